@@ -0,0 +1,47 @@
+-- Migration: Stored tsvector columns with GIN indexes for email archive search
+-- Date: 2026-10-18
+--
+-- Run with psql outside a transaction block (CREATE INDEX CONCURRENTLY):
+--   psql "$DATABASE_URL" -f migrations/20261018_email_fulltext_search.sql
+
+-- 1. Generated search vector: subject (weight A) + body preview (weight B)
+ALTER TABLE email_archive.hot_emails
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(subject, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body_preview, '')), 'B')
+    ) STORED;
+
+ALTER TABLE email_archive.cold_emails
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(subject, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body_preview, '')), 'B')
+    ) STORED;
+
+-- 2. GIN indexes on the stored vectors
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hot_emails_search_vector
+    ON email_archive.hot_emails USING gin(search_vector);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cold_emails_search_vector
+    ON email_archive.cold_emails USING gin(search_vector);
+
+-- 3. Sort key for keyset pagination (received_date DESC, id DESC)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hot_emails_received_date_id
+    ON email_archive.hot_emails(received_date, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cold_emails_received_date_id
+    ON email_archive.cold_emails(received_date, id);
+
+-- 4. Drop indexes the stored vectors replace: B-trees on body text (no use for
+--    text search, and they fail on long bodies) and the expression GIN indexes
+--    created by src/utils/migrate_email_storage.py
+DROP INDEX CONCURRENTLY IF EXISTS email_archive.ix_hot_emails_body_text;
+DROP INDEX CONCURRENTLY IF EXISTS email_archive.ix_cold_emails_body_text;
+DROP INDEX CONCURRENTLY IF EXISTS email_archive.ix_hot_emails_body_preview;
+DROP INDEX CONCURRENTLY IF EXISTS email_archive.ix_cold_emails_body_preview;
+DROP INDEX CONCURRENTLY IF EXISTS email_archive.idx_hot_emails_body_preview;
+DROP INDEX CONCURRENTLY IF EXISTS email_archive.idx_cold_emails_body_preview;
+
+ANALYZE email_archive.hot_emails;
+ANALYZE email_archive.cold_emails;
+
+-- End of migration
@@ -10,9 +10,13 @@ Phase 1 of RAG System Implementation
 
 import os
 import sys
+import json
 import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 
 # Add src to path for imports
@@ -20,11 +24,65 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from langchain_community.document_loaders import DirectoryLoader, UnstructuredFileLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter, MarkdownHeaderTextSplitter
-from src.core.chroma_embedding_manager_simple import SimpleChromaEmbeddingManager
+from src.core.chroma_registry import get_chroma_registry
 from src.core.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Supported file extensions
+SUPPORTED_EXTENSIONS = {'.md', '.pdf', '.docx', '.txt'}
+
+# Rows per Chroma upsert/delete call
+WRITE_BATCH_SIZE = 1000
+
+
+def file_sha256(path: Path) -> str:
+    """Hash a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_guideline_file(filepath: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Load and split one document (runs in a worker process).
+    
+    Args:
+        filepath: Path of the document
+        chunk_size: Size of text chunks for embedding
+        chunk_overlap: Overlap between chunks
+        
+    Returns:
+        List of chunk texts, in document order
+    """
+    loader = UnstructuredFileLoader(filepath)
+    doc_content = loader.load()
+    if not doc_content:
+        return []
+    text_content = doc_content[0].page_content if hasattr(doc_content[0], 'page_content') else str(doc_content[0])
+    
+    if filepath.lower().endswith('.md'):
+        # Use markdown splitter for markdown files
+        splitter = MarkdownHeaderTextSplitter(
+            headers_to_split_on=[
+                ("#", "Header 1"),
+                ("##", "Header 2"),
+                ("###", "Header 3"),
+                ("####", "Header 4"),
+            ]
+        )
+    else:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+            separators=["\n\n", "\n", " ", ""]
+        )
+    pieces = splitter.split_text(text_content)
+    return [piece.page_content if hasattr(piece, 'page_content') else str(piece) for piece in pieces]
+
 class GuidelineIngestionPipeline:
     """
     Pipeline for ingesting guideline documents into ChromaDB collections.
@@ -34,12 +92,16 @@ class GuidelineIngestionPipeline:
     - Intelligent text chunking with context preservation
     - Specialized collections for technical vs process documents
     - Metadata preservation for source tracking
+    - Incremental runs driven by a manifest of file hashes and chunk ids
+    - Parallel parsing across a process pool
     """
     
     def __init__(self, 
                  guidelines_dir: str = "../docs/guidelines",
                  chunk_size: int = 1000,
-                 chunk_overlap: int = 100):
+                 chunk_overlap: int = 100,
+                 manifest_path: Optional[str] = None,
+                 max_workers: Optional[int] = None):
         """
         Initialize the ingestion pipeline.
         
@@ -47,41 +109,20 @@ class GuidelineIngestionPipeline:
             guidelines_dir: Directory containing guideline documents
             chunk_size: Size of text chunks for embedding
             chunk_overlap: Overlap between chunks for context preservation
+            manifest_path: JSON manifest of ingested files (defaults to chroma_db/guidelines_manifest.json)
+            max_workers: Parsing processes (defaults to the CPU count)
         """
         self.guidelines_dir = Path(guidelines_dir)
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.max_workers = max_workers
         
-        # Initialize embedding manager
-        self.embedding_manager = SimpleChromaEmbeddingManager()
-        
-        # Initialize text splitters
-        self._init_text_splitters()
+        # Shared Chroma client and collection handles
+        self.registry = get_chroma_registry()
+        self.manifest_path = Path(manifest_path or Path(self.registry.persist_directory) / "guidelines_manifest.json")
         
         logger.info(f"GuidelineIngestionPipeline initialized for {self.guidelines_dir}")
     
-    def _init_text_splitters(self):
-        """Initialize text splitters for different document types."""
-        # General text splitter for most documents
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        
-        # Markdown-specific splitter for better structure preservation
-        self.markdown_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=[
-                ("#", "Header 1"),
-                ("##", "Header 2"),
-                ("###", "Header 3"),
-                ("####", "Header 4"),
-            ]
-        )
-        
-        logger.info("Text splitters initialized")
-    
     def _determine_collection(self, filename: str) -> str:
         """
         Determine which ChromaDB collection to use based on filename.
@@ -120,203 +161,230 @@ class GuidelineIngestionPipeline:
         logger.info(f"Unknown document type for {filename}, defaulting to process collection")
         return 'guidelines_process'
     
-    def _load_documents(self) -> List[Dict[str, Any]]:
+    def _scan_files(self) -> List[Path]:
         """
-        Load all documents from the guidelines directory.
+        Find all supported documents under the guidelines directory.
         
         Returns:
-            List of document dictionaries with content and metadata
+            Sorted list of document paths
         """
-        documents = []
-        
         if not self.guidelines_dir.exists():
             logger.error(f"Guidelines directory not found: {self.guidelines_dir}")
-            return documents
-        
-        # Supported file extensions
-        supported_extensions = {'.md', '.pdf', '.docx', '.txt'}
+            return []
         
-        # Recursively find all supported files
-        for file_path in self.guidelines_dir.rglob("*"):
-            if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
-                try:
-                    logger.info(f"Loading document: {file_path.name}")
-                    
-                    # Load document content
-                    loader = UnstructuredFileLoader(str(file_path))
-                    doc_content = loader.load()
-                    
-                    if doc_content:
-                        # Extract text content
-                        text_content = doc_content[0].page_content if hasattr(doc_content[0], 'page_content') else str(doc_content[0])
-                        
-                        documents.append({
-                            'filename': file_path.name,
-                            'filepath': str(file_path),
-                            'content': text_content,
-                            'collection': self._determine_collection(file_path.name)
-                        })
-                        
-                        logger.info(f"Successfully loaded {file_path.name} ({len(text_content)} chars)")
-                    else:
-                        logger.warning(f"No content extracted from {file_path.name}")
-                        
-                except Exception as e:
-                    logger.error(f"Failed to load {file_path.name}: {e}")
-                    continue
+        return sorted(
+            file_path for file_path in self.guidelines_dir.rglob("*")
+            if file_path.is_file() and file_path.suffix.lower() in SUPPORTED_EXTENSIONS
+        )
+    
+    def _load_manifest(self) -> Dict[str, Any]:
+        """Load the manifest of ingested files (relative path -> hash, collection, chunk ids)."""
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f).get("files", {})
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return {}
+    
+    def _save_manifest(self, files: Dict[str, Any]):
+        """Write the manifest atomically."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.manifest_path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump({"updated_at": time.time(), "files": files}, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+    
+    def _fingerprint(self, file_path: Path, previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Size, mtime and content hash of a file.
         
-        logger.info(f"Loaded {len(documents)} documents")
-        return documents
+        The hash of the previous run is reused when size and mtime are unchanged.
+        """
+        stat = file_path.stat()
+        if previous and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime:
+            sha256 = previous["sha256"]
+        else:
+            sha256 = file_sha256(file_path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256}
     
-    def _chunk_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _parse_files(self, paths: List[Path]) -> Dict[Path, List[str]]:
         """
-        Split documents into chunks for embedding.
+        Parse and chunk documents across a process pool.
         
         Args:
-            documents: List of document dictionaries
+            paths: Documents to parse
             
         Returns:
-            List of chunk dictionaries with metadata
+            Dict mapping each successfully parsed path to its chunk texts
         """
-        chunks = []
+        parsed = {}
+        if not paths:
+            return parsed
         
-        for doc in documents:
-            try:
-                content = doc['content']
-                filename = doc['filename']
-                collection = doc['collection']
-                
-                # Choose appropriate splitter based on file type
-                if filename.lower().endswith('.md'):
-                    # Use markdown splitter for markdown files
-                    doc_chunks = self.markdown_splitter.split_text(content)
-                else:
-                    # Use general text splitter for other files
-                    doc_chunks = self.text_splitter.split_text(content)
-                
-                # Create chunk metadata
-                for i, chunk in enumerate(doc_chunks):
-                    chunks.append({
-                        'content': chunk,
-                        'filename': filename,
-                        'collection': collection,
-                        'chunk_index': i,
-                        'total_chunks': len(doc_chunks),
-                        'metadata': {
-                            'source': filename,
-                            'chunk_index': i,
-                            'total_chunks': len(doc_chunks),
-                            'collection': collection
-                        }
-                    })
-                
-                logger.info(f"Created {len(doc_chunks)} chunks for {filename}")
-                
-            except Exception as e:
-                logger.error(f"Failed to chunk {doc['filename']}: {e}")
-                continue
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(parse_guideline_file, str(path), self.chunk_size, self.chunk_overlap): path
+                for path in paths
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    parsed[path] = future.result()
+                    logger.info(f"Parsed {path.name} into {len(parsed[path])} chunks")
+                except Exception as e:
+                    logger.error(f"Failed to load {path.name}: {e}")
         
-        logger.info(f"Created {len(chunks)} total chunks")
-        return chunks
+        return parsed
     
-    def _store_chunks_in_chromadb(self, chunks: List[Dict[str, Any]]):
-        """
-        Store document chunks in ChromaDB collections.
-        
-        Args:
-            chunks: List of chunk dictionaries
-        """
-        # Group chunks by collection
-        collections = {}
-        for chunk in chunks:
-            collection_name = chunk['collection']
-            if collection_name not in collections:
-                collections[collection_name] = []
-            collections[collection_name].append(chunk)
-        
-        # Store chunks in each collection
-        for collection_name, collection_chunks in collections.items():
-            try:
-                logger.info(f"Storing {len(collection_chunks)} chunks in {collection_name}")
-                
-                # Create collection-specific embedding manager
-                collection_manager = SimpleChromaEmbeddingManager(
-                    collection_name=collection_name
-                )
-                
-                # Prepare data for ChromaDB
-                texts = [str(chunk['content']) for chunk in collection_chunks]
-                metadatas = [chunk['metadata'] for chunk in collection_chunks]
-                ids = [f"{chunk['filename']}_{chunk['chunk_index']}" for chunk in collection_chunks]
-                
-                # Store in ChromaDB
-                collection_manager.collection.add(
-                    documents=texts,
-                    metadatas=metadatas,
-                    ids=ids
-                )
-                
-                logger.info(f"Successfully stored chunks in {collection_name}")
-                
-            except Exception as e:
-                logger.error(f"Failed to store chunks in {collection_name}: {e}")
-                continue
+    def _upsert_chunks(self, collection_name: str, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        """Upsert chunks into a collection in large batches."""
+        collection = self.registry.get_collection(collection_name)
+        for i in range(0, len(ids), WRITE_BATCH_SIZE):
+            collection.upsert(
+                ids=ids[i:i + WRITE_BATCH_SIZE],
+                documents=texts[i:i + WRITE_BATCH_SIZE],
+                metadatas=metadatas[i:i + WRITE_BATCH_SIZE]
+            )
     
-    def run_ingestion(self) -> Dict[str, Any]:
+    def _delete_chunks(self, collection_name: str, ids: List[str]):
+        """Delete chunks from a collection in large batches."""
+        collection = self.registry.get_collection(collection_name)
+        for i in range(0, len(ids), WRITE_BATCH_SIZE):
+            collection.delete(ids=ids[i:i + WRITE_BATCH_SIZE])
+    
+    def run_ingestion(self, incremental: bool = False) -> Dict[str, Any]:
         """
         Run the complete ingestion pipeline.
         
+        Every document is hashed and compared with the manifest. In incremental
+        mode only new or changed documents are parsed; otherwise all of them are.
+        Chunks of parsed documents are upserted, and chunk ids that a document
+        no longer produces (or of documents that were removed) are deleted.
+        
+        Args:
+            incremental: Skip documents whose content hash is unchanged
+        
         Returns:
             Dictionary with ingestion results and statistics
         """
         start_time = time.time()
         
-        logger.info("🚀 Starting guideline document ingestion pipeline...")
+        logger.info(f"🚀 Starting guideline document ingestion pipeline ({'incremental' if incremental else 'full'})...")
         
         try:
-            # Step 1: Load documents
-            logger.info("📚 Loading documents...")
-            documents = self._load_documents()
+            # Step 1: Find documents and compare them with the manifest
+            logger.info("📚 Scanning documents...")
+            paths = self._scan_files()
             
-            if not documents:
+            if not paths:
                 logger.error("No documents found to process")
-                return {'success': False, 'error': 'No documents found'}
+                return {'success': False, 'error': 'No documents found', 'processing_time': time.time() - start_time}
             
-            # Step 2: Chunk documents
-            logger.info("✂️ Chunking documents...")
-            chunks = self._chunk_documents(documents)
+            previous = self._load_manifest()
+            manifest = {}
+            to_parse = []
+            fingerprints = {}
+            for path in paths:
+                key = path.relative_to(self.guidelines_dir).as_posix()
+                fingerprints[path] = self._fingerprint(path, previous.get(key))
+                entry = previous.get(key)
+                if incremental and entry and entry.get("sha256") == fingerprints[path]["sha256"]:
+                    # Unchanged: keep its chunks, refresh size/mtime
+                    manifest[key] = dict(entry, **fingerprints[path])
+                else:
+                    to_parse.append(path)
             
-            if not chunks:
-                logger.error("No chunks created from documents")
-                return {'success': False, 'error': 'No chunks created'}
+            # Step 2: Parse and chunk new or changed documents
+            logger.info(f"✂️ Parsing {len(to_parse)} of {len(paths)} documents...")
+            parsed = self._parse_files(to_parse)
             
-            # Step 3: Store in ChromaDB
+            # Step 3: Upsert new chunks and collect stale chunk ids per collection
             logger.info("💾 Storing chunks in ChromaDB...")
-            self._store_chunks_in_chromadb(chunks)
+            upserts: Dict[str, Tuple[List[str], List[str], List[Dict[str, Any]]]] = {}
+            deletes: Dict[str, List[str]] = {}
+            collections = {}
+            for path in to_parse:
+                key = path.relative_to(self.guidelines_dir).as_posix()
+                old_entry = previous.get(key)
+                if path not in parsed:
+                    # Parsing failed: leave what is stored for it untouched
+                    if old_entry:
+                        manifest[key] = old_entry
+                    continue
+                
+                chunks = parsed[path]
+                collection = self._determine_collection(path.name)
+                # Ids follow the relative path, so same-named documents in different
+                # folders (or a document moved between them) never share ids
+                ids = [f"{key}_{i}" for i in range(len(chunks))]
+                ids_out, texts_out, metadatas_out = upserts.setdefault(collection, ([], [], []))
+                for i, chunk in enumerate(chunks):
+                    ids_out.append(ids[i])
+                    texts_out.append(chunk)
+                    metadatas_out.append({
+                        'source': path.name,
+                        'chunk_index': i,
+                        'total_chunks': len(chunks),
+                        'collection': collection
+                    })
+                collections[collection] = collections.get(collection, 0) + len(chunks)
+                
+                if old_entry:
+                    stale = set(old_entry.get("chunk_ids", [])) - set(ids)
+                    if stale:
+                        deletes.setdefault(old_entry.get("collection", collection), []).extend(sorted(stale))
+                
+                manifest[key] = dict(fingerprints[path], collection=collection, chunk_ids=ids)
+            
+            # Documents that disappeared from the directory
+            removed = [key for key in previous if key not in manifest and not (self.guidelines_dir / key).exists()]
+            for key in removed:
+                entry = previous[key]
+                deletes.setdefault(entry.get("collection", "guidelines_process"), []).extend(entry.get("chunk_ids", []))
+            
+            # Never delete an id that a document still owns (upserted this run or
+            # unchanged); manifests from before ids followed the relative path can
+            # list the same basename id for several documents
+            owned: Dict[str, set] = {}
+            for entry in manifest.values():
+                owned.setdefault(entry.get("collection"), set()).update(entry.get("chunk_ids", []))
+            for collection_name in list(deletes):
+                keep = owned.get(collection_name, set())
+                deletes[collection_name] = [i for i in dict.fromkeys(deletes[collection_name]) if i not in keep]
+                if not deletes[collection_name]:
+                    del deletes[collection_name]
+            
+            for collection_name, (ids, texts, metadatas) in upserts.items():
+                logger.info(f"Storing {len(ids)} chunks in {collection_name}")
+                self._upsert_chunks(collection_name, ids, texts, metadatas)
+            for collection_name, ids in deletes.items():
+                logger.info(f"Deleting {len(ids)} stale chunks from {collection_name}")
+                self._delete_chunks(collection_name, ids)
+            
+            self._save_manifest(manifest)
             
             # Calculate statistics
             total_time = time.time() - start_time
-            
-            # Group by collection
-            collections = {}
-            for chunk in chunks:
-                collection = chunk['collection']
-                if collection not in collections:
-                    collections[collection] = 0
-                collections[collection] += 1
+            total_chunks = sum(collections.values())
             
             results = {
                 'success': True,
-                'total_documents': len(documents),
-                'total_chunks': len(chunks),
+                'total_documents': len(parsed),
+                'total_chunks': total_chunks,
+                'unchanged_documents': len(paths) - len(to_parse),
+                'failed_documents': len(to_parse) - len(parsed),
+                'removed_documents': len(removed),
+                'chunks_deleted': sum(len(ids) for ids in deletes.values()),
                 'collections': collections,
                 'processing_time': total_time,
-                'documents_processed': [doc['filename'] for doc in documents]
+                'documents_processed': sorted(path.name for path in parsed)
             }
             
             logger.info(f"✅ Ingestion completed successfully!")
-            logger.info(f"   Documents processed: {len(documents)}")
-            logger.info(f"   Chunks created: {len(chunks)}")
+            logger.info(f"   Documents processed: {len(parsed)} ({results['unchanged_documents']} unchanged)")
+            logger.info(f"   Chunks created: {total_chunks}")
             logger.info(f"   Processing time: {total_time:.2f} seconds")
             logger.info(f"   Collections: {collections}")
             
@@ -332,14 +400,20 @@ class GuidelineIngestionPipeline:
 
 def main():
     """Main execution function."""
+    parser = argparse.ArgumentParser(description="Ingest guideline documents into ChromaDB")
+    parser.add_argument("--guidelines-dir", default="../docs/guidelines", help="Directory containing guideline documents")
+    parser.add_argument("--incremental", action="store_true", help="Only re-parse documents whose content changed")
+    parser.add_argument("--workers", type=int, default=None, help="Parsing processes (default: CPU count)")
+    args = parser.parse_args()
+    
     print("🚀 Starting Guideline Document Ingestion Pipeline")
     print("=" * 60)
     
     # Initialize pipeline
-    pipeline = GuidelineIngestionPipeline()
+    pipeline = GuidelineIngestionPipeline(guidelines_dir=args.guidelines_dir, max_workers=args.workers)
     
     # Run ingestion
-    results = pipeline.run_ingestion()
+    results = pipeline.run_ingestion(incremental=args.incremental)
     
     # Print results
     print("\n" + "=" * 60)
@@ -347,6 +421,8 @@ def main():
         print("✅ INGESTION COMPLETED SUCCESSFULLY")
         print(f"📊 Documents processed: {results['total_documents']}")
         print(f"📊 Chunks created: {results['total_chunks']}")
+        print(f"📊 Unchanged documents: {results['unchanged_documents']}")
+        print(f"📊 Removed documents: {results['removed_documents']} ({results['chunks_deleted']} chunks deleted)")
         print(f"⏱️  Processing time: {results['processing_time']:.2f} seconds")
         print(f"🗄️  Collections: {results['collections']}")
         
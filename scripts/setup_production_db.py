@@ -117,14 +117,10 @@ def setup_email_archive_tables():
     print("\n📧 Setting up email archive tables...")
     
     try:
-        from src.core.models.email_archive import Base
-        from sqlalchemy import create_engine
+        from src.core.database.migrations import run_migrations
         
-        database_url = os.getenv('DATABASE_URL')
-        engine = create_engine(database_url)
-        
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Create all tables (email archive, corrections, tracked activities)
+        run_migrations(os.getenv('DATABASE_URL'))
         print("✅ Email archive tables created")
         
         return True
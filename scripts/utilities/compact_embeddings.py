@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Compact the task embedding collection.
+
+Removes duplicate rows (the same normalized text stored under several ids)
+and, unless --keep-orphans is given, rows for tasks that no longer exist in
+any user's Notion task database. The collection is rebuilt from the kept
+rows, which also rebuilds its HNSW index. Prints row counts and average query
+latency before and after.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.config.settings import NOTION_TOKEN, NOTION_USERS_DB_ID, NOTION_DATABASE_ID
+from src.core.chroma_embedding_manager_simple import SimpleChromaEmbeddingManager
+
+
+def collect_live_task_texts():
+    """Task titles currently in Notion, across every user's task database."""
+    from src.core import fetch_notion_tasks
+    from src.core.security.jwt_utils import JWTManager
+    from src.core.services.auth_service import AuthService
+
+    jwt_manager = JWTManager(secret_key="dummy", algorithm="HS256")  # Only used for user lookup
+    auth_service = AuthService(NOTION_TOKEN, NOTION_USERS_DB_ID, jwt_manager, None)
+    database_ids = {user.task_database_id for user in auth_service.get_all_users() if user.task_database_id}
+    if NOTION_DATABASE_ID:
+        database_ids.add(NOTION_DATABASE_ID)
+
+    texts = set()
+    for database_id in database_ids:
+        tasks = fetch_notion_tasks(database_id)
+        if not tasks.empty and 'task' in tasks.columns:
+            texts.update(text for text in tasks['task'] if text)
+        print(f"   {database_id}: {len(tasks)} tasks")
+    return texts
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Deduplicate and rebuild a Chroma embedding collection")
+    parser.add_argument("--collection", default="task_embeddings", help="Collection to compact")
+    parser.add_argument("--persist-directory", default="chroma_db", help="Chroma data directory")
+    parser.add_argument("--keep-orphans", action="store_true",
+                        help="Only remove duplicates; don't drop rows for tasks missing from Notion")
+    args = parser.parse_args()
+
+    print(f"🧹 Compacting collection '{args.collection}' in {args.persist_directory}")
+    live_texts = None
+    if not args.keep_orphans:
+        print("📥 Loading live tasks from Notion...")
+        live_texts = collect_live_task_texts()
+        print(f"📊 {len(live_texts)} distinct live task texts")
+
+    manager = SimpleChromaEmbeddingManager(collection_name=args.collection,
+                                           persist_directory=args.persist_directory)
+    report = manager.compact_collection(live_texts=live_texts)
+
+    print("\n" + "=" * 60)
+    print(f"Rows:             {report['rows_before']} -> {report['rows_after']}")
+    print(f"Duplicates:       {report['duplicates_removed']} removed")
+    print(f"Orphans:          {report['orphans_removed']} removed")
+    print(f"Query latency:    {report['query_ms_before']:.2f} ms -> {report['query_ms_after']:.2f} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
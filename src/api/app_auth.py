@@ -129,6 +129,8 @@ print(f"JWT Manager Secret: {jwt_manager.secret_key[:8]}..." if jwt_manager.secr
 # Initialize Authentication Service
 auth_service = AuthService(NOTION_TOKEN, NOTION_USERS_DB_ID, jwt_manager, NOTION_PARENT_PAGE_ID)
 app.auth_service = auth_service
+if USER_DIRECTORY_PRELOAD:
+    auth_service.preload_user_directory()
 
 # Initialize User Task Service
 from src.core.services.user_task_service import UserTaskService
@@ -424,15 +426,19 @@ def process_update(current_user):
         existing_tasks = notion_agent.fetch_tasks(database_id=user_task_db_id)
         log_output.append("Fetched existing tasks for similarity check.")
 
-        # Step 3: Process each extracted task
+        # Step 3: Process all extracted tasks (similarity is resolved in one batch)
+        results = task_processing_agent.process_tasks(
+            database_id=user_task_db_id,
+            tasks=extracted_tasks,
+            existing_tasks=existing_tasks,
+            log_output=log_output
+        )
+        if isinstance(results, dict):
+            # Agent error: report it for every task
+            results = [(False, results.get("error", "Task processing failed"))] * len(extracted_tasks)
+
         processed_tasks = []
-        for task in extracted_tasks:
-            success, message = task_processing_agent.process_task(
-                database_id=user_task_db_id,
-                task=task,
-                existing_tasks=existing_tasks,
-                log_output=log_output
-            )
+        for task, (success, message) in zip(extracted_tasks, results):
             if success:
                 log_output.append(f"Successfully processed task: {task.get('task')}")
                 processed_tasks.append({
@@ -792,6 +798,7 @@ def create_user_task_database(current_user):
         user_page = auth_service._get_notion_page_by_id(user_id)
         if user_page:
             auth_service._update_user_page(user_page['id'], {"task_database_id": database_id})
+            auth_service.invalidate_user(user_id, user.email)
         
         return jsonify({
             'message': 'Task database created successfully',
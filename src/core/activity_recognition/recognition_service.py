@@ -221,7 +221,8 @@ Examples:
 
 Activity name:"""
 
-            response = get_ai_response(prompt)
+            # Near-identical titles share a cached name
+            response = get_ai_response(prompt, semantic_class="activity_name", semantic_text=task_title)
             
             # Clean up the response
             normalized_name = response.strip()
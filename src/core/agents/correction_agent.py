@@ -4,6 +4,8 @@ Simplified AI agent for interpreting user correction requests.
 import json
 import re
 from typing import List, Dict, Any, Optional
+from src.config.settings import GEMINI_MODEL
+from src.core.ai.response_cache import cached_completion
 from src.core.gemini_client import client
 from src.core.logging_config import get_logger
 
@@ -32,8 +34,12 @@ class CorrectionAgent:
             # Build simple, focused prompt
             prompt = self._build_simple_correction_prompt(reply_text, task_ids)
             
-            # Get AI response
-            response = self.ai_client.generate_content(prompt)
+            # Get AI response (the same reply to the same tasks is interpreted once)
+            response = cached_completion(
+                prompt,
+                lambda: self.ai_client.generate_content(prompt),
+                f"gemini:{GEMINI_MODEL}"
+            )
             
             # Parse response (response is already a string)
             corrections = self._parse_simple_response(response, task_ids)
@@ -1,4 +1,4 @@
-from src.core.task_processor import insert_or_update_task
+from src.core.task_processor import insert_or_update_task, insert_or_update_tasks
 from src.core.exceptions import handle_agent_errors, TaskProcessingAgentError
 
 class TaskProcessingAgent:
@@ -13,6 +13,17 @@ class TaskProcessingAgent:
             print(traceback.format_exc())
             raise ValueError(f"Task processing failed: {str(e)}\n{traceback.format_exc()}")
 
+    @handle_agent_errors("TaskProcessingAgent")
+    def process_tasks(self, database_id: str, tasks, existing_tasks, log_output=None, batch_mode=False):
+        """Process all tasks from one update, resolving similarity in a single batch."""
+        try:
+            return insert_or_update_tasks(database_id, tasks, existing_tasks, log_output, batch_mode)
+        except Exception as e:
+            import traceback
+            print(f"Error processing tasks: {e}")
+            print(traceback.format_exc())
+            raise ValueError(f"Task processing failed: {str(e)}\n{traceback.format_exc()}")
+
     @handle_agent_errors("TaskProcessingAgent")
     def batch_process_tasks(self, database_id: str, tasks, existing_tasks):
         try:
@@ -10,8 +10,11 @@ from src.config.settings import (
     AI_PROVIDER,
     CHAT_MODEL,
     DEBUG_MODE,
+    GEMINI_MODEL,
+    LLM_RESPONSE_CACHE_SAMPLED_TTL_SECONDS,
     MIN_TASK_LENGTH
 )
+from src.core.ai.response_cache import cached_completion
 
 class AnalyzerBase:
     """Base class for analyzers."""
@@ -36,10 +39,13 @@ class AnalyzerBase:
             return "Gemini client not available"
         
         try:
-            # Use Gemini's native API
-            response_text = self.client.generate_content(
+            # Use Gemini's native API; sampled insights should vary, so skip the cache
+            response_text = cached_completion(
                 prompt,
-                temperature=0.7
+                lambda: self.client.generate_content(prompt, temperature=0.7),
+                f"gemini:{GEMINI_MODEL}",
+                0.7,
+                cache=False
             )
             return response_text
         except Exception as e:
@@ -367,6 +373,108 @@ Response:"""
                 "explanation": f"Error parsing AI response: {str(e)}"
             }
 
+    def analyze_task_similarity_batch(self,
+                                      comparisons: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Analyze several new tasks against their own candidate lists in one AI call.
+
+        Args:
+            comparisons: List of {"new_task": ..., "existing_tasks": [...]} entries
+
+        Returns:
+            List of similarity results, one per comparison and in the same order
+        """
+        if not comparisons:
+            return []
+
+        try:
+            prompt = self._create_batch_similarity_prompt(comparisons)
+            response = self.generate_text(prompt)
+            return self._parse_batch_similarity_response(response, comparisons)
+
+        except Exception as e:
+            import traceback
+            print(f"Error in batch task similarity analysis: {e}")
+            print(traceback.format_exc())
+            return [{
+                "is_match": False,
+                "confidence": 0.0,
+                "matched_task": None,
+                "explanation": f"Error in AI analysis: {str(e)}"
+            } for _ in comparisons]
+
+    def _create_batch_similarity_prompt(self, comparisons: List[Dict[str, Any]]) -> str:
+        """Create a single prompt covering several new tasks and their candidates."""
+
+        sections = ""
+        for n, comparison in enumerate(comparisons, 1):
+            sections += f"NEW TASK {n}:\n\"{comparison['new_task'].get('task', '')}\"\n"
+            sections += f"CANDIDATES FOR NEW TASK {n}:\n"
+            for i, task in enumerate(comparison["existing_tasks"], 1):
+                sections += f"{i}. Task: {task.get('task', '')}\n"
+                if task.get("description"):
+                    sections += f"   Description: {task['description']}\n"
+                sections += f"   Status: {task.get('status', '')}, Category: {task.get('category', '')}\n"
+            sections += "\n"
+
+        prompt = f"""You are an expert at identifying duplicate or similar tasks in a project management system.
+
+Each new task below has its own numbered list of candidate existing tasks.
+For each new task, decide whether it is similar to one of ITS OWN candidates. Consider:
+- Semantic similarity (same meaning, different words)
+- Functional similarity (same purpose/goal)
+- Domain similarity (same area of work)
+- Implementation similarity (same technical approach)
+
+{sections}
+Respond with a JSON array containing exactly one object per new task, in the following format:
+[
+    {{
+        "new_task_index": the new task number (1-based),
+        "is_match": true/false,
+        "confidence": 0.0-1.0,
+        "matched_task_index": null or the candidate number (1-based),
+        "explanation": "Detailed explanation of why tasks are similar or different"
+    }}
+]
+
+Response:"""
+
+        return prompt
+
+    def _parse_batch_similarity_response(self, response: str,
+                                         comparisons: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Parse the AI response for batch task similarity."""
+        import json
+        import re
+
+        results = [{
+            "is_match": False,
+            "confidence": 0.0,
+            "matched_task": None,
+            "explanation": "No result returned by AI for this task"
+        } for _ in comparisons]
+
+        json_match = re.search(r'\[.*\]', response, re.DOTALL)
+        if not json_match:
+            for result in results:
+                result["explanation"] = f"Could not parse AI response: {response[:200]}..."
+            return results
+
+        for position, item in enumerate(json.loads(json_match.group())):
+            if not isinstance(item, dict):
+                continue
+            try:
+                n = int(item.get("new_task_index") or position + 1) - 1
+            except (TypeError, ValueError):
+                continue
+            if not 0 <= n < len(comparisons):
+                continue
+            # Reuse the single-task parser for field validation and index mapping
+            results[n] = self._parse_similarity_response(json.dumps(item), comparisons[n]["existing_tasks"])
+
+        return results
+
 class ProjectAnalyzer(AnalyzerBase):
     """Analyzer for projects."""
     
@@ -547,18 +655,29 @@ class ProjectAnalyzer(AnalyzerBase):
         
         return prompt
 
-def get_ai_response(prompt: str) -> str:
-    """Get response from Gemini API."""
+def get_ai_response(prompt: str, **cache_options) -> str:
+    """
+    Get response from Gemini API.
+    
+    Args:
+        prompt: Prompt text
+        **cache_options: Response cache options (cache, ttl, semantic_class, semantic_text)
+    """
     try:
         from src.core.gemini_client import client
         
         if not client:
             raise Exception("Gemini client not available")
         
-        # Use Gemini's native API
-        response_text = client.generate_content(
+        # Use Gemini's native API, through the shared response cache; the answer is
+        # sampled, so it is kept for the shorter sampled lifetime unless the caller says otherwise
+        cache_options.setdefault('ttl', LLM_RESPONSE_CACHE_SAMPLED_TTL_SECONDS)
+        response_text = cached_completion(
             prompt,
-            temperature=0.3
+            lambda: client.generate_content(prompt, temperature=0.3),
+            f"gemini:{GEMINI_MODEL}",
+            0.3,
+            **cache_options
         )
         
         return response_text
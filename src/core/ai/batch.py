@@ -0,0 +1,158 @@
+"""
+Concurrent execution of many independent LLM prompts.
+
+batch_api_requests in both provider clients used to send prompts one after
+another, so a weekly analytics run took as long as the sum of all its round
+trips. run_prompt_batch overlaps them on a bounded thread pool. Every call
+still goes through the provider's shared client (one HTTP connection pool)
+and its rate limiter, so concurrency overlaps latency without exceeding the
+configured request, token or in-flight limits.
+
+Each prompt is retried on its own with jittered exponential backoff, results
+come back in prompt order, and a batch stops scheduling work when it is
+cancelled (cancel_batches(), or the waiting thread being interrupted, e.g.
+by KeyboardInterrupt or a SystemExit raised from a SIGTERM handler).
+cancel_batches() runs on interpreter exit and on Celery worker shutdown.
+"""
+import atexit
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, List, Optional, Sequence
+
+from src.config.settings import (
+    LLM_BATCH_MAX_CONCURRENCY,
+    LLM_BATCH_MAX_RETRIES,
+    LLM_BATCH_RETRY_BASE_SECONDS,
+    LLM_BATCH_RETRY_MAX_SECONDS
+)
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class BatchCancelled(Exception):
+    """Raised for prompts that were not (re)tried because their batch was cancelled."""
+
+
+# Events of the batches currently running, set by cancel_batches()
+_running: "set[threading.Event]" = set()
+_running_lock = threading.Lock()
+
+
+def cancel_batches():
+    """Cancel every running batch: no new prompts or retries are started."""
+    with _running_lock:
+        for event in _running:
+            event.set()
+
+
+def _cancel_on_shutdown(*args, **kwargs):
+    """Signal receiver: cancel running batches when the process shuts down."""
+    cancel_batches()
+
+
+def _register_shutdown_hooks():
+    """Cancel running batches on interpreter exit and on Celery worker shutdown."""
+    atexit.register(cancel_batches)
+    # atexit handlers only run after non-daemon threads (such as executor
+    # workers) are joined; threading's own exit hooks run before that join
+    register_before_join = getattr(threading, "_register_atexit", None)
+    if register_before_join is not None:
+        try:
+            register_before_join(cancel_batches)
+        except RuntimeError:
+            pass  # Interpreter already shutting down
+    try:
+        from celery import signals
+    except ImportError:
+        return
+    # worker_shutting_down: warm shutdown started (tasks in this process are still running)
+    # worker_shutdown / worker_process_shutdown: main worker / pool child process exiting
+    for name in ("worker_shutting_down", "worker_shutdown", "worker_process_shutdown"):
+        signal = getattr(signals, name, None)
+        if signal is not None:
+            signal.connect(_cancel_on_shutdown, weak=False)
+
+
+_register_shutdown_hooks()
+
+
+def backoff_delay(attempt: int,
+                  base: float = LLM_BATCH_RETRY_BASE_SECONDS,
+                  cap: float = LLM_BATCH_RETRY_MAX_SECONDS) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _call_with_retries(call: Callable[[Any], str], prompt: Any, index: int,
+                       max_retries: int, cancelled: threading.Event) -> str:
+    for attempt in range(max_retries + 1):
+        if cancelled.is_set():
+            raise BatchCancelled(f"prompt {index + 1} cancelled")
+        try:
+            return call(prompt)
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.debug(f"Prompt {index + 1} failed on attempt {attempt + 1}: {e}. Retrying in {delay:.2f}s")
+            # Waiting on the event lets cancellation cut the backoff short
+            if cancelled.wait(delay):
+                raise BatchCancelled(f"prompt {index + 1} cancelled")
+
+
+def run_prompt_batch(call: Callable[[Any], str],
+                     prompts: Sequence[Any],
+                     max_concurrency: int = LLM_BATCH_MAX_CONCURRENCY,
+                     max_retries: int = LLM_BATCH_MAX_RETRIES,
+                     on_error: Optional[Callable[[int, Exception], str]] = None) -> List[str]:
+    """
+    Run call(prompt) for every prompt on a bounded thread pool.
+
+    Args:
+        call: Sends one prompt and returns the response text (without retrying itself)
+        prompts: Prompts in the order results should be returned
+        max_concurrency: Prompts in flight at once
+        max_retries: Retries per prompt after its first attempt
+        on_error: Maps (prompt index, final exception) to the result string;
+                  defaults to "Error: <message>"
+
+    Returns:
+        List[str]: One result per prompt, in prompt order
+    """
+    if not prompts:
+        return []
+    if on_error is None:
+        on_error = lambda index, error: f"Error: {str(error)}"
+
+    cancelled = threading.Event()
+    with _running_lock:
+        _running.add(cancelled)
+    workers = max(1, min(max_concurrency, len(prompts)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='llm-batch')
+    try:
+        futures = [
+            executor.submit(_call_with_retries, call, prompt, i, max_retries, cancelled)
+            for i, prompt in enumerate(prompts)
+        ]
+        wait(futures)
+    except BaseException:
+        # Interrupted while waiting: stop retries and drop prompts not started yet
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        with _running_lock:
+            _running.discard(cancelled)
+    executor.shutdown(wait=True)
+
+    results = []
+    for i, future in enumerate(futures):
+        error = future.exception() if not future.cancelled() else BatchCancelled(f"prompt {i + 1} cancelled")
+        if error is None:
+            results.append(future.result())
+        else:
+            logger.error(f"Error processing prompt {i + 1}: {str(error)}")
+            results.append(on_error(i, error))
+    return results
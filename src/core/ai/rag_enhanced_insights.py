@@ -91,10 +91,12 @@ def get_guideline_context_for_coaching(person_name: str, tasks: List[Dict[str, A
         kb = KnowledgeBase(name="guidelines")
         all_context = []
         
+        # One batched retrieval for every query; chunks shared between queries appear once
+        chunks_by_query = kb.query_guidelines_batch(guideline_queries, top_k=2)
         for query in guideline_queries:
-            chunks = kb.query_guidelines(query, top_k=2)
-            if chunks:
-                all_context.extend(chunks)
+            for chunk in chunks_by_query.get(query, []):
+                if chunk not in all_context:
+                    all_context.append(chunk)
         
         if all_context:
             return "\n\n---\n\n".join(all_context)
@@ -293,8 +295,11 @@ def get_rag_enhanced_project_insight(selected_category: str, filtered_tasks: pd.
         from src.core.knowledge.knowledge_base import KnowledgeBase
         
         kb = KnowledgeBase(name="guidelines")
-        project_guidelines = kb.query_guidelines("project management timeline guidelines", top_k=3)
-        deployment_guidelines = kb.query_guidelines("deployment procedures guidelines", top_k=2)
+        chunks_by_query = kb.query_guidelines_batch(
+            ["project management timeline guidelines", "deployment procedures guidelines"], top_k=3
+        )
+        project_guidelines = chunks_by_query.get("project management timeline guidelines", [])
+        deployment_guidelines = chunks_by_query.get("deployment procedures guidelines", [])[:2]
         
         guideline_context = ""
         if project_guidelines:
@@ -370,9 +375,12 @@ def get_guideline_violation_alerts(tasks: List[Dict[str, Any]]) -> List[Dict[str
         from src.core.knowledge.knowledge_base import KnowledgeBase
         
         kb = KnowledgeBase(name="guidelines")
+        chunks_by_query = kb.query_guidelines_batch(
+            ["email response time guidelines", "security incident response guidelines"], top_k=2
+        )
         
         # Check for email response time violations
-        email_guidelines = kb.query_guidelines("email response time guidelines", top_k=2)
+        email_guidelines = chunks_by_query.get("email response time guidelines", [])
         if email_guidelines:
             current_date = datetime.now()
             for task in tasks:
@@ -396,7 +404,7 @@ def get_guideline_violation_alerts(tasks: List[Dict[str, Any]]) -> List[Dict[str
                             })
         
         # Check for security-related delays
-        security_guidelines = kb.query_guidelines("security incident response guidelines", top_k=2)
+        security_guidelines = chunks_by_query.get("security incident response guidelines", [])
         if security_guidelines:
             for task in tasks:
                 if any(keyword in task.get('task', '').lower() for keyword in ['security', 'vulnerability', 'patch']):
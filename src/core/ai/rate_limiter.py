@@ -0,0 +1,340 @@
+"""
+Rate limiting for LLM API calls.
+
+Each provider/model pair gets a limiter made of three parts:
+
+- a request bucket (requests per minute, with a configurable burst),
+- a token bucket (estimated prompt + completion tokens per minute),
+- a cap on calls in flight at once.
+
+With the Redis backend the buckets and the in-flight count live in Redis, so
+the Flask app, the Gmail processor and every Celery `ai` worker draw from one
+global quota. Without Redis each process gets its own in-memory limiter.
+"""
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from src.config.settings import (
+    DEBUG_MODE,
+    LLM_RATE_LIMIT_BACKEND,
+    LLM_RATE_LIMIT_REDIS_URL,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_CONCURRENT_REQUESTS,
+    LLM_RATE_LIMIT_BURST,
+    LLM_RATE_LIMITS
+)
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# How long a crashed caller can hold a Redis in-flight slot; callers still
+# running renew their lease every third of this, however long the call takes
+_SLOT_LEASE_SECONDS = 30
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token)."""
+    return len(text or "") // 4 + 1
+
+
+def _sleep(wait: float, what: str):
+    if DEBUG_MODE:
+        print(f"Rate limiting: Waiting {wait:.2f}s for {what}")
+    time.sleep(wait)
+
+
+class TokenBucket:
+    """Thread-safe token bucket."""
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Initialize the bucket, starting full.
+
+        Args:
+            rate: Tokens added per second (0 or less disables limiting)
+            capacity: Maximum tokens held, i.e. the largest burst
+        """
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: int = 1) -> float:
+        """
+        Take tokens if available.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds until they will be available
+        """
+        if self.rate <= 0:
+            return 0.0
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: int = 1):
+        """Block until the tokens can be taken."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return
+            _sleep(wait, "token bucket")
+
+
+# The scripts read the clock from Redis, so callers on hosts with skewed clocks
+# share one timeline. Replicating effects lets pre-5.0 servers run TIME before writes.
+_REDIS_NOW = """
+if redis.replicate_commands then redis.replicate_commands() end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+"""
+
+# KEYS[1] bucket hash; ARGV rate, capacity, tokens. Returns seconds to wait ("0" when taken).
+_BUCKET_SCRIPT = _REDIS_NOW + """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= wanted then
+    tokens = tokens - wanted
+else
+    wait = (wanted - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+# KEYS[1] lease zset; ARGV limit, lease id, lease seconds. Returns 1 if a slot was taken.
+_SLOT_SCRIPT = _REDIS_NOW + """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[1]) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[2])
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+    return 1
+end
+return 0
+"""
+
+# KEYS[1] lease zset; ARGV lease id, lease seconds. Returns 1 if the lease was still held and is extended.
+_RENEW_SCRIPT = _REDIS_NOW + """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+    return 1
+end
+return 0
+"""
+
+
+class RedisTokenBucket(TokenBucket):
+    """Token bucket whose state lives in Redis and is shared by all processes."""
+
+    def __init__(self, redis_client, key: str, rate: float, capacity: int):
+        """
+        Initialize the bucket.
+
+        Args:
+            redis_client: redis.Redis connection
+            key: Redis key holding the bucket state
+            rate: Tokens added per second (0 or less disables limiting)
+            capacity: Maximum tokens held, i.e. the largest burst
+        """
+        super().__init__(rate, capacity)
+        self.redis_client = redis_client
+        self.key = key
+        self._script = redis_client.register_script(_BUCKET_SCRIPT)
+
+    def try_acquire(self, tokens: int = 1) -> float:
+        if self.rate <= 0:
+            return 0.0
+        tokens = min(tokens, self.capacity)
+        try:
+            return float(self._script(keys=[self.key], args=[self.rate, self.capacity, tokens]))
+        except Exception as e:
+            # Don't stall AI calls because Redis is briefly unavailable; fall back to the local bucket
+            logger.warning(f"Redis rate limiter unavailable ({e}); using local limit")
+            return super().try_acquire(tokens)
+
+
+class LLMRateLimiter:
+    """Requests-per-minute, tokens-per-minute and in-flight limits for one provider/model."""
+
+    def __init__(self, name: str, requests_per_minute: int, tokens_per_minute: int,
+                 max_concurrent: int, burst: int, redis_client=None):
+        """
+        Initialize the limiter.
+
+        Args:
+            name: Provider and model, e.g. "gemini:gemini-1.5-flash"
+            requests_per_minute: Request budget (0 disables)
+            tokens_per_minute: Token budget (0 disables)
+            max_concurrent: Calls allowed in flight at once (0 disables)
+            burst: Requests allowed back to back before pacing starts
+            redis_client: Optional redis.Redis; when given, limits are shared across processes
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.redis_client = redis_client
+        request_rate = requests_per_minute / 60.0
+        token_rate = tokens_per_minute / 60.0
+        if redis_client is not None:
+            prefix = f"llm_rate:{name}"
+            self.requests = RedisTokenBucket(redis_client, f"{prefix}:requests", request_rate, burst)
+            self.tokens = RedisTokenBucket(redis_client, f"{prefix}:tokens", token_rate, tokens_per_minute)
+            self._slots_key = f"{prefix}:in_flight"
+            self._slot_script = redis_client.register_script(_SLOT_SCRIPT)
+            self._renew_script = redis_client.register_script(_RENEW_SCRIPT)
+        else:
+            self.requests = TokenBucket(request_rate, burst)
+            self.tokens = TokenBucket(token_rate, tokens_per_minute)
+        self._local_slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+
+    def _acquire_redis_slot(self) -> Optional[str]:
+        lease = uuid.uuid4().hex
+        while True:
+            try:
+                taken = self._slot_script(
+                    keys=[self._slots_key],
+                    args=[self.max_concurrent, lease, _SLOT_LEASE_SECONDS]
+                )
+            except Exception as e:
+                logger.warning(f"Redis in-flight limit unavailable ({e}); using local limit")
+                return None
+            if taken:
+                return lease
+            _sleep(0.05, "an in-flight slot")
+
+    def _renew_redis_slot(self, lease: str, done: threading.Event):
+        # Runs while the call does, so long generations keep their slot
+        while not done.wait(_SLOT_LEASE_SECONDS / 3):
+            try:
+                if not self._renew_script(keys=[self._slots_key], args=[lease, _SLOT_LEASE_SECONDS]):
+                    logger.warning(f"In-flight slot lease for {self.name} expired before the call finished")
+                    return
+            except Exception as e:
+                logger.warning(f"Failed to renew Redis in-flight slot: {e}")
+
+    def _release_redis_slot(self, lease: str):
+        try:
+            self.redis_client.zrem(self._slots_key, lease)
+        except Exception as e:
+            logger.warning(f"Failed to release Redis in-flight slot: {e}")
+
+    @contextmanager
+    def slot(self, tokens: int = 1):
+        """
+        Wait for budget and an in-flight slot, then hold the slot for the duration of the call.
+
+        Args:
+            tokens: Estimated tokens for the call (prompt plus maximum completion)
+        """
+        self.requests.acquire()
+        self.tokens.acquire(tokens)
+        lease = None
+        if self.max_concurrent > 0 and self.redis_client is not None:
+            lease = self._acquire_redis_slot()
+        use_local = self._local_slots is not None and lease is None
+        if use_local:
+            self._local_slots.acquire()
+        done = threading.Event()
+        if lease is not None:
+            threading.Thread(target=self._renew_redis_slot, args=(lease, done),
+                             name=f"llm-slot-{self.name}", daemon=True).start()
+        try:
+            yield
+        finally:
+            done.set()
+            if use_local:
+                self._local_slots.release()
+            if lease is not None:
+                self._release_redis_slot(lease)
+
+
+def _initialize_redis():
+    """Connect to Redis for shared rate limits, or return None to limit per process."""
+    try:
+        import redis
+        client = redis.Redis.from_url(
+            LLM_RATE_LIMIT_REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5
+        )
+        client.ping()
+        logger.info("LLM rate limiter using Redis backend")
+        return client
+    except ImportError:
+        logger.warning("Redis package not installed. LLM rate limits will be per process.")
+    except Exception as e:
+        logger.warning(f"Failed to connect to Redis: {e}. LLM rate limits will be per process.")
+    return None
+
+
+def _limits_for(name: str) -> Tuple[int, int, int, int]:
+    """(rpm, tpm, max concurrent, burst) for a provider/model, applying LLM_RATE_LIMITS overrides."""
+    overrides: Dict = {}
+    try:
+        overrides = json.loads(LLM_RATE_LIMITS or "{}")
+    except json.JSONDecodeError as e:
+        logger.warning(f"Ignoring invalid LLM_RATE_LIMITS: {e}")
+    provider = name.split(":", 1)[0]
+    limits = {**overrides.get(provider, {}), **overrides.get(name, {})}
+    return (
+        int(limits.get("rpm", LLM_REQUESTS_PER_MINUTE)),
+        int(limits.get("tpm", LLM_TOKENS_PER_MINUTE)),
+        int(limits.get("concurrency", LLM_MAX_CONCURRENT_REQUESTS)),
+        int(limits.get("burst", LLM_RATE_LIMIT_BURST)),
+    )
+
+
+# Global limiter registry
+_limiters: Dict[str, LLMRateLimiter] = {}
+_limiters_lock = threading.Lock()
+_redis_client = None
+_redis_checked = False
+
+
+def get_rate_limiter(provider: str, model: str) -> LLMRateLimiter:
+    """
+    Get the shared limiter for a provider and model.
+
+    Args:
+        provider: AI provider, e.g. 'gemini' or 'openai'
+        model: Model name
+
+    Returns:
+        LLMRateLimiter: Redis-backed when LLM_RATE_LIMIT_BACKEND is 'redis' and Redis is reachable
+    """
+    global _redis_client, _redis_checked
+    name = f"{provider}:{model}"
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                if not _redis_checked:
+                    _redis_client = _initialize_redis() if LLM_RATE_LIMIT_BACKEND == "redis" else None
+                    _redis_checked = True
+                rpm, tpm, concurrency, burst = _limits_for(name)
+                limiter = LLMRateLimiter(name, rpm, tpm, concurrency, burst, redis_client=_redis_client)
+                _limiters[name] = limiter
+    return limiter
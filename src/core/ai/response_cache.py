@@ -0,0 +1,421 @@
+"""
+Cache of LLM responses.
+
+The same prompts reach the providers again and again: re-forwarded emails
+produce identical correction prompts, /ask questions repeat, and the same
+task title is normalized into an activity name on every sighting. Call
+sites wrap their provider call in cached_completion(), which looks up a
+hash of (provider/model, temperature, whitespace-normalized prompt) before
+calling, and stores the answer with a TTL afterwards.
+
+Prompt classes whose answers depend on a short, paraphrasable input (an
+activity name for a task title, an answer to a guidelines question) can
+also opt into similarity matching: the input is embedded with the shared
+embedding backend and a cached answer of the same class, model and
+temperature is reused when the inputs are at least
+LLM_RESPONSE_CACHE_SIMILARITY_THRESHOLD similar.
+
+Entries live in SQLite (default, per host) or Redis (shared by every
+process). Calls that raise are never cached, cache=False skips the cache
+for nondeterministic prompts, and storage errors only cost a cache miss.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config.settings import (
+    LLM_RESPONSE_CACHE_BACKEND,
+    LLM_RESPONSE_CACHE_PATH,
+    LLM_RESPONSE_CACHE_REDIS_URL,
+    LLM_RESPONSE_CACHE_TTL_SECONDS,
+    LLM_RESPONSE_CACHE_MAX_ENTRIES,
+    LLM_RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+    LLM_RESPONSE_CACHE_SEMANTIC_CANDIDATES
+)
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# SQLite writes between sweeps of expired and excess rows
+_SWEEP_EVERY = 500
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so prompts differing only in layout share an entry."""
+    return " ".join((prompt or "").split())
+
+
+def response_key(prompt: str, model: str, temperature: Optional[float]) -> str:
+    """Exact-match cache key of a prompt."""
+    material = f"{model}\n{temperature}\n{normalize_prompt(prompt)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class SQLiteResponseStore:
+    """Response entries in a local SQLite file (one WAL connection per thread)."""
+
+    def __init__(self, path: str = LLM_RESPONSE_CACHE_PATH, max_entries: int = LLM_RESPONSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        conn = self._connection()
+        with conn:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                semantic_class TEXT,
+                vector BLOB
+            )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_responses_class ON llm_responses(semantic_class, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_responses_expires ON llm_responses(expires_at)')
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            'SELECT response FROM llm_responses WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, response: str, ttl: int,
+            semantic_class: Optional[str] = None, vector: Optional[np.ndarray] = None):
+        now = time.time()
+        blob = np.asarray(vector, dtype=np.float32).tobytes() if vector is not None else None
+        conn = self._connection()
+        with conn:
+            conn.execute('''
+            INSERT OR REPLACE INTO llm_responses (key, response, expires_at, created_at, semantic_class, vector)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (key, response, now + ttl, now, semantic_class, blob))
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % _SWEEP_EVERY == 0
+        if sweep:
+            self.sweep()
+
+    def sweep(self):
+        """Delete expired rows and the oldest rows beyond max_entries."""
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM llm_responses WHERE expires_at <= ?', (time.time(),))
+            count = conn.execute('SELECT COUNT(*) FROM llm_responses').fetchone()[0]
+            if count > self.max_entries:
+                conn.execute('''
+                DELETE FROM llm_responses WHERE key IN (
+                    SELECT key FROM llm_responses ORDER BY created_at ASC LIMIT ?
+                )
+                ''', (count - self.max_entries,))
+
+    def recent(self, semantic_class: str, limit: int) -> List[Tuple[str, np.ndarray]]:
+        rows = self._connection().execute('''
+        SELECT key, vector FROM llm_responses
+        WHERE semantic_class = ? AND expires_at > ? AND vector IS NOT NULL
+        ORDER BY created_at DESC LIMIT ?
+        ''', (semantic_class, time.time(), limit)).fetchall()
+        return [(key, np.frombuffer(blob, dtype=np.float32)) for key, blob in reversed(rows)]
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM llm_responses')
+
+
+class RedisResponseStore:
+    """Response entries in Redis, expiring through Redis TTLs; shared by every process."""
+
+    def __init__(self, redis_client, max_class_entries: int = LLM_RESPONSE_CACHE_SEMANTIC_CANDIDATES):
+        self.redis_client = redis_client
+        self.max_class_entries = max_class_entries
+
+    def _key(self, key: str) -> str:
+        return f"llm_response:{key}"
+
+    def _class_key(self, semantic_class: str) -> str:
+        return f"llm_response_class:{semantic_class}"
+
+    def get(self, key: str) -> Optional[str]:
+        raw = self.redis_client.get(self._key(key))
+        return json.loads(raw)["response"] if raw else None
+
+    def set(self, key: str, response: str, ttl: int,
+            semantic_class: Optional[str] = None, vector: Optional[np.ndarray] = None):
+        entry: Dict[str, Any] = {"response": response}
+        if vector is not None:
+            entry["vector"] = np.asarray(vector, dtype=np.float32).tolist()
+        pipe = self.redis_client.pipeline()
+        pipe.set(self._key(key), json.dumps(entry), ex=ttl)
+        if semantic_class and vector is not None:
+            class_key = self._class_key(semantic_class)
+            pipe.zadd(class_key, {key: time.time()})
+            pipe.zremrangebyrank(class_key, 0, -self.max_class_entries - 1)
+            pipe.expire(class_key, ttl)
+        pipe.execute()
+
+    def recent(self, semantic_class: str, limit: int) -> List[Tuple[str, np.ndarray]]:
+        keys = self.redis_client.zrange(self._class_key(semantic_class), -limit, -1)
+        if not keys:
+            return []
+        raws = self.redis_client.mget([self._key(key) for key in keys])
+        found = []
+        for key, raw in zip(keys, raws):
+            if raw:
+                vector = json.loads(raw).get("vector")
+                if vector:
+                    found.append((key, np.asarray(vector, dtype=np.float32)))
+        return found
+
+    def clear(self):
+        for pattern in ("llm_response:*", "llm_response_class:*"):
+            keys = list(self.redis_client.scan_iter(match=pattern))
+            if keys:
+                self.redis_client.delete(*keys)
+
+
+class _SemanticIndex:
+    """In-process matrix of cached input embeddings of one prompt class."""
+
+    __slots__ = ("keys", "vectors")
+
+    def __init__(self, entries: List[Tuple[str, np.ndarray]], dimension: int):
+        self.keys = [key for key, _ in entries]
+        self.vectors = (np.vstack([vector for _, vector in entries]) if entries
+                        else np.empty((0, dimension), dtype=np.float32))
+
+    def add(self, key: str, vector: np.ndarray, limit: int):
+        self.keys.append(key)
+        self.vectors = np.vstack([self.vectors, vector[None, :]])
+        if len(self.keys) > limit:
+            self.keys = self.keys[-limit:]
+            self.vectors = self.vectors[-limit:]
+
+    def best(self, vector: np.ndarray) -> Tuple[Optional[str], float]:
+        if not self.keys:
+            return None, 0.0
+        scores = self.vectors @ vector
+        i = int(np.argmax(scores))
+        return self.keys[i], float(scores[i])
+
+    def discard(self, key: str):
+        if key in self.keys:
+            i = self.keys.index(key)
+            del self.keys[i]
+            self.vectors = np.delete(self.vectors, i, axis=0)
+
+
+class ResponseCache:
+    """Exact and similarity-matched LLM response cache with TTLs and hit-rate counters."""
+
+    def __init__(self,
+                 store=None,
+                 ttl_seconds: int = LLM_RESPONSE_CACHE_TTL_SECONDS,
+                 similarity_threshold: float = LLM_RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+                 semantic_candidates: int = LLM_RESPONSE_CACHE_SEMANTIC_CANDIDATES,
+                 embedding_backend=None):
+        """
+        Initialize the cache.
+
+        Args:
+            store: SQLiteResponseStore or RedisResponseStore; None disables caching
+            ttl_seconds: Default lifetime of an entry
+            similarity_threshold: Cosine similarity needed to reuse another input's answer
+            semantic_candidates: Recent entries per prompt class compared by similarity
+            embedding_backend: Backend embedding similarity inputs (defaults to the shared one)
+        """
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.semantic_candidates = semantic_candidates
+        self._embedding_backend = embedding_backend
+        self._indexes: Dict[str, _SemanticIndex] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.errors = 0
+
+    def _backend(self):
+        if self._embedding_backend is None:
+            from src.core.embedding_backends import get_embedding_backend
+            self._embedding_backend = get_embedding_backend()
+        return self._embedding_backend
+
+    def _index(self, class_key: str) -> _SemanticIndex:
+        index = self._indexes.get(class_key)
+        if index is None:
+            entries = self.store.recent(class_key, self.semantic_candidates)
+            index = self._indexes[class_key] = _SemanticIndex(entries, self._backend().dimension)
+        return index
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_or_call(self,
+                    prompt: str,
+                    call: Callable[[], str],
+                    model: str,
+                    temperature: Optional[float] = None,
+                    ttl: Optional[int] = None,
+                    semantic_class: Optional[str] = None,
+                    semantic_text: Optional[str] = None,
+                    cache: bool = True) -> str:
+        """
+        Return a cached response for the prompt, or call the provider and cache its answer.
+
+        Args:
+            prompt: Full prompt sent to the provider
+            call: Sends the prompt and returns the response text; exceptions propagate uncached
+            model: Provider and model, e.g. "gemini:gemini-1.5-flash"
+            temperature: Sampling temperature of the call (part of the key)
+            ttl: Lifetime of the stored answer (defaults to ttl_seconds)
+            semantic_class: Opt into similarity matching among prompts of this class
+            semantic_text: Input compared by similarity (defaults to the prompt)
+            cache: False calls the provider without reading or writing the cache
+
+        Returns:
+            str: Response text
+        """
+        if not cache or self.store is None:
+            self._count("bypassed")
+            return call()
+
+        key = response_key(prompt, model, temperature)
+        class_key = f"{semantic_class}|{model}|{temperature}" if semantic_class else None
+        vector = None
+        try:
+            response = self.store.get(key)
+            if response is not None:
+                self._count("exact_hits")
+                return response
+            if class_key is not None:
+                vector = self._backend().embed_one(normalize_prompt(semantic_text or prompt))
+                with self._lock:
+                    index = self._index(class_key)
+                    match, score = index.best(vector)
+                if match is not None and score >= self.similarity_threshold:
+                    response = self.store.get(match)
+                    if response is not None:
+                        self._count("semantic_hits")
+                        logger.debug(f"Reusing cached response for a prompt of class {semantic_class} (similarity {score:.3f})")
+                        return response
+                    with self._lock:
+                        index.discard(match)  # expired
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"LLM response cache read error: {e}")
+
+        self._count("misses")
+        response = call()
+        if response:
+            try:
+                self.store.set(key, response, ttl or self.ttl_seconds, class_key, vector)
+                if vector is not None:
+                    with self._lock:
+                        self._index(class_key).add(key, vector, self.semantic_candidates)
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"LLM response cache write error: {e}")
+        return response
+
+    def clear(self):
+        """Drop every cached response."""
+        if self.store is not None:
+            self.store.clear()
+        with self._lock:
+            self._indexes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the hit rate of cacheable calls."""
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            total = hits + self.misses
+            return {
+                "backend": type(self.store).__name__ if self.store is not None else "none",
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "errors": self.errors,
+                "hit_rate": hits / total if total else 0.0
+            }
+
+
+def _initialize_redis():
+    """Connect to Redis for the shared response cache, or return None to fall back to SQLite."""
+    try:
+        import redis
+        client = redis.Redis.from_url(
+            LLM_RESPONSE_CACHE_REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5
+        )
+        client.ping()
+        logger.info("LLM response cache using Redis backend")
+        return client
+    except ImportError:
+        logger.warning("Redis package not installed. LLM response cache will use SQLite.")
+    except Exception as e:
+        logger.warning(f"Failed to connect to Redis: {e}. LLM response cache will use SQLite.")
+    return None
+
+
+def _create_store():
+    if LLM_RESPONSE_CACHE_BACKEND == "none":
+        return None
+    if LLM_RESPONSE_CACHE_BACKEND == "redis":
+        redis_client = _initialize_redis()
+        if redis_client is not None:
+            return RedisResponseStore(redis_client)
+    try:
+        return SQLiteResponseStore()
+    except Exception as e:
+        logger.warning(f"LLM response cache unavailable: {e}")
+        return None
+
+
+# Global response cache instance
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Get the process-wide LLM response cache.
+
+    Returns:
+        ResponseCache: The shared cache, stored according to LLM_RESPONSE_CACHE_BACKEND
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(store=_create_store())
+    return _response_cache
+
+
+def cached_completion(prompt: str, call: Callable[[], str], model: str,
+                      temperature: Optional[float] = None, **options) -> str:
+    """
+    Shortcut for get_response_cache().get_or_call(); see ResponseCache.get_or_call for options.
+    """
+    return get_response_cache().get_or_call(prompt, call, model, temperature, **options)
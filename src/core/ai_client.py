@@ -10,8 +10,12 @@ from src.config.settings import (
     GEMINI_API_KEY,
     OPENAI_API_KEY,
     CHAT_MODEL,
-    DEBUG_MODE
+    DEBUG_MODE,
+    GEMINI_MODEL,
+    OPENAI_MODEL
 )
+from src.core.ai.response_cache import cached_completion
+from src.core.embedding_backends import get_embedding_backend
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +28,10 @@ def call_ai_api(prompt: str, **kwargs) -> str:
     """
     Call an AI API (OpenAI or Gemini) to process the prompt.
     
+    Responses go through the shared LLM response cache. Pass cache=False for
+    prompts whose answer should differ between calls; cache_ttl,
+    semantic_class and semantic_text are passed on to the cache.
+    
     Args:
         prompt: The text prompt to send to the AI
         **kwargs: Additional parameters for the API call
@@ -42,6 +50,13 @@ def call_ai_api(prompt: str, **kwargs) -> str:
         logger.error(f"Error calling AI API: {str(e)}")
         return f"Error: {str(e)}"
 
+def _pop_cache_options(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Move response cache options out of the provider call's keyword arguments."""
+    options = {name: kwargs.pop(name) for name in ('cache', 'semantic_class', 'semantic_text') if name in kwargs}
+    if 'cache_ttl' in kwargs:
+        options['ttl'] = kwargs.pop('cache_ttl')
+    return options
+
 def call_openai_api(prompt: str, **kwargs) -> str:
     """Call OpenAI API to process the prompt."""
     try:
@@ -50,12 +65,17 @@ def call_openai_api(prompt: str, **kwargs) -> str:
         if not client:
             return "OpenAI client not available"
         
-        response = client.chat_completions_create(
-            messages=[{"role": "user", "content": prompt}],
-            **kwargs
-        )
+        cache_options = _pop_cache_options(kwargs)
+        
+        def call():
+            response = client.chat_completions_create(
+                messages=[{"role": "user", "content": prompt}],
+                **kwargs
+            )
+            return response.choices[0].message.content
         
-        return response['choices'][0]['message']['content']
+        return cached_completion(prompt, call, f"openai:{kwargs.get('model', OPENAI_MODEL)}",
+                                 kwargs.get('temperature'), **cache_options)
         
     except ImportError:
         return "OpenAI client not available"
@@ -71,12 +91,17 @@ def call_gemini_api(prompt: str, **kwargs) -> str:
         if not client:
             return "Gemini client not available"
         
-        response = client.chat_completions_create(
-            messages=[{"role": "user", "content": prompt}],
-            **kwargs
-        )
+        cache_options = _pop_cache_options(kwargs)
         
-        return response['choices'][0]['message']['content']
+        def call():
+            response = client.chat_completions_create(
+                messages=[{"role": "user", "content": prompt}],
+                **kwargs
+            )
+            return response['choices'][0]['message']['content']
+        
+        return cached_completion(prompt, call, f"gemini:{GEMINI_MODEL}",
+                                 kwargs.get('temperature'), **cache_options)
         
     except ImportError:
         return "Gemini client not available"
@@ -102,38 +127,43 @@ def get_ai_client():
         return None
 
 def get_embedding(text: str) -> List[float]:
-    """Get embedding for a text using the configured AI provider."""
+    """
+    Get embedding for a text through the configured provider's cache.
+    
+    Both providers embed with the shared local embedding backend, so the
+    result has the same model and dimension whichever provider is set.
+    """
     if AI_PROVIDER == 'openai':
         try:
             from src.core.openai_client import get_cached_embedding
             return get_cached_embedding(text)
         except ImportError:
-            return [0.0] * 1000
+            pass
     elif AI_PROVIDER == 'gemini':
         try:
             from src.core.gemini_client import get_cached_embedding
             return get_cached_embedding(text)
         except ImportError:
-            return [0.0] * 1000
-    else:
-        return [0.0] * 1000
+            pass
+    # No provider cache available - embed directly
+    return get_embedding_backend().embed_one(text).tolist()
 
 def get_batch_embeddings(texts: List[str], force_refresh: bool = False) -> List[List[float]]:
-    """Get embeddings for multiple texts using the configured AI provider."""
+    """Get embeddings for multiple texts through the configured provider's cache."""
     if AI_PROVIDER == 'openai':
         try:
             from src.core.openai_client import get_batch_embeddings
             return get_batch_embeddings(texts, force_refresh)
         except ImportError:
-            return [[0.0] * 1000] * len(texts)
+            pass
     elif AI_PROVIDER == 'gemini':
         try:
             from src.core.gemini_client import get_batch_embeddings
             return get_batch_embeddings(texts, force_refresh)
         except ImportError:
-            return [[0.0] * 1000] * len(texts)
-    else:
-        return [[0.0] * 1000] * len(texts)
+            pass
+    # No provider cache available - embed directly
+    return get_embedding_backend().embed(texts).tolist()
 
 def get_coaching_insight(person_name: str, tasks: List[str], recent_tasks: List[str], peer_feedback: str) -> str:
     """Get coaching insights using the configured AI provider."""
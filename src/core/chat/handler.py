@@ -6,6 +6,7 @@ from typing import Dict, Any, Optional
 import re
 import traceback
 
+from src.config.settings import GUIDELINE_CACHE_TTL_SECONDS
 from src.core.task_extractor import extract_tasks_from_update
 from src.core.task_processor import insert_or_update_task, batch_insert_tasks
 from src.core.notion_service import NotionService
@@ -251,7 +252,10 @@ ANSWER:
         # Get AI response using the existing AI client
         from src.core.ai_client import call_ai_api
         
-        response = call_ai_api(prompt)
+        # Rephrasings of a question already answered reuse the cached answer, for no
+        # longer than the guideline results themselves so re-ingested guides show up
+        response = call_ai_api(prompt, semantic_class="guidelines_ask", semantic_text=question,
+                               cache_ttl=GUIDELINE_CACHE_TTL_SECONDS)
         
         if not response:
             return {
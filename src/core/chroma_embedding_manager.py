@@ -9,10 +9,11 @@ import numpy as np
 from pathlib import Path
 import chromadb
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
 import logging
 
+from src.core.embedding_backends import LocalEmbeddingBackend
 from src.core.logging_config import get_logger
+from src.core.chroma_embedding_manager_simple import content_id, embeddings_by_text, match_results_to_tasks
 
 logger = get_logger(__name__)
 
@@ -22,7 +23,7 @@ class ChromaEmbeddingManager:
     
     Features:
     - Persistent vector database with Chroma
-    - Consistent embedding dimensions using SentenceTransformers
+    - Consistent embedding dimensions using the local embedding backend
     - Optimized similarity search
     - Automatic cache management
     - Batch operations support
@@ -37,16 +38,16 @@ class ChromaEmbeddingManager:
         
         Args:
             collection_name: Name of the Chroma collection
-            model_name: SentenceTransformer model to use
+            model_name: sentence-transformers model to run in the local embedding backend
             persist_directory: Directory to persist Chroma data
         """
         self.collection_name = collection_name
         self.model_name = model_name
         self.persist_directory = persist_directory
         
-        # Initialize SentenceTransformer for consistent embeddings
-        logger.info(f"Initializing SentenceTransformer with model: {model_name}")
-        self.embedding_model = SentenceTransformer(model_name)
+        # Local embedding backend (CPU, int8 ONNX when available) for consistent embeddings
+        logger.info(f"Initializing local embedding backend with model: {model_name}")
+        self.embedding_model = LocalEmbeddingBackend(model_name)
         
         # Initialize Chroma client
         self._init_chroma_client()
@@ -114,7 +115,7 @@ class ChromaEmbeddingManager:
             
             # Check if text already exists in collection
             existing = self.collection.get(
-                where={"text": text},
+                ids=[content_id(text)],
                 include=["embeddings"]
             )
             
@@ -125,7 +126,7 @@ class ChromaEmbeddingManager:
                 return embedding
             
             # Generate new embedding
-            embedding = self.embedding_model.encode(text, convert_to_numpy=True)
+            embedding = self.embedding_model.embed_one(text)
             
             # Store in collection
             self._add_to_collection([text], [embedding.tolist()])
@@ -156,6 +157,9 @@ class ChromaEmbeddingManager:
             if not valid_texts:
                 return {}
             
+            # Each distinct text once, in first-seen order
+            valid_texts = list(dict.fromkeys(valid_texts))
+            
             # Check for existing embeddings
             existing_embeddings = {}
             texts_to_generate = []
@@ -167,32 +171,21 @@ class ChromaEmbeddingManager:
                 
                 # Get existing embeddings for this batch
                 existing = self.collection.get(
-                    where={"text": {"$in": batch_texts}},
-                    include=["embeddings", "metadatas"]
+                    ids=list({content_id(text) for text in batch_texts}),
+                    include=["embeddings"]
                 )
                 
-                # Map existing embeddings
-                for j, text in enumerate(batch_texts):
-                    if text in existing["metadatas"]:
-                        idx = existing["metadatas"].index({"text": text})
-                        existing_embeddings[text] = np.array(existing["embeddings"][idx])
-                    else:
-                        texts_to_generate.append(text)
+                # Map existing embeddings through the id index
+                found = embeddings_by_text(batch_texts, existing)
+                existing_embeddings.update(found)
+                texts_to_generate.extend(text for text in batch_texts if text not in found)
             
             # Generate embeddings for new texts
             if texts_to_generate:
                 logger.info(f"Generating embeddings for {len(texts_to_generate)} new texts")
                 
-                # Generate embeddings in batches
-                new_embeddings = []
-                for i in range(0, len(texts_to_generate), batch_size):
-                    batch_texts = texts_to_generate[i:i + batch_size]
-                    batch_embeddings = self.embedding_model.encode(
-                        batch_texts, 
-                        convert_to_numpy=True,
-                        show_progress_bar=False
-                    )
-                    new_embeddings.extend(batch_embeddings)
+                # The backend batches by text length
+                new_embeddings = list(self.embedding_model.embed(texts_to_generate))
                 
                 # Store new embeddings
                 if new_embeddings:
@@ -247,7 +240,7 @@ class ChromaEmbeddingManager:
             collection_texts = []
             collection_embeddings = []
             
-            for text in texts:
+            for text in dict.fromkeys(texts):
                 if text in text_embeddings:
                     collection_texts.append(text)
                     collection_embeddings.append(text_embeddings[text].tolist())
@@ -343,20 +336,7 @@ class ChromaEmbeddingManager:
             )
             
             # Map back to full task objects
-            similar_tasks = []
-            for result in similar_texts:
-                # Find the corresponding task object
-                for task in existing_tasks:
-                    if task.get("task", "") == result["text"]:
-                        similar_tasks.append({
-                            "task": task,
-                            "similarity": result["similarity"],
-                            "distance": result["distance"],
-                            "rank": result["rank"]
-                        })
-                        break
-            
-            return similar_tasks
+            return match_results_to_tasks(similar_texts, existing_tasks)
             
         except Exception as e:
             logger.error(f"Error finding similar tasks: {e}")
@@ -368,15 +348,17 @@ class ChromaEmbeddingManager:
             if not texts or not embeddings:
                 return
             
-            # Generate unique IDs
-            ids = [f"task_{uuid.uuid4().hex}" for _ in texts]
-            
-            # Add to collection
-            self.collection.add(
-                embeddings=embeddings,
-                documents=texts,
-                metadatas=[{"text": text} for text in texts],
-                ids=ids
+            # One row per normalized text; re-adding a known text replaces it instead of duplicating it
+            by_id = {}
+            for text, embedding in zip(texts, embeddings):
+                by_id[content_id(text)] = (text, embedding)
+            
+            # Upsert into collection
+            self.collection.upsert(
+                embeddings=[embedding for _, embedding in by_id.values()],
+                documents=[text for text, _ in by_id.values()],
+                metadatas=[{"text": text} for text, _ in by_id.values()],
+                ids=list(by_id)
             )
             
             logger.debug(f"Added {len(texts)} embeddings to collection")
@@ -4,7 +4,7 @@ Uses Chroma's built-in embedding capabilities for better compatibility.
 """
 import os
 import time
-import uuid
+import hashlib
 from typing import Dict, List, Any, Optional, Tuple
 import numpy as np
 from pathlib import Path
@@ -12,10 +12,84 @@ import chromadb
 from chromadb.config import Settings
 import logging
 
+from src.core.chroma_registry import get_chroma_registry
 from src.core.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Rows read or written per Chroma call
+_BATCH_SIZE = 100
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies of a text share one embedding."""
+    return " ".join((text or "").split())
+
+
+def content_id(text: str) -> str:
+    """Deterministic collection id for a text: a hash of its normalized form."""
+    return "task_" + hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()[:32]
+
+
+def embeddings_by_text(texts: List[str], result: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Join a collection.get() result back to the requested texts through a content-id index.
+    
+    Args:
+        texts: Requested texts
+        result: collection.get() result including "embeddings"
+        
+    Returns:
+        Dict[str, np.ndarray]: Text -> embedding for every text found in the result
+    """
+    ids = result.get("ids")
+    if ids is None or len(ids) == 0:
+        return {}
+    positions = {row_id: k for k, row_id in enumerate(ids)}
+    found = {}
+    for text in texts:
+        k = positions.get(content_id(text))
+        if k is not None:
+            found[text] = np.array(result["embeddings"][k])
+    return found
+
+
+def match_results_to_tasks(results: List[Dict[str, Any]], tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Map similarity results (one per distinct text) back to task objects.
+    
+    Every task sharing a matched title is returned; a task id that appears
+    more than once in the input is returned once.
+    
+    Args:
+        results: find_similar() output
+        tasks: Tasks that were searched
+        
+    Returns:
+        List[Dict[str, Any]]: Matches with the task and its scores
+    """
+    tasks_by_text: Dict[str, List[Dict[str, Any]]] = {}
+    seen_task_ids = set()
+    for task in tasks:
+        task_id = task.get("id")
+        if task_id is not None:
+            if task_id in seen_task_ids:
+                continue
+            seen_task_ids.add(task_id)
+        tasks_by_text.setdefault(content_id(task.get("task", "")), []).append(task)
+    
+    matches = []
+    for result in results:
+        for task in tasks_by_text.get(content_id(result["text"]), []):
+            matches.append({
+                "task": task,
+                "similarity": result["similarity"],
+                "distance": result["distance"],
+                "rank": result["rank"]
+            })
+    return matches
+
+
 class SimpleChromaEmbeddingManager:
     """
     Simplified Chroma embedding manager using built-in embeddings.
@@ -30,16 +104,19 @@ class SimpleChromaEmbeddingManager:
     
     def __init__(self, 
                  collection_name: str = "task_embeddings",
-                 persist_directory: str = "chroma_db"):
+                 persist_directory: str = "chroma_db",
+                 embedding_function=None):
         """
         Initialize the simplified Chroma embedding manager.
         
         Args:
             collection_name: Name of the Chroma collection
             persist_directory: Directory to persist Chroma data
+            embedding_function: Optional Chroma embedding function (defaults to Chroma's own)
         """
         self.collection_name = collection_name
         self.persist_directory = persist_directory
+        self.embedding_function = embedding_function
         
         # Initialize Chroma client
         self._init_chroma_client()
@@ -52,17 +129,8 @@ class SimpleChromaEmbeddingManager:
     def _init_chroma_client(self):
         """Initialize Chroma client with persistent storage."""
         try:
-            # Create persist directory if it doesn't exist
-            Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
-            
-            # Initialize Chroma client with persistent storage
-            self.chroma_client = chromadb.PersistentClient(
-                path=self.persist_directory,
-                settings=Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
-            )
+            # Share the process-wide client for this directory
+            self.chroma_client = get_chroma_registry(self.persist_directory).client
             
             logger.info(f"Chroma client initialized with persist directory: {self.persist_directory}")
             
@@ -70,6 +138,12 @@ class SimpleChromaEmbeddingManager:
             logger.error(f"Failed to initialize Chroma client: {e}")
             raise
     
+    def _collection_kwargs(self) -> Dict[str, Any]:
+        """Extra arguments for opening collections (the custom embedding function, if any)."""
+        if self.embedding_function is None:
+            return {}
+        return {"embedding_function": self.embedding_function}
+    
     def _init_collection(self):
         """Initialize or get the Chroma collection with default embedding function."""
         try:
@@ -80,7 +154,8 @@ class SimpleChromaEmbeddingManager:
                     "description": "Task embeddings for similarity matching",
                     "embedding_function": "default",
                     "created_at": time.time()
-                }
+                },
+                **self._collection_kwargs()
             )
             
             # Get collection info
@@ -106,8 +181,9 @@ class SimpleChromaEmbeddingManager:
                 return None
             
             # Check if text already exists in collection
+            text_id = content_id(text)
             existing = self.collection.get(
-                where={"text": text},
+                ids=[text_id],
                 include=["embeddings"]
             )
             
@@ -122,7 +198,7 @@ class SimpleChromaEmbeddingManager:
             
             # Retrieve the embedding we just added
             new_embedding = self.collection.get(
-                where={"text": text},
+                ids=[text_id],
                 include=["embeddings"]
             )
             
@@ -156,36 +232,28 @@ class SimpleChromaEmbeddingManager:
             if not valid_texts:
                 return {}
             
+            # Each distinct text once, in first-seen order
+            valid_texts = list(dict.fromkeys(valid_texts))
+            
             # Check for existing embeddings
             existing_embeddings = {}
             texts_to_generate = []
             
             # Query existing embeddings in batches
-            batch_size = 100  # Chroma batch limit
+            batch_size = _BATCH_SIZE  # Chroma batch limit
             for i in range(0, len(valid_texts), batch_size):
                 batch_texts = valid_texts[i:i + batch_size]
                 
                 # Get existing embeddings for this batch
                 existing = self.collection.get(
-                    where={"text": {"$in": batch_texts}},
-                    include=["embeddings", "metadatas"]
+                    ids=list({content_id(text) for text in batch_texts}),
+                    include=["embeddings"]
                 )
                 
-                # Map existing embeddings
-                if existing["metadatas"] is not None and len(existing["metadatas"]) > 0:
-                    for j, text in enumerate(batch_texts):
-                        # Find the text in existing metadata
-                        text_found = False
-                        for k, metadata in enumerate(existing["metadatas"]):
-                            if metadata.get("text") == text:
-                                existing_embeddings[text] = np.array(existing["embeddings"][k])
-                                text_found = True
-                                break
-                        if not text_found:
-                            texts_to_generate.append(text)
-                else:
-                    # No existing embeddings found
-                    texts_to_generate.extend(batch_texts)
+                # Map existing embeddings through the id index
+                found = embeddings_by_text(batch_texts, existing)
+                existing_embeddings.update(found)
+                texts_to_generate.extend(text for text in batch_texts if text not in found)
             
             # Generate embeddings for new texts
             if texts_to_generate:
@@ -195,19 +263,13 @@ class SimpleChromaEmbeddingManager:
                 self._add_to_collection(texts_to_generate)
                 
                 # Retrieve the new embeddings
-                new_embeddings_data = self.collection.get(
-                    where={"text": {"$in": texts_to_generate}},
-                    include=["embeddings", "metadatas"]
-                )
-                
-                # Add to results
-                if new_embeddings_data["metadatas"] is not None and len(new_embeddings_data["metadatas"]) > 0:
-                    for i, text in enumerate(texts_to_generate):
-                        # Find the text in new metadata
-                        for k, metadata in enumerate(new_embeddings_data["metadatas"]):
-                            if metadata.get("text") == text:
-                                existing_embeddings[text] = np.array(new_embeddings_data["embeddings"][k])
-                                break
+                for i in range(0, len(texts_to_generate), batch_size):
+                    batch_texts = texts_to_generate[i:i + batch_size]
+                    new_embeddings_data = self.collection.get(
+                        ids=list({content_id(text) for text in batch_texts}),
+                        include=["embeddings"]
+                    )
+                    existing_embeddings.update(embeddings_by_text(batch_texts, new_embeddings_data))
             
             logger.info(f"Retrieved {len(existing_embeddings)} embeddings")
             return existing_embeddings
@@ -248,10 +310,11 @@ class SimpleChromaEmbeddingManager:
                 return []
             
             # Use Chroma's query method directly
+            candidate_ids = list({content_id(text) for text in texts})
             results = self.collection.query(
                 query_texts=[query_text],
-                n_results=min(top_k, len(texts)),
-                where={"text": {"$in": texts}},
+                n_results=min(top_k, len(candidate_ids)),
+                ids=candidate_ids,
                 include=["distances", "documents"]
             )
             
@@ -314,36 +377,25 @@ class SimpleChromaEmbeddingManager:
             )
             
             # Map back to full task objects
-            similar_tasks = []
-            for result in similar_texts:
-                # Find the corresponding task object
-                for task in existing_tasks:
-                    if task.get("task", "") == result["text"]:
-                        similar_tasks.append({
-                            "task": task,
-                            "similarity": result["similarity"],
-                            "distance": result["distance"],
-                            "rank": result["rank"]
-                        })
-                        break
-            
-            return similar_tasks
+            return match_results_to_tasks(similar_texts, existing_tasks)
             
         except Exception as e:
             logger.error(f"Error finding similar tasks: {e}")
             return []
     
     def _add_to_collection(self, texts: List[str]):
-        """Add texts to the collection (Chroma will generate embeddings automatically)."""
+        """Upsert texts under their content ids (Chroma will generate embeddings automatically)."""
         try:
             if not texts:
                 return
             
-            # Generate unique IDs
-            ids = [f"task_{uuid.uuid4().hex}" for _ in texts]
+            # One row per normalized text; re-adding a known text replaces it instead of duplicating it
+            by_id = {content_id(text): text for text in texts}
+            ids = list(by_id)
+            texts = list(by_id.values())
             
-            # Add to collection (Chroma will handle embedding generation)
-            self.collection.add(
+            # Upsert into collection (Chroma will handle embedding generation)
+            self.collection.upsert(
                 documents=texts,
                 metadatas=[{"text": text} for text in texts],
                 ids=ids
@@ -354,6 +406,101 @@ class SimpleChromaEmbeddingManager:
         except Exception as e:
             logger.error(f"Error adding to collection: {e}")
     
+    def _measure_query_latency(self, probes: List[List[float]], n_results: int = 5) -> float:
+        """Average milliseconds per nearest-neighbour query for the given probe vectors."""
+        if not probes or self.collection.count() == 0:
+            return 0.0
+        start = time.perf_counter()
+        for probe in probes:
+            self.collection.query(
+                query_embeddings=[probe],
+                n_results=min(n_results, self.collection.count()),
+                include=["distances"]
+            )
+        return (time.perf_counter() - start) * 1000 / len(probes)
+    
+    def compact_collection(self, live_texts: Optional[List[str]] = None, probe_count: int = 20) -> Dict[str, Any]:
+        """
+        Remove duplicate and orphaned rows and rebuild the collection (and its HNSW index).
+        
+        Rows are re-keyed by content id, keeping the first row seen for each
+        normalized text. Stored embeddings are copied, not regenerated. The new
+        collection is filled under a temporary name and swapped in at the end.
+        
+        Args:
+            live_texts: Texts still in use (e.g. task titles in Notion); when given,
+                rows for any other text are dropped as orphans
+            probe_count: Stored vectors used to time queries before and after
+            
+        Returns:
+            Dict[str, Any]: Row counts and average query latency before and after
+        """
+        rows_before = self.collection.count()
+        keep = {}
+        duplicates = 0
+        for offset in range(0, rows_before, _BATCH_SIZE):
+            page = self.collection.get(
+                limit=_BATCH_SIZE,
+                offset=offset,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            for k, row_id in enumerate(page["ids"]):
+                metadata = page["metadatas"][k] or {}
+                text = metadata.get("text") or page["documents"][k]
+                if not text:
+                    continue
+                text_id = content_id(text)
+                if text_id in keep:
+                    duplicates += 1
+                    continue
+                keep[text_id] = (text, list(page["embeddings"][k]), metadata)
+        
+        orphans = 0
+        if live_texts is not None:
+            live_ids = {content_id(text) for text in live_texts if text}
+            orphans = sum(1 for text_id in keep if text_id not in live_ids)
+            keep = {text_id: row for text_id, row in keep.items() if text_id in live_ids}
+        
+        probes = [row[1] for row in list(keep.values())[:probe_count]]
+        latency_before = self._measure_query_latency(probes)
+        
+        # Build the compacted copy, then swap it in
+        temp_name = f"{self.collection_name}__compacting"
+        try:
+            self.chroma_client.delete_collection(temp_name)
+        except Exception:
+            pass
+        compacted = self.chroma_client.create_collection(
+            name=temp_name,
+            metadata=dict(self.collection.metadata or {}, compacted_at=time.time()),
+            **self._collection_kwargs()
+        )
+        items = list(keep.items())
+        for i in range(0, len(items), _BATCH_SIZE):
+            batch = items[i:i + _BATCH_SIZE]
+            compacted.upsert(
+                ids=[text_id for text_id, _ in batch],
+                documents=[row[0] for _, row in batch],
+                embeddings=[row[1] for _, row in batch],
+                metadatas=[dict(row[2], text=row[0]) for _, row in batch]
+            )
+        self.chroma_client.delete_collection(self.collection_name)
+        compacted.modify(name=self.collection_name)
+        get_chroma_registry(self.persist_directory).forget_collection(self.collection_name)
+        self.collection = self.chroma_client.get_collection(self.collection_name, **self._collection_kwargs())
+        
+        report = {
+            "collection_name": self.collection_name,
+            "rows_before": rows_before,
+            "rows_after": self.collection.count(),
+            "duplicates_removed": duplicates,
+            "orphans_removed": orphans,
+            "query_ms_before": round(latency_before, 3),
+            "query_ms_after": round(self._measure_query_latency(probes), 3),
+        }
+        logger.info(f"Compacted collection '{self.collection_name}': {report}")
+        return report
+    
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the collection."""
         try:
@@ -380,6 +527,7 @@ class SimpleChromaEmbeddingManager:
         """Clear all embeddings from the collection."""
         try:
             self.chroma_client.delete_collection(self.collection_name)
+            get_chroma_registry(self.persist_directory).forget_collection(self.collection_name)
             self._init_collection()
             logger.info("Collection cleared successfully")
         except Exception as e:
@@ -0,0 +1,235 @@
+"""
+Process-wide registry of Chroma clients and collection handles.
+
+Opening a PersistentClient loads the SQLite catalog and the HNSW segments
+from disk, so callers that only need to read a collection (RAG guideline
+queries, /ask) share one client per persist directory and one handle per
+collection instead of building a SimpleChromaEmbeddingManager each time.
+Query texts are embedded with the collection embedding function directly
+and are never written to a collection.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import chromadb
+from chromadb.config import Settings
+
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_PERSIST_DIRECTORY = "chroma_db"
+
+# Collections filled by scripts/ingest_guidelines.py
+GUIDELINE_COLLECTIONS = ("guidelines_technical", "guidelines_process")
+
+
+class ChromaRegistry:
+    """
+    One Chroma client per persist directory with cached collection handles.
+
+    Collections are opened lazily on first use and kept until they are
+    forgotten (e.g. after a manager deletes and rebuilds one).
+    """
+
+    def __init__(self, persist_directory: str = DEFAULT_PERSIST_DIRECTORY, embedding_function=None):
+        """
+        Initialize the registry (the client is opened on first use).
+
+        Args:
+            persist_directory: Directory holding the Chroma data
+            embedding_function: Optional Chroma embedding function (defaults to Chroma's own)
+        """
+        self.persist_directory = persist_directory
+        self._embedding_function = embedding_function
+        self._client = None
+        self._collections: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def client(self):
+        """The shared PersistentClient for this directory."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
+                    self._client = chromadb.PersistentClient(
+                        path=self.persist_directory,
+                        settings=Settings(
+                            anonymized_telemetry=False,
+                            allow_reset=True
+                        )
+                    )
+                    logger.info(f"Chroma client opened for {self.persist_directory}")
+        return self._client
+
+    @property
+    def embedding_function(self):
+        """The embedding function used for query texts (Chroma's default unless one was given)."""
+        if self._embedding_function is None:
+            with self._lock:
+                if self._embedding_function is None:
+                    from chromadb.utils import embedding_functions
+                    self._embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        return self._embedding_function
+
+    def get_collection(self, name: str):
+        """
+        Return the cached handle for a collection, opening (or creating) it on first use.
+
+        Args:
+            name: Collection name
+
+        Returns:
+            The Chroma collection
+        """
+        collection = self._collections.get(name)
+        if collection is not None:
+            return collection
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                kwargs = {}
+                if self._embedding_function is not None:
+                    kwargs["embedding_function"] = self._embedding_function
+                collection = self.client.get_or_create_collection(name=name, **kwargs)
+                self._collections[name] = collection
+        return collection
+
+    def forget_collection(self, name: str):
+        """Drop a cached handle so the next use reopens the collection."""
+        with self._lock:
+            self._collections.pop(name, None)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed query texts without storing them in any collection.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List[List[float]]: One embedding per text, in order
+        """
+        if not texts:
+            return []
+        return [[float(x) for x in vector] for vector in self.embedding_function(list(texts))]
+
+    def query_collections(self,
+                          query_embedding: List[float],
+                          collection_names: Sequence[str],
+                          n_results: int) -> List[Dict[str, Any]]:
+        """
+        Query several collections in parallel with one embedding.
+
+        Args:
+            query_embedding: Embedding of the query text
+            collection_names: Collections to search
+            n_results: Results requested from each collection
+
+        Returns:
+            List[Dict[str, Any]]: Hits with 'content', 'metadata', 'distance' and
+            'collection', sorted by distance (most similar first)
+        """
+        return self.query_collections_batch([query_embedding], collection_names, n_results)[0]
+
+    def query_collections_batch(self,
+                                query_embeddings: List[List[float]],
+                                collection_names: Sequence[str],
+                                n_results: int,
+                                failed: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Query several collections in parallel with many embeddings.
+
+        Each collection receives a single query() call carrying every
+        embedding. A collection that fails to answer is logged and skipped.
+
+        Args:
+            query_embeddings: One embedding per query
+            collection_names: Collections to search
+            n_results: Results requested from each collection per query
+            failed: If given, the names of collections that failed are appended
+
+        Returns:
+            List[List[Dict[str, Any]]]: For each query, hits with 'content',
+            'metadata', 'distance' and 'collection', sorted by distance
+        """
+        if not query_embeddings:
+            return []
+        if not collection_names or n_results <= 0:
+            return [[] for _ in query_embeddings]
+
+        def query_one(name: str) -> List[List[Dict[str, Any]]]:
+            try:
+                results = self.get_collection(name).query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_results,
+                    include=['documents', 'metadatas', 'distances']
+                )
+            except Exception as e:
+                logger.error(f"Error querying collection {name}: {e}")
+                if failed is not None:
+                    failed.append(name)
+                return [[] for _ in query_embeddings]
+            per_query = []
+            for q in range(len(query_embeddings)):
+                documents = _row(results, 'documents', q)
+                metadatas = _row(results, 'metadatas', q)
+                distances = _row(results, 'distances', q)
+                hits = []
+                for i, doc in enumerate(documents):
+                    if doc:
+                        hits.append({
+                            'content': doc,
+                            'metadata': metadatas[i] if i < len(metadatas) and metadatas[i] else {},
+                            'distance': distances[i] if i < len(distances) else 1.0,
+                            'collection': name
+                        })
+                per_query.append(hits)
+            return per_query
+
+        if len(collection_names) == 1:
+            by_collection = [query_one(collection_names[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=len(collection_names)) as pool:
+                by_collection = list(pool.map(query_one, collection_names))
+
+        merged = []
+        for q in range(len(query_embeddings)):
+            hits = [hit for per_query in by_collection for hit in per_query[q]]
+            hits.sort(key=lambda hit: hit['distance'])
+            merged.append(hits)
+        return merged
+
+
+def _row(results: Dict[str, Any], field: str, q: int) -> List[Any]:
+    """Row q of a query() result field, or an empty list when absent."""
+    rows = results.get(field) or []
+    if q >= len(rows):
+        return []
+    return rows[q] or []
+
+
+_registries: Dict[str, ChromaRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_chroma_registry(persist_directory: str = DEFAULT_PERSIST_DIRECTORY) -> ChromaRegistry:
+    """Return the process-wide registry for a persist directory."""
+    key = str(Path(persist_directory).resolve())
+    registry = _registries.get(key)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(key)
+            if registry is None:
+                registry = ChromaRegistry(persist_directory)
+                _registries[key] = registry
+    return registry
+
+
+def reset_chroma_registries():
+    """Forget every registry (used by tests)."""
+    with _registries_lock:
+        _registries.clear()
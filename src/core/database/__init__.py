@@ -1,7 +1,16 @@
 """
 Database package for centralized database management.
 """
-from .connection import engine, SessionLocal
+from .connection import get_engine, get_session_factory
 from .models import Base
 
-__all__ = ['engine', 'SessionLocal', 'Base'] 
\ No newline at end of file
+
+def __getattr__(name):
+    # Resolved lazily so importing the package does not build an engine
+    if name in ('engine', 'SessionLocal'):
+        from . import connection
+        return getattr(connection, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ['engine', 'SessionLocal', 'get_engine', 'get_session_factory', 'Base']
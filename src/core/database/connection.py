@@ -1,32 +1,121 @@
 """
 Centralized database connection management.
+
+One engine (and connection pool) is created per database URL and shared by
+every service in the process. Creating a service is therefore cheap; schema
+creation is not done here but in src.core.database.migrations.
 """
-import os
+import threading
+from typing import Dict, Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from src.config.settings import DATABASE_URL
-
-# Create database engine
-engine = create_engine(
+from sqlalchemy.pool import QueuePool
+from src.config.settings import (
     DATABASE_URL,
-    poolclass=StaticPool,
-    pool_pre_ping=True,
-    echo=False  # Set to True for SQL debugging
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_TIMEOUT
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_engines: Dict[str, Engine] = {}
+_session_factories: Dict[str, sessionmaker] = {}
+_engine_lock = threading.Lock()
+
+
+def _create_engine(database_url: str) -> Engine:
+    if database_url.startswith('sqlite'):
+        # SQLite picks its own pool class; QueuePool sizing does not apply
+        return create_engine(database_url, pool_pre_ping=True, echo=False)
+    return create_engine(
+        database_url,
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,  # Test connections before use
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+        echo=False  # Set to True for SQL debugging
+    )
+
+
+def get_engine(database_url: Optional[str] = None) -> Engine:
+    """
+    Get the shared engine for a database URL, creating it on first use.
+
+    Args:
+        database_url: Database URL. Defaults to DATABASE_URL.
+
+    Returns:
+        Engine: Pooled SQLAlchemy engine shared by all callers in this process.
+    """
+    database_url = database_url or DATABASE_URL
+    engine = _engines.get(database_url)
+    if engine is None:
+        with _engine_lock:
+            engine = _engines.get(database_url)
+            if engine is None:
+                engine = _create_engine(database_url)
+                _engines[database_url] = engine
+    return engine
+
+
+def get_session_factory(database_url: Optional[str] = None) -> sessionmaker:
+    """
+    Get the shared session factory bound to get_engine(database_url).
+
+    Args:
+        database_url: Database URL. Defaults to DATABASE_URL.
+
+    Returns:
+        sessionmaker: Session factory for the shared engine.
+    """
+    database_url = database_url or DATABASE_URL
+    factory = _session_factories.get(database_url)
+    if factory is None:
+        engine = get_engine(database_url)
+        with _engine_lock:
+            factory = _session_factories.get(database_url)
+            if factory is None:
+                factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                _session_factories[database_url] = factory
+    return factory
+
+
+def dispose_engines(close: bool = True):
+    """
+    Drop every pooled connection.
+
+    Args:
+        close: Close the connections. In a freshly forked worker pass False, so
+               the child starts with empty pools without closing the sockets it
+               shares with its parent.
+    """
+    with _engine_lock:
+        for engine in _engines.values():
+            engine.dispose(close=close)
+
+
+def __getattr__(name):
+    # `engine` and `SessionLocal` for DATABASE_URL are built on first access, not at import
+    if name == 'engine':
+        return get_engine()
+    if name == 'SessionLocal':
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def get_db_session():
     """
     Get a database session.
-    
+
     Returns:
         Session: SQLAlchemy session instance
     """
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
@@ -0,0 +1,100 @@
+"""
+Explicit schema setup for the application's PostgreSQL tables.
+
+Run once per deployment (it is idempotent):
+
+    python -m src.core.database.migrations
+
+Services no longer create tables when they are constructed. Set
+DB_AUTO_MIGRATE=true to have them call ensure_schema() once per process instead.
+"""
+import sys
+import threading
+from typing import Optional
+
+from sqlalchemy import text
+
+from src.config.settings import DATABASE_URL, DB_AUTO_MIGRATE
+from src.core.database.connection import get_engine, get_session_factory
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_migrated_urls = set()
+_migrate_lock = threading.Lock()
+
+
+def _metadata_sets():
+    from src.core.models.email_archive import Base as EmailArchiveBase
+    from src.core.models.correction_models import Base as CorrectionBase
+    from src.core.database.models import Base as CoreBase
+    return [
+        ("email_archive", EmailArchiveBase.metadata),
+        ("corrections", CorrectionBase.metadata),
+        ("core", CoreBase.metadata),
+    ]
+
+
+def _seed_storage_stats(database_url: str):
+    """Make sure the hot and cold storage_stats rows exist."""
+    from src.core.models.email_archive import StorageStats
+
+    with get_session_factory(database_url)() as session:
+        existing = {row.storage_type for row in session.query(StorageStats.storage_type).all()}
+        for storage_type in ('hot', 'cold'):
+            if storage_type not in existing:
+                session.add(StorageStats(storage_type=storage_type))
+        session.commit()
+
+
+def run_migrations(database_url: Optional[str] = None):
+    """
+    Create missing tables and seed reference rows.
+
+    Args:
+        database_url: Database URL. Defaults to DATABASE_URL.
+    """
+    database_url = database_url or DATABASE_URL
+    engine = get_engine(database_url)
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as conn:
+            conn.execute(text("CREATE SCHEMA IF NOT EXISTS email_archive"))
+    for name, metadata in _metadata_sets():
+        metadata.create_all(bind=engine)
+        logger.info(f"Schema ready: {name}")
+    _seed_storage_stats(database_url)
+    with _migrate_lock:
+        _migrated_urls.add(database_url)
+
+
+def ensure_schema(database_url: Optional[str] = None):
+    """
+    Run migrations once per process when DB_AUTO_MIGRATE is enabled; otherwise do nothing.
+
+    Args:
+        database_url: Database URL. Defaults to DATABASE_URL.
+    """
+    if not DB_AUTO_MIGRATE:
+        return
+    database_url = database_url or DATABASE_URL
+    if database_url in _migrated_urls:
+        return
+    run_migrations(database_url)
+
+
+def check_connection(database_url: Optional[str] = None) -> bool:
+    """Return True if the database answers a trivial query."""
+    try:
+        with get_engine(database_url).connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.error(f"Database connection check failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    if not check_connection():
+        sys.exit(1)
+    run_migrations()
+    print("✅ Database schema is up to date")
@@ -0,0 +1,242 @@
+"""
+Pluggable embedding backends.
+
+Every caller that needs a text embedding (the provider clients'
+get_cached_embedding / get_batch_embeddings, EmbeddingManager and the
+EmbeddingAgent on top of it, and the Chroma managers) goes through one
+backend, so vectors produced anywhere in the process share a model, a
+vocabulary and a fixed dimension and can be cached and compared.
+
+The default 'local' backend runs sentence-transformers/all-MiniLM-L6-v2 on
+the CPU, preferably through its int8-quantized ONNX export. It is the same
+model as Chroma's default embedding function, so vectors already stored in
+Chroma collections stay comparable.
+"""
+import threading
+from abc import ABC, abstractmethod
+from hashlib import md5
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.config.settings import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_ONNX_FILE,
+    LOCAL_EMBEDDING_DIMENSION,
+    LOCAL_EMBEDDING_MAX_BATCH_TOKENS,
+    LOCAL_EMBEDDING_MAX_BATCH_SIZE
+)
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# all-MiniLM-L6-v2 truncates input to this many word pieces
+_MAX_SEQ_LENGTH = 256
+
+
+def estimate_text_tokens(text: str, max_seq_length: int = _MAX_SEQ_LENGTH) -> int:
+    """Rough word-piece count of a text as the model sees it (truncated to max_seq_length)."""
+    return min(max_seq_length, len(text or "") // 4 + 2)
+
+
+def adaptive_batches(texts: List[str],
+                     max_batch_tokens: int = LOCAL_EMBEDDING_MAX_BATCH_TOKENS,
+                     max_batch_size: int = LOCAL_EMBEDDING_MAX_BATCH_SIZE) -> List[List[int]]:
+    """
+    Group text positions into batches sized by text length.
+
+    Texts are sorted by length so each batch pads to a similar length, and a
+    batch is closed once batch size times its longest text would exceed
+    max_batch_tokens: many short task titles go in one batch, long email
+    bodies in small ones.
+
+    Returns:
+        List[List[int]]: Positions into texts, one list per batch
+    """
+    order = sorted(range(len(texts)), key=lambda i: estimate_text_tokens(texts[i]))
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    longest = 0
+    for i in order:
+        tokens = estimate_text_tokens(texts[i])
+        if batch and (len(batch) >= max_batch_size or (len(batch) + 1) * max(longest, tokens) > max_batch_tokens):
+            batches.append(batch)
+            batch, longest = [], 0
+        batch.append(i)
+        longest = max(longest, tokens)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class EmbeddingBackend(ABC):
+    """A model turning texts into fixed-dimension, L2-normalized float32 vectors."""
+
+    name: str = "base"
+    dimension: int = 0
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dimension), rows L2-normalized
+        """
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """Embed a single text."""
+        return self.embed([text])[0]
+
+    def zero_vector(self) -> List[float]:
+        """Fallback vector for texts that cannot be embedded."""
+        return [0.0] * self.dimension
+
+    def cache_key(self, text: str) -> str:
+        """Cache key for a text's embedding; includes the backend so other models' vectors never match."""
+        return md5(f"{self.name}\n{text}".encode()).hexdigest()
+
+    # Same interface as the provider clients, so the backend can stand in for them
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        return self.embed_one(text)
+
+    def get_batch_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        return list(self.embed(texts))
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """CPU sentence-transformer backend, int8 ONNX when available, with length-adaptive batching."""
+
+    def __init__(self,
+                 model_name: str = EMBEDDING_MODEL,
+                 onnx_file: Optional[str] = LOCAL_EMBEDDING_ONNX_FILE,
+                 dimension: int = LOCAL_EMBEDDING_DIMENSION,
+                 max_batch_tokens: int = LOCAL_EMBEDDING_MAX_BATCH_TOKENS,
+                 max_batch_size: int = LOCAL_EMBEDDING_MAX_BATCH_SIZE):
+        """
+        Initialize the backend (the model is loaded on first use).
+
+        Args:
+            model_name: sentence-transformers model id
+            onnx_file: Quantized ONNX file inside the model repo ('' runs the PyTorch model)
+            dimension: Output dimension of the model
+            max_batch_tokens: Padded-token budget of one batch
+            max_batch_size: Upper bound on texts per batch
+        """
+        if "/" not in model_name:
+            model_name = f"sentence-transformers/{model_name}"
+        self.model_name = model_name
+        self.onnx_file = onnx_file
+        self.dimension = dimension
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.name = f"local:{model_name}:{dimension}"
+        self._encode: Optional[Callable[[List[str]], np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Callable[[List[str]], np.ndarray]:
+        """Load the model once; prefer int8 ONNX, then PyTorch on CPU, then Chroma's ONNX MiniLM."""
+        if self._encode is not None:
+            return self._encode
+        with self._lock:
+            if self._encode is None:
+                self._encode = self._load_sentence_transformer() or self._load_chroma_onnx()
+        return self._encode
+
+    def _load_sentence_transformer(self) -> Optional[Callable[[List[str]], np.ndarray]]:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            logger.warning("sentence-transformers not installed. Falling back to Chroma's ONNX MiniLM.")
+            return None
+
+        model = None
+        if self.onnx_file:
+            try:
+                model = SentenceTransformer(
+                    self.model_name,
+                    device="cpu",
+                    backend="onnx",
+                    model_kwargs={"file_name": self.onnx_file, "provider": "CPUExecutionProvider"}
+                )
+                logger.info(f"Loaded {self.model_name} ({self.onnx_file}) for local embeddings")
+            except Exception as e:
+                logger.warning(f"Could not load ONNX model {self.onnx_file}: {e}. Using the PyTorch model on CPU.")
+        if model is None:
+            model = SentenceTransformer(self.model_name, device="cpu")
+            logger.info(f"Loaded {self.model_name} (PyTorch, CPU) for local embeddings")
+
+        def encode(batch: List[str]) -> np.ndarray:
+            return model.encode(
+                batch,
+                batch_size=len(batch),
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+        return encode
+
+    def _load_chroma_onnx(self) -> Callable[[List[str]], np.ndarray]:
+        if not self.model_name.endswith("all-MiniLM-L6-v2"):
+            raise RuntimeError(f"sentence-transformers is required to run {self.model_name}")
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+        function = ONNXMiniLM_L6_V2(preferred_providers=["CPUExecutionProvider"])
+        logger.info("Loaded Chroma's ONNX MiniLM for local embeddings")
+        return lambda batch: np.asarray(function(batch), dtype=np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        if not texts:
+            return vectors
+        encode = self._load()
+        texts = [text or "" for text in texts]
+        for positions in adaptive_batches(texts, self.max_batch_tokens, self.max_batch_size):
+            batch = np.asarray(encode([texts[i] for i in positions]), dtype=np.float32)
+            if batch.shape[1] != self.dimension:
+                raise ValueError(
+                    f"{self.model_name} returned {batch.shape[1]}-dim vectors, expected {self.dimension}"
+                )
+            vectors[positions] = batch
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+# Backends selectable through EMBEDDING_BACKEND
+EMBEDDING_BACKENDS: Dict[str, Callable[[], EmbeddingBackend]] = {
+    "local": LocalEmbeddingBackend,
+}
+
+_backends: Dict[str, EmbeddingBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_embedding_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    """
+    Get the process-wide embedding backend.
+
+    Args:
+        name: Backend name (defaults to EMBEDDING_BACKEND)
+
+    Returns:
+        EmbeddingBackend: The shared backend instance
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    name = (name or EMBEDDING_BACKEND).lower()
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                factory = EMBEDDING_BACKENDS.get(name)
+                if factory is None:
+                    raise ValueError(f"Unsupported embedding backend: {name}")
+                backend = _backends[name] = factory()
+    return backend
@@ -0,0 +1,290 @@
+"""
+SQLite cache of text embeddings, shared by the provider clients.
+
+Each thread keeps one connection open (WAL journaling, so readers never
+wait for the writer), lookups and inserts are batched into IN (...) and
+executemany statements, and vectors are stored as raw float32 bytes.
+
+Two writes are kept off the hot path:
+- last_used of cache hits is buffered and flushed in one statement every
+  EMBEDDING_CACHE_TOUCH_FLUSH_SECONDS (or every 1000 hits)
+- eviction runs only when an in-process size counter passes
+  MAX_CACHE_ENTRIES by EMBEDDING_CACHE_EVICT_SLACK, and then trims the
+  oldest rows back to MAX_CACHE_ENTRIES in one statement
+"""
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.config.settings import (
+    EMBEDDING_CACHE_PATH,
+    MAX_CACHE_ENTRIES,
+    EMBEDDING_CACHE_EVICT_SLACK,
+    EMBEDDING_CACHE_TOUCH_FLUSH_SECONDS
+)
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Stay well below SQLite's bound-parameter limit
+_MAX_IN_PARAMS = 500
+
+# Hits buffered before last_used is flushed regardless of time
+_MAX_PENDING_TOUCHES = 1000
+
+# Pickled-list table of earlier versions; its keys are no longer produced
+_LEGACY_TABLE = "embeddings"
+
+
+def _chunks(items: List[Any], size: int = _MAX_IN_PARAMS) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed by EmbeddingBackend.cache_key()."""
+
+    def __init__(self,
+                 path: str = EMBEDDING_CACHE_PATH,
+                 max_entries: int = MAX_CACHE_ENTRIES,
+                 evict_slack: float = EMBEDDING_CACHE_EVICT_SLACK,
+                 touch_flush_seconds: float = EMBEDDING_CACHE_TOUCH_FLUSH_SECONDS):
+        """
+        Initialize the cache and create its table.
+
+        Args:
+            path: SQLite database file
+            max_entries: Rows kept after an eviction
+            evict_slack: Fraction of max_entries the cache may grow past before evicting
+            touch_flush_seconds: Longest time a hit's last_used update is buffered
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_at = int(max_entries * (1 + evict_slack))
+        self.touch_flush_seconds = touch_flush_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending_touches: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+        self.writes = 0
+        self.evictions = 0
+        self._init_schema()
+
+    # --- Connections ---
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Flush buffered updates and close this thread's connection."""
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _init_schema(self):
+        conn = self._connection()
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS {_LEGACY_TABLE}")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS embedding_vectors (
+                text_hash TEXT PRIMARY KEY,
+                text TEXT,
+                embedding BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_embedding_vectors_last_used ON embedding_vectors(last_used)')
+        self._size = conn.execute('SELECT COUNT(*) FROM embedding_vectors').fetchone()[0]
+
+    # --- Public API ---
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up embeddings by cache key.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Dict[str, np.ndarray]: Key -> float32 vector for every key found (read-only arrays)
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        started = time.perf_counter()
+        conn = self._connection()
+        found: Dict[str, np.ndarray] = {}
+        for chunk in _chunks(keys):
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f'SELECT text_hash, embedding FROM embedding_vectors WHERE text_hash IN ({placeholders})',
+                chunk
+            )
+            for text_hash, blob in rows:
+                found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            self.lookup_seconds += time.perf_counter() - started
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            for text_hash in found:
+                self._pending_touches[text_hash] = now
+            flush_due = (len(self._pending_touches) >= _MAX_PENDING_TOUCHES
+                         or time.monotonic() - self._last_flush >= self.touch_flush_seconds)
+        if flush_due:
+            self.flush()
+        return found
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Look up one embedding by cache key."""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: List[Tuple[str, str, Any]]):
+        """
+        Store embeddings, replacing any existing row of the same key.
+
+        Args:
+            items: (cache key, text, vector) triples
+        """
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (key, text, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, text, vector in items
+        ]
+        conn = self._connection()
+        with conn:
+            conn.executemany('''
+            INSERT INTO embedding_vectors (text_hash, text, embedding, last_used)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(text_hash) DO UPDATE SET
+                embedding = excluded.embedding,
+                last_used = excluded.last_used
+            ''', rows)
+        with self._lock:
+            self.writes += len(rows)
+            # Replacements are counted too; the next eviction recounts exactly
+            self._size += len(rows)
+            evict_due = self._size > self.evict_at
+        if evict_due:
+            self.evict()
+
+    def put(self, key: str, text: str, vector: Any):
+        """Store one embedding."""
+        self.put_many([(key, text, vector)])
+
+    def get_or_embed(self, texts: List[str], backend, force_refresh: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Embeddings of texts from the cache, embedding and storing the misses in one batch.
+
+        Args:
+            texts: Texts to embed
+            backend: EmbeddingBackend producing the vectors (and their cache keys)
+            force_refresh: Re-embed every text instead of reading the cache
+
+        Returns:
+            Dict[str, np.ndarray]: Text -> vector for every distinct text
+        """
+        keys = {text: backend.cache_key(text) for text in dict.fromkeys(texts)}
+        cached = {} if force_refresh else self.get_many(list(keys.values()))
+        result = {text: cached[key] for text, key in keys.items() if key in cached}
+        missing = [text for text in keys if text not in result]
+        if missing:
+            vectors = backend.embed(missing)
+            self.put_many([(keys[text], text, vector) for text, vector in zip(missing, vectors)])
+            result.update(zip(missing, vectors))
+        return result
+
+    def flush(self):
+        """Write buffered last_used updates."""
+        with self._lock:
+            touches = list(self._pending_touches.items())
+            self._pending_touches.clear()
+            self._last_flush = time.monotonic()
+        if not touches:
+            return
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                'UPDATE embedding_vectors SET last_used = MAX(last_used, ?) WHERE text_hash = ?',
+                [(used, text_hash) for text_hash, used in touches]
+            )
+
+    def evict(self):
+        """Trim the least recently used rows back to max_entries."""
+        self.flush()
+        conn = self._connection()
+        with conn:
+            size = conn.execute('SELECT COUNT(*) FROM embedding_vectors').fetchone()[0]
+            excess = size - self.max_entries
+            if excess > 0:
+                conn.execute('''
+                DELETE FROM embedding_vectors WHERE text_hash IN (
+                    SELECT text_hash FROM embedding_vectors ORDER BY last_used ASC LIMIT ?
+                )
+                ''', (excess,))
+                size -= excess
+                logger.info(f"Evicted {excess} entries from the embedding cache")
+        with self._lock:
+            self._size = size
+            if excess > 0:
+                self.evictions += excess
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, lookup latency and the (approximate) row count."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "lookups": self.lookups,
+                "avg_lookup_ms": 1000 * self.lookup_seconds / self.lookups if self.lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "pending_touches": len(self._pending_touches)
+            }
+
+
+# Global embedding cache instance
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Get the process-wide embedding cache.
+
+    Returns:
+        EmbeddingCache: The shared cache at EMBEDDING_CACHE_PATH
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache()
+    return _embedding_cache
@@ -1,68 +1,27 @@
 """
 Embedding manager for handling all embedding operations.
 """
-import os
-import json
-import time
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Optional
 import numpy as np
-from pathlib import Path
 
 from src.core.logging_config import get_logger
-from src.core.openai_client import EnhancedOpenAIClient
+from src.core.embedding_backends import get_embedding_backend
+from src.core.vector_cache import MmapVectorCache, get_vector_cache
 
 logger = get_logger(__name__)
 
 class EmbeddingManager:
     """Manager for handling all embedding operations."""
     
-    def __init__(self):
-        """Initialize the embedding manager."""
-        self.client = EnhancedOpenAIClient()
-        self._cache = {}
-        self._cache_file = Path("cache/embeddings.json")
-        self._cache_file.parent.mkdir(exist_ok=True)
-        self._load_cache()
-    
-    def _load_cache(self):
-        """Load embeddings from cache file."""
-        try:
-            if self._cache_file.exists():
-                with open(self._cache_file, 'r') as f:
-                    self._cache = json.load(f)
-                logger.info("Embedding cache initialized", 
-                          extra={"count": len(self._cache)})
-        except Exception as e:
-            logger.error("Error loading embedding cache", 
-                        extra={"error": str(e)})
-            self._cache = {}
-    
-    def _save_cache(self):
-        """Save embeddings to cache file."""
-        try:
-            with open(self._cache_file, 'w') as f:
-                json.dump(self._cache, f)
-        except Exception as e:
-            logger.error("Error saving embedding cache", 
-                        extra={"error": str(e)})
-    
-    def _prune_cache(self, max_size: int = 1000):
+    def __init__(self, cache: Optional[MmapVectorCache] = None):
         """
-        Prune the cache to maintain a maximum size.
+        Initialize the embedding manager.
         
         Args:
-            max_size: Maximum number of entries to keep.
+            cache: Vector cache to use (defaults to the process-wide one at VECTOR_CACHE_DIR)
         """
-        if len(self._cache) > max_size:
-            # Sort by last accessed time
-            sorted_items = sorted(
-                self._cache.items(),
-                key=lambda x: x[1].get('last_accessed', 0)
-            )
-            # Keep only the most recently accessed items
-            self._cache = dict(sorted_items[-max_size:])
-            logger.debug("Pruned embedding cache", 
-                        extra={"remaining_count": len(self._cache)})
+        self.client = get_embedding_backend()
+        self._cache = cache or get_vector_cache(dimension=self.client.dimension, namespace=self.client.name)
     
     def get_embedding(self, text: str) -> Optional[np.ndarray]:
         """
@@ -76,20 +35,16 @@ class EmbeddingManager:
         """
         try:
             # Check cache first
-            if text in self._cache:
-                self._cache[text]['last_accessed'] = time.time()
-                return np.array(self._cache[text]['embedding'])
+            key = self.client.cache_key(text)
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                return embedding
             
             # Generate new embedding
             embedding = self.client.get_embedding(text)
             if embedding is not None:
                 # Add to cache
-                self._cache[text] = {
-                    'embedding': embedding.tolist(),
-                    'last_accessed': time.time()
-                }
-                self._prune_cache()
-                self._save_cache()
+                self._cache.put(key, embedding)
                 return embedding
             
             return None
@@ -102,12 +57,13 @@ class EmbeddingManager:
                         })
             return None
     
-    def get_batch_embeddings(self, texts: List[str]) -> Dict[str, np.ndarray]:
+    def get_batch_embeddings(self, texts: List[str], force_refresh: bool = False) -> Dict[str, np.ndarray]:
         """
         Get embeddings for a batch of texts.
         
         Args:
             texts: List of texts to get embeddings for.
+            force_refresh: Re-embed every text instead of using the cache.
             
         Returns:
             Dict[str, np.ndarray]: Dictionary mapping texts to their embeddings.
@@ -120,15 +76,10 @@ class EmbeddingManager:
                 return {}
             
             # Check cache first
-            cached_embeddings = {}
-            texts_to_generate = []
-            
-            for text in valid_texts:
-                if text in self._cache:
-                    self._cache[text]['last_accessed'] = time.time()
-                    cached_embeddings[text] = np.array(self._cache[text]['embedding'])
-                else:
-                    texts_to_generate.append(text)
+            keys = {text: self.client.cache_key(text) for text in valid_texts}
+            found = {} if force_refresh else self._cache.get_many(list(keys.values()))
+            cached_embeddings = {text: found[key] for text, key in keys.items() if key in found}
+            texts_to_generate = [text for text in keys if text not in cached_embeddings]
             
             # Generate embeddings for uncached texts
             if texts_to_generate:
@@ -136,18 +87,13 @@ class EmbeddingManager:
                            extra={"count": len(texts_to_generate)})
                 new_embeddings = self.client.get_batch_embeddings(texts_to_generate)
                 
-                # Add new embeddings to cache
+                # Append new embeddings to the cache
+                new_items = []
                 for text, embedding in zip(texts_to_generate, new_embeddings):
                     if embedding is not None:
-                        self._cache[text] = {
-                            'embedding': embedding.tolist(),
-                            'last_accessed': time.time()
-                        }
+                        new_items.append((keys[text], embedding))
                         cached_embeddings[text] = embedding
-            
-            # Prune and save cache
-            self._prune_cache()
-            self._save_cache()
+                self._cache.put_many(new_items)
             
             return cached_embeddings
             
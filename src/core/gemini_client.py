@@ -3,11 +3,7 @@ Gemini API integration for Task Manager with throttling and retries.
 Handles embeddings and AI-generated insights.
 """
 import os
-import sqlite3
-import pickle
 import traceback
-from hashlib import md5
-from datetime import datetime
 import time
 import random
 import numpy as np
@@ -15,8 +11,6 @@ import httpx
 import json
 import logging
 from typing import List, Dict, Any, Optional
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
 from src.config.settings import (
     GEMINI_API_KEY, 
@@ -25,11 +19,15 @@ from src.config.settings import (
     CHAT_MODEL, 
     DEBUG_MODE,
     MIN_TASK_LENGTH,
-    MAX_CACHE_ENTRIES,
     AI_PROVIDER,
     GEMINI_MODEL,
-    GEMINI_EMBEDDING_MODEL
+    GEMINI_EMBEDDING_MODEL,
+    LLM_BATCH_MAX_CONCURRENCY
 )
+from src.core.ai.batch import run_prompt_batch
+from src.core.ai.rate_limiter import get_rate_limiter, estimate_tokens
+from src.core.embedding_backends import get_embedding_backend
+from src.core.embedding_cache import get_embedding_cache
 
 # Only import Google AI if we're using Gemini
 if AI_PROVIDER == 'gemini':
@@ -44,14 +42,8 @@ class EnhancedGeminiClient:
     def __init__(self):
         """Initialize the Gemini client with rate limiting and retries."""
         self.max_retries = 3
-        self.rate_limit_delay = 1.0
-        self.last_request_time = 0
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,  # Limit vocabulary size
-            min_df=1,  # Include terms that appear in at least 1 document
-            max_df=1.0,  # Include terms that appear in at most 100% of documents
-            norm='l2'  # Normalize vectors to unit length
-        )
+        self.rate_limiter = get_rate_limiter('gemini', GEMINI_MODEL)
+        self.embedding_backend = get_embedding_backend()
         if AI_PROVIDER == 'gemini':
             genai.configure(api_key=GEMINI_API_KEY)
             self.model = genai.GenerativeModel(GEMINI_MODEL)
@@ -62,67 +54,40 @@ class EnhancedGeminiClient:
         
         self.embeddings_cache = {}
         
-    def _wait_if_needed(self):
-        """Wait if needed to respect rate limits."""
-        now = time.time()
-        elapsed = now - self.last_request_time
-        
-        if elapsed < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - elapsed
-            if DEBUG_MODE:
-                print(f"Rate limiting: Waiting {sleep_time:.2f}s")
-            time.sleep(sleep_time)
-            
-        self.last_request_time = time.time()
-        
     def embeddings_create(self, text: str) -> List[float]:
-        """Create embeddings using TF-IDF vectorizer."""
+        """Create an embedding with the shared local embedding backend."""
         try:
-            # Transform the text into TF-IDF vector
-            vector = self.vectorizer.fit_transform([text])
-            # Convert to dense array and normalize
-            embedding = vector.toarray()[0]
-            # Ensure the vector has the correct length
-            if len(embedding) < 1000:
-                embedding = np.pad(embedding, (0, 1000 - len(embedding)))
-            return embedding.tolist()
+            return self.embedding_backend.embed_one(text).tolist()
         except Exception as e:
             logger.error(f"Error creating embedding: {str(e)}")
-            return [0.0] * 1000  # Return zero vector as fallback
+            return self.embedding_backend.zero_vector()  # Return zero vector as fallback
             
     def embeddings_create_batch(self, texts: List[str]) -> List[List[float]]:
-        """Create embeddings for a batch of texts."""
+        """Create embeddings for a batch of texts (batched by length in the backend)."""
         try:
-            # Transform all texts at once
-            vectors = self.vectorizer.fit_transform(texts)
-            # Convert to dense arrays and normalize
-            embeddings = vectors.toarray()
-            # Normalize each vector
-            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-            embeddings = np.divide(embeddings, norms, where=norms>0)
-            return embeddings.tolist()
+            return self.embedding_backend.embed(texts).tolist()
         except Exception as e:
             logger.error(f"Error creating batch embeddings: {str(e)}")
-            return [[0.0] * 1000] * len(texts)  # Return zero vectors as fallback
+            return [self.embedding_backend.zero_vector() for _ in texts]  # Return zero vectors as fallback
                     
     def generate_content(self, prompt: str, **kwargs):
         """Generate content using Gemini's native API."""
-        for attempt in range(self.max_retries + 1):
+        max_retries = kwargs.pop('max_retries', self.max_retries)
+        for attempt in range(max_retries + 1):
             try:
-                self._wait_if_needed()
-                
                 # Get parameters
                 temperature = kwargs.get('temperature', 0.7)
                 max_tokens = kwargs.get('max_tokens', 1000)
                 
-                # Generate response using Gemini's native API
-                response = self.model.generate_content(
-                    prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=temperature,
-                        max_output_tokens=max_tokens,
+                # Generate response using Gemini's native API, within the shared rate limits
+                with self.rate_limiter.slot(tokens=estimate_tokens(prompt) + max_tokens):
+                    response = self.model.generate_content(
+                        prompt,
+                        generation_config=genai.types.GenerationConfig(
+                            temperature=temperature,
+                            max_output_tokens=max_tokens,
+                        )
                     )
-                )
                 
                 # Handle different response types
                 if hasattr(response, 'text'):
@@ -134,14 +99,14 @@ class EnhancedGeminiClient:
                     return str(response)
                 
             except Exception as e:
-                if "rate_limit" in str(e).lower() and attempt < self.max_retries:
+                if "rate_limit" in str(e).lower() and attempt < max_retries:
                     # Rate limit error - implement exponential backoff
                     sleep_time = (2 ** attempt) + random.random()
                     if DEBUG_MODE:
                         print(f"Rate limited on attempt {attempt+1}. Retrying in {sleep_time:.2f}s")
                     time.sleep(sleep_time)
                     continue
-                elif attempt < self.max_retries:
+                elif attempt < max_retries:
                     # Other error - retry with shorter backoff
                     sleep_time = (attempt + 1) + random.random()
                     if DEBUG_MODE:
@@ -207,29 +172,7 @@ client = EnhancedGeminiClient() if AI_PROVIDER == 'gemini' else None
 
 def setup_embedding_cache():
     """Initialize the SQLite-based embedding cache."""
-    # Create database if it doesn't exist
-    conn = sqlite3.connect(EMBEDDING_CACHE_PATH)
-    cursor = conn.cursor()
-    
-    # Create table if it doesn't exist
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS embeddings (
-        text_hash TEXT PRIMARY KEY,
-        text TEXT,
-        embedding BLOB,
-        last_used TIMESTAMP
-    )
-    ''')
-    
-    # Create index for performance
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)')
-    
-    # Check existing entries count
-    cursor.execute('SELECT COUNT(*) FROM embeddings')
-    count = cursor.fetchone()[0]
-    
-    conn.commit()
-    conn.close()
+    count = len(get_embedding_cache())
     
     # Only log if there are actually entries (to avoid confusion)
     if count > 0:
@@ -254,151 +197,35 @@ def get_cached_embedding(text):
     if not text or not isinstance(text, str) or len(text.strip()) < MIN_TASK_LENGTH:
         return None
 
-    text_hash = md5(text.encode()).hexdigest()
-    
-    # Connect to SQLite
-    conn = sqlite3.connect(EMBEDDING_CACHE_PATH)
-    cursor = conn.cursor()
-    
-    # Look for cache hit
-    cursor.execute('SELECT embedding FROM embeddings WHERE text_hash = ?', (text_hash,))
-    result = cursor.fetchone()
-    
-    if result:
-        # Update last_used timestamp
-        cursor.execute('UPDATE embeddings SET last_used = ? WHERE text_hash = ?', 
-                      (datetime.now().isoformat(), text_hash))
-        conn.commit()
-        embedding = pickle.loads(result[0])
-        conn.close()
-        debug_print(f"Cache hit for text: {text[:50]}...")
-        return embedding
-    
-    # Cache miss - get from Gemini
-    debug_print(f"Cache miss for text: {text[:50]}...")
-    
+    backend = get_embedding_backend()
     try:
-        if client:
-            embedding = client.embeddings_create(text)
-        else:
-            # Fallback to TF-IDF if no client
-            vectorizer = TfidfVectorizer(max_features=1000)
-            vector = vectorizer.fit_transform([text])
-            embedding = vector.toarray()[0].tolist()
-            if len(embedding) < 1000:
-                embedding = embedding + [0.0] * (1000 - len(embedding))
-        
-        # Store in cache
-        cursor.execute('''
-        INSERT OR REPLACE INTO embeddings (text_hash, text, embedding, last_used)
-        VALUES (?, ?, ?, ?)
-        ''', (text_hash, text, pickle.dumps(embedding), datetime.now().isoformat()))
-        
-        # Clean up old entries if cache is full
-        cursor.execute('SELECT COUNT(*) FROM embeddings')
-        count = cursor.fetchone()[0]
-        
-        if count > MAX_CACHE_ENTRIES:
-            cursor.execute('''
-            DELETE FROM embeddings WHERE text_hash NOT IN (
-                SELECT text_hash FROM embeddings 
-                ORDER BY last_used DESC 
-                LIMIT ?
-            )
-            ''', (MAX_CACHE_ENTRIES,))
-        
-        conn.commit()
-        conn.close()
-        
-        return embedding
-        
+        return get_embedding_cache().get_or_embed([text], backend)[text].tolist()
     except Exception as e:
-        conn.close()
         logger.error(f"Error getting embedding: {str(e)}")
-        return [0.0] * 1000  # Return zero vector as fallback
+        return backend.zero_vector()  # Return zero vector as fallback
 
 def get_batch_embeddings(texts, force_refresh=False):
     """Get embeddings for multiple texts, using cache when possible."""
     if not texts:
         return []
     
-    embeddings = []
-    texts_to_embed = []
-    text_indices = []
-    
-    if not force_refresh:
-        # Check cache for each text
-        for i, text in enumerate(texts):
-            if not text or not isinstance(text, str) or len(text.strip()) < MIN_TASK_LENGTH:
-                embeddings.append([0.0] * 1000)
-                continue
-                
-            cached_embedding = get_cached_embedding(text)
-            if cached_embedding is not None:
-                embeddings.append(cached_embedding)
-            else:
-                texts_to_embed.append(text)
-                text_indices.append(i)
-                embeddings.append(None)  # Placeholder
-    else:
-        # Force refresh all
-        texts_to_embed = texts
-        text_indices = list(range(len(texts)))
-        embeddings = [None] * len(texts)
+    backend = get_embedding_backend()
+    valid_texts = [
+        text for text in texts
+        if text and isinstance(text, str) and len(text.strip()) >= MIN_TASK_LENGTH
+    ]
     
-    # Get embeddings for texts not in cache
-    if texts_to_embed:
-        try:
-            if client:
-                batch_embeddings = client.embeddings_create_batch(texts_to_embed)
-            else:
-                # Fallback to TF-IDF
-                vectorizer = TfidfVectorizer(max_features=1000)
-                vectors = vectorizer.fit_transform(texts_to_embed)
-                batch_embeddings = vectors.toarray().tolist()
-                # Pad vectors to 1000 dimensions
-                for i, embedding in enumerate(batch_embeddings):
-                    if len(embedding) < 1000:
-                        batch_embeddings[i] = embedding + [0.0] * (1000 - len(embedding))
-            
-            # Store in cache and update results
-            conn = sqlite3.connect(EMBEDDING_CACHE_PATH)
-            cursor = conn.cursor()
-            
-            for i, (text, embedding) in enumerate(zip(texts_to_embed, batch_embeddings)):
-                text_hash = md5(text.encode()).hexdigest()
-                
-                # Store in cache
-                cursor.execute('''
-                INSERT OR REPLACE INTO embeddings (text_hash, text, embedding, last_used)
-                VALUES (?, ?, ?, ?)
-                ''', (text_hash, text, pickle.dumps(embedding), datetime.now().isoformat()))
-                
-                # Update results
-                embeddings[text_indices[i]] = embedding
-            
-            # Clean up old entries if cache is full
-            cursor.execute('SELECT COUNT(*) FROM embeddings')
-            count = cursor.fetchone()[0]
-            
-            if count > MAX_CACHE_ENTRIES:
-                cursor.execute('''
-                DELETE FROM embeddings WHERE text_hash NOT IN (
-                    SELECT text_hash FROM embeddings 
-                    ORDER BY last_used DESC 
-                    LIMIT ?
-                )
-                ''', (MAX_CACHE_ENTRIES,))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            logger.error(f"Error getting batch embeddings: {str(e)}")
-            # Fill with zero vectors as fallback
-            for i in text_indices:
-                embeddings[i] = [0.0] * 1000
+    try:
+        # One batched cache lookup, one backend call for all misses
+        found = get_embedding_cache().get_or_embed(valid_texts, backend, force_refresh=force_refresh)
+    except Exception as e:
+        logger.error(f"Error getting batch embeddings: {str(e)}")
+        found = {}
     
+    embeddings = []
+    for text in texts:
+        vector = found.get(text) if isinstance(text, str) else None
+        embeddings.append(vector.tolist() if vector is not None else backend.zero_vector())
     return embeddings
 
 def get_coaching_insight(person_name, tasks, recent_tasks, peer_feedback):
@@ -476,30 +303,27 @@ def get_project_insight(selected_category, filtered_tasks):
         logger.error(f"Error generating project insight: {str(e)}")
         return f"Unable to generate project insights: {str(e)}"
 
-def batch_api_requests(prompts, model=CHAT_MODEL, temperature=0.4):
-    """Process multiple prompts in batch with rate limiting."""
-    results = []
+def batch_api_requests(prompts, model=CHAT_MODEL, temperature=0.4, max_concurrency=LLM_BATCH_MAX_CONCURRENCY):
+    """
+    Process multiple prompts concurrently within the shared rate limits.
     
-    for i, prompt in enumerate(prompts):
-        try:
-            if DEBUG_MODE:
-                print(f"Processing prompt {i+1}/{len(prompts)}")
-            
-            response = client.chat_completions_create(
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                max_tokens=1000
-            )
-            
-            result = response['choices'][0]['message']['content']
-            results.append(result)
-            
-            # Rate limiting between requests
-            if i < len(prompts) - 1:  # Don't sleep after the last request
-                time.sleep(0.1)  # 100ms delay between requests
-                
-        except Exception as e:
-            logger.error(f"Error processing prompt {i+1}: {str(e)}")
-            results.append(f"Error: {str(e)}")
+    Args:
+        prompts: List of prompt strings
+        model: Model to use (the client's configured Gemini model is used)
+        temperature: Temperature setting
+        max_concurrency: Prompts in flight at once
+        
+    Returns:
+        List of response strings, in prompt order ("Error: ..." for prompts that failed)
+    """
+    def ask(prompt):
+        # run_prompt_batch retries each prompt with jittered backoff
+        response = client.chat_completions_create(
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=1000,
+            max_retries=0
+        )
+        return response['choices'][0]['message']['content']
     
-    return results 
\ No newline at end of file
+    return run_prompt_batch(ask, prompts, max_concurrency=max_concurrency)
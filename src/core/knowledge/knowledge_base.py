@@ -4,9 +4,32 @@ Handles storing and retrieving reference information.
 """
 import os
 import json
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
+from src.config.settings import GUIDELINE_CACHE_TTL_SECONDS
+
+# Recent guideline query results, keyed by (normalized query, top_k), with
+# their expiry time. Guidelines are ingested by a separate process, so
+# entries expire instead of waiting for clear_guideline_cache().
+_GUIDELINE_CACHE_SIZE = 128
+_guideline_cache: "OrderedDict[Tuple[str, int], Tuple[float, List[str]]]" = OrderedDict()
+_guideline_cache_lock = threading.Lock()
+
+
+def _guideline_cache_key(query_text: str, top_k: int) -> Tuple[str, int]:
+    return (" ".join(query_text.lower().split()), top_k)
+
+
+def clear_guideline_cache():
+    """Forget cached guideline query results (e.g. after re-ingesting guidelines)."""
+    with _guideline_cache_lock:
+        _guideline_cache.clear()
+
+
 class KnowledgeBase:
     """Base class for managing domain-specific knowledge."""
     
@@ -233,59 +256,77 @@ class KnowledgeBase:
         Returns:
             List of relevant text chunks from guideline documents
         """
-        try:
-            from src.core.chroma_embedding_manager_simple import SimpleChromaEmbeddingManager
-            
-            # Initialize embedding manager for query
-            query_manager = SimpleChromaEmbeddingManager()
-            
-            # Get query embedding
-            query_embedding = query_manager.get_embedding(query_text)
-            if query_embedding is None:
-                print(f"Failed to generate embedding for query: {query_text}")
-                return []
-            
-            # Query both guideline collections
-            relevant_chunks = []
-            
-            # Collection names from the ingestion pipeline
-            collections = ['guidelines_technical', 'guidelines_process']
+        return self.query_guidelines_batch([query_text], top_k=top_k).get(query_text, [])
+    
+    def query_guidelines_batch(self, query_texts: List[str], top_k: int = 4) -> Dict[str, List[str]]:
+        """
+        Query the guideline documents for several queries at once.
+        
+        Queries answered within GUIDELINE_CACHE_TTL_SECONDS are served from a
+        small LRU cache. The rest are embedded in one call and sent to each
+        guideline collection in a single query; a chunk returned by both
+        collections is kept once. Results of a query in which a collection
+        failed are returned but not cached.
+        
+        Args:
+            query_texts: The questions or queries
+            top_k: Number of most relevant chunks to retrieve per query
             
-            for collection_name in collections:
-                try:
-                    # Create collection-specific manager
-                    collection_manager = SimpleChromaEmbeddingManager(
-                        collection_name=collection_name
-                    )
-                    
-                    # Query the collection
-                    results = collection_manager.collection.query(
-                        query_embeddings=[query_embedding.tolist()],
-                        n_results=top_k // 2,  # Get half from each collection
-                        include=['documents', 'metadatas', 'distances']
-                    )
-                    
-                    # Extract relevant chunks
-                    if results and 'documents' in results and results['documents']:
-                        for i, doc in enumerate(results['documents'][0]):
-                            if doc:  # Ensure document is not empty
-                                relevant_chunks.append({
-                                    'content': doc,
-                                    'metadata': results['metadatas'][0][i] if results['metadatas'] and results['metadatas'][0] else {},
-                                    'distance': results['distances'][0][i] if results['distances'] and results['distances'][0] else 1.0
-                                })
-                                
-                except Exception as e:
-                    print(f"Error querying collection {collection_name}: {e}")
-                    continue
+        Returns:
+            Dict mapping each query to its relevant text chunks
+        """
+        results: Dict[str, List[str]] = {}
+        missing = []
+        now = time.monotonic()
+        with _guideline_cache_lock:
+            for query_text in dict.fromkeys(q for q in query_texts if q and q.strip()):
+                key = _guideline_cache_key(query_text, top_k)
+                entry = _guideline_cache.get(key)
+                if entry is not None and entry[0] > now:
+                    _guideline_cache.move_to_end(key)
+                    results[query_text] = list(entry[1])
+                else:
+                    _guideline_cache.pop(key, None)
+                    missing.append(query_text)
+        
+        if not missing:
+            return results
+        
+        try:
+            from src.core.chroma_registry import GUIDELINE_COLLECTIONS, get_chroma_registry
             
-            # Sort by similarity score (lower distance = more similar)
-            relevant_chunks.sort(key=lambda x: x['distance'])
+            registry = get_chroma_registry()
             
-            # Return top chunks as text
-            top_chunks = relevant_chunks[:top_k]
-            return [chunk['content'] for chunk in top_chunks]
+            # Embed the queries without storing them in any collection
+            query_embeddings = registry.embed_queries(missing)
+            if len(query_embeddings) != len(missing):
+                print(f"Failed to generate embeddings for queries: {missing}")
+                return results
             
+            # Query both guideline collections in parallel, half of top_k from each
+            failed: List[str] = []
+            hits_per_query = registry.query_collections_batch(
+                query_embeddings,
+                GUIDELINE_COLLECTIONS,
+                n_results=max(1, top_k // 2),
+                failed=failed
+            )
         except Exception as e:
             print(f"Error in query_guidelines: {e}")
-            return []
\ No newline at end of file
+            return results
+        
+        expires_at = time.monotonic() + GUIDELINE_CACHE_TTL_SECONDS
+        with _guideline_cache_lock:
+            for query_text, hits in zip(missing, hits_per_query):
+                # Hits are sorted by distance; keep the first copy of each chunk
+                chunks = list(dict.fromkeys(hit['content'] for hit in hits))[:top_k]
+                results[query_text] = chunks
+                if failed:
+                    continue
+                key = _guideline_cache_key(query_text, top_k)
+                _guideline_cache[key] = (expires_at, list(chunks))
+                _guideline_cache.move_to_end(key)
+                while len(_guideline_cache) > _GUIDELINE_CACHE_SIZE:
+                    _guideline_cache.popitem(last=False)
+        
+        return results
@@ -1,9 +1,10 @@
 """
 SQLAlchemy models for email archive database with hot and cold storage.
 """
-from sqlalchemy import Column, String, Text, DateTime, Boolean, Integer, BigInteger, JSON, CheckConstraint
-from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB
+from sqlalchemy import Column, String, Text, DateTime, Boolean, Integer, BigInteger, JSON, CheckConstraint, Computed, Index
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 import uuid
 from datetime import datetime
@@ -11,11 +12,22 @@ from typing import Optional, List, Dict, Any
 
 Base = declarative_base()
 
+# Text-search document for an archived email: subject ranks above the body preview.
+# Stored as a generated column so it is tokenized once, on write.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(subject, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(body_preview, '')), 'B')"
+)
+
 
 class HotEmail(Base):
     """Model for hot storage emails (recent, frequently accessed)."""
     __tablename__ = 'hot_emails'
-    __table_args__ = {'schema': 'email_archive'}
+    __table_args__ = (
+        Index('ix_hot_emails_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_hot_emails_received_date_id', 'received_date', 'id'),
+        {'schema': 'email_archive'}
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     message_id = Column(String(255), unique=True, nullable=False, index=True)
@@ -24,8 +36,8 @@ class HotEmail(Base):
     sender_name = Column(String(255))
     recipient_email = Column(String(255), nullable=False)
     subject = Column(Text, index=True)
-    body_text = Column(Text, index=True)
-    body_preview = Column(Text, index=True)
+    body_text = Column(Text)
+    body_preview = Column(Text)
     body_storage_key = Column(String(255))
     has_full_body = Column(Boolean, default=False)
     body_html = Column(Text)
@@ -42,6 +54,7 @@ class HotEmail(Base):
     is_archived = Column(Boolean, default=False)
     processing_status = Column(String(50), default='pending', index=True)
     processing_metadata = Column(JSONB)
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
     created_at = Column(DateTime(timezone=True), default=func.now())
     updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
 
@@ -81,7 +94,11 @@ class HotEmail(Base):
 class ColdEmail(Base):
     """Model for cold storage emails (older, less frequently accessed)."""
     __tablename__ = 'cold_emails'
-    __table_args__ = {'schema': 'email_archive'}
+    __table_args__ = (
+        Index('ix_cold_emails_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_cold_emails_received_date_id', 'received_date', 'id'),
+        {'schema': 'email_archive'}
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     message_id = Column(String(255), unique=True, nullable=False, index=True)
@@ -90,8 +107,8 @@ class ColdEmail(Base):
     sender_name = Column(String(255))
     recipient_email = Column(String(255), nullable=False)
     subject = Column(Text, index=True)
-    body_text = Column(Text, index=True)
-    body_preview = Column(Text, index=True)
+    body_text = Column(Text)
+    body_preview = Column(Text)
     body_storage_key = Column(String(255))
     has_full_body = Column(Boolean, default=False)
     body_html = Column(Text)
@@ -108,6 +125,7 @@ class ColdEmail(Base):
     is_archived = Column(Boolean, default=False)
     processing_status = Column(String(50), default='pending', index=True)
     processing_metadata = Column(JSONB)
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
     archived_date = Column(DateTime(timezone=True), default=func.now(), index=True)
     created_at = Column(DateTime(timezone=True), default=func.now())
     updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
@@ -207,4 +225,47 @@ class StorageStats(Base):
             'oldest_email_date': self.oldest_email_date.isoformat() if self.oldest_email_date else None,
             'newest_email_date': self.newest_email_date.isoformat() if self.newest_email_date else None,
             'last_updated': self.last_updated.isoformat() if self.last_updated else None
-        } 
\ No newline at end of file
+        } 
+
+class BodyBlob(Base):
+    """Model for reference counts of content-addressed email body files."""
+    __tablename__ = 'body_blobs'
+    __table_args__ = {'schema': 'email_archive'}
+
+    storage_key = Column(String(255), primary_key=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    size_bytes = Column(BigInteger)
+    created_at = Column(DateTime(timezone=True), default=func.now())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert model to dictionary."""
+        return {
+            'storage_key': self.storage_key,
+            'ref_count': self.ref_count,
+            'size_bytes': self.size_bytes,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class MaintenanceCheckpoint(Base):
+    """Model for resumable archive maintenance jobs (e.g. the hot -> cold mover)."""
+    __tablename__ = 'maintenance_checkpoints'
+    __table_args__ = {'schema': 'email_archive'}
+
+    job_name = Column(String(100), primary_key=True)
+    last_received_date = Column(DateTime(timezone=True))
+    last_email_id = Column(UUID(as_uuid=True))
+    rows_processed = Column(BigInteger, default=0)
+    last_run_metrics = Column(JSONB)
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert model to dictionary."""
+        return {
+            'job_name': self.job_name,
+            'last_received_date': self.last_received_date.isoformat() if self.last_received_date else None,
+            'last_email_id': str(self.last_email_id) if self.last_email_id else None,
+            'rows_processed': self.rows_processed,
+            'last_run_metrics': self.last_run_metrics,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
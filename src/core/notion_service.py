@@ -14,6 +14,9 @@ from src.config.settings import (
     DAYS_THRESHOLD
 )
 from src.core.logging_config import get_logger
+from src.core.task_vector_index import record_task_upsert, record_task_delete
+from src.core.notion_sync import task_store
+from src.core.task_cache import get_task_cache
 from src.plugins.plugin_manager_instance import plugin_manager
 
 logger = get_logger(__name__)
@@ -23,9 +26,8 @@ class NotionService:
         self.token = token or NOTION_TOKEN
         self.feedback_db_id = feedback_db_id or NOTION_FEEDBACK_DB_ID
         self.client = Client(auth=self.token)
-        self._cache = {}
-        self._cache_timestamp = None
-        self._cache_valid_duration = timedelta(minutes=5)
+        # Shared by every NotionService in the process, so per-request instances still hit it
+        self.task_cache = get_task_cache()
         
         # Get the project protection plugin
         self.protection_plugin = plugin_manager.get_plugin('ProjectProtectionPlugin')
@@ -61,39 +63,28 @@ class NotionService:
             pd.DataFrame: DataFrame of tasks.
         """
         try:
-            # Caching is now per-database
-            cache_key = f"tasks_{database_id}"
-            if self._is_cache_valid(cache_key):
+            cached = self.task_cache.get(database_id)
+            if cached is not None:
                 logger.debug(f"Returning cached tasks for database {database_id}")
-                return pd.DataFrame(list(self._cache[cache_key].values()))
+                return pd.DataFrame(cached)
 
-            # Calculate date filter (leave blank to fetch all, but keep infrastructure)
-            filter_params = {}
-            # Fetch from Notion
+            # Fetch from Notion: full paginated load the first time, last_edited_time deltas after that
             logger.info(f"Fetching tasks from Notion database: {database_id}", extra={"days_back": days_back})
-            response = self.client.databases.query(
-                database_id=database_id,
-                **filter_params
-            )
+            pages = task_store.sync(self.client, database_id)
             # Process results
             tasks = []
-            for page in response.get("results", []):
+            for page in pages:
                 try:
                     task = self._process_notion_page(page)
                     if task:
                         tasks.append(task)
-                        # Initialize per-db cache if not present
-                        if cache_key not in self._cache:
-                            self._cache[cache_key] = {}
-                        self._cache[cache_key][task["id"]] = task
                 except Exception as e:
                     logger.error("Error processing Notion page", 
                                extra={
                                    "page_id": page["id"],
                                    "error": str(e)
                                })
-            # Update cache timestamp
-            self._cache_timestamp = datetime.now() # This timestamp is now for the whole cache object
+            self.task_cache.set(database_id, tasks)
             logger.info(f"Successfully fetched tasks from {database_id}", extra={"count": len(tasks)})
             return pd.DataFrame(tasks)
         except Exception as e:
@@ -114,13 +105,10 @@ class NotionService:
                 parent={"database_id": database_id},
                 properties=self._format_task_properties(task_data)
             )
+            task_store.record_page(response, database_id)
             task = self._process_notion_page(response)
-            # Update per-db cache
-            cache_key = f"tasks_{database_id}"
-            if task:
-                if cache_key not in self._cache:
-                    self._cache[cache_key] = {}
-                self._cache[cache_key][task["id"]] = task
+            self.task_cache.upsert_task(database_id, task)
+            record_task_upsert(database_id, task)
             logger.info(f"Successfully inserted task into {database_id}", extra={"task_id": task["id"]})
             return True, "Task inserted successfully"
         except Exception as e:
@@ -141,12 +129,12 @@ class NotionService:
                 page_id=task_id,
                 properties=self._format_task_properties(updates)
             )
+            task_store.record_page(response)
             task = self._process_notion_page(response)
-            
-            # This is tricky because we don't know the DB ID from the task ID alone.
-            # We would need to search all cached DBs or skip caching on update.
-            # For simplicity, we'll skip cache update here. A better solution might involve
-            # passing the DB ID to update_task as well.
+            # The updated page carries its parent database, so caches can be written through
+            database_id = (response.get("parent") or {}).get("database_id")
+            self.task_cache.upsert_task(database_id, task)
+            record_task_upsert(database_id, task)
             
             logger.info("Successfully updated task", extra={"task_id": task_id})
             return True, "Task updated successfully"
@@ -203,6 +191,9 @@ class NotionService:
                 page_id=task_id,
                 archived=True
             )
+            task_store.record_page(response)
+            self.task_cache.remove_task(task_id, (response.get("parent") or {}).get("database_id"))
+            record_task_delete(task_id)
             
             logger.info("Successfully archived task", extra={"task_id": task_id})
             return True, "Task archived successfully"
@@ -261,19 +252,6 @@ class NotionService:
             "Is Recurring": {"checkbox": task.get("is_recurring", False)}
         }
 
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """
-        Check if the cache for a specific key is still valid.
-        
-        Returns:
-            bool: True if cache is valid, False otherwise.
-        """
-        if not self._cache_timestamp or cache_key not in self._cache:
-            return False
-        
-        age = datetime.now() - self._cache_timestamp
-        return age < self._cache_valid_duration
-    
     def _process_notion_page(self, page: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
         Process a Notion page into a task dictionary.
@@ -0,0 +1,186 @@
+"""
+Paginated, incremental sync of Notion task databases.
+
+The first read of a database pages through the whole table using
+`has_more`/`next_cursor`. Later reads only ask Notion for pages whose
+`last_edited_time` is at or after a per-database watermark and merge them
+into a local page store. A full resync still runs every
+NOTION_FULL_SYNC_MINUTES to pick up pages archived directly in Notion.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from src.config.settings import NOTION_FULL_SYNC_MINUTES
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Notion caps page_size at 100
+NOTION_PAGE_SIZE = 100
+
+
+def query_all_pages(client, database_id: str, **query) -> List[Dict[str, Any]]:
+    """
+    Run a databases.query and follow `next_cursor` until every page is returned.
+
+    Args:
+        client: notion_client.Client
+        database_id: The Notion database to query
+        **query: Extra query arguments (filter, sorts, ...)
+
+    Returns:
+        List[Dict[str, Any]]: Raw Notion page objects from all result pages.
+    """
+    pages = []
+    cursor = None
+    while True:
+        kwargs = dict(query, database_id=database_id, page_size=NOTION_PAGE_SIZE)
+        if cursor:
+            kwargs["start_cursor"] = cursor
+        response = client.databases.query(**kwargs)
+        pages.extend(response.get("results", []))
+        cursor = response.get("next_cursor")
+        if not response.get("has_more") or not cursor:
+            return pages
+
+
+def _normalize_id(notion_id: Optional[str]) -> str:
+    """Notion ids are accepted with or without dashes; key everything without them."""
+    return (notion_id or "").replace("-", "").lower()
+
+
+def _page_database_id(page: Dict[str, Any]) -> Optional[str]:
+    parent = page.get("parent") or {}
+    return parent.get("database_id")
+
+
+def _is_archived(page: Dict[str, Any]) -> bool:
+    return bool(page.get("archived") or page.get("in_trash"))
+
+
+class _DatabaseState:
+    """Local copy of one Notion database."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        self.watermark: Optional[str] = None
+        self.last_full_sync: Optional[datetime] = None
+
+    def merge(self, page: Dict[str, Any], advance_watermark: bool = True):
+        """
+        Apply one page to the local copy.
+
+        Only pages read by a sync query may advance the watermark: a page we
+        just wrote can be newer than remote edits the next delta query has not
+        fetched yet.
+        """
+        if _is_archived(page):
+            self.pages.pop(page["id"], None)
+            return
+        self.pages[page["id"]] = page
+        edited = page.get("last_edited_time")
+        if advance_watermark and edited and (self.watermark is None or edited > self.watermark):
+            self.watermark = edited
+
+
+class NotionTaskStore:
+    """Process-wide store of Notion pages, kept current with delta queries."""
+
+    def __init__(self, full_sync_interval: timedelta = timedelta(minutes=NOTION_FULL_SYNC_MINUTES)):
+        self.full_sync_interval = full_sync_interval
+        self._states: Dict[str, _DatabaseState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, database_id: str) -> _DatabaseState:
+        key = _normalize_id(database_id)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = _DatabaseState()
+                self._states[key] = state
+            return state
+
+    def sync(self, client, database_id: str, force_full: bool = False) -> List[Dict[str, Any]]:
+        """
+        Bring the local copy of a database up to date and return its pages.
+
+        Args:
+            client: notion_client.Client used for the queries
+            database_id: The Notion database to sync
+            force_full: Page through the whole database even if a watermark exists
+
+        Returns:
+            List[Dict[str, Any]]: Raw, non-archived Notion pages of the database.
+        """
+        state = self._state(database_id)
+        with state.lock:
+            now = datetime.now()
+            needs_full = (
+                force_full
+                or state.watermark is None
+                or state.last_full_sync is None
+                or now - state.last_full_sync >= self.full_sync_interval
+            )
+            if needs_full:
+                pages = query_all_pages(client, database_id)
+                state.pages = {}
+                state.watermark = None
+                for page in pages:
+                    state.merge(page)
+                state.last_full_sync = now
+                logger.info(f"Full sync of Notion database {database_id}", extra={"count": len(state.pages)})
+            else:
+                # last_edited_time is minute-granular, so re-read the watermark minute (merging is idempotent)
+                pages = query_all_pages(
+                    client,
+                    database_id,
+                    filter={
+                        "timestamp": "last_edited_time",
+                        "last_edited_time": {"on_or_after": state.watermark}
+                    }
+                )
+                for page in pages:
+                    state.merge(page)
+                logger.debug(f"Delta sync of Notion database {database_id}", extra={"changed": len(pages)})
+            return list(state.pages.values())
+
+    def record_page(self, page: Optional[Dict[str, Any]], database_id: Optional[str] = None):
+        """
+        Write a page returned by pages.create/update straight into the store.
+
+        The database is taken from the page's parent when not given. Archived
+        pages are removed. Nothing happens for databases that were never synced.
+        The watermark is left alone, so the next delta sync still picks up
+        pages edited remotely before this write.
+        """
+        if not page or not page.get("id"):
+            return
+        database_id = database_id or _page_database_id(page)
+        if not database_id:
+            return
+        with self._lock:
+            state = self._states.get(_normalize_id(database_id))
+        if state is None:
+            return
+        with state.lock:
+            state.merge(page, advance_watermark=False)
+
+    def watermark(self, database_id: str) -> Optional[str]:
+        """Return the last_edited_time watermark for a database, if synced."""
+        with self._lock:
+            state = self._states.get(_normalize_id(database_id))
+        return state.watermark if state else None
+
+    def invalidate(self, database_id: Optional[str] = None):
+        """Forget one database (or all), forcing a full sync on next read."""
+        with self._lock:
+            if database_id is None:
+                self._states.clear()
+            else:
+                self._states.pop(_normalize_id(database_id), None)
+
+
+# Global task store instance
+task_store = NotionTaskStore()
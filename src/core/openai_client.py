@@ -3,11 +3,7 @@ OpenAI API integration for Task Manager with throttling and retries.
 Handles embeddings and AI-generated insights.
 """
 import os
-import sqlite3
-import pickle
 import traceback
-from hashlib import md5
-from datetime import datetime
 import time
 import random
 import numpy as np
@@ -15,8 +11,6 @@ import httpx
 import json
 import logging
 from typing import List, Dict, Any, Optional
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
 from src.config.settings import (
     OPENAI_API_KEY,
@@ -26,9 +20,13 @@ from src.config.settings import (
     CHAT_MODEL,
     DEBUG_MODE,
     MIN_TASK_LENGTH,
-    MAX_CACHE_ENTRIES,
-    AI_PROVIDER
+    AI_PROVIDER,
+    LLM_BATCH_MAX_CONCURRENCY
 )
+from src.core.ai.batch import run_prompt_batch
+from src.core.ai.rate_limiter import get_rate_limiter, estimate_tokens
+from src.core.embedding_backends import get_embedding_backend
+from src.core.embedding_cache import get_embedding_cache
 
 # Only import OpenAI if we're using it
 if AI_PROVIDER == 'openai':
@@ -43,14 +41,7 @@ class EnhancedOpenAIClient:
     def __init__(self):
         """Initialize the OpenAI client with rate limiting and retries."""
         self.max_retries = 3
-        self.rate_limit_delay = 1.0
-        self.last_request_time = 0
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,  # Limit vocabulary size
-            min_df=1,  # Include terms that appear in at least 1 document
-            max_df=1.0,  # Include terms that appear in at most 100% of documents
-            norm='l2'  # Normalize vectors to unit length
-        )
+        self.embedding_backend = get_embedding_backend()
         if AI_PROVIDER == 'openai':
             self.client = OpenAI(api_key=OPENAI_API_KEY)
         else:
@@ -58,64 +49,41 @@ class EnhancedOpenAIClient:
         
         self.embeddings_cache = {}
         
-    def _wait_if_needed(self):
-        """Wait if needed to respect rate limits."""
-        now = time.time()
-        elapsed = now - self.last_request_time
-        
-        if elapsed < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - elapsed
-            if DEBUG_MODE:
-                print(f"Rate limiting: Waiting {sleep_time:.2f}s")
-            time.sleep(sleep_time)
-            
-        self.last_request_time = time.time()
-        
     def embeddings_create(self, text: str) -> List[float]:
-        """Create embeddings using TF-IDF vectorizer."""
+        """Create an embedding with the shared local embedding backend."""
         try:
-            # Transform the text into TF-IDF vector
-            vector = self.vectorizer.fit_transform([text])
-            # Convert to dense array and normalize
-            embedding = vector.toarray()[0]
-            # Ensure the vector has the correct length
-            if len(embedding) < 1000:
-                embedding = np.pad(embedding, (0, 1000 - len(embedding)))
-            return embedding.tolist()
+            return self.embedding_backend.embed_one(text).tolist()
         except Exception as e:
             logger.error(f"Error creating embedding: {str(e)}")
-            return [0.0] * 1000  # Return zero vector as fallback
+            return self.embedding_backend.zero_vector()  # Return zero vector as fallback
             
     def embeddings_create_batch(self, texts: List[str]) -> List[List[float]]:
-        """Create embeddings for a batch of texts."""
+        """Create embeddings for a batch of texts (batched by length in the backend)."""
         try:
-            # Transform all texts at once
-            vectors = self.vectorizer.fit_transform(texts)
-            # Convert to dense arrays and normalize
-            embeddings = vectors.toarray()
-            # Normalize each vector
-            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-            embeddings = np.divide(embeddings, norms, where=norms>0)
-            return embeddings.tolist()
+            return self.embedding_backend.embed(texts).tolist()
         except Exception as e:
             logger.error(f"Error creating batch embeddings: {str(e)}")
-            return [[0.0] * 1000] * len(texts)  # Return zero vectors as fallback
+            return [self.embedding_backend.zero_vector() for _ in texts]  # Return zero vectors as fallback
                     
     def chat_completions_create(self, **kwargs):
         """Create chat completions with retries and rate limiting."""
-        for attempt in range(self.max_retries + 1):
+        max_retries = kwargs.pop('max_retries', self.max_retries)
+        for attempt in range(max_retries + 1):
             try:
-                self._wait_if_needed()
-                return self.client.chat.completions.create(**kwargs)
+                model = kwargs.get('model', OPENAI_MODEL)
+                prompt_text = " ".join(str(m.get('content', '')) for m in kwargs.get('messages', []))
+                tokens = estimate_tokens(prompt_text) + (kwargs.get('max_tokens') or 1000)
+                with get_rate_limiter('openai', model).slot(tokens=tokens):
+                    return self.client.chat.completions.create(**kwargs)
             except Exception as e:
-                if "rate_limit" in str(e).lower() and attempt < self.max_retries:
+                if "rate_limit" in str(e).lower() and attempt < max_retries:
                     # Rate limit error - implement exponential backoff
                     sleep_time = (2 ** attempt) + random.random()
                     if DEBUG_MODE:
                         print(f"Rate limited on attempt {attempt+1}. Retrying in {sleep_time:.2f}s")
                     time.sleep(sleep_time)
                     continue
-                elif attempt < self.max_retries:
+                elif attempt < max_retries:
                     # Other error - retry with shorter backoff
                     sleep_time = (attempt + 1) + random.random()
                     if DEBUG_MODE:
@@ -143,29 +111,7 @@ client = EnhancedOpenAIClient() if AI_PROVIDER == 'openai' else None
 
 def setup_embedding_cache():
     """Initialize the SQLite-based embedding cache."""
-    # Create database if it doesn't exist
-    conn = sqlite3.connect(EMBEDDING_CACHE_PATH)
-    cursor = conn.cursor()
-    
-    # Create table if it doesn't exist
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS embeddings (
-        text_hash TEXT PRIMARY KEY,
-        text TEXT,
-        embedding BLOB,
-        last_used TIMESTAMP
-    )
-    ''')
-    
-    # Create index for performance
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)')
-    
-    # Check existing entries count
-    cursor.execute('SELECT COUNT(*) FROM embeddings')
-    count = cursor.fetchone()[0]
-    
-    conn.commit()
-    conn.close()
+    count = len(get_embedding_cache())
     
     # Only log if there are actually entries (to avoid confusion)
     if count > 0:
@@ -190,56 +136,9 @@ def get_cached_embedding(text):
     if not text or not isinstance(text, str) or len(text.strip()) < MIN_TASK_LENGTH:
         return None
 
-    text_hash = md5(text.encode()).hexdigest()
-    
-    # Connect to SQLite
-    conn = sqlite3.connect(EMBEDDING_CACHE_PATH)
-    cursor = conn.cursor()
-    
-    # Look for cache hit
-    cursor.execute('SELECT embedding FROM embeddings WHERE text_hash = ?', (text_hash,))
-    result = cursor.fetchone()
-    
-    if result:
-        # Update last_used timestamp
-        cursor.execute('UPDATE embeddings SET last_used = ? WHERE text_hash = ?', 
-                      (datetime.now().isoformat(), text_hash))
-        conn.commit()
-        embedding = pickle.loads(result[0])
-        conn.close()
-        return embedding
-
-    # Cache miss - get from OpenAI
     try:
-        response = client.embeddings_create(
-            text=text
-        )
-        embedding = response
-        
-        # Store in cache
-        cursor.execute(
-            'INSERT INTO embeddings (text_hash, text, embedding, last_used) VALUES (?, ?, ?, ?)',
-            (text_hash, text, pickle.dumps(embedding), datetime.now().isoformat())
-        )
-        
-        # Check if cache size is too large and prune if needed
-        cursor.execute('SELECT COUNT(*) FROM embeddings')
-        count = cursor.fetchone()[0]
-        
-        if count > MAX_CACHE_ENTRIES:
-            # Delete oldest entries
-            prune_count = count - MAX_CACHE_ENTRIES
-            cursor.execute(
-                'DELETE FROM embeddings WHERE text_hash IN (SELECT text_hash FROM embeddings ORDER BY last_used ASC LIMIT ?)',
-                (prune_count,)
-            )
-            debug_print(f"Pruned {prune_count} entries from embedding cache")
-        
-        conn.commit()
-        conn.close()
-        return embedding
+        return get_embedding_cache().get_or_embed([text], get_embedding_backend())[text].tolist()
     except Exception as e:
-        conn.close()
         debug_print(f"Error getting embedding: {e}")
         return None
 
@@ -262,95 +161,18 @@ def get_batch_embeddings(texts, force_refresh=False):
     if not valid_texts:
         return {}
         
-    # Use sets to remove duplicates - this reduces API calls
-    unique_texts = list(set(valid_texts))
+    # Duplicates are looked up and embedded once
+    unique_texts = list(dict.fromkeys(valid_texts))
     print(f"Processing {len(unique_texts)} unique texts out of {len(valid_texts)} total")
 
-    # Create lookup dictionaries
-    hash_lookup = {md5(t.encode()).hexdigest(): t for t in unique_texts}
-    embeddings = {}
-    texts_to_request = []
-    text_hashes_to_request = []
-
-    # Connect to SQLite
-    conn = sqlite3.connect(EMBEDDING_CACHE_PATH)
-    cursor = conn.cursor()
-    
-    # If force refresh, skip cache lookup
-    if not force_refresh:
-        # Check cache first for all texts
-        for text_hash, text in hash_lookup.items():
-            cursor.execute('SELECT embedding FROM embeddings WHERE text_hash = ?', (text_hash,))
-            result = cursor.fetchone()
-            
-            if result:
-                # Update last_used timestamp
-                cursor.execute('UPDATE embeddings SET last_used = ? WHERE text_hash = ?', 
-                            (datetime.now().isoformat(), text_hash))
-                embeddings[text_hash] = pickle.loads(result[0])
-            else:
-                texts_to_request.append(text)
-                text_hashes_to_request.append(text_hash)
-    else:
-        # Skip cache for all texts if force_refresh
-        texts_to_request = list(unique_texts)
-        text_hashes_to_request = list(hash_lookup.keys())
-    
-    conn.commit()
-
-    # Only call API if we have texts not in cache
-    if texts_to_request:
-        try:
-            # OPTIMIZATION: Use larger batch size to reduce number of API calls
-            batch_size = 1000  # Increased from 100 (adjust based on API limits)
-            
-            for i in range(0, len(texts_to_request), batch_size):
-                batch = texts_to_request[i:i+batch_size]
-                batch_hashes = text_hashes_to_request[i:i+batch_size]
-
-                print(f"Processing batch {i//batch_size + 1} with {len(batch)} texts")
-                batch_embeddings = client.embeddings_create_batch(batch)
-
-                # Store new embeddings in cache and results
-                for j, embedding in enumerate(batch_embeddings):
-                    text_hash = batch_hashes[j]
-                    text = batch[j]
-                    
-                    cursor.execute(
-                        'INSERT OR REPLACE INTO embeddings (text_hash, text, embedding, last_used) VALUES (?, ?, ?, ?)',
-                        (text_hash, text, pickle.dumps(embedding), datetime.now().isoformat())
-                    )
-                    
-                    embeddings[text_hash] = embedding
-            
-            # Check if cache size is too large and prune if needed
-            cursor.execute('SELECT COUNT(*) FROM embeddings')
-            count = cursor.fetchone()[0]
-            
-            if count > MAX_CACHE_ENTRIES:
-                # Delete oldest entries
-                prune_count = count - MAX_CACHE_ENTRIES
-                cursor.execute(
-                    'DELETE FROM embeddings WHERE text_hash IN (SELECT text_hash FROM embeddings ORDER BY last_used ASC LIMIT ?)',
-                    (prune_count,)
-                )
-                debug_print(f"Pruned {prune_count} entries from embedding cache")
-            
-            conn.commit()
-        except Exception as e:
-            debug_print(f"Error in batch embeddings: {e}")
-    
-    conn.close()
-
-    # Reconstruct the result mapping to include all original texts
-    # This handles any duplicates in the original list
-    result = {}
-    for text in valid_texts:
-        text_hash = md5(text.encode()).hexdigest()
-        if text_hash in embeddings:
-            result[text] = embeddings[text_hash]
+    try:
+        # One batched cache lookup, one backend call for all misses
+        found = get_embedding_cache().get_or_embed(unique_texts, get_embedding_backend(), force_refresh=force_refresh)
+    except Exception as e:
+        debug_print(f"Error in batch embeddings: {e}")
+        return {}
     
-    return result
+    return {text: vector.tolist() for text, vector in found.items()}
 
 def get_coaching_insight(person_name, tasks, recent_tasks, peer_feedback):
     """Generate coaching insights using OpenAI with optimized prompting."""
@@ -476,17 +298,18 @@ def get_project_insight(selected_category, filtered_tasks):
         return f"⚠️ Unable to generate AI insight: {e}"
 
 # Utility function to combine multiple API calls
-def batch_api_requests(prompts, model=CHAT_MODEL, temperature=0.4):
+def batch_api_requests(prompts, model=CHAT_MODEL, temperature=0.4, max_concurrency=LLM_BATCH_MAX_CONCURRENCY):
     """
-    Batch multiple prompts into fewer API calls.
+    Process multiple prompts concurrently within the shared rate limits.
     
     Args:
         prompts: List of prompt strings or prompt dicts
         model: Model to use
         temperature: Temperature setting
+        max_concurrency: Prompts in flight at once
         
     Returns:
-        List of response strings
+        List of response strings, in prompt order ("Error: ..." for prompts that failed)
     """
     if not prompts:
         return []
@@ -499,27 +322,14 @@ def batch_api_requests(prompts, model=CHAT_MODEL, temperature=0.4):
         else:
             messages_list.append(prompt)
     
-    results = []
-    
-    # Process in batches of 5 to avoid overwhelming the API
-    batch_size = 5
-    for i in range(0, len(messages_list), batch_size):
-        batch = messages_list[i:i+batch_size]
-        batch_results = []
-        
-        # Process batch in parallel (API will automatically rate limit)
-        for messages in batch:
-            try:
-                response = client.chat_completions_create(
-                    model=model,
-                    messages=messages,
-                    temperature=temperature
-                )
-                batch_results.append(response.choices[0].message.content)
-            except Exception as e:
-                debug_print(f"Error in batch API request: {e}")
-                batch_results.append(f"Error: {str(e)}")
-                
-        results.extend(batch_results)
+    def ask(messages):
+        # run_prompt_batch retries each prompt with jittered backoff
+        response = client.chat_completions_create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_retries=0
+        )
+        return response.choices[0].message.content
     
-    return results
\ No newline at end of file
+    return run_prompt_batch(ask, messages_list, max_concurrency=max_concurrency)
@@ -3,11 +3,114 @@ JWT utilities for authentication system.
 """
 import jwt
 import os
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from functools import wraps
 from flask import request, jsonify, current_app, redirect, url_for
 
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+# Version 2 tokens carry the profile claims require_auth needs (task database, name)
+CLAIMS_VERSION = 2
+
+
+def current_epoch() -> int:
+    """Authentication epoch stamped into new tokens (milliseconds since the Unix epoch)."""
+    return int(time.time() * 1000)
+
+
+class TokenRevocations:
+    """
+    Users whose earlier tokens must not be trusted.
+    
+    Revoking a user records the current epoch; tokens whose authentication
+    epoch is not newer no longer have their claims trusted, and require_auth
+    falls back to looking the user up (which also catches deactivation).
+    
+    With a Redis client the epochs live in a shared hash, loaded at startup and
+    re-read at most every refresh_seconds, so revocations reach every worker
+    and survive restarts. Without one they are held per process only.
+    """
+    
+    REDIS_KEY = "token_revocations"
+    
+    def __init__(self, redis_client=None, refresh_seconds: float = 5):
+        self.redis_client = redis_client
+        self.refresh_seconds = refresh_seconds
+        self._revoked_at: Dict[str, int] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+    
+    def revoke(self, user_id: str):
+        """Distrust every token issued to the user up to now."""
+        revoked_at = current_epoch()
+        with self._lock:
+            self._revoked_at[user_id] = revoked_at
+        if self.redis_client is not None:
+            try:
+                # No expiry: refreshed tokens keep their epoch, so the entry must outlive them
+                self.redis_client.hset(self.REDIS_KEY, user_id, revoked_at)
+            except Exception as e:
+                logger.warning(f"Token revocation write error: {e}")
+    
+    def is_revoked(self, user_id: str, epoch: Optional[int]) -> bool:
+        """Whether a token with this authentication epoch was issued before the user's revocation."""
+        if self.redis_client is not None and time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            self.load()
+        revoked_at = self._revoked_at.get(user_id)
+        if revoked_at is None:
+            return False
+        return epoch is None or epoch <= revoked_at
+    
+    def load(self):
+        """Merge the shared revocation epochs into this process's copy."""
+        if self.redis_client is None:
+            return
+        self._loaded_at = time.monotonic()
+        try:
+            shared = self.redis_client.hgetall(self.REDIS_KEY)
+        except Exception as e:
+            logger.warning(f"Token revocation read error: {e}")
+            return
+        with self._lock:
+            for user_id, revoked_at in shared.items():
+                revoked_at = int(revoked_at)
+                if revoked_at > self._revoked_at.get(user_id, 0):
+                    self._revoked_at[user_id] = revoked_at
+    
+    def clear(self):
+        """Forget this process's copy (the shared hash is left alone)."""
+        with self._lock:
+            self._revoked_at.clear()
+            self._loaded_at = 0.0
+
+
+# Global token revocation instance
+_token_revocations = None
+_token_revocations_lock = threading.Lock()
+
+
+def get_token_revocations() -> TokenRevocations:
+    """Get the process-wide token revocations, sharing the user directory's Redis when it has one."""
+    global _token_revocations
+    if _token_revocations is None:
+        with _token_revocations_lock:
+            if _token_revocations is None:
+                from src.config.settings import TOKEN_REVOCATION_REFRESH_SECONDS
+                from src.core.user_directory import get_user_directory
+                revocations = TokenRevocations(
+                    redis_client=get_user_directory().redis_client,
+                    refresh_seconds=TOKEN_REVOCATION_REFRESH_SECONDS
+                )
+                revocations.load()
+                _token_revocations = revocations
+    return _token_revocations
+
 
 class JWTManager:
     """Manages JWT token operations."""
@@ -25,15 +128,23 @@ class JWTManager:
             raise ValueError("JWT_SECRET_KEY environment variable must be set")
         self.algorithm = algorithm
     
-    def generate_token(self, user_id: str, role: str, email: str, expires_in: int = 86400) -> str:
+    def generate_token(self, user_id: str, role: str, email: str, expires_in: int = 86400,
+                       task_database_id: Optional[str] = None, full_name: Optional[str] = None,
+                       epoch: Optional[int] = None) -> str:
         """
         Generate a JWT token for a user.
         
+        When profile claims (task database ID, full name) are given, the token is
+        a versioned claims token that require_auth can trust without a user lookup.
+        
         Args:
             user_id: The user's internal ID (UUID).
             role: The user's role.
             email: The user's email address.
             expires_in: Token expiration time in seconds (default: 24 hours).
+            task_database_id: The user's Notion task database ID claim.
+            full_name: The user's display name claim.
+            epoch: Authentication epoch (default: now); kept across refreshes.
             
         Returns:
             str: The JWT token.
@@ -46,6 +157,14 @@ class JWTManager:
             'iat': datetime.utcnow()
         }
         
+        if task_database_id is not None or full_name is not None:
+            payload.update({
+                'ver': CLAIMS_VERSION,
+                'task_database_id': task_database_id,
+                'full_name': full_name,
+                'epoch': epoch if epoch is not None else current_epoch()
+            })
+        
         return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
     
     def decode_token(self, token: str) -> Dict[str, Any]:
@@ -89,7 +208,15 @@ class JWTManager:
             payload.pop('exp', None)
             payload.pop('iat', None)
             
-            # Generate new token
+            # Generate new token; claims and the authentication epoch carry over, so
+            # refreshing never escapes a revocation
+            if payload.get('ver') == CLAIMS_VERSION:
+                return self.generate_token(
+                    payload['user_id'], payload['role'], payload['email'], expires_in,
+                    task_database_id=payload.get('task_database_id'),
+                    full_name=payload.get('full_name'),
+                    epoch=payload.get('epoch')
+                )
             return self.generate_token(payload['user_id'], payload['role'], payload['email'], expires_in)
             
         except jwt.InvalidTokenError:
@@ -104,6 +231,10 @@ def require_auth(f):
     - For browser requests (HTML), it redirects to the login page.
     - For API requests (JSON), it returns a 401 error.
     
+    Claims tokens (version 2) are trusted as decoded. Older tokens, and tokens
+    of users revoked since they were issued, fall back to a user lookup; a
+    revoked user that is missing or inactive is rejected.
+    
     Args:
         f: The Flask route function to protect.
         
@@ -139,15 +270,9 @@ def require_auth(f):
             # Get JWT manager from app context
             jwt_manager = current_app.jwt_manager
             
-            # Debug: Print token and secret key
-            print(f"Token: {token[:20]}...")
-            print(f"JWT Manager Secret: {jwt_manager.secret_key[:8]}..." if jwt_manager.secret_key else "Not found")
-            
             # Decode and validate the token
             payload = jwt_manager.decode_token(token)
             
-            print(f"Token payload: {payload}")
-            
             # Add user info to request context
             request.user_id = payload['user_id']
             request.user_role = payload['role']
@@ -160,15 +285,26 @@ def require_auth(f):
                 'email': payload.get('email')
             }
             
+            revoked = get_token_revocations().is_revoked(payload['user_id'], payload.get('epoch'))
+            if payload.get('ver') == CLAIMS_VERSION and not revoked:
+                # Decode-only hot path: the profile is in the signed claims
+                current_user['task_database_id'] = payload.get('task_database_id')
+                current_user['full_name'] = payload.get('full_name')
+                return f(current_user, *args, **kwargs)
+            
             # Get user's task database ID from auth service
             try:
                 auth_service = current_app.auth_service
                 user = auth_service.get_user_by_id(payload['user_id'])
+                if revoked and (not user or not user.is_active):
+                    return handle_unauthenticated()
                 if user and hasattr(user, 'task_database_id'):
                     current_user['task_database_id'] = user.task_database_id
                 if user and hasattr(user, 'full_name'):
                     current_user['full_name'] = user.full_name
             except Exception as e:
+                if revoked:
+                    raise
                 print(f"Warning: Could not fetch user details: {e}")
             
             return f(current_user, *args, **kwargs)
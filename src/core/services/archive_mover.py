@@ -0,0 +1,264 @@
+"""
+Chunked, resumable hot -> cold storage mover for the email archive.
+
+Each batch is its own short transaction: lock up to N eligible hot rows
+(SKIP LOCKED, so ingestion writing new hot rows is never waited on), copy
+them with INSERT ... SELECT ... RETURNING, delete them from hot storage,
+adjust the storage statistics by the batch's deltas and advance the
+checkpoint. A run stops when nothing is left, when its time budget is spent,
+or when another run holds the job lock; the next run resumes from the
+checkpoint.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, func, literal, select, text, tuple_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from src.config.settings import (
+    HOT_STORAGE_DAYS,
+    ARCHIVE_MOVE_BATCH_SIZE,
+    ARCHIVE_MOVE_MAX_ROWS_PER_SECOND,
+    ARCHIVE_MOVE_MAX_SECONDS
+)
+from src.core.models.email_archive import HotEmail, ColdEmail, StorageStats, MaintenanceCheckpoint
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+JOB_NAME = 'move_to_cold_storage'
+
+# pg_try_advisory_lock key so only one mover runs at a time
+_ADVISORY_LOCK_KEY = 0x636F6C64  # 'cold'
+
+
+def cold_copy_columns() -> List[str]:
+    """Columns copied from hot to cold rows (cold-only and generated columns excluded)."""
+    hot_columns = {column.key for column in HotEmail.__table__.columns if column.computed is None}
+    return [
+        column.key for column in ColdEmail.__table__.columns
+        if column.computed is None and column.key in hot_columns
+    ]
+
+
+def copy_to_cold_statement(ids: List[Any]):
+    """INSERT ... SELECT ... RETURNING copying the given hot rows into cold storage."""
+    hot = HotEmail.__table__
+    cold = ColdEmail.__table__
+    columns = cold_copy_columns()
+    return (
+        pg_insert(cold)
+        .from_select(
+            columns + ['archived_date'],
+            select(*[hot.c[name] for name in columns], func.now()).where(hot.c.id.in_(ids))
+        )
+        .on_conflict_do_nothing(index_elements=['message_id'])
+        .returning(cold.c.id, cold.c.email_size_bytes, cold.c.received_date)
+    )
+
+
+class ColdStorageMover:
+    """Moves emails older than the hot-storage window to cold storage in batches."""
+
+    def __init__(self,
+                 engine: Engine,
+                 session_factory,
+                 batch_size: int = ARCHIVE_MOVE_BATCH_SIZE,
+                 max_rows_per_second: float = ARCHIVE_MOVE_MAX_ROWS_PER_SECOND,
+                 max_seconds: Optional[float] = ARCHIVE_MOVE_MAX_SECONDS):
+        """
+        Initialize the mover.
+
+        Args:
+            engine: Engine of the archive database (used for the job lock)
+            session_factory: Callable returning a new database session
+            batch_size: Rows moved per transaction
+            max_rows_per_second: Throttle; sleeps between batches to stay under it (0 disables)
+            max_seconds: Time budget for one run (None for no limit)
+        """
+        self.engine = engine
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_rows_per_second = max_rows_per_second
+        self.max_seconds = max_seconds
+
+    def run(self, days_threshold: int = HOT_STORAGE_DAYS) -> Dict[str, Any]:
+        """
+        Move eligible emails until none are left or the time budget is spent.
+
+        Args:
+            days_threshold: Emails received more than this many days ago are moved
+
+        Returns:
+            Dict: Run metrics (rows_moved, batches, rows_per_second, lag_seconds, ...)
+        """
+        started = time.monotonic()
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days_threshold)
+        metrics = {
+            'job_name': JOB_NAME,
+            'cutoff': cutoff.isoformat(),
+            'rows_moved': 0,
+            'rows_already_cold': 0,
+            'batches': 0,
+            'completed': False,
+            'skipped': False,
+        }
+
+        # Session-level lock on an autocommit connection: held for the run without an open transaction
+        with self.engine.connect() as lock_conn:
+            lock_conn = lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+            if not self._try_lock(lock_conn):
+                logger.info("Cold storage move already running elsewhere; skipping")
+                metrics['skipped'] = True
+                return metrics
+            try:
+                while True:
+                    if self.max_seconds is not None and time.monotonic() - started >= self.max_seconds:
+                        break
+                    batch_started = time.monotonic()
+                    selected, inserted = self._move_batch(cutoff)
+                    if selected == 0:
+                        metrics['completed'] = True
+                        break
+                    metrics['batches'] += 1
+                    metrics['rows_moved'] += inserted
+                    metrics['rows_already_cold'] += selected - inserted
+                    self._throttle(selected, time.monotonic() - batch_started)
+            finally:
+                self._unlock(lock_conn)
+
+        elapsed = time.monotonic() - started
+        metrics['elapsed_seconds'] = round(elapsed, 3)
+        metrics['rows_per_second'] = round(metrics['rows_moved'] / elapsed, 1) if elapsed > 0 else 0.0
+        metrics['lag_seconds'] = self._lag_seconds(cutoff)
+        self._finish(metrics)
+
+        logger.info(
+            f"Cold storage move: {metrics['rows_moved']} rows in {metrics['batches']} batches "
+            f"({metrics['rows_per_second']} rows/s, lag {metrics['lag_seconds']}s, "
+            f"{'complete' if metrics['completed'] else 'will resume'})"
+        )
+        return metrics
+
+    def _try_lock(self, conn) -> bool:
+        if conn.dialect.name != 'postgresql':
+            return True
+        return bool(conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}).scalar())
+
+    def _unlock(self, conn):
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+
+    def _throttle(self, rows: int, batch_seconds: float):
+        """Sleep long enough to keep the move rate under max_rows_per_second."""
+        if not self.max_rows_per_second or self.max_rows_per_second <= 0:
+            return
+        pause = rows / self.max_rows_per_second - batch_seconds
+        if pause > 0:
+            time.sleep(pause)
+
+    def _move_batch(self, cutoff: datetime) -> tuple:
+        """
+        Move one batch in its own transaction.
+
+        Returns:
+            tuple: (rows taken from hot storage, rows inserted into cold storage)
+        """
+        hot = HotEmail.__table__
+
+        with self.session_factory() as session:
+            checkpoint = self._get_checkpoint(session)
+
+            # Lock the next eligible rows in received_date order, after the checkpoint
+            eligible = select(hot.c.id, hot.c.received_date).where(hot.c.received_date < cutoff)
+            if checkpoint.last_received_date is not None and checkpoint.last_email_id is not None:
+                eligible = eligible.where(
+                    tuple_(hot.c.received_date, hot.c.id) > tuple_(
+                        literal(checkpoint.last_received_date, hot.c.received_date.type),
+                        literal(checkpoint.last_email_id, hot.c.id.type)
+                    )
+                )
+            eligible = (
+                eligible.order_by(hot.c.received_date, hot.c.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            batch = session.execute(eligible).all()
+            if not batch:
+                # Nothing left after the checkpoint; start the next pass from the beginning
+                checkpoint.last_received_date = None
+                checkpoint.last_email_id = None
+                session.commit()
+                return 0, 0
+            ids = [row.id for row in batch]
+
+            # Copy to cold storage; a message already archived there is not copied again
+            inserted = [dict(row._mapping) for row in session.execute(copy_to_cold_statement(ids))]
+
+            removed = [
+                dict(row._mapping) for row in session.execute(
+                    delete(hot).where(hot.c.id.in_(ids))
+                    .returning(hot.c.id, hot.c.email_size_bytes, hot.c.received_date)
+                )
+            ]
+
+            self._apply_move_to_stats(session, removed, inserted)
+
+            last = batch[-1]
+            checkpoint.last_received_date = last.received_date
+            checkpoint.last_email_id = last.id
+            checkpoint.rows_processed = (checkpoint.rows_processed or 0) + len(inserted)
+            session.commit()
+            return len(batch), len(inserted)
+
+    def _apply_move_to_stats(self, session: Session, removed: List[Dict[str, Any]], inserted: List[Dict[str, Any]]):
+        """Shift counts and sizes from hot to cold (date ranges are corrected by the periodic refresh)."""
+        for storage_type, rows, sign in (('hot', removed, -1), ('cold', inserted, 1)):
+            if not rows:
+                continue
+            size = sum(row.get('email_size_bytes') or 0 for row in rows)
+            session.execute(
+                update(StorageStats)
+                .where(StorageStats.storage_type == storage_type)
+                .values(
+                    total_emails=func.coalesce(StorageStats.total_emails, 0) + sign * len(rows),
+                    total_size_bytes=func.coalesce(StorageStats.total_size_bytes, 0) + sign * size,
+                    last_updated=datetime.now()
+                )
+            )
+
+    def _get_checkpoint(self, session: Session) -> MaintenanceCheckpoint:
+        checkpoint = session.get(MaintenanceCheckpoint, JOB_NAME, with_for_update=True)
+        if checkpoint is None:
+            checkpoint = MaintenanceCheckpoint(job_name=JOB_NAME, rows_processed=0)
+            session.add(checkpoint)
+            session.flush()
+        return checkpoint
+
+    def _lag_seconds(self, cutoff: datetime) -> float:
+        """How far behind the mover is: age past the cutoff of the oldest hot email still eligible."""
+        with self.session_factory() as session:
+            oldest = session.execute(
+                select(func.min(HotEmail.received_date)).where(HotEmail.received_date < cutoff)
+            ).scalar()
+        if oldest is None:
+            return 0.0
+        if oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        return round((cutoff - oldest).total_seconds(), 1)
+
+    def _finish(self, metrics: Dict[str, Any]):
+        """Record the run's metrics on the checkpoint row."""
+        with self.session_factory() as session:
+            checkpoint = self._get_checkpoint(session)
+            checkpoint.last_run_metrics = dict(metrics, finished_at=datetime.now(timezone.utc).isoformat())
+            session.commit()
+
+    def get_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Return the stored checkpoint and last-run metrics, if any."""
+        with self.session_factory() as session:
+            checkpoint = session.get(MaintenanceCheckpoint, JOB_NAME)
+            return checkpoint.to_dict() if checkpoint else None
@@ -8,8 +8,9 @@ from typing import Optional, List, Dict, Any
 from notion_client import Client
 
 from src.core.models.user import User
-from src.core.security.jwt_utils import JWTManager
+from src.core.security.jwt_utils import JWTManager, get_token_revocations
 from src.core.services.user_task_service import UserTaskService
+from src.core.user_directory import MISS, get_user_directory
 
 
 class AuthService:
@@ -30,6 +31,7 @@ class AuthService:
         self.jwt_manager = jwt_manager
         self.parent_page_id = parent_page_id
         self.user_task_service = UserTaskService(notion_token)
+        self.user_directory = get_user_directory()
     
     def _hash_password(self, password: str) -> str:
         """
@@ -443,6 +445,8 @@ class AuthService:
         
         # Create user in Notion
         self._create_user_page(user)
+        # The email may be cached as an unknown sender
+        self.user_directory.invalidate(user_id=user.user_id, email=user.email)
         
         # Create task database for the user if parent page is configured
         if self.parent_page_id:
@@ -454,6 +458,7 @@ class AuthService:
                 user_page = self._get_notion_page_by_email(email)
                 if user_page:
                     self._update_user_page(user_page['id'], {"task_database_id": task_database_id})
+                    self.user_directory.invalidate(user_id=user.user_id, email=email)
                     
             except Exception as e:
                 print(f"Warning: Failed to create task database for user {email}: {str(e)}")
@@ -492,8 +497,12 @@ class AuthService:
                 user.last_login = datetime.utcnow()
                 self._update_user_page(page['id'], {"last_login": user.last_login})
             
-            # Generate JWT token
-            token = self.jwt_manager.generate_token(user.user_id, user.role, user.email)
+            # Generate JWT token carrying the profile claims require_auth needs
+            token = self.jwt_manager.generate_token(
+                user.user_id, user.role, user.email,
+                task_database_id=user.task_database_id or "",
+                full_name=user.full_name
+            )
             
             return token
             
@@ -503,7 +512,9 @@ class AuthService:
     
     def get_user_by_id(self, user_id: str) -> Optional[User]:
         """
-        Get a user by their internal ID (UUID).
+        Get a user by their internal ID (UUID), from the user directory when cached.
+        
+        The returned user never carries a password hash.
         
         Args:
             user_id: The user's internal ID.
@@ -511,11 +522,19 @@ class AuthService:
         Returns:
             Optional[User]: User object if found, None otherwise.
         """
-        return self._get_user_by_id(user_id)
+        cached = self.user_directory.get_by_id(user_id)
+        if cached is not MISS:
+            return cached
+        user = self._get_user_by_id(user_id)
+        self._remember(user, user_id=user_id)
+        return self._without_password(user)
     
     def get_user_by_email(self, email: str) -> Optional[User]:
         """
-        Get a user by their email address.
+        Get a user by their email address, from the user directory when cached.
+        
+        Unknown emails are cached briefly as well, so repeated mail from an
+        unregistered sender does not query Notion every time.
         
         Args:
             email: The user's email address.
@@ -523,7 +542,12 @@ class AuthService:
         Returns:
             Optional[User]: User object if found, None otherwise.
         """
-        return self._get_user_by_email(email)
+        cached = self.user_directory.get_by_email(email)
+        if cached is not MISS:
+            return cached
+        user = self._get_user_by_email(email)
+        self._remember(user, email=email)
+        return self._without_password(user)
     
     def get_all_users(self) -> List[User]:
         """
@@ -534,6 +558,47 @@ class AuthService:
         """
         return self._get_all_users()
     
+    def preload_user_directory(self) -> int:
+        """
+        Load every user into the user directory (one Notion query).
+        
+        Returns:
+            int: Number of users cached
+        """
+        try:
+            return self.user_directory.preload(self._get_all_users())
+        except Exception as e:
+            print(f"Warning: Could not preload user directory: {str(e)}")
+            return 0
+    
+    def invalidate_user(self, user_id: str, email: Optional[str] = None):
+        """
+        Forget cached copies of a user after their Notion record changed.
+        
+        Drops the user from the user directory and revokes the claims in tokens
+        issued so far, so require_auth looks the user up again.
+        
+        Args:
+            user_id: The user's internal ID (UUID).
+            email: The user's email address, if known.
+        """
+        get_token_revocations().revoke(user_id)
+        self.user_directory.invalidate(user_id=user_id, email=email)
+    
+    def _remember(self, user: Optional[User], user_id: Optional[str] = None, email: Optional[str] = None):
+        """Cache a lookup result, including "not found"."""
+        if user is not None:
+            self.user_directory.set_user(user)
+        else:
+            self.user_directory.set_missing(user_id=user_id, email=email)
+    
+    @staticmethod
+    def _without_password(user: Optional[User]) -> Optional[User]:
+        """Strip the password hash so cached and uncached lookups return the same shape."""
+        if user is not None:
+            user.password_hash = ""
+        return user
+    
     def update_user(self, user_id: str, updates: Dict[str, Any]) -> Optional[User]:
         """
         Update a user's information.
@@ -556,19 +621,14 @@ class AuthService:
                     raise ValueError("Password must be at least 8 characters long")
                 updates["password_hash"] = self._hash_password(updates.pop("password"))
             
-            # Update user object
-            for key, value in updates.items():
-                if hasattr(user, key):
-                    setattr(user, key, value)
-            
-            user.updated_at = datetime.utcnow()
-            updates['updated_at'] = user.updated_at
+            updates['updated_at'] = datetime.utcnow()
             
             # Update in Notion
             self._update_user_page(user_page['id'], updates)
+            self.invalidate_user(user_id, self._extract_title(user_page['properties'].get('Email', {})))
 
             # Re-fetch user to get the updated object
-            return self._get_user_by_id(user_id)
+            return self.get_user_by_id(user_id)
             
         except Exception as e:
             print(f"Update user error: {str(e)}")
@@ -595,6 +655,7 @@ class AuthService:
             }
             
             self._update_user_page(user_page['id'], updates)
+            self.invalidate_user(user_id, self._extract_title(user_page['properties'].get('Email', {})))
             
             return True
             
@@ -616,7 +677,7 @@ class AuthService:
             payload = self.jwt_manager.decode_token(token)
             
             # Check if user still exists and is active
-            user = self._get_user_by_id(payload['user_id'])
+            user = self.get_user_by_id(payload['user_id'])
             if not user or not user.is_active:
                 return None
             
@@ -0,0 +1,315 @@
+"""
+Content-addressed store for full email bodies.
+
+Bodies are keyed by the SHA-256 of their text and written once to
+bodies/<aa>/<bb>/<hash> under the storage root, so forwarded copies and
+repeated reply chains share one file and no directory grows without bound.
+Files are gzip by default, or zstd (optionally with a dictionary trained on
+our own mail) when the zstandard package is installed. The codec is read
+from each file's magic bytes, so both codecs and the legacy
+emails/<id>.txt.gz files can be read side by side.
+
+The store only manages files; reference counts live in the
+email_archive.body_blobs table and are maintained by EmailArchiveService.
+"""
+import gzip
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.config.settings import (
+    EMAIL_BODY_COMPRESSION,
+    EMAIL_BODY_ZSTD_LEVEL,
+    EMAIL_BODY_MMAP_THRESHOLD_BYTES
+)
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Parallel file reads/writes in batch calls
+_IO_WORKERS = 8
+
+
+def body_hash(body_text: str) -> str:
+    """SHA-256 of a body's UTF-8 text."""
+    return hashlib.sha256(body_text.encode('utf-8')).hexdigest()
+
+
+def body_key(digest: str) -> str:
+    """Storage key for a body hash, sharded two levels deep."""
+    return f"bodies/{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def _load_zstd():
+    """Return the zstandard module, or None when it is not installed."""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+class ContentAddressedBodyStore:
+    """Deduplicated, compressed, sharded file store for email bodies."""
+
+    def __init__(self,
+                 root: str,
+                 compression: str = EMAIL_BODY_COMPRESSION,
+                 zstd_level: int = EMAIL_BODY_ZSTD_LEVEL,
+                 mmap_threshold: int = EMAIL_BODY_MMAP_THRESHOLD_BYTES):
+        """
+        Initialize the store.
+
+        Args:
+            root: Storage root (the archive's EMAIL_STORAGE_PATH)
+            compression: 'gzip' or 'zstd' for new bodies (zstd falls back to gzip if not installed)
+            zstd_level: zstd compression level
+            mmap_threshold: Files at least this large are read through mmap
+        """
+        self.root = root
+        self.mmap_threshold = mmap_threshold
+        self.zstd_level = zstd_level
+        self._zstd = _load_zstd() if compression == 'zstd' else None
+        if compression == 'zstd' and self._zstd is None:
+            logger.warning("zstandard package not installed. Email bodies will be stored with gzip.")
+        self.compression = 'zstd' if self._zstd is not None else 'gzip'
+        self._dictionaries: Dict[int, object] = {}
+        self._lock = threading.Lock()
+        # ZstdCompressor objects must not be shared between threads, so each
+        # thread builds its own from the dictionary current for new writes
+        self._local = threading.local()
+        self._dictionary = self._latest_dictionary() if self._zstd is not None else None
+
+    # ------------------------------------------------------------------ paths
+
+    def path_for(self, storage_key: str) -> str:
+        """Absolute path of a storage key."""
+        return os.path.join(self.root, storage_key)
+
+    def _dictionary_dir(self) -> str:
+        return os.path.join(self.root, 'dictionaries')
+
+    # ------------------------------------------------------------ compression
+
+    def _thread_compressor(self):
+        """This thread's zstd compressor, rebuilt when a new dictionary is trained."""
+        dictionary = self._dictionary
+        local = self._local
+        if getattr(local, 'compressor', None) is None or local.dictionary is not dictionary:
+            # Building a compressor digests the shared dictionary; do that one thread at a time
+            with self._lock:
+                if dictionary is not None:
+                    local.compressor = self._zstd.ZstdCompressor(level=self.zstd_level, dict_data=dictionary)
+                else:
+                    local.compressor = self._zstd.ZstdCompressor(level=self.zstd_level)
+            local.dictionary = dictionary
+        return local.compressor
+
+    def _latest_dictionary(self):
+        directory = self._dictionary_dir()
+        if not os.path.isdir(directory):
+            return None
+        names = sorted(
+            (name for name in os.listdir(directory) if name.endswith('.zdict')),
+            key=lambda name: os.path.getmtime(os.path.join(directory, name))
+        )
+        if not names:
+            return None
+        return self._load_dictionary(int(names[-1].split('.')[0]))
+
+    def _load_dictionary(self, dict_id: int):
+        """Load (and cache) a trained dictionary by its zstd dictionary id."""
+        with self._lock:
+            if dict_id not in self._dictionaries:
+                path = os.path.join(self._dictionary_dir(), f"{dict_id}.zdict")
+                with open(path, 'rb') as f:
+                    self._dictionaries[dict_id] = self._zstd.ZstdCompressionDict(f.read())
+            return self._dictionaries[dict_id]
+
+    def train_dictionary(self, samples: List[str], dict_size: int = 112640) -> Optional[int]:
+        """
+        Train a zstd dictionary on sample bodies and use it for new writes.
+
+        Earlier dictionaries are kept so bodies written with them stay readable.
+
+        Args:
+            samples: Representative email bodies (a few thousand works well)
+            dict_size: Dictionary size in bytes
+
+        Returns:
+            Optional[int]: The new dictionary id, or None if zstd is not in use
+        """
+        if self._zstd is None:
+            logger.warning("zstd compression is not enabled; no dictionary trained")
+            return None
+        dictionary = self._zstd.train_dictionary(dict_size, [s.encode('utf-8') for s in samples if s])
+        dict_id = dictionary.dict_id()
+        os.makedirs(self._dictionary_dir(), exist_ok=True)
+        self._atomic_write(os.path.join(self._dictionary_dir(), f"{dict_id}.zdict"), dictionary.as_bytes())
+        with self._lock:
+            self._dictionaries[dict_id] = dictionary
+        self._dictionary = dictionary
+        logger.info(f"Trained zstd dictionary {dict_id} on {len(samples)} bodies")
+        return dict_id
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == 'zstd':
+            return self._thread_compressor().compress(data)
+        return gzip.compress(data)
+
+    def _decompress(self, data) -> bytes:
+        head = bytes(data[:4])
+        if head.startswith(GZIP_MAGIC):
+            return gzip.decompress(data)
+        if head == ZSTD_MAGIC:
+            zstd = self._zstd or _load_zstd()
+            if zstd is None:
+                raise RuntimeError("zstandard package is required to read this body")
+            if self._zstd is None:
+                self._zstd = zstd
+            dict_id = zstd.get_frame_parameters(data).dict_id
+            if dict_id:
+                decompressor = zstd.ZstdDecompressor(dict_data=self._load_dictionary(dict_id))
+            else:
+                decompressor = zstd.ZstdDecompressor()
+            return decompressor.decompress(data)
+        raise ValueError("Unknown body encoding")
+
+    # ------------------------------------------------------------ read/write
+
+    def _atomic_write(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def put(self, body_text: str) -> str:
+        """
+        Store a body (once per distinct text) and return its storage key.
+
+        Args:
+            body_text: Full email body text
+
+        Returns:
+            str: Storage key
+        """
+        storage_key = body_key(body_hash(body_text))
+        path = self.path_for(storage_key)
+        if not os.path.exists(path):
+            self._atomic_write(path, self._compress(body_text.encode('utf-8')))
+        return storage_key
+
+    def put_many(self, bodies: List[str]) -> List[str]:
+        """
+        Store several bodies; identical bodies are written once.
+
+        Args:
+            bodies: Full email body texts
+
+        Returns:
+            List[str]: Storage key for each body, in order
+        """
+        if not bodies:
+            return []
+        unique = list(dict.fromkeys(bodies))
+        with ThreadPoolExecutor(max_workers=min(_IO_WORKERS, len(unique))) as pool:
+            keys = dict(zip(unique, pool.map(self.put, unique)))
+        return [keys[body] for body in bodies]
+
+    def get(self, storage_key: str) -> Optional[str]:
+        """
+        Read a body by storage key (legacy emails/<id>.txt.gz keys included).
+
+        Files of at least mmap_threshold bytes are decompressed straight from a
+        memory map instead of being read into a separate buffer first.
+
+        Args:
+            storage_key: Storage key
+
+        Returns:
+            Optional[str]: Body text, or None if the file is missing
+        """
+        path = self.path_for(storage_key)
+        if not os.path.exists(path):
+            logger.warning(f"Email body file not found: {path}")
+            return None
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            if size and size >= self.mmap_threshold:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return self._decompress(mapped).decode('utf-8')
+            return self._decompress(f.read()).decode('utf-8')
+
+    def get_many(self, storage_keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Read several bodies in parallel.
+
+        Args:
+            storage_keys: Storage keys
+
+        Returns:
+            Dict[str, str]: Storage key -> body text for every key that was found
+        """
+        unique = list(dict.fromkeys(key for key in storage_keys if key))
+        if not unique:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(_IO_WORKERS, len(unique))) as pool:
+            bodies = pool.map(self._get_quietly, unique)
+        return {key: body for key, body in zip(unique, bodies) if body is not None}
+
+    def _get_quietly(self, storage_key: str) -> Optional[str]:
+        try:
+            return self.get(storage_key)
+        except Exception as e:
+            logger.error(f"Failed to read email body {storage_key}: {e}")
+            return None
+
+    def iter_keys(self) -> Iterator[Tuple[str, float]]:
+        """
+        Walk the content-addressed files (legacy and temporary files excluded).
+
+        Yields:
+            Tuple[str, float]: Storage key and the file's modification time
+        """
+        bodies_dir = os.path.join(self.root, 'bodies')
+        for directory, _, names in os.walk(bodies_dir):
+            for name in names:
+                if name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    mtime = os.path.getmtime(path)
+                except FileNotFoundError:
+                    continue
+                yield os.path.relpath(path, self.root).replace(os.sep, '/'), mtime
+
+    def delete_many(self, storage_keys: Iterable[str]) -> int:
+        """
+        Remove body files (callers decide, via reference counts, which are unused).
+
+        Returns:
+            int: Number of files removed
+        """
+        removed = 0
+        for storage_key in storage_keys:
+            try:
+                os.unlink(self.path_for(storage_key))
+                removed += 1
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.error(f"Failed to remove email body {storage_key}: {e}")
+        return removed
@@ -3,6 +3,7 @@ Celery configuration for asynchronous task processing.
 """
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 from src.config.settings import DEBUG_MODE
 
 # Celery configuration
@@ -19,7 +20,8 @@ celery_app = Celery(
         'core.tasks.ai_tasks', 
         'core.tasks.email_tasks',
         'core.tasks.dashboard_tasks',
-        'core.tasks.correction_tasks'  # Add correction tasks
+        'core.tasks.correction_tasks',  # Add correction tasks
+        'core.tasks.email_archive_tasks'
     ]
 )
 
@@ -42,6 +44,7 @@ celery_app.conf.update(
         'core.tasks.email_tasks.*': {'queue': 'email'},
         'core.tasks.dashboard_tasks.*': {'queue': 'dashboard'},
         'core.tasks.correction_tasks.*': {'queue': 'corrections'},  # Add correction queue
+        'core.tasks.email_archive_tasks.*': {'queue': 'archive'},  # Maintenance, separate from ingestion
     },
     
     # Task execution settings
@@ -80,4 +83,11 @@ if DEBUG_MODE:
     celery_app.conf.update(
         task_always_eager=False,  # Allow async execution even in debug
         task_eager_propagates=True,
-    ) 
\ No newline at end of file
+    )
+
+
+@worker_process_init.connect
+def _reset_database_pools(**kwargs):
+    """Give each forked worker process its own database connections."""
+    from src.core.database.connection import dispose_engines
+    dispose_engines(close=False)
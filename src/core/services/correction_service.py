@@ -6,14 +6,14 @@ import uuid
 import json
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text
 from sqlalchemy.exc import OperationalError, DisconnectionError
-from sqlalchemy.pool import QueuePool
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
-from src.core.models.correction_models import TaskCorrectionLog, TaskCorrection, Base
+from src.core.models.correction_models import TaskCorrectionLog, TaskCorrection
+from src.core.database.connection import get_engine, get_session_factory
+from src.core.database.migrations import ensure_schema
 from src.core.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -31,24 +31,9 @@ class CorrectionService:
         self._last_health_check = datetime.utcnow()
         self._health_check_interval = timedelta(minutes=5)
         
-        # Enhanced connection pooling configuration for PostgreSQL
-        self.engine = create_engine(
-            self.database_url,
-            poolclass=QueuePool,
-            pool_size=10,  # Number of connections to maintain
-            max_overflow=20,  # Additional connections when pool is full
-            pool_pre_ping=True,  # Test connections before use
-            pool_recycle=3600,  # Recycle connections every hour
-            pool_timeout=30,  # Timeout for getting connection from pool
-            echo=False  # Set to True for SQL debugging
-        )
-        
-        # Create session factory with retry logic
-        self.SessionLocal = sessionmaker(
-            bind=self.engine,
-            autocommit=False,
-            autoflush=False
-        )
+        # Pooled engine shared process-wide (sizing from DB_POOL_* settings)
+        self.engine = get_engine(self.database_url)
+        self.SessionLocal = get_session_factory(self.database_url)
         
         # Initialize database tables with retry
         self._initialize_database_with_retry()
@@ -56,11 +41,10 @@ class CorrectionService:
         logger.info("✅ PostgreSQL correction service initialized successfully")
     
     def _initialize_database_with_retry(self, max_retries=3):
-        """Initialize database tables with retry logic."""
+        """Run the schema check (a no-op unless DB_AUTO_MIGRATE) with retry logic."""
         for attempt in range(max_retries):
             try:
-                Base.metadata.create_all(bind=self.engine)
-                logger.info("Database tables initialized successfully")
+                ensure_schema(self.database_url)
                 break
             except (OperationalError, DisconnectionError) as e:
                 if attempt == max_retries - 1:
@@ -291,7 +275,5 @@ class CorrectionService:
         return sender_email.lower().strip() == expected_email.lower().strip()
     
     def close(self):
-        """Properly close database connections."""
-        if hasattr(self, 'engine'):
-            self.engine.dispose()
-            logger.info("Database connections closed") 
\ No newline at end of file
+        """Release this service. The pooled engine is shared, so it is left open (see dispose_engines)."""
+        logger.info("Correction service closed") 
\ No newline at end of file
@@ -2,23 +2,33 @@
 Email Archive Service for managing hot and cold storage of emails.
 """
 import os
+import base64
 import hashlib
-import gzip
 import json
+import time
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Union
-from sqlalchemy import create_engine, text, and_, or_, func
-from sqlalchemy.orm import sessionmaker, Session
+from typing import Optional, List, Dict, Any, Union, Tuple
+from sqlalchemy import text, and_, or_, func, case, insert, update, delete, cast, tuple_, bindparam, DateTime
+from sqlalchemy.dialects.postgresql import REAL, UUID as PG_UUID, insert as pg_insert
+from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 import uuid
 
 from src.core.models.email_archive import (
-    Base, HotEmail, ColdEmail, ProcessingLog, StorageStats
+    HotEmail, ColdEmail, ProcessingLog, StorageStats, BodyBlob
 )
+from src.core.database.connection import get_engine, get_session_factory
+from src.core.services.archive_mover import ColdStorageMover
+from src.core.services.body_store import ContentAddressedBodyStore, body_hash, body_key
+from src.core.database.migrations import ensure_schema
 from src.core.logging_config import get_logger
+from src.config.settings import EMAIL_BODY_ORPHAN_GRACE_SECONDS
 
 logger = get_logger(__name__)
 
+# body_blobs rows locked per garbage-collection transaction
+_BODY_GC_BATCH = 1000
+
 
 class EmailArchiveService:
     """Service for managing email archiving with hot and cold storage."""
@@ -38,15 +48,14 @@ class EmailArchiveService:
         # Initialize file storage
         self.storage_path = storage_path or os.getenv('EMAIL_STORAGE_PATH', './email_storage')
         self._ensure_storage_directory()
+        self.body_store = ContentAddressedBodyStore(self.storage_path)
         
-        self.engine = create_engine(self.database_url)
-        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-        
-        # Create tables if they don't exist
-        Base.metadata.create_all(bind=self.engine)
+        # Pooled engine shared with every other service using this database
+        self.engine = get_engine(self.database_url)
+        self.SessionLocal = get_session_factory(self.database_url)
         
-        # Initialize storage statistics
-        self._initialize_storage_stats()
+        # Tables and storage_stats rows come from src.core.database.migrations
+        ensure_schema(self.database_url)
     
     def _ensure_storage_directory(self):
         """Ensure the email storage directory exists."""
@@ -59,32 +68,19 @@ class EmailArchiveService:
     
     def _store_full_email_body(self, email_id: str, body_text: str) -> Optional[str]:
         """
-        Store full email body in compressed file.
+        Store full email body in the content-addressed body store.
+        
+        The caller is responsible for counting the reference (see _add_body_refs).
         
         Args:
-            email_id: Email ID
+            email_id: Email ID (kept for callers; the key depends only on the content)
             body_text: Full email body text
             
         Returns:
             Optional[str]: Storage key if successful, None otherwise
         """
         try:
-            # Create storage key
-            storage_key = f"emails/{email_id}.txt.gz"
-            file_path = os.path.join(self.storage_path, storage_key)
-            
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            
-            # Compress and store
-            compressed_data = gzip.compress(body_text.encode('utf-8'))
-            
-            with open(file_path, 'wb') as f:
-                f.write(compressed_data)
-            
-            logger.info(f"Stored full email body: {file_path}")
-            return storage_key
-            
+            return self.body_store.put(body_text)
         except Exception as e:
             logger.error(f"Failed to store full email body: {str(e)}")
             return None
@@ -100,48 +96,150 @@ class EmailArchiveService:
             Optional[str]: Email body text if successful, None otherwise
         """
         try:
-            file_path = os.path.join(self.storage_path, storage_key)
+            return self.body_store.get(storage_key)
+        except Exception as e:
+            logger.error(f"Failed to retrieve full email body: {str(e)}")
+            return None
+    
+    def get_full_email_bodies(self, storage_keys: List[str]) -> Dict[str, str]:
+        """
+        Retrieve several full email bodies at once.
+        
+        Args:
+            storage_keys: Storage keys (body_storage_key values)
             
-            if not os.path.exists(file_path):
-                logger.warning(f"Email body file not found: {file_path}")
-                return None
+        Returns:
+            Dict[str, str]: Storage key -> body text for every body found
+        """
+        return self.body_store.get_many(storage_keys)
+    
+    def _add_body_refs(self, session: Session, rows: List[Dict[str, Any]]):
+        """
+        Count one reference per stored email on its body file (single upsert).
+        
+        The upsert leaves the body_blobs rows locked until the caller commits, so
+        garbage collection cannot remove those files in the meantime; write the
+        files only after this call (see _collect_unused_bodies).
+        """
+        counts: Dict[str, int] = {}
+        for row in rows:
+            if row.get('body_storage_key'):
+                counts[row['body_storage_key']] = counts.get(row['body_storage_key'], 0) + 1
+        if not counts:
+            return
+        # Sorted so concurrent writers lock shared rows in the same order
+        stmt = pg_insert(BodyBlob).values([
+            {'storage_key': key, 'ref_count': counts[key]} for key in sorted(counts)
+        ])
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['storage_key'],
+            set_={'ref_count': BodyBlob.ref_count + stmt.excluded.ref_count}
+        ))
+    
+    def _release_body_refs(self, session: Session, storage_keys: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Drop one reference per deleted email.
+        
+        Rows that reach zero are kept; _collect_unused_bodies removes them (and
+        their files) once this transaction has committed.
+        
+        Returns:
+            Tuple[List[str], List[str]]: Legacy per-email files (emails/<id>.txt.gz,
+            single owner, safe to remove after commit) and the body keys released
+        """
+        counts: Dict[str, int] = {}
+        legacy = []
+        for key in storage_keys:
+            if not key:
+                continue
+            if key.startswith('emails/'):
+                legacy.append(key)
+            else:
+                counts[key] = counts.get(key, 0) + 1
+        if counts:
+            session.execute(
+                update(BodyBlob)
+                .where(BodyBlob.storage_key == bindparam('key'))
+                .values(ref_count=BodyBlob.ref_count - bindparam('count')),
+                [{'key': key, 'count': counts[key]} for key in sorted(counts)]
+            )
+        return legacy, sorted(counts)
+    
+    def _collect_unused_bodies(self, storage_keys: List[str]) -> int:
+        """
+        Remove the body files among storage_keys that no email references any more.
+        
+        Each batch deletes the rows whose count is still zero and unlinks their
+        files before committing. The delete locks those rows, so a writer
+        referencing the same body waits until the file is gone and then writes it
+        again. If the commit fails, the rows stay at zero and a later run retries.
+        
+        Returns:
+            int: Number of files removed
+        """
+        removed = 0
+        keys = sorted(set(storage_keys))
+        for start in range(0, len(keys), _BODY_GC_BATCH):
+            batch = keys[start:start + _BODY_GC_BATCH]
+            with self._get_session() as session:
+                unused = [key for (key,) in session.execute(
+                    delete(BodyBlob)
+                    .where(and_(BodyBlob.storage_key.in_(batch), BodyBlob.ref_count <= 0))
+                    .returning(BodyBlob.storage_key)
+                )]
+                removed += self.body_store.delete_many(unused)
+                session.commit()
+        return removed
+    
+    def sweep_orphan_bodies(self, min_age_seconds: int = EMAIL_BODY_ORPHAN_GRACE_SECONDS) -> int:
+        """
+        Remove body files that have no body_blobs row, and rows left at zero.
+        
+        Bodies are written inside the storing transaction, so a store that fails
+        after writing leaves files nothing references. Files younger than
+        min_age_seconds may belong to a store still in progress and are skipped.
+        
+        Args:
+            min_age_seconds: Only files last modified at least this long ago are swept
             
-            with open(file_path, 'rb') as f:
-                compressed_data = f.read()
+        Returns:
+            int: Number of files removed
+        """
+        cutoff = time.time() - min_age_seconds
+        candidates = sorted(key for key, mtime in self.body_store.iter_keys() if mtime < cutoff)
+        removed = 0
+        try:
+            for start in range(0, len(candidates), _BODY_GC_BATCH):
+                batch = candidates[start:start + _BODY_GC_BATCH]
+                with self._get_session() as session:
+                    # Claiming a key with a placeholder row waits for any writer
+                    # inserting the same key; only keys with no row are claimed
+                    stmt = pg_insert(BodyBlob).values([{'storage_key': key, 'ref_count': 0} for key in batch])
+                    claimed = [key for (key,) in session.execute(
+                        stmt.on_conflict_do_nothing(index_elements=['storage_key'])
+                        .returning(BodyBlob.storage_key)
+                    )]
+                    removed += self.body_store.delete_many(claimed)
+                    if claimed:
+                        session.execute(delete(BodyBlob).where(BodyBlob.storage_key.in_(claimed)))
+                    session.commit()
             
-            body_text = gzip.decompress(compressed_data).decode('utf-8')
-            return body_text
+            # Rows whose collection was interrupted after cleanup_old_emails committed
+            with self._get_session() as session:
+                zero = [key for (key,) in session.query(BodyBlob.storage_key).filter(BodyBlob.ref_count <= 0).all()]
+            removed += self._collect_unused_bodies(zero)
+            
+            logger.info(f"Swept {removed} unreferenced body files")
+            return removed
             
         except Exception as e:
-            logger.error(f"Failed to retrieve full email body: {str(e)}")
-            return None
+            logger.error(f"Failed to sweep unreferenced body files: {str(e)}")
+            return removed
     
     def _get_session(self) -> Session:
         """Get a database session."""
         return self.SessionLocal()
     
-    def _initialize_storage_stats(self):
-        """Initialize storage statistics if they don't exist."""
-        try:
-            with self._get_session() as session:
-                # Check if stats exist
-                hot_stats = session.query(StorageStats).filter_by(storage_type='hot').first()
-                cold_stats = session.query(StorageStats).filter_by(storage_type='cold').first()
-                
-                if not hot_stats:
-                    hot_stats = StorageStats(storage_type='hot')
-                    session.add(hot_stats)
-                
-                if not cold_stats:
-                    cold_stats = StorageStats(storage_type='cold')
-                    session.add(cold_stats)
-                
-                session.commit()
-                logger.info("Storage statistics initialized")
-                
-        except Exception as e:
-            logger.error(f"Failed to initialize storage stats: {str(e)}")
-    
     def store_email(self, email_data: Dict[str, Any], storage_type: str = 'hot') -> str:
         """
         Store an email in the archive using hybrid storage.
@@ -153,74 +251,122 @@ class EmailArchiveService:
         Returns:
             str: Email ID
         """
+        return self.store_emails_bulk([email_data], storage_type)[0]
+    
+    def store_emails_bulk(self, emails: List[Dict[str, Any]], storage_type: str = 'hot') -> List[str]:
+        """
+        Store a batch of emails (e.g. one IMAP fetch) in a single transaction.
+        
+        Emails and their processing logs are written with multi-row INSERTs and the
+        storage statistics are adjusted by the batch's deltas instead of being
+        recomputed from the whole table. Emails whose message_id is already archived
+        are not inserted again.
+        
+        Args:
+            emails: List of email data dictionaries (same shape as store_email)
+            storage_type: 'hot' or 'cold'
+            
+        Returns:
+            List[str]: Email ID for each input email, in order (existing ID for duplicates)
+        """
+        if not emails:
+            return []
+        
         start_time = datetime.now()
-        PREVIEW_LENGTH = 250  # Small preview for database
+        table = HotEmail if storage_type == 'hot' else ColdEmail
+        # Generated columns (search_vector) are computed by PostgreSQL
+        columns = {column.key for column in table.__table__.columns if column.computed is None}
         
         try:
             with self._get_session() as session:
-                # Extract full body text
-                full_body = email_data.get('body_text', '')
-                
-                # Create preview for database
-                if len(full_body) > PREVIEW_LENGTH:
-                    body_preview = full_body[:PREVIEW_LENGTH] + "..."
-                    has_full_body = True
-                else:
-                    body_preview = full_body
-                    has_full_body = False
-                
-                # Create email record
-                if storage_type == 'hot':
-                    email = HotEmail(**email_data)
-                else:
-                    email = ColdEmail(**email_data)
-                
-                # Set preview and storage flags
-                email.body_preview = body_preview
-                email.has_full_body = has_full_body
-                
-                session.add(email)
-                session.flush()  # Get the ID
-                email_id = str(email.id)
-                
-                # Store full body in file if needed
-                storage_key = None
-                if has_full_body and full_body:
-                    storage_key = self._store_full_email_body(email_id, full_body)
-                    if storage_key:
-                        email.body_storage_key = storage_key
-                        session.commit()
-                
-                # Log processing
-                processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
-                log = ProcessingLog(
-                    email_id=email.id,
-                    storage_type=storage_type,
-                    processing_step='store_email',
-                    status='success',
-                    processing_time_ms=processing_time,
-                    metadata={
-                        'email_size': email_data.get('email_size_bytes', 0),
-                        'body_length': len(full_body),
-                        'preview_length': len(body_preview),
-                        'has_full_body': has_full_body,
-                        'storage_key': storage_key
-                    }
+                message_ids = [e['message_id'] for e in emails]
+                existing = dict(
+                    session.query(table.message_id, table.id)
+                    .filter(table.message_id.in_(message_ids))
+                    .all()
                 )
-                session.add(log)
-                
-                session.commit()
-                
-                # Update storage statistics
-                self._update_storage_stats(session, storage_type)
-                
-                logger.info(f"Stored email {email_id} in {storage_type} storage (preview: {len(body_preview)} chars, full body: {has_full_body})")
-                return email_id
+                ids_by_message = {mid: str(eid) for mid, eid in existing.items()}
+                
+                email_rows = []
+                log_rows = []
+                full_bodies = []
+                for email_data in emails:
+                    message_id = email_data['message_id']
+                    if message_id in ids_by_message:
+                        continue
+                    
+                    row, log_metadata, full_body = self._build_email_row(email_data, columns)
+                    ids_by_message[message_id] = str(row['id'])
+                    email_rows.append(row)
+                    if full_body is not None:
+                        full_bodies.append((row, log_metadata, full_body))
+                    log_rows.append({
+                        'id': uuid.uuid4(),
+                        'email_id': row['id'],
+                        'storage_type': storage_type,
+                        'processing_step': 'store_email',
+                        'status': 'success',
+                        'processing_metadata': log_metadata
+                    })
+                
+                # Long bodies go to the content-addressed store, keyed by their hash
+                for row, log_metadata, body in full_bodies:
+                    storage_key = body_key(body_hash(body))
+                    row['body_storage_key'] = storage_key
+                    log_metadata['storage_key'] = storage_key
+                
+                if email_rows:
+                    processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+                    per_email_ms = processing_time // len(email_rows)
+                    for log_row in log_rows:
+                        log_row['processing_time_ms'] = per_email_ms
+                    
+                    session.execute(insert(table), email_rows)
+                    session.execute(insert(ProcessingLog), log_rows)
+                    # Reference the bodies before relying on files that may already exist
+                    self._add_body_refs(session, email_rows)
+                    self.body_store.put_many([body for _, _, body in full_bodies])
+                    self._apply_storage_stats_delta(session, storage_type, email_rows)
+                    session.commit()
+                
+                logger.info(f"Stored {len(email_rows)} emails in {storage_type} storage "
+                            f"({len(emails) - len(email_rows)} already archived)")
+                return [ids_by_message[e['message_id']] for e in emails]
                 
         except Exception as e:
-            logger.error(f"Failed to store email: {str(e)}")
+            logger.error(f"Failed to store emails: {str(e)}")
             raise
     
+    def _build_email_row(self, email_data: Dict[str, Any], columns) -> tuple:
+        """Build an insert row, its processing-log metadata and the full body to store (or None)."""
+        PREVIEW_LENGTH = 250  # Small preview for database
+        
+        row = {key: value for key, value in email_data.items() if key in columns}
+        row['id'] = uuid.uuid4()
+        
+        # Extract full body text
+        full_body = email_data.get('body_text', '') or ''
+        
+        # Create preview for database
+        if len(full_body) > PREVIEW_LENGTH:
+            row['body_preview'] = full_body[:PREVIEW_LENGTH] + "..."
+            row['has_full_body'] = True
+        else:
+            row['body_preview'] = full_body
+            row['has_full_body'] = False
+        
+        # The full body is written to the body store by the caller, in one batch
+        row['body_storage_key'] = None
+        
+        log_metadata = {
+            'email_size': email_data.get('email_size_bytes', 0),
+            'body_length': len(full_body),
+            'preview_length': len(row['body_preview']),
+            'has_full_body': row['has_full_body'],
+            'storage_key': None
+        }
+        return row, log_metadata, full_body if row['has_full_body'] else None
+    
     def get_email(self, email_id: str, storage_type: str = 'hot') -> Optional[Dict[str, Any]]:
         """
         Retrieve an email from the archive.
@@ -281,55 +427,136 @@ class EmailArchiveService:
             date_to: End date filter
             storage_type: 'hot' or 'cold'
             limit: Maximum number of results
-            offset: Number of results to skip
+            offset: Number of results to skip (prefer search_emails_page for deep pages)
             
         Returns:
-            List[Dict]: List of email data
+            List[Dict]: List of email data, best match (or newest) first
         """
         try:
             with self._get_session() as session:
-                if storage_type == 'hot':
-                    query_obj = session.query(HotEmail)
-                else:
-                    query_obj = session.query(ColdEmail)
-                
-                # Apply filters
-                if user_id:
-                    query_obj = query_obj.filter(HotEmail.user_id == user_id)
-                
-                if sender_email:
-                    query_obj = query_obj.filter(HotEmail.sender_email == sender_email)
-                
-                if date_from:
-                    query_obj = query_obj.filter(HotEmail.received_date >= date_from)
-                
-                if date_to:
-                    query_obj = query_obj.filter(HotEmail.received_date <= date_to)
-                
-                if query:
-                    # Full-text search on subject and body preview
-                    search_filter = or_(
-                        text("to_tsvector('english', subject) @@ plainto_tsquery('english', :query)"),
-                        text("to_tsvector('english', body_preview) @@ plainto_tsquery('english', :query)")
-                    )
-                    query_obj = query_obj.filter(search_filter).params(query=query)
-                
-                # Order by received date (newest first)
-                query_obj = query_obj.order_by(HotEmail.received_date.desc())
+                query_obj, _ = self._build_search_query(
+                    session, query, user_id, sender_email, date_from, date_to, storage_type
+                )
+                rows = query_obj.offset(offset).limit(limit).all()
+                return [self._search_row_to_dict(row, query) for row in rows]
                 
-                # Apply pagination
-                emails = query_obj.offset(offset).limit(limit).all()
+        except Exception as e:
+            logger.error(f"Failed to search emails: {str(e)}")
+            return []
+    
+    def search_emails_page(self,
+                           query: str = None,
+                           user_id: str = None,
+                           sender_email: str = None,
+                           date_from: datetime = None,
+                           date_to: datetime = None,
+                           storage_type: str = 'hot',
+                           limit: int = 100,
+                           cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Search emails with keyset pagination.
+        
+        Text queries match the indexed search_vector column and are ordered by
+        ts_rank, then received_date and id; without a query results are ordered
+        by received_date and id. Each page resumes after the last row of the
+        previous one instead of skipping rows with OFFSET.
+        
+        Args:
+            query: Text search query
+            user_id: Filter by user ID
+            sender_email: Filter by sender email
+            date_from: Start date filter
+            date_to: End date filter
+            storage_type: 'hot' or 'cold'
+            limit: Maximum number of results
+            cursor: next_cursor from the previous page
+            
+        Returns:
+            Dict: 'emails' (list of email data) and 'next_cursor' (None on the last page)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        after = _decode_search_cursor(cursor) if cursor else None
+        
+        try:
+            with self._get_session() as session:
+                query_obj, sort_key = self._build_search_query(
+                    session, query, user_id, sender_email, date_from, date_to, storage_type
+                )
+                if after:
+                    if query:
+                        after[0] = cast(after[0], REAL)
+                    after[-2] = cast(after[-2], DateTime(timezone=True))
+                    after[-1] = cast(after[-1], PG_UUID(as_uuid=True))
+                    query_obj = query_obj.filter(tuple_(*sort_key) < tuple_(*after))
+                
+                rows = query_obj.limit(limit + 1).all()
+                next_cursor = None
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    last = rows[-1]
+                    email, rank = (last[0], last[1]) if query else (last, None)
+                    key = [email.received_date.isoformat(), str(email.id)]
+                    next_cursor = _encode_search_cursor([rank] + key if query else key)
                 
-                return [email.to_dict() for email in emails]
+                return {
+                    'emails': [self._search_row_to_dict(row, query) for row in rows],
+                    'next_cursor': next_cursor
+                }
                 
         except Exception as e:
             logger.error(f"Failed to search emails: {str(e)}")
-            return []
+            return {'emails': [], 'next_cursor': None}
+    
+    def _build_search_query(self, session: Session, query, user_id, sender_email, date_from, date_to, storage_type):
+        """Build the filtered, ordered search query and the columns of its sort key."""
+        table = HotEmail if storage_type == 'hot' else ColdEmail
+        
+        if query:
+            # Full-text search on the stored, GIN-indexed subject + preview vector
+            ts_query = func.plainto_tsquery('english', query)
+            rank = func.ts_rank(table.search_vector, ts_query)
+            query_obj = session.query(table, rank.label('rank')).filter(table.search_vector.op('@@')(ts_query))
+            sort_key = [rank, table.received_date, table.id]
+        else:
+            query_obj = session.query(table)
+            sort_key = [table.received_date, table.id]
+        
+        # Apply filters
+        if user_id:
+            query_obj = query_obj.filter(table.user_id == user_id)
+        
+        if sender_email:
+            query_obj = query_obj.filter(table.sender_email == sender_email)
+        
+        if date_from:
+            query_obj = query_obj.filter(table.received_date >= date_from)
+        
+        if date_to:
+            query_obj = query_obj.filter(table.received_date <= date_to)
+        
+        # Best match first, then newest first
+        query_obj = query_obj.order_by(*[column.desc() for column in sort_key])
+        return query_obj, sort_key
+    
+    def _search_row_to_dict(self, row, query) -> Dict[str, Any]:
+        """Convert a search result row to email data (with its rank for text queries)."""
+        if not query:
+            return row.to_dict()
+        email, rank = row[0], row[1]
+        email_dict = email.to_dict()
+        email_dict['rank'] = float(rank)
+        return email_dict
     
     def move_to_cold_storage(self, days_threshold: int = 30) -> int:
         """
         Move emails from hot to cold storage based on age.
         
+        Rows are moved in small batches, one transaction each (see
+        ColdStorageMover); the periodic Celery task uses the mover directly
+        so a run can stop on its time budget and resume later.
+        
         Args:
             days_threshold: Number of days after which emails are moved to cold storage
             
@@ -337,29 +564,71 @@ class EmailArchiveService:
             int: Number of emails moved
         """
         try:
-            with self._get_session() as session:
-                # Use the PostgreSQL function to move emails
-                result = session.execute(
-                    text("SELECT email_archive.move_to_cold_storage(:days_threshold)"),
-                    {"days_threshold": days_threshold}
-                )
-                moved_count = result.scalar()
-                
-                # Update storage statistics
-                self._update_storage_stats(session, 'hot')
-                self._update_storage_stats(session, 'cold')
-                
-                session.commit()
-                
-                logger.info(f"Moved {moved_count} emails to cold storage")
-                return moved_count
+            metrics = self.get_cold_storage_mover(max_seconds=None).run(days_threshold)
+            return metrics['rows_moved']
                 
         except Exception as e:
             logger.error(f"Failed to move emails to cold storage: {str(e)}")
             return 0
     
+    def get_cold_storage_mover(self, **kwargs) -> ColdStorageMover:
+        """
+        Create a batched hot -> cold mover bound to this archive's database.
+        
+        Args:
+            **kwargs: ColdStorageMover options (batch_size, max_rows_per_second, max_seconds)
+        """
+        return ColdStorageMover(self.engine, self.SessionLocal, **kwargs)
+    
+    def _apply_storage_stats_delta(self, session: Session, storage_type: str, rows: List[Dict[str, Any]]):
+        """Add a batch of newly stored emails to the storage statistics (single UPDATE)."""
+        added_size = sum(row.get('email_size_bytes') or 0 for row in rows)
+        dates = [row['received_date'] for row in rows if row.get('received_date')]
+        values = {
+            'total_emails': StorageStats.total_emails + len(rows),
+            'total_size_bytes': func.coalesce(StorageStats.total_size_bytes, 0) + added_size,
+            'last_updated': datetime.now()
+        }
+        try:
+            oldest, newest = min(dates), max(dates)
+        except (ValueError, TypeError):
+            # No dates, or naive and aware datetimes mixed; the periodic refresh fixes the range
+            oldest = newest = None
+        if oldest is not None:
+            values['oldest_email_date'] = case(
+                (or_(StorageStats.oldest_email_date.is_(None), StorageStats.oldest_email_date > oldest), oldest),
+                else_=StorageStats.oldest_email_date
+            )
+            values['newest_email_date'] = case(
+                (or_(StorageStats.newest_email_date.is_(None), StorageStats.newest_email_date < newest), newest),
+                else_=StorageStats.newest_email_date
+            )
+        session.execute(
+            update(StorageStats)
+            .where(StorageStats.storage_type == storage_type)
+            .values(**values)
+        )
+    
+    def refresh_storage_stats(self, storage_types: Optional[List[str]] = None):
+        """
+        Recompute storage statistics from the email tables.
+        
+        Inserts keep the statistics current incrementally; this full scan corrects
+        drift and is run periodically (see task_scheduler) and after bulk moves.
+        
+        Args:
+            storage_types: Storage types to refresh. Defaults to hot and cold.
+        """
+        try:
+            with self._get_session() as session:
+                for storage_type in storage_types or ['hot', 'cold']:
+                    self._update_storage_stats(session, storage_type)
+                session.commit()
+        except Exception as e:
+            logger.error(f"Failed to refresh storage stats: {str(e)}")
+    
     def _update_storage_stats(self, session: Session, storage_type: str):
-        """Update storage statistics."""
+        """Recompute storage statistics with full table aggregates (caller commits)."""
         try:
             if storage_type == 'hot':
                 table = HotEmail
@@ -406,6 +675,8 @@ class EmailArchiveService:
         Permanently delete emails older than the threshold from cold storage.
         Use with caution!
         
+        Body files are removed once no remaining email references them.
+        
         Args:
             days_threshold: Number of days after which emails are deleted
             
@@ -416,19 +687,26 @@ class EmailArchiveService:
             with self._get_session() as session:
                 cutoff_date = datetime.now() - timedelta(days=days_threshold)
                 
-                # Count emails to be deleted
-                count = session.query(ColdEmail).filter(
-                    ColdEmail.received_date < cutoff_date
-                ).count()
+                # Delete emails, keeping their body keys to release
+                deleted = session.execute(
+                    delete(ColdEmail)
+                    .where(ColdEmail.received_date < cutoff_date)
+                    .returning(ColdEmail.body_storage_key)
+                ).all()
+                count = len(deleted)
+                legacy_files, released = self._release_body_refs(session, [key for (key,) in deleted])
                 
-                # Delete emails
-                session.query(ColdEmail).filter(
-                    ColdEmail.received_date < cutoff_date
-                ).delete()
+                # Deletes are rare and large; recompute instead of tracking deltas
+                self._update_storage_stats(session, 'cold')
                 
                 session.commit()
                 
-                logger.warning(f"Deleted {count} emails older than {days_threshold} days from cold storage")
+                # Files go only after the references are gone for good
+                removed_files = self.body_store.delete_many(legacy_files)
+                removed_files += self._collect_unused_bodies(released)
+                
+                logger.warning(f"Deleted {count} emails older than {days_threshold} days from cold storage "
+                               f"({removed_files} body files removed)")
                 return count
                 
         except Exception as e:
@@ -530,4 +808,37 @@ class EmailArchiveService:
                 
         except Exception as e:
             logger.error(f"Failed to get email by message_id {message_id}: {str(e)}")
-            return None 
\ No newline at end of file
+            return None 
+
+# Global email archive service instance
+_email_archive_service = None
+
+
+def _encode_search_cursor(key: List[Any]) -> str:
+    """Opaque cursor for the sort key of the last row on a page."""
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+
+def _decode_search_cursor(cursor: str) -> List[Any]:
+    """Sort key encoded by _encode_search_cursor."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError(f"Invalid search cursor: {cursor!r}")
+    if not isinstance(key, list) or len(key) not in (2, 3):
+        raise ValueError(f"Invalid search cursor: {cursor!r}")
+    key[-2] = datetime.fromisoformat(key[-2])
+    return key
+
+
+def get_email_archive_service() -> EmailArchiveService:
+    """
+    Get the process-wide EmailArchiveService.
+
+    Returns:
+        EmailArchiveService: Shared service using the pooled engine for DATABASE_URL.
+    """
+    global _email_archive_service
+    if _email_archive_service is None:
+        _email_archive_service = EmailArchiveService()
+    return _email_archive_service
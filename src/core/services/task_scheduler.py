@@ -8,7 +8,7 @@ from datetime import datetime, timedelta
 from celery.schedules import crontab
 from src.core.services.celery_config import celery_app
 from src.core.logging_config import get_logger
-from src.config.settings import DEBUG_MODE
+from src.config.settings import DEBUG_MODE, ARCHIVE_MOVE_INTERVAL_MINUTES
 
 logger = get_logger(__name__)
 
@@ -16,6 +16,7 @@ logger = get_logger(__name__)
 from src.core.tasks.email_tasks import process_gmail_updates_async
 from src.core.tasks.notion_tasks import identify_stale_tasks_async
 from src.core.tasks.dashboard_tasks import generate_analytics_report_async
+from src.core.tasks.email_archive_tasks import move_to_cold_storage_async, sweep_orphan_bodies_async
 
 @celery_app.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
@@ -49,6 +50,28 @@ def setup_periodic_tasks(sender, **kwargs):
         name='generate-weekly-analytics-monday-8am'
     )
     
+    # Email archive storage stats - every hour at minute 30
+    # (inserts update the counters incrementally; this corrects any drift)
+    sender.add_periodic_task(
+        crontab(minute=30, hour='*'),
+        refresh_email_storage_stats.s(),
+        name='refresh-email-storage-stats-every-hour'
+    )
+    
+    # Hot -> cold archive move - small batches within a time budget, resumed on the next run
+    sender.add_periodic_task(
+        crontab(minute=f'*/{ARCHIVE_MOVE_INTERVAL_MINUTES}'),
+        move_to_cold_storage_async.s(),
+        name='move-emails-to-cold-storage'
+    )
+    
+    # Body files left behind by failed archive transactions - every day at 3 AM
+    sender.add_periodic_task(
+        crontab(minute=0, hour=3),
+        sweep_orphan_bodies_async.s(),
+        name='sweep-orphan-email-bodies-daily'
+    )
+    
     logger.info("Periodic tasks configured successfully")
 
 @celery_app.task(name='task_manager.check_gmail_periodic')
@@ -202,6 +225,37 @@ def generate_weekly_analytics():
             'timestamp': datetime.now().isoformat()
         }
 
+@celery_app.task(name='task_manager.refresh_email_storage_stats')
+def refresh_email_storage_stats():
+    """Periodic task to recompute email archive storage statistics."""
+    try:
+        from src.config.settings import EMAIL_ARCHIVE_ENABLED
+        if not EMAIL_ARCHIVE_ENABLED:
+            return {
+                'success': True,
+                'skipped': True,
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        from src.core.services.email_archive_service import get_email_archive_service
+        archive_service = get_email_archive_service()
+        archive_service.refresh_storage_stats()
+        
+        logger.info("Email storage statistics refreshed")
+        return {
+            'success': True,
+            'stats': archive_service.get_storage_stats(),
+            'timestamp': datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Error refreshing email storage stats: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }
+
 @celery_app.task(name='task_manager.cleanup_old_results')
 def cleanup_old_results():
     """Periodic task to cleanup old task results from Redis."""
@@ -8,6 +8,8 @@ from datetime import datetime
 
 from src.core.models.user import User
 from src.core.logging_config import get_logger
+from src.core.notion_sync import task_store
+from src.core.task_cache import get_task_cache
 from src.plugins.plugin_manager_instance import plugin_manager
 
 logger = get_logger(__name__)
@@ -238,6 +240,9 @@ class UserTaskService:
                 parent={"database_id": user.task_database_id},
                 properties=properties
             )
+            task_store.record_page(response, user.task_database_id)
+            # The shared cache holds NotionService-shaped tasks; refill it from the (already current) store
+            get_task_cache().invalidate(user.task_database_id)
             
             # Return the created task data (with original names, not tokens)
             created_task = {
@@ -275,12 +280,11 @@ class UserTaskService:
             return []
         
         try:
-            response = self.notion_client.databases.query(
-                database_id=user.task_database_id
-            )
+            # Pages through the database on first load, then only pulls edited pages
+            pages = task_store.sync(self.notion_client, user.task_database_id)
             
             tasks = []
-            for page in response.get("results", []):
+            for page in pages:
                 task = self._process_task_page(page)
                 if task:
                     tasks.append(task)
@@ -413,10 +417,12 @@ class UserTaskService:
             properties = {k: v for k, v in properties.items() if v is not None}
             
             if properties:
-                self.notion_client.pages.update(
+                response = self.notion_client.pages.update(
                     page_id=task_id,
                     properties=properties
                 )
+                task_store.record_page(response, user.task_database_id)
+                get_task_cache().invalidate(user.task_database_id)
                 
                 logger.info(f"Updated task {task_id} for user {user.email}")
                 return True
@@ -442,10 +448,12 @@ class UserTaskService:
             return False
         
         try:
-            self.notion_client.pages.update(
+            response = self.notion_client.pages.update(
                 page_id=task_id,
                 archived=True
             )
+            task_store.record_page(response, user.task_database_id)
+            get_task_cache().invalidate(user.task_database_id)
             
             logger.info(f"Deleted task {task_id} for user {user.email}")
             return True
@@ -0,0 +1,294 @@
+"""
+Process-wide cache of processed Notion tasks, keyed by task database id.
+
+NotionService instances are created per request, so an instance-level
+cache rarely hits. This cache is shared by every instance in the process
+(or by every process when the Redis backend is enabled). Each database
+entry carries its own TTL, the least recently used databases are evicted
+first, and inserts, updates and archives are written through.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.config.settings import (
+    TASK_CACHE_BACKEND,
+    TASK_CACHE_TTL_SECONDS,
+    TASK_CACHE_MAX_DATABASES,
+    TASK_CACHE_REDIS_URL
+)
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Marks a Redis hash as loaded even when the database has no tasks
+_LOADED_FIELD = "__loaded__"
+
+# Every Redis key of the cache starts with this prefix
+_REDIS_PREFIX = "notion_tasks:"
+
+# Redis hash mapping each cached task id to its database key. Entries can
+# outlive the task's database entry (it expires on its own); lookups treat
+# such entries as a hint only.
+_REDIS_INDEX_KEY = f"{_REDIS_PREFIX}index"
+
+
+def _normalize_id(notion_id: Optional[str]) -> str:
+    """Notion ids are accepted with or without dashes; key everything without them."""
+    return (notion_id or "").replace("-", "").lower()
+
+
+class _Entry:
+    __slots__ = ("tasks", "expires_at")
+
+    def __init__(self, tasks: Dict[str, Dict[str, Any]], expires_at: float):
+        self.tasks = tasks
+        self.expires_at = expires_at
+
+
+class TaskCache:
+    """Shared task cache with per-database TTL, LRU eviction and write-through."""
+
+    def __init__(self,
+                 ttl_seconds: int = TASK_CACHE_TTL_SECONDS,
+                 max_databases: int = TASK_CACHE_MAX_DATABASES,
+                 redis_client=None):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: Lifetime of a database entry after it is loaded
+            max_databases: Databases kept in memory before LRU eviction
+            redis_client: Optional redis.Redis; when given, entries live in Redis
+                          (eviction is then Redis' maxmemory policy)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_databases = max_databases
+        self.redis_client = redis_client
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # --- Public API ---
+
+    def get(self, database_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached tasks of a database, or None on a miss or expiry."""
+        key = _normalize_id(database_id)
+        if self.redis_client is not None:
+            tasks = self._redis_get(key)
+        else:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires_at <= time.monotonic():
+                    del self._entries[key]
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                tasks = list(entry.tasks.values()) if entry is not None else None
+
+        if tasks is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return tasks
+
+    def set(self, database_id: str, tasks: List[Dict[str, Any]]):
+        """Store the full task list of a database, starting a fresh TTL."""
+        key = _normalize_id(database_id)
+        by_id = {task["id"]: task for task in tasks if task.get("id")}
+        if self.redis_client is not None:
+            self._redis_set(key, by_id)
+            return
+        with self._lock:
+            self._entries[key] = _Entry(by_id, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_databases:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.debug(f"Evicted task cache entry for database {evicted}")
+
+    def upsert_task(self, database_id: Optional[str], task: Optional[Dict[str, Any]]):
+        """Write an inserted or updated task through to a cached database (no-op if not cached)."""
+        if not database_id or not task or not task.get("id"):
+            return
+        key = _normalize_id(database_id)
+        if self.redis_client is not None:
+            self._redis_call("upsert", self._redis_upsert, key, task)
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.tasks[task["id"]] = task
+
+    def remove_task(self, task_id: str, database_id: Optional[str] = None):
+        """Drop an archived task from its database entry, or from every entry if unknown."""
+        if self.redis_client is not None:
+            self._redis_call("remove", self._redis_remove, task_id, _normalize_id(database_id) if database_id else None)
+            return
+        with self._lock:
+            if database_id:
+                entries = [self._entries.get(_normalize_id(database_id))]
+            else:
+                entries = list(self._entries.values())
+            for entry in entries:
+                if entry is not None:
+                    entry.tasks.pop(task_id, None)
+
+    def invalidate(self, database_id: Optional[str] = None):
+        """Forget one database, or everything."""
+        if self.redis_client is not None:
+            if database_id:
+                self._redis_call("invalidate", self._redis_invalidate, _normalize_id(database_id))
+            else:
+                self._redis_call("invalidate", self._redis_clear)
+            return
+        with self._lock:
+            if database_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(_normalize_id(database_id), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of cached databases."""
+        total = self.hits + self.misses
+        if self.redis_client is not None:
+            databases = self._redis_call("stats", self._redis_count) or 0
+        else:
+            databases = len(self._entries)
+        return {
+            "backend": "redis" if self.redis_client is not None else "memory",
+            "databases": databases,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    # --- Redis backend ---
+
+    def _redis_key(self, key: str) -> str:
+        return f"{_REDIS_PREFIX}{key}"
+
+    def _redis_entry_keys(self):
+        return (k for k in self.redis_client.scan_iter(match=f"{_REDIS_PREFIX}*", count=500)
+                if k != _REDIS_INDEX_KEY)
+
+    def _redis_call(self, action: str, func, *args):
+        try:
+            return func(*args)
+        except Exception as e:
+            logger.warning(f"Task cache {action} error: {e}")
+            return None
+
+    def _redis_get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        raw = self._redis_call("read", self.redis_client.hgetall, self._redis_key(key))
+        if not raw:
+            return None
+        return [json.loads(value) for field, value in raw.items() if field != _LOADED_FIELD]
+
+    def _redis_set(self, key: str, by_id: Dict[str, Dict[str, Any]]):
+        redis_key = self._redis_key(key)
+        mapping = {task_id: json.dumps(task, default=str) for task_id, task in by_id.items()}
+        mapping[_LOADED_FIELD] = "1"
+
+        def write():
+            pipe = self.redis_client.pipeline()
+            pipe.delete(redis_key)
+            pipe.hset(redis_key, mapping=mapping)
+            pipe.expire(redis_key, self.ttl_seconds)
+            if by_id:
+                pipe.hset(_REDIS_INDEX_KEY, mapping={task_id: key for task_id in by_id})
+            # The index outlives every entry written before it
+            pipe.expire(_REDIS_INDEX_KEY, self.ttl_seconds)
+            pipe.execute()
+        self._redis_call("write", write)
+
+    def _redis_upsert(self, key: str, task: Dict[str, Any]):
+        redis_key = self._redis_key(key)
+        value = json.dumps(task, default=str)
+
+        # Only write through to loaded entries; a partial hash would look like a full hit.
+        # WATCH makes the existence check and the write one step: if the entry
+        # expires or is replaced in between, the transaction is retried.
+        def write(pipe):
+            if not pipe.exists(redis_key):
+                return
+            pipe.multi()
+            pipe.hset(redis_key, task["id"], value)
+            pipe.hset(_REDIS_INDEX_KEY, task["id"], key)
+            pipe.expire(_REDIS_INDEX_KEY, self.ttl_seconds)
+        self.redis_client.transaction(write, redis_key)
+
+    def _redis_invalidate(self, key: str):
+        redis_key = self._redis_key(key)
+        task_ids = [f for f in self.redis_client.hkeys(redis_key) if f != _LOADED_FIELD]
+        # Drop the tasks' index entries too, unless they have since moved to another database
+        owners = self.redis_client.hmget(_REDIS_INDEX_KEY, task_ids) if task_ids else []
+        pipe = self.redis_client.pipeline()
+        pipe.delete(redis_key)
+        stale = [task_id for task_id, owner in zip(task_ids, owners) if owner == key]
+        if stale:
+            pipe.hdel(_REDIS_INDEX_KEY, *stale)
+        pipe.execute()
+
+    def _redis_clear(self):
+        pipe = self.redis_client.pipeline()
+        for redis_key in self._redis_entry_keys():
+            pipe.delete(redis_key)
+        pipe.delete(_REDIS_INDEX_KEY)
+        pipe.execute()
+
+    def _redis_count(self) -> int:
+        return sum(1 for _ in self._redis_entry_keys())
+
+    def _redis_remove(self, task_id: str, key: Optional[str]):
+        # Without a database id, the index says which entry holds the task; a
+        # dangling index entry just makes the hdel below a no-op
+        key = key or self.redis_client.hget(_REDIS_INDEX_KEY, task_id)
+        pipe = self.redis_client.pipeline()
+        if key:
+            pipe.hdel(self._redis_key(key), task_id)
+        pipe.hdel(_REDIS_INDEX_KEY, task_id)
+        pipe.execute()
+
+
+def _initialize_redis():
+    """Connect to Redis for the shared task cache, or return None to stay in memory."""
+    try:
+        import redis
+        client = redis.Redis.from_url(
+            TASK_CACHE_REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5
+        )
+        client.ping()
+        logger.info("Notion task cache using Redis backend")
+        return client
+    except ImportError:
+        logger.warning("Redis package not installed. Notion task cache will stay in memory.")
+    except Exception as e:
+        logger.warning(f"Failed to connect to Redis: {e}. Notion task cache will stay in memory.")
+    return None
+
+
+# Global task cache instance
+_task_cache = None
+_task_cache_lock = threading.Lock()
+
+
+def get_task_cache() -> TaskCache:
+    """
+    Get the process-wide task cache.
+
+    Returns:
+        TaskCache: The shared cache, Redis-backed when TASK_CACHE_BACKEND is 'redis'.
+    """
+    global _task_cache
+    if _task_cache is None:
+        with _task_cache_lock:
+            if _task_cache is None:
+                redis_client = _initialize_redis() if TASK_CACHE_BACKEND == "redis" else None
+                _task_cache = TaskCache(redis_client=redis_client)
+    return _task_cache
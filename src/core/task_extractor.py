@@ -6,6 +6,7 @@ import json
 import re
 import ast
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from dateutil import parser
 from datetime import datetime
 from typing import List, Dict, Any, Optional
@@ -16,7 +17,8 @@ from src.config.settings import (
     DEBUG_MODE,
     CHAT_MODEL,
     ENABLE_CHAT_VERIFICATION,
-    AI_PROVIDER
+    AI_PROVIDER,
+    EXTRACTION_CONCURRENCY
 )
 
 # Import security manager for protecting sensitive data
@@ -425,4 +427,64 @@ Remember:
 
     except Exception as e:
         print(f"Error in extract_tasks_from_update: {traceback.format_exc()}")
-        return []
\ No newline at end of file
+        return []
+
+
+def _task_key(task: Dict[str, Any]) -> tuple:
+    """Identity of an extracted task for de-duplication across chunks."""
+    text = re.sub(r'\s+', ' ', str(task.get('task', ''))).strip().lower()
+    employee = str(task.get('employee', '')).strip().lower()
+    return (employee, text)
+
+
+def merge_chunk_tasks(chunk_results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Merge per-chunk task lists in chunk order, dropping repeats.
+
+    Overlapping chunks (e.g. a shared header or a section split across two
+    chunks) often yield the same task twice; the first occurrence is kept.
+
+    Args:
+        chunk_results: Tasks extracted from each chunk, in chunk order
+
+    Returns:
+        List[Dict[str, Any]]: Merged task list
+    """
+    merged = []
+    seen = set()
+    for chunk_tasks in chunk_results:
+        for task in chunk_tasks or []:
+            key = _task_key(task)
+            if key[1] and key in seen:
+                debug_print(f"Dropping duplicate task from later chunk: {task.get('task')}")
+                continue
+            seen.add(key)
+            merged.append(task)
+    return merged
+
+
+def extract_tasks_from_chunks(chunks: List[str], max_workers: int = EXTRACTION_CONCURRENCY) -> List[Dict[str, Any]]:
+    """
+    Extract tasks from all chunks of one email concurrently and merge the results.
+
+    Requests still pass through the AI client's shared rate limiter, so this only
+    overlaps the round trips; it does not raise the request rate above the quota.
+
+    Args:
+        chunks: Text chunks, e.g. from chunk_email_text
+        max_workers: Chunks extracted at once (1 extracts them one after another)
+
+    Returns:
+        List[Dict[str, Any]]: De-duplicated tasks in chunk order
+    """
+    if not chunks:
+        return []
+    workers = max(1, min(max_workers, len(chunks)))
+    if workers == 1:
+        chunk_results = [extract_tasks_from_update(chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='extract') as executor:
+            chunk_results = list(executor.map(extract_tasks_from_update, chunks))
+    for i, chunk_tasks in enumerate(chunk_results):
+        print(f"   ✅ Extracted {len(chunk_tasks)} tasks from chunk {i+1}/{len(chunks)}")
+    return merge_chunk_tasks(chunk_results)
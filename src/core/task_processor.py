@@ -26,7 +26,7 @@ from src.config.settings import (
 )
 from src.core.chroma_embedding_manager_simple import SimpleChromaEmbeddingManager
 from src.core.notion_service import NotionService
-from src.core.task_similarity import check_task_similarity
+from src.core.task_similarity import check_task_similarity, check_task_similarity_batch
 from src.plugins import plugin_manager
 
 # Initialize simplified Chroma-based embedding manager
@@ -79,6 +79,86 @@ def normalize_date_for_notion(date_value):
         # Fallback: just return the string as-is
         return str(date_value)
 
+def _prepare_task(task: dict, log_output: list, batch_mode: bool):
+    """
+    Normalize a task and run the pre-similarity verification checks.
+    
+    Returns:
+        None if the task can go on to similarity matching, otherwise the
+        (success, message) tuple to report for it.
+    """
+    # Only skip empty tasks, not short ones
+    if not task["task"] or not task["task"].strip():
+        log_output.append(f"⚠️ Skipping empty task")
+        return False, "Task is empty"
+    
+    # Normalize the date in the task to use current year
+    if "date" in task and task["date"]:
+        task["date"] = normalize_date_for_notion(task["date"])
+    
+    log_output.append(f"📋 Processing task: '{task['task']}'")
+    log_output.append(f"📅 Task date: {task['date']}")
+    
+    # Check for task verification needs using the integrated context evaluation
+    needs_verification = False
+    verification_fields = []
+    
+    # Check for description needs
+    if task.get("needs_description", False):
+        needs_verification = True
+        verification_fields.append("description")
+        log_output.append(f"⚠️ Task needs more detailed description")
+        
+    # Check category confidence
+    if task.get("category") == "Needs Context" or task.get("confidence", {}).get("category") == "LOW":
+        needs_verification = True
+        task["needs_category"] = True
+        verification_fields.append("category")
+        log_output.append(f"⚠️ Task needs category verification")
+        
+    # If verification is needed and we're not in batch mode, return early
+    if needs_verification and not batch_mode:
+        return False, "Task needs verification"
+    
+    return None
+
+def _apply_similarity_result(database_id: str, task: dict, similarity_result: dict, log_output: list, batch_mode: bool):
+    """Update the matched task or create a new one, based on a similarity result."""
+    if similarity_result["is_match"]:
+        matched_task = similarity_result["matched_task"]
+        log_output.append(f"🔍 Found matching task: '{matched_task['task']}'")
+        log_output.append(f"💡 Confidence: {similarity_result['confidence']:.2f}")
+        log_output.append(f"📝 {similarity_result['explanation']}")
+        
+        # Preserve original date and employee from matched task
+        task["date"] = matched_task.get("date", task["date"])
+        task["employee"] = matched_task.get("employee", task["employee"])
+        
+        # Update the existing task
+        if not batch_mode:
+            notion_service = NotionService()
+            success, message = notion_service.update_task(matched_task["id"], task)
+            if success:
+                log_output.append(f"✅ Updated existing task: {task['task']}")
+            else:
+                log_output.append(f"❌ Failed to update task: {message}")
+            return success, message
+        return True, "Task verified for update"
+        
+    else:
+        log_output.append("🆕 No matching task found, creating new task")
+        
+        # Create new task
+        if not batch_mode:
+            notion_service = NotionService()
+            success, message = notion_service.insert_task(database_id, task)
+            if success:
+                log_output.append(f"✅ Created new task: {task['task']}")
+            else:
+                log_output.append(f"❌ Failed to create task: {message}")
+            return success, message
+        return True, "Task verified for creation"
+
 def insert_or_update_task(database_id: str, task: dict, existing_tasks, log_output=None, batch_mode=False):
     """
     Insert a new task or update existing similar task with intelligent matching.
@@ -93,82 +173,20 @@ def insert_or_update_task(database_id: str, task: dict, existing_tasks, log_outp
     # Initialize log_output if not provided
     if log_output is None:
         log_output = []
-        
-    # Only skip empty tasks, not short ones
-    if not task["task"] or not task["task"].strip():
-        log_output.append(f"⚠️ Skipping empty task")
-        return False, "Task is empty"
 
     try:
         # Convert DataFrame to list of dictionaries if needed
         if hasattr(existing_tasks, 'to_dict'):
             existing_tasks = existing_tasks.to_dict('records')
         
-        # Normalize the date in the task to use current year
-        if "date" in task and task["date"]:
-            task["date"] = normalize_date_for_notion(task["date"])
-        
-        log_output.append(f"📋 Processing task: '{task['task']}'")
-        log_output.append(f"📅 Task date: {task['date']}")
-        
-        # Check for task verification needs using the integrated context evaluation
-        needs_verification = False
-        verification_fields = []
-        
-        # Check for description needs
-        if task.get("needs_description", False):
-            needs_verification = True
-            verification_fields.append("description")
-            log_output.append(f"⚠️ Task needs more detailed description")
-            
-        # Check category confidence
-        if task.get("category") == "Needs Context" or task.get("confidence", {}).get("category") == "LOW":
-            needs_verification = True
-            task["needs_category"] = True
-            verification_fields.append("category")
-            log_output.append(f"⚠️ Task needs category verification")
-            
-        # If verification is needed and we're not in batch mode, return early
-        if needs_verification and not batch_mode:
-            return False, "Task needs verification"
+        early_result = _prepare_task(task, log_output, batch_mode)
+        if early_result is not None:
+            return early_result
             
         # Check for similar existing tasks using the hybrid approach
-        similarity_result = check_task_similarity(task, existing_tasks)
+        similarity_result = check_task_similarity(task, existing_tasks, database_id=database_id)
         
-        if similarity_result["is_match"]:
-            matched_task = similarity_result["matched_task"]
-            log_output.append(f"🔍 Found matching task: '{matched_task['task']}'")
-            log_output.append(f"💡 Confidence: {similarity_result['confidence']:.2f}")
-            log_output.append(f"📝 {similarity_result['explanation']}")
-            
-            # Preserve original date and employee from matched task
-            task["date"] = matched_task.get("date", task["date"])
-            task["employee"] = matched_task.get("employee", task["employee"])
-            
-            # Update the existing task
-            if not batch_mode:
-                notion_service = NotionService()
-                success, message = notion_service.update_task(matched_task["id"], task)
-                if success:
-                    log_output.append(f"✅ Updated existing task: {task['task']}")
-                else:
-                    log_output.append(f"❌ Failed to update task: {message}")
-                return success, message
-            return True, "Task verified for update"
-            
-        else:
-            log_output.append("🆕 No matching task found, creating new task")
-            
-            # Create new task
-            if not batch_mode:
-                notion_service = NotionService()
-                success, message = notion_service.insert_task(database_id, task)
-                if success:
-                    log_output.append(f"✅ Created new task: {task['task']}")
-                else:
-                    log_output.append(f"❌ Failed to create task: {message}")
-                return success, message
-            return True, "Task verified for creation"
+        return _apply_similarity_result(database_id, task, similarity_result, log_output, batch_mode)
             
     except Exception as e:
         error_msg = f"❌ Error in task processing: {e}"
@@ -177,6 +195,68 @@ def insert_or_update_task(database_id: str, task: dict, existing_tasks, log_outp
         print(traceback.format_exc())
         return False, error_msg
 
+def insert_or_update_tasks(database_id: str, tasks: list, existing_tasks, log_output=None, batch_mode=False):
+    """
+    Insert or update all tasks extracted from one update, resolving similarity in one batch.
+    
+    Same per-task behavior as insert_or_update_task, but similarity for every
+    task is resolved with a single check_task_similarity_batch call, and tasks
+    repeating an earlier task of the same update are skipped.
+    
+    Args:
+        database_id: The ID of the Notion database to use.
+        tasks: The tasks to process
+        existing_tasks: Existing tasks to check against (DataFrame or list)
+        log_output: List to append log messages to
+        batch_mode: If True, only verify but don't insert to Notion
+        
+    Returns:
+        List of (success, message) tuples aligned with tasks.
+    """
+    if log_output is None:
+        log_output = []
+    
+    results = [None] * len(tasks)
+    try:
+        # Convert DataFrame to list of dictionaries if needed
+        if hasattr(existing_tasks, 'to_dict'):
+            existing_tasks = existing_tasks.to_dict('records')
+        
+        ready = []
+        for i, task in enumerate(tasks):
+            results[i] = _prepare_task(task, log_output, batch_mode)
+            if results[i] is None:
+                ready.append(i)
+        
+        similarity_results = check_task_similarity_batch(
+            [tasks[i] for i in ready], existing_tasks, database_id=database_id
+        )
+        
+        for i, similarity_result in zip(ready, similarity_results):
+            task = tasks[i]
+            if similarity_result.get("duplicate_of") is not None:
+                original = tasks[ready[similarity_result["duplicate_of"]]]
+                log_output.append(f"🔁 Skipping '{task['task']}': same work as '{original['task']}' in this update")
+                results[i] = (True, "Duplicate of another task in the same update")
+                continue
+            try:
+                results[i] = _apply_similarity_result(database_id, task, similarity_result, log_output, batch_mode)
+            except Exception as e:
+                error_msg = f"❌ Error in task processing: {e}"
+                log_output.append(error_msg)
+                print(error_msg)
+                print(traceback.format_exc())
+                results[i] = (False, error_msg)
+        
+        return results
+        
+    except Exception as e:
+        error_msg = f"❌ Error in task processing: {e}"
+        log_output.append(error_msg)
+        print(error_msg)
+        print(traceback.format_exc())
+        return [r if r is not None else (False, error_msg) for r in results]
+
 def batch_insert_tasks(database_id: str, tasks: list, existing_tasks: list):
     """
     Process multiple tasks efficiently in batch.
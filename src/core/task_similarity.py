@@ -10,10 +10,13 @@ from src.config.settings import (
     SIMILARITY_MODE,
     SIMILARITY_THRESHOLD,
     SIMILARITY_TOP_K,
+    SIMILARITY_AUTO_MATCH_THRESHOLD,
+    SIMILARITY_CANDIDATE_FLOOR,
     DEBUG_MODE
 )
 from src.core.chroma_embedding_manager_simple import SimpleChromaEmbeddingManager
 from src.core.ai.analyzers import TaskAnalyzer
+from src.core.task_vector_index import TaskVectorIndex, get_task_index, task_key
 
 # Initialize simplified Chroma-based embedding manager
 _chroma_manager = SimpleChromaEmbeddingManager()
@@ -30,13 +33,41 @@ def debug_print(message):
     if DEBUG_MODE:
         print(message)
 
-def find_similar_tasks(new_task: Dict[str, Any], existing_tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _search_task_index(new_task: Dict[str, Any], existing_tasks: List[Dict[str, Any]],
+                       top_k: int, threshold: float, database_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Rank existing tasks against a new task using the in-memory vector index.
+    
+    With a database_id the process-wide index for that database is reused, so
+    only tasks not seen before are embedded. Without one, a throwaway index
+    is built for this call.
+    """
+    if database_id:
+        index = get_task_index(database_id, _chroma_manager.get_batch_embeddings)
+    else:
+        index = TaskVectorIndex("adhoc", _chroma_manager.get_batch_embeddings)
+    index.sync(existing_tasks)
+    
+    query_embedding = _chroma_manager.get_embedding(new_task.get("task", ""))
+    if query_embedding is None:
+        return []
+    
+    return index.search(
+        query_embedding,
+        candidate_keys=[task_key(task) for task in existing_tasks],
+        top_k=top_k,
+        threshold=threshold
+    )
+
+def find_similar_tasks(new_task: Dict[str, Any], existing_tasks: List[Dict[str, Any]],
+                       database_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Find similar tasks using Chroma-based embeddings.
     
     Args:
         new_task: The new task to check
         existing_tasks: List of existing tasks to check against
+        database_id: Notion database the tasks belong to, enables the cached vector index
         
     Returns:
         Dict with similarity results
@@ -51,12 +82,13 @@ def find_similar_tasks(new_task: Dict[str, Any], existing_tasks: List[Dict[str,
     try:
         debug_print("Using Chroma-based similarity search...")
         
-        # Use Chroma manager to find similar tasks
-        similar_tasks = _chroma_manager.find_similar_tasks(
-            new_task=new_task,
-            existing_tasks=existing_tasks,
+        # Score against the in-memory vector index (embeddings come from Chroma)
+        similar_tasks = _search_task_index(
+            new_task,
+            existing_tasks,
             top_k=5,
-            threshold=SIMILARITY_THRESHOLD
+            threshold=SIMILARITY_THRESHOLD,
+            database_id=database_id
         )
         
         if not similar_tasks:
@@ -88,6 +120,17 @@ def find_similar_tasks(new_task: Dict[str, Any], existing_tasks: List[Dict[str,
             "explanation": f"Error in similarity search: {str(e)}"
         }
 
+def _format_for_analyzer(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a Notion task into the shape TaskAnalyzer prompts expect."""
+    return {
+        "task": task.get("task", ""),
+        "description": task.get("notes", ""),
+        "status": task.get("status", ""),
+        "employee": task.get("employee", ""),
+        "date": task.get("date", ""),
+        "category": task.get("category", "")
+    }
+
 def check_task_similarity_ai(new_task: Dict[str, Any], existing_tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Check task similarity using AI analysis.
@@ -110,17 +153,7 @@ def check_task_similarity_ai(new_task: Dict[str, Any], existing_tasks: List[Dict
         analyzer = TaskAnalyzer()
         
         # Convert tasks to the format expected by the analyzer
-        formatted_existing_tasks = []
-        for task in existing_tasks:
-            formatted_task = {
-                "task": task.get("task", ""),
-                "description": task.get("notes", ""),
-                "status": task.get("status", ""),
-                "employee": task.get("employee", ""),
-                "date": task.get("date", ""),
-                "category": task.get("category", "")
-            }
-            formatted_existing_tasks.append(formatted_task)
+        formatted_existing_tasks = [_format_for_analyzer(task) for task in existing_tasks]
         
         # Analyze similarity
         result = analyzer.analyze_task_similarity(
@@ -139,13 +172,15 @@ def check_task_similarity_ai(new_task: Dict[str, Any], existing_tasks: List[Dict
             "explanation": f"Error in AI analysis: {str(e)}"
         }
 
-def check_task_similarity(new_task: Dict[str, Any], existing_tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+def check_task_similarity(new_task: Dict[str, Any], existing_tasks: List[Dict[str, Any]],
+                          database_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Check if a new task is similar to any existing tasks.
     
     Args:
         new_task: The new task to check
         existing_tasks: List of existing tasks to check against
+        database_id: Notion database the tasks belong to, enables the cached vector index
         
     Returns:
         Dict with similarity results
@@ -159,9 +194,11 @@ def check_task_similarity(new_task: Dict[str, Any], existing_tasks: List[Dict[st
     
     # Use the configured similarity mode
     debug_print(f"Using {SIMILARITY_MODE} mode for task similarity check")
-    return check_task_similarity_mode(new_task, existing_tasks, mode=SIMILARITY_MODE, top_k=SIMILARITY_TOP_K)
+    return check_task_similarity_mode(new_task, existing_tasks, mode=SIMILARITY_MODE, top_k=SIMILARITY_TOP_K,
+                                      database_id=database_id)
 
-def find_top_k_similar_tasks(new_task: Dict[str, Any], existing_tasks: List[Dict[str, Any]], k: int = 5) -> List[Dict[str, Any]]:
+def find_top_k_similar_tasks(new_task: Dict[str, Any], existing_tasks: List[Dict[str, Any]], k: int = 5,
+                             database_id: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Find the top-k most similar tasks using Chroma-based embeddings.
     Returns a list of dicts with 'task' and 'similarity'.
@@ -170,12 +207,13 @@ def find_top_k_similar_tasks(new_task: Dict[str, Any], existing_tasks: List[Dict
         return []
     
     try:
-        # Use Chroma manager to find top-k similar tasks
-        similar_tasks = _chroma_manager.find_similar_tasks(
-            new_task=new_task,
-            existing_tasks=existing_tasks,
+        # Use the in-memory vector index to find top-k similar tasks
+        similar_tasks = _search_task_index(
+            new_task,
+            existing_tasks,
             top_k=k,
-            threshold=0.0  # No threshold for top-k search
+            threshold=0.0,  # No threshold for top-k search
+            database_id=database_id
         )
         
         # Format results
@@ -193,7 +231,8 @@ def find_top_k_similar_tasks(new_task: Dict[str, Any], existing_tasks: List[Dict
         debug_print(traceback.format_exc())
         return []
 
-def check_task_similarity_mode(new_task: Dict[str, Any], existing_tasks: List[Dict[str, Any]], mode: str = 'embedding', top_k: int = 5) -> Dict[str, Any]:
+def check_task_similarity_mode(new_task: Dict[str, Any], existing_tasks: List[Dict[str, Any]], mode: str = 'embedding', top_k: int = 5,
+                               database_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Flexible similarity checker: 'embedding', 'ai', or 'hybrid'.
     - 'embedding': Chroma-based embedding search
@@ -208,12 +247,12 @@ def check_task_similarity_mode(new_task: Dict[str, Any], existing_tasks: List[Di
         }
     
     if mode == 'embedding':
-        return find_similar_tasks(new_task, existing_tasks)
+        return find_similar_tasks(new_task, existing_tasks, database_id=database_id)
     elif mode == 'ai':
         return check_task_similarity_ai(new_task, existing_tasks)
     elif mode == 'hybrid':
         # 1. Get top_k candidates by Chroma embedding
-        top_candidates = find_top_k_similar_tasks(new_task, existing_tasks, k=top_k)
+        top_candidates = find_top_k_similar_tasks(new_task, existing_tasks, k=top_k, database_id=database_id)
         candidate_tasks = [c['task'] for c in top_candidates]
         # 2. Use LLM to compare only those
         return check_task_similarity_ai(new_task, candidate_tasks)
@@ -224,6 +263,145 @@ def check_task_similarity_mode(new_task: Dict[str, Any], existing_tasks: List[Di
             "explanation": f"Unknown mode: {mode}"
         }
 
+def check_task_similarity_batch(new_tasks: List[Dict[str, Any]], existing_tasks: List[Dict[str, Any]],
+                                database_id: Optional[str] = None, mode: Optional[str] = None,
+                                top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Check all tasks extracted from one update against the existing tasks at once.
+    
+    All new tasks are embedded in one call and scored against the vector index
+    with one matrix multiply. In hybrid mode, only tasks whose best candidate is
+    ambiguous (between SIMILARITY_CANDIDATE_FLOOR and SIMILARITY_AUTO_MATCH_THRESHOLD)
+    go to the LLM, together in a single prompt. Tasks that repeat an earlier task
+    of the same batch are collapsed and flagged with "duplicate_of".
+    
+    Args:
+        new_tasks: Tasks extracted from one update
+        existing_tasks: List of existing tasks to check against
+        database_id: Notion database the tasks belong to, enables the cached vector index
+        mode: 'embedding', 'ai' or 'hybrid' (defaults to SIMILARITY_MODE)
+        top_k: Candidates per task in hybrid mode (defaults to SIMILARITY_TOP_K)
+        
+    Returns:
+        List of similarity results aligned with new_tasks. A result with
+        "duplicate_of" set holds the batch position of the task it repeats.
+    """
+    mode = mode or SIMILARITY_MODE
+    top_k = top_k or SIMILARITY_TOP_K
+    results: List[Optional[Dict[str, Any]]] = [None] * len(new_tasks)
+    
+    valid = []
+    for i, task in enumerate(new_tasks):
+        if not task or not (task.get("task") or "").strip():
+            results[i] = {"is_match": False, "confidence": 0.0, "explanation": "Invalid task"}
+        else:
+            valid.append(i)
+    if not valid:
+        return results
+    
+    try:
+        # 1. One encoder call for every task in the batch
+        embeddings = _chroma_manager.get_batch_embeddings(
+            list(dict.fromkeys(new_tasks[i]["task"] for i in valid))
+        )
+        embedded = [i for i in valid if new_tasks[i]["task"] in embeddings]
+        for i in valid:
+            if new_tasks[i]["task"] not in embeddings:
+                results[i] = {"is_match": False, "confidence": 0.0, "explanation": "Could not embed task"}
+        if not embedded:
+            return results
+        
+        # 2. Collapse tasks that repeat an earlier task of the same batch
+        queries = np.vstack([np.asarray(embeddings[new_tasks[i]["task"]], dtype=np.float32) for i in embedded])
+        unit = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        pair_similarity = 1.0 / (1.0 + np.maximum(2.0 - 2.0 * (unit @ unit.T), 0.0))
+        unique_rows = []
+        for row, i in enumerate(embedded):
+            earlier = [r for r in unique_rows if pair_similarity[row, r] >= SIMILARITY_AUTO_MATCH_THRESHOLD]
+            if earlier:
+                best = max(earlier, key=lambda r: pair_similarity[row, r])
+                results[i] = {
+                    "is_match": False,
+                    "duplicate_of": embedded[best],
+                    "confidence": float(pair_similarity[row, best]),
+                    "explanation": f"Duplicate of '{new_tasks[embedded[best]]['task']}' in the same update"
+                }
+            else:
+                unique_rows.append(row)
+        
+        unique = [embedded[r] for r in unique_rows]
+        if not existing_tasks:
+            for i in unique:
+                results[i] = {"is_match": False, "confidence": 0.0, "explanation": "No tasks to compare"}
+            return results
+        
+        if mode == 'ai':
+            # LLM-only mode compares against every existing task; nothing to share
+            for i in unique:
+                results[i] = check_task_similarity_ai(new_tasks[i], existing_tasks)
+            return results
+        if mode not in ('embedding', 'hybrid'):
+            for i in unique:
+                results[i] = {"is_match": False, "confidence": 0.0, "explanation": f"Unknown mode: {mode}"}
+            return results
+        
+        # 3. One matrix multiply against the existing tasks
+        if database_id:
+            index = get_task_index(database_id, _chroma_manager.get_batch_embeddings)
+        else:
+            index = TaskVectorIndex("adhoc", _chroma_manager.get_batch_embeddings)
+        index.sync(existing_tasks)
+        matches = index.search_many(
+            [queries[r] for r in unique_rows],
+            candidate_keys=[task_key(task) for task in existing_tasks],
+            top_k=5 if mode == 'embedding' else top_k,
+            threshold=SIMILARITY_THRESHOLD if mode == 'embedding' else SIMILARITY_CANDIDATE_FLOOR
+        )
+        
+        ambiguous = []
+        for i, candidates in zip(unique, matches):
+            if not candidates:
+                results[i] = {"is_match": False, "confidence": 0.0, "explanation": "No similar tasks found"}
+            elif mode == 'embedding' or candidates[0]["similarity"] >= SIMILARITY_AUTO_MATCH_THRESHOLD:
+                best = candidates[0]
+                results[i] = {
+                    "is_match": True,
+                    "confidence": best["similarity"],
+                    "matched_task": best["task"],
+                    "explanation": f"Found similar task: '{best['task']['task']}' with {best['similarity']:.1%} similarity"
+                }
+            else:
+                ambiguous.append((i, [c["task"] for c in candidates]))
+        
+        # 4. One LLM call for all ambiguous hybrid candidates
+        if ambiguous:
+            debug_print(f"Sending {len(ambiguous)} ambiguous tasks to the LLM in one prompt")
+            comparisons = []
+            for i, candidates in ambiguous:
+                comparisons.append({
+                    "new_task": new_tasks[i],
+                    "existing_tasks": [_format_for_analyzer(task) for task in candidates]
+                })
+            analyzed = TaskAnalyzer().analyze_task_similarity_batch(comparisons)
+            for (i, candidates), comparison, result in zip(ambiguous, comparisons, analyzed):
+                # Map the analyzer's formatted copy back to the Notion task (keeps the id)
+                originals = {id(f): task for f, task in zip(comparison["existing_tasks"], candidates)}
+                result["matched_task"] = originals.get(id(result.get("matched_task")))
+                if result["is_match"] and result["matched_task"] is None:
+                    result["is_match"] = False
+                results[i] = result
+        
+        return results
+        
+    except Exception as e:
+        debug_print(f"Error in batch similarity check: {e}")
+        debug_print(traceback.format_exc())
+        return [r if r is not None else {
+            "is_match": False,
+            "confidence": 0.0,
+            "explanation": f"Error in batch similarity check: {str(e)}"
+        } for r in results]
+
 def get_chroma_stats() -> Dict[str, Any]:
     """Get statistics about the Chroma embedding collection."""
     try:
@@ -0,0 +1,295 @@
+"""
+In-process vector index for task similarity.
+
+Keeps one normalized float32 matrix per Notion database so that similarity
+lookups are a single matrix-vector product instead of per-call Chroma
+round trips. Chroma remains the durable embedding store; the index only
+asks it for embeddings of rows it has not seen yet.
+"""
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Callable that maps a list of texts to {text: embedding}
+EmbeddingProvider = Callable[[List[str]], Dict[str, np.ndarray]]
+
+
+def task_key(task: Dict[str, Any]) -> str:
+    """Return the row key for a task: its Notion id, or its text if it has none."""
+    return task.get("id") or f"text:{task.get('task', '')}"
+
+
+class TaskVectorIndex:
+    """
+    Normalized embedding matrix for the tasks of one Notion database.
+
+    Rows are appended as tasks are seen and overwritten in place when a
+    task's text changes. Inserts and updates coming from NotionService are
+    queued and embedded lazily in one batch on the next search.
+    """
+
+    def __init__(self, database_id: str, embed_texts: EmbeddingProvider):
+        """
+        Initialize an empty index.
+
+        Args:
+            database_id: The Notion database this index mirrors
+            embed_texts: Batch embedding function (e.g. the Chroma manager's get_batch_embeddings)
+        """
+        self.database_id = database_id
+        self._embed_texts = embed_texts
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+        self._row_by_key: Dict[str, int] = {}
+        self._texts: List[str] = []
+        self._tasks: List[Dict[str, Any]] = []
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._row_by_key or key in self._pending
+
+    def upsert(self, task: Dict[str, Any]):
+        """Queue a task for (re-)indexing on the next search."""
+        if not task or not (task.get("task") or "").strip():
+            return
+        with self._lock:
+            self._pending[task_key(task)] = task
+
+    def remove(self, key: str):
+        """Drop a row by moving the last row into its slot."""
+        with self._lock:
+            self._pending.pop(key, None)
+            row = self._row_by_key.pop(key, None)
+            if row is None:
+                return
+            last = self._size - 1
+            if row != last:
+                moved_task = self._tasks[last]
+                self._matrix[row] = self._matrix[last]
+                self._texts[row] = self._texts[last]
+                self._tasks[row] = moved_task
+                self._row_by_key[task_key(moved_task)] = row
+            self._texts.pop()
+            self._tasks.pop()
+            self._size = last
+
+    def sync(self, tasks: List[Dict[str, Any]]):
+        """
+        Make sure every task in `tasks` is indexed with its current text.
+
+        Only tasks that are new or whose text changed are embedded, in a
+        single batch call.
+        """
+        with self._lock:
+            for task in tasks:
+                text = (task.get("task") or "").strip()
+                if not text:
+                    continue
+                key = task_key(task)
+                row = self._row_by_key.get(key)
+                if row is None or self._texts[row] != task.get("task"):
+                    self._pending[key] = task
+                else:
+                    # Keep the latest field values (status, notes, ...) for callers
+                    self._tasks[row] = task
+            self._flush_pending()
+
+    def search(self,
+               query_embedding: np.ndarray,
+               candidate_keys: Optional[List[str]] = None,
+               top_k: int = 5,
+               threshold: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Score the query against the index with one matrix-vector product.
+
+        Scores are reported the same way as SimpleChromaEmbeddingManager:
+        `distance` is squared L2 between unit vectors and
+        `similarity = 1 / (1 + distance)`, so SIMILARITY_THRESHOLD keeps its meaning.
+
+        Args:
+            query_embedding: Embedding of the new task
+            candidate_keys: Restrict results to these row keys (None = whole index)
+            top_k: Number of top results to return
+            threshold: Minimum similarity (0-1)
+
+        Returns:
+            List[Dict[str, Any]]: Matches with task, similarity, distance and rank
+        """
+        if query_embedding is None:
+            return []
+        return self.search_many([query_embedding], candidate_keys, top_k, threshold)[0]
+
+    def search_many(self,
+                    query_embeddings: List[np.ndarray],
+                    candidate_keys: Optional[List[str]] = None,
+                    top_k: int = 5,
+                    threshold: float = 0.0) -> List[List[Dict[str, Any]]]:
+        """
+        Score several queries against the index with one matrix multiply.
+
+        Same scoring as `search`; returns one result list per query, in order.
+        """
+        with self._lock:
+            self._flush_pending()
+            empty = [[] for _ in query_embeddings]
+            if self._size == 0 or not query_embeddings:
+                return empty
+
+            queries = _normalize(np.vstack([
+                np.asarray(q, dtype=np.float32).reshape(1, -1) for q in query_embeddings
+            ]))
+            if queries.shape[1] != self._matrix.shape[1]:
+                logger.warning(f"Query dimension {queries.shape[1]} does not match index dimension {self._matrix.shape[1]}")
+                return empty
+
+            if candidate_keys is None:
+                rows = np.arange(self._size)
+                matrix = self._matrix[:self._size]
+            else:
+                rows = np.fromiter(
+                    (self._row_by_key[k] for k in dict.fromkeys(candidate_keys) if k in self._row_by_key),
+                    dtype=np.int64
+                )
+                if rows.size == 0:
+                    return empty
+                matrix = self._matrix[rows]
+
+            cosine = queries @ matrix.T
+            distances = np.maximum(2.0 - 2.0 * cosine, 0.0)
+            similarities = 1.0 / (1.0 + distances)
+
+            k = min(top_k, rows.size)
+            top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+
+            all_results = []
+            for q, candidates in enumerate(top):
+                order = candidates[np.argsort(-similarities[q, candidates], kind="stable")]
+                results = []
+                for rank, i in enumerate(order, start=1):
+                    similarity = float(similarities[q, i])
+                    if similarity < threshold:
+                        break
+                    results.append({
+                        "task": self._tasks[rows[i]],
+                        "similarity": similarity,
+                        "distance": float(distances[q, i]),
+                        "rank": rank
+                    })
+                all_results.append(results)
+            return all_results
+
+    def _flush_pending(self):
+        """Embed queued tasks in one batch and write them into the matrix."""
+        if not self._pending:
+            return
+        pending = list(self._pending.values())
+        self._pending = {}
+
+        embeddings = self._embed_texts(list(dict.fromkeys(t["task"] for t in pending)))
+        vectors, keep = [], []
+        for task in pending:
+            embedding = embeddings.get(task["task"])
+            if embedding is None:
+                logger.warning(f"No embedding available for task: {task['task'][:50]}...")
+                continue
+            vectors.append(np.asarray(embedding, dtype=np.float32))
+            keep.append(task)
+        if not vectors:
+            return
+
+        vectors = _normalize(np.vstack(vectors))
+        if self._matrix is None:
+            self._matrix = np.empty((max(len(keep), 64), vectors.shape[1]), dtype=np.float32)
+
+        for task, vector in zip(keep, vectors):
+            key = task_key(task)
+            row = self._row_by_key.get(key)
+            if row is None:
+                row = self._size
+                if row == self._matrix.shape[0]:
+                    grown = np.empty((row * 2, self._matrix.shape[1]), dtype=np.float32)
+                    grown[:row] = self._matrix[:row]
+                    self._matrix = grown
+                self._row_by_key[key] = row
+                self._texts.append(task["task"])
+                self._tasks.append(task)
+                self._size += 1
+            else:
+                self._texts[row] = task["task"]
+                self._tasks[row] = task
+            self._matrix[row] = vector
+
+        logger.debug(f"Indexed {len(keep)} tasks for database {self.database_id} ({self._size} rows)")
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize the rows of a matrix, leaving zero rows untouched."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+# Global per-database index registry
+_indexes: Dict[str, TaskVectorIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def get_task_index(database_id: str, embed_texts: EmbeddingProvider) -> TaskVectorIndex:
+    """
+    Get the process-wide index for a Notion database, creating it on first use.
+
+    Args:
+        database_id: The Notion database id
+        embed_texts: Batch embedding function used if the index has to be created
+
+    Returns:
+        TaskVectorIndex: The index for that database.
+    """
+    with _registry_lock:
+        index = _indexes.get(database_id)
+        if index is None:
+            index = TaskVectorIndex(database_id, embed_texts)
+            _indexes[database_id] = index
+        return index
+
+
+def record_task_upsert(database_id: Optional[str], task: Optional[Dict[str, Any]]):
+    """
+    Keep the index for `database_id` in step with a Notion insert or update.
+
+    When `database_id` is None (NotionService.update_task only knows the
+    page id), the task is routed to whichever index already holds it.
+    Nothing happens if no index has been built for the database yet.
+    """
+    if not task or not task.get("id"):
+        return
+    with _registry_lock:
+        if database_id:
+            index = _indexes.get(database_id)
+        else:
+            index = next((i for i in _indexes.values() if task["id"] in i), None)
+    if index is not None:
+        index.upsert(task)
+
+
+def record_task_delete(task_id: str):
+    """Remove an archived Notion task from whichever index holds it."""
+    with _registry_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.remove(task_id)
+
+
+def reset_task_indexes():
+    """Drop all in-memory indexes (useful for testing)."""
+    with _registry_lock:
+        _indexes.clear()
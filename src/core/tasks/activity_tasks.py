@@ -2,7 +2,7 @@
 Celery tasks for activity recognition and tracking.
 """
 from src.utils.celery_config import celery_app
-from src.core.database.connection import SessionLocal
+from src.core.database.connection import get_session_factory
 from src.core.activity_recognition.recognition_service import ActivityRecognitionService
 from src.core.logging_config import get_logger
 
@@ -26,7 +26,7 @@ def recognize_activity_for_task(self, user_id: str, task_id: str, task_title: st
         logger.info(f"Starting activity recognition for task {task_id} (user: {user_id})")
         
         # Get database session
-        db_session = SessionLocal()
+        db_session = get_session_factory()()
         
         # Initialize recognition service
         recognition_service = ActivityRecognitionService(user_id, db_session)
@@ -80,7 +80,7 @@ def generate_user_activity_summary(self, user_id: str):
         logger.info(f"Generating activity summary for user {user_id}")
         
         # Get database session
-        db_session = SessionLocal()
+        db_session = get_session_factory()()
         
         # Initialize recognition service
         recognition_service = ActivityRecognitionService(user_id, db_session)
@@ -123,7 +123,7 @@ def cleanup_old_activities():
         logger.info("Starting cleanup of old activities")
         
         # Get database session
-        db_session = SessionLocal()
+        db_session = get_session_factory()()
         
         # This would implement cleanup logic
         # For example, remove activities that haven't been updated in 6 months
@@ -0,0 +1,107 @@
+"""
+Celery tasks for email archive maintenance.
+
+These run on the 'archive' queue (see celery_config) so long maintenance runs
+never occupy the workers that process incoming email.
+"""
+from datetime import datetime
+from typing import Any, Dict
+
+from src.config.settings import HOT_STORAGE_DAYS, COLD_STORAGE_DAYS, ARCHIVE_MOVE_MAX_SECONDS
+from src.core.logging_config import get_logger
+from src.core.services.celery_config import celery_app
+
+logger = get_logger(__name__)
+
+
+@celery_app.task(name='core.tasks.email_archive_tasks.move_to_cold_storage_async')
+def move_to_cold_storage_async(days_threshold: int = HOT_STORAGE_DAYS,
+                               max_seconds: int = ARCHIVE_MOVE_MAX_SECONDS) -> Dict[str, Any]:
+    """
+    Move old emails from hot to cold storage in batches, within a time budget.
+
+    A run that hits its budget leaves a checkpoint; the next scheduled run
+    resumes from it.
+
+    Args:
+        days_threshold: Emails received more than this many days ago are moved
+        max_seconds: Time budget for this run
+
+    Returns:
+        Dict containing the run metrics (rows moved, rows/sec, lag)
+    """
+    try:
+        from src.core.services.email_archive_service import get_email_archive_service
+
+        mover = get_email_archive_service().get_cold_storage_mover(max_seconds=max_seconds)
+        metrics = mover.run(days_threshold)
+        return {
+            'success': True,
+            'metrics': metrics,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        logger.error(f"Error moving emails to cold storage: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+@celery_app.task(name='core.tasks.email_archive_tasks.cleanup_old_emails_async')
+def cleanup_old_emails_async(days_threshold: int = COLD_STORAGE_DAYS) -> Dict[str, Any]:
+    """
+    Permanently delete emails older than the threshold from cold storage.
+
+    Args:
+        days_threshold: Number of days after which emails are deleted
+
+    Returns:
+        Dict containing the number of emails deleted
+    """
+    try:
+        from src.core.services.email_archive_service import get_email_archive_service
+
+        deleted_count = get_email_archive_service().cleanup_old_emails(days_threshold)
+        return {
+            'success': True,
+            'deleted_count': deleted_count,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        logger.error(f"Error cleaning up old emails: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+@celery_app.task(name='core.tasks.email_archive_tasks.sweep_orphan_bodies_async')
+def sweep_orphan_bodies_async() -> Dict[str, Any]:
+    """
+    Remove email body files that no archived email references.
+
+    Returns:
+        Dict containing the number of files removed
+    """
+    try:
+        from src.core.services.email_archive_service import get_email_archive_service
+
+        removed = get_email_archive_service().sweep_orphan_bodies()
+        return {
+            'success': True,
+            'removed_files': removed,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        logger.error(f"Error sweeping orphan email bodies: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }
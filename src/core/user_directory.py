@@ -0,0 +1,295 @@
+"""
+Process-wide directory of users, indexed by user id and by email.
+
+Authenticated requests and inbound emails both need the user record (task
+database id, display name) and would otherwise query the Notion users
+database every time. AuthService instances are created all over the code
+base, so the directory is shared by every instance in the process (or by
+every process when the Redis backend is enabled).
+
+Entries expire after a TTL and are invalidated explicitly when a user is
+updated, deactivated or registered. Unknown emails and ids are cached too,
+with a shorter TTL, so mail from unregistered senders does not hit Notion
+on every message. Password hashes are never cached; login always reads the
+user from Notion.
+"""
+import dataclasses
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from src.config.settings import (
+    USER_DIRECTORY_BACKEND,
+    USER_DIRECTORY_TTL_SECONDS,
+    USER_DIRECTORY_NEGATIVE_TTL_SECONDS,
+    USER_DIRECTORY_MAX_USERS,
+    USER_DIRECTORY_REDIS_URL
+)
+from src.core.logging_config import get_logger
+from src.core.models.user import User
+
+logger = get_logger(__name__)
+
+# Returned by lookups when the directory knows nothing about the key
+MISS = object()
+
+# Redis value marking a known-missing user
+_ABSENT = ""
+
+
+def normalize_email(email: Optional[str]) -> str:
+    """Emails are matched case-insensitively."""
+    return (email or "").strip().lower()
+
+
+def _to_record(user: User) -> Dict[str, Any]:
+    record = user.to_dict()
+    record['password_hash'] = ""
+    return record
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at")
+
+    def __init__(self, value, expires_at: float):
+        self.value = value
+        self.expires_at = expires_at
+
+
+class UserDirectory:
+    """User cache keyed by id and email, with TTL, negative caching and LRU eviction."""
+
+    def __init__(self,
+                 ttl_seconds: int = USER_DIRECTORY_TTL_SECONDS,
+                 negative_ttl_seconds: int = USER_DIRECTORY_NEGATIVE_TTL_SECONDS,
+                 max_users: int = USER_DIRECTORY_MAX_USERS,
+                 redis_client=None):
+        """
+        Initialize the directory.
+
+        Args:
+            ttl_seconds: Lifetime of a cached user
+            negative_ttl_seconds: Lifetime of a "no such user" entry
+            max_users: Entries kept per index before LRU eviction (memory backend)
+            redis_client: Optional redis.Redis; when given, entries live in Redis
+        """
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_users = max_users
+        self.redis_client = redis_client
+        # user_id -> User (or None); email -> user_id (or None)
+        self._by_id: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._by_email: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # --- Public API ---
+
+    def get_by_id(self, user_id: str):
+        """Return the cached User, None if known not to exist, or MISS."""
+        if not user_id:
+            return MISS
+        if self.redis_client is not None:
+            result = self._redis_get_user(user_id)
+        else:
+            with self._lock:
+                result = self._memory_get(self._by_id, user_id)
+        return self._count(result)
+
+    def get_by_email(self, email: str):
+        """Return the cached User, None if known not to exist, or MISS."""
+        key = normalize_email(email)
+        if not key:
+            return MISS
+        if self.redis_client is not None:
+            user_id = self._redis_call("read", self.redis_client.get, self._redis_key("email", key))
+            if user_id is None:
+                result = MISS
+            elif user_id == _ABSENT:
+                result = None
+            else:
+                result = self._redis_get_user(user_id)
+        else:
+            with self._lock:
+                user_id = self._memory_get(self._by_email, key)
+                if user_id is MISS or user_id is None:
+                    result = user_id
+                else:
+                    result = self._memory_get(self._by_id, user_id)
+        return self._count(result)
+
+    def set_user(self, user: User):
+        """Cache a user under both its id and its email."""
+        record = _to_record(user)
+        cached = User.from_dict(record)
+        email = normalize_email(user.email)
+        if self.redis_client is not None:
+            def write():
+                pipe = self.redis_client.pipeline()
+                pipe.set(self._redis_key("id", user.user_id), json.dumps(record), ex=self.ttl_seconds)
+                if email:
+                    pipe.set(self._redis_key("email", email), user.user_id, ex=self.ttl_seconds)
+                pipe.execute()
+            self._redis_call("write", write)
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._memory_set(self._by_id, user.user_id, _Entry(cached, expires_at))
+            if email:
+                self._memory_set(self._by_email, email, _Entry(user.user_id, expires_at))
+
+    def set_missing(self, user_id: Optional[str] = None, email: Optional[str] = None):
+        """Remember, briefly, that no user has this id or email."""
+        email = normalize_email(email)
+        if self.redis_client is not None:
+            def write():
+                pipe = self.redis_client.pipeline()
+                if user_id:
+                    pipe.set(self._redis_key("id", user_id), _ABSENT, ex=self.negative_ttl_seconds)
+                if email:
+                    pipe.set(self._redis_key("email", email), _ABSENT, ex=self.negative_ttl_seconds)
+                pipe.execute()
+            self._redis_call("write", write)
+            return
+        expires_at = time.monotonic() + self.negative_ttl_seconds
+        with self._lock:
+            if user_id:
+                self._memory_set(self._by_id, user_id, _Entry(None, expires_at))
+            if email:
+                self._memory_set(self._by_email, email, _Entry(None, expires_at))
+
+    def invalidate(self, user_id: Optional[str] = None, email: Optional[str] = None):
+        """Forget a user by id and/or email, or everything when neither is given."""
+        email = normalize_email(email)
+        if self.redis_client is not None:
+            keys = []
+            if user_id:
+                keys.append(self._redis_key("id", user_id))
+            if email:
+                keys.append(self._redis_key("email", email))
+            if keys:
+                self._redis_call("invalidate", self.redis_client.delete, *keys)
+            return
+        with self._lock:
+            if not user_id and not email:
+                self._by_id.clear()
+                self._by_email.clear()
+                return
+            if user_id:
+                entry = self._by_id.pop(user_id, None)
+                # Also drop the email index entry of the cached user (the email may have changed)
+                if entry is not None and entry.value is not None:
+                    self._by_email.pop(normalize_email(entry.value.email), None)
+            if email:
+                self._by_email.pop(email, None)
+
+    def preload(self, users: Iterable[User]) -> int:
+        """Cache a full user list (e.g. from AuthService.get_all_users). Returns the count."""
+        count = 0
+        for user in users:
+            if user.user_id:
+                self.set_user(user)
+                count += 1
+        logger.info(f"Preloaded {count} users into the user directory")
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of cached users."""
+        total = self.hits + self.misses
+        return {
+            "backend": "redis" if self.redis_client is not None else "memory",
+            "users": len(self._by_id),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    # --- Memory backend ---
+
+    def _count(self, result):
+        if result is MISS:
+            self.misses += 1
+            return result
+        self.hits += 1
+        # Callers get their own copy; the cached user must not change under other requests
+        return dataclasses.replace(result) if result is not None else None
+
+    def _memory_get(self, index: "OrderedDict[str, _Entry]", key: str):
+        entry = index.get(key)
+        if entry is None:
+            return MISS
+        if entry.expires_at <= time.monotonic():
+            del index[key]
+            return MISS
+        index.move_to_end(key)
+        return entry.value
+
+    def _memory_set(self, index: "OrderedDict[str, _Entry]", key: str, entry: _Entry):
+        index[key] = entry
+        index.move_to_end(key)
+        while len(index) > self.max_users:
+            index.popitem(last=False)
+
+    # --- Redis backend ---
+
+    def _redis_key(self, kind: str, key: str) -> str:
+        return f"user_directory:{kind}:{key}"
+
+    def _redis_call(self, action: str, func, *args):
+        try:
+            return func(*args)
+        except Exception as e:
+            logger.warning(f"User directory {action} error: {e}")
+            return None
+
+    def _redis_get_user(self, user_id: str):
+        raw = self._redis_call("read", self.redis_client.get, self._redis_key("id", user_id))
+        if raw is None:
+            return MISS
+        if raw == _ABSENT:
+            return None
+        return User.from_dict(json.loads(raw))
+
+
+def _initialize_redis():
+    """Connect to Redis for the shared user directory, or return None to stay in memory."""
+    try:
+        import redis
+        client = redis.Redis.from_url(
+            USER_DIRECTORY_REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5
+        )
+        client.ping()
+        logger.info("User directory using Redis backend")
+        return client
+    except ImportError:
+        logger.warning("Redis package not installed. User directory will stay in memory.")
+    except Exception as e:
+        logger.warning(f"Failed to connect to Redis: {e}. User directory will stay in memory.")
+    return None
+
+
+# Global user directory instance
+_user_directory = None
+_user_directory_lock = threading.Lock()
+
+
+def get_user_directory() -> UserDirectory:
+    """
+    Get the process-wide user directory.
+
+    Returns:
+        UserDirectory: The shared directory, Redis-backed when USER_DIRECTORY_BACKEND is 'redis'.
+    """
+    global _user_directory
+    if _user_directory is None:
+        with _user_directory_lock:
+            if _user_directory is None:
+                redis_client = _initialize_redis() if USER_DIRECTORY_BACKEND == "redis" else None
+                _user_directory = UserDirectory(redis_client=redis_client)
+    return _user_directory
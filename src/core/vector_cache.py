@@ -0,0 +1,472 @@
+"""
+Memory-mapped float32 vector cache, keyed by EmbeddingBackend.cache_key().
+
+A generation <g> of the cache is four flat files in the cache directory:
+
+    vectors.<g>.f32   one row of `dimension` float32 per entry, append-only
+    keys.<g>.bin      the entry's 32-character hex key, parallel to vectors
+    used.<g>.u4       last use of the entry (epoch seconds, uint32)
+    order.<g>.u4      row numbers sorted by key: the lookup index
+
+plus CURRENT, a small JSON file naming the live generation, its dimension
+and the backend namespace. Opening the cache maps these files; nothing is
+parsed, so a warm start costs the same for ten or a hundred thousand
+entries. Keys are found by binary search through the index; rows appended
+since the index was last written are kept in a small dict.
+
+One process at a time holds the writer lock and appends. Every other
+process (or any process with VECTOR_CACHE_READONLY) maps the same files
+read-only and picks up appended rows and new generations as they appear.
+When the writer's file outgrows max_entries, it copies the most recently
+used entries into the next generation, switches CURRENT and removes the old
+files; readers keep their old mappings until they notice the switch.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config.settings import (
+    LOCAL_EMBEDDING_DIMENSION,
+    VECTOR_CACHE_DIR,
+    VECTOR_CACHE_MAX_ENTRIES,
+    VECTOR_CACHE_COMPACT_SLACK,
+    VECTOR_CACHE_READONLY
+)
+from src.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_KEY_DTYPE = np.dtype("S32")
+_USED_DTYPE = np.dtype("<u4")
+_ROW_DTYPE = np.dtype("<u4")
+
+# Appended rows buffered before the files are flushed and remapped
+_MAX_PENDING = 1024
+
+# Rows outside the sorted index before the index is rewritten
+_MAX_UNINDEXED = 4096
+
+# Readers look for appended rows or a new generation at most this often
+_REFRESH_SECONDS = 1.0
+
+# Rows copied per step while compacting
+_COPY_ROWS = 4096
+
+
+def _encode_key(key: str) -> bytes:
+    raw = key.encode("ascii")
+    if len(raw) != _KEY_DTYPE.itemsize:
+        raise ValueError(f"Vector cache keys are {_KEY_DTYPE.itemsize}-character hex digests, got {key!r}")
+    return raw
+
+
+def _atomic_write(path: str, data: bytes):
+    """Write a file so readers see either the old or the new contents."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _map(path: str, dtype: np.dtype, rows: int, width: int = 1, writable: bool = False) -> np.ndarray:
+    """Map the first rows of a flat file (an empty array when there are none)."""
+    shape = (rows, width) if width > 1 else (rows,)
+    if rows == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r+" if writable else "r", shape=shape)
+
+
+def _rows_in(path: str, row_bytes: int) -> int:
+    try:
+        return os.path.getsize(path) // row_bytes
+    except OSError:
+        return 0
+
+
+class MmapVectorCache:
+    """Append-only, memory-mapped vector store with generational LRU compaction."""
+
+    def __init__(self,
+                 directory: str = VECTOR_CACHE_DIR,
+                 dimension: int = LOCAL_EMBEDDING_DIMENSION,
+                 namespace: str = "",
+                 max_entries: int = VECTOR_CACHE_MAX_ENTRIES,
+                 compact_slack: float = VECTOR_CACHE_COMPACT_SLACK,
+                 readonly: bool = VECTOR_CACHE_READONLY):
+        """
+        Open (or create) the cache.
+
+        Args:
+            directory: Cache directory
+            dimension: Vector dimension; a cache of another dimension is discarded
+            namespace: Embedding backend name; a cache of another backend is discarded
+            max_entries: Entries kept by a compaction
+            compact_slack: Fraction of max_entries the files may grow past before compacting
+            readonly: Only read; never append or compact
+        """
+        self.directory = directory
+        self.dimension = dimension
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.compact_at = int(max_entries * (1 + compact_slack))
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._files: Dict[str, Any] = {}
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+            readonly = not self._acquire_writer_lock()
+        self.readonly = readonly
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+        self._generation = -1
+        self._reset_maps()
+        self._open()
+
+    # --- Files ---
+
+    def _path(self, kind: str, generation: Optional[int] = None) -> str:
+        generation = self._generation if generation is None else generation
+        suffix = {"vectors": "f32", "keys": "bin", "used": "u4", "order": "u4"}[kind]
+        return os.path.join(self.directory, f"{kind}.{generation}.{suffix}")
+
+    def _acquire_writer_lock(self) -> bool:
+        """Take the cross-process writer lock; False when another process holds it."""
+        try:
+            import fcntl
+        except ImportError:
+            return True  # No flock (Windows): run one writer per cache directory
+        lock_file = open(os.path.join(self.directory, "writer.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            logger.info(f"Vector cache {self.directory} has a writer in another process; opening read-only")
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _read_current(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.directory, "CURRENT")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_current(self, generation: int):
+        meta = {"generation": generation, "dimension": self.dimension, "namespace": self.namespace}
+        _atomic_write(os.path.join(self.directory, "CURRENT"), json.dumps(meta).encode())
+
+    def _reset_maps(self):
+        self._rows = 0
+        self._vectors = _map("", np.float32, 0, self.dimension)
+        self._keys = _map("", _KEY_DTYPE, 0)
+        self._used = _map("", _USED_DTYPE, 0)
+        self._order = _map("", _ROW_DTYPE, 0)
+        self._unindexed: Dict[bytes, int] = {}
+        self._pending: Dict[bytes, Tuple[np.ndarray, int]] = {}
+        self._last_refresh = time.monotonic()
+
+    def _open(self):
+        """Map the live generation, starting a new one when there is none or it does not match."""
+        meta = self._read_current()
+        usable = (meta is not None
+                  and meta.get("dimension") == self.dimension
+                  and meta.get("namespace") == self.namespace)
+        if not usable:
+            if self.readonly:
+                self._generation = -1
+                self._reset_maps()
+                return
+            generation = meta["generation"] + 1 if meta else 0
+            if meta is not None:
+                logger.info(f"Discarding vector cache generation {meta['generation']} (other model or dimension)")
+                self._remove_generation(meta["generation"])
+            self._generation = generation
+            for kind in ("vectors", "keys", "used", "order"):
+                open(self._path(kind), "wb").close()
+            self._write_current(generation)
+        else:
+            self._generation = meta["generation"]
+        self._map_generation()
+        logger.info(f"Vector cache opened: generation {self._generation}, {self._rows} rows"
+                    f"{' (read-only)' if self.readonly else ''}")
+
+    def _map_generation(self):
+        """(Re)map the live generation's files."""
+        row_bytes = self.dimension * 4
+        rows = min(_rows_in(self._path("keys"), _KEY_DTYPE.itemsize),
+                   _rows_in(self._path("vectors"), row_bytes))
+        if not self.readonly:
+            rows = min(rows, _rows_in(self._path("used"), _USED_DTYPE.itemsize))
+            self._close_files()
+            # Drop a partially written last row so later appends stay aligned
+            for kind, width in (("vectors", row_bytes), ("keys", _KEY_DTYPE.itemsize), ("used", _USED_DTYPE.itemsize)):
+                with open(self._path(kind), "r+b") as f:
+                    f.truncate(rows * width)
+            self._files = {kind: open(self._path(kind), "ab") for kind in ("vectors", "keys", "used")}
+        self._rows = rows
+        self._vectors = _map(self._path("vectors"), np.float32, rows, self.dimension)
+        self._keys = _map(self._path("keys"), _KEY_DTYPE, rows)
+        if not self.readonly:
+            self._used = _map(self._path("used"), _USED_DTYPE, rows, writable=True)
+        indexed = min(_rows_in(self._path("order"), _ROW_DTYPE.itemsize), rows)
+        self._order = _map(self._path("order"), _ROW_DTYPE, indexed)
+        self._unindexed = {self._keys[row]: row for row in range(indexed, rows)}
+        self._last_refresh = time.monotonic()
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def _remove_generation(self, generation: int):
+        for kind in ("vectors", "keys", "used", "order"):
+            try:
+                os.remove(self._path(kind, generation))
+            except OSError:
+                pass
+
+    # --- Lookups ---
+
+    def _find_rows(self, keys: List[bytes]) -> np.ndarray:
+        """Row of each key in the mapped files, or -1."""
+        rows = np.full(len(keys), -1, dtype=np.int64)
+        indexed = len(self._order)
+        if indexed:
+            wanted = np.array(keys, dtype=_KEY_DTYPE)
+            sorted_keys = self._keys[:indexed]
+            # side='right' finds the last (newest) of repeated keys; the sort is stable
+            positions = np.searchsorted(sorted_keys, wanted, side="right", sorter=self._order) - 1
+            valid = positions >= 0
+            candidates = self._order[np.where(valid, positions, 0)].astype(np.int64)
+            found = valid & (self._keys[candidates] == wanted)
+            rows[found] = candidates[found]
+        for i, key in enumerate(keys):
+            row = self._unindexed.get(key)
+            if row is not None:
+                rows[i] = row
+        return rows
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up vectors by cache key.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Dict[str, np.ndarray]: Key -> float32 vector (a copy) for every key found
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        with self._lock:
+            if self.readonly and time.monotonic() - self._last_refresh >= _REFRESH_SECONDS:
+                self.refresh()
+            encoded = [_encode_key(key) for key in keys]
+            found: Dict[str, np.ndarray] = {}
+            now = int(time.time())
+            rows = self._find_rows(encoded)
+            hit = rows >= 0
+            if hit.any():
+                hit_rows = rows[hit]
+                vectors = np.asarray(self._vectors[hit_rows])
+                if not self.readonly:
+                    self._used[hit_rows] = now
+                for key, vector in zip(np.array(keys, dtype=object)[hit], vectors):
+                    found[key] = vector
+            for key, raw in zip(keys, encoded):
+                pending = self._pending.get(raw)
+                if pending is not None:
+                    found[key] = pending[0].copy()
+                    self._pending[raw] = (pending[0], now)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Look up one vector by cache key."""
+        return self.get_many([key]).get(key)
+
+    # --- Writes ---
+
+    def put_many(self, items: List[Tuple[str, Any]]):
+        """
+        Append vectors; a key stored again is served from its newest row.
+
+        In read-only mode the vectors are only kept in memory (at most
+        _MAX_PENDING of them) for this process.
+
+        Args:
+            items: (cache key, vector) pairs
+        """
+        if not items:
+            return
+        now = int(time.time())
+        with self._lock:
+            for key, vector in items:
+                vector = np.asarray(vector, dtype=np.float32).reshape(self.dimension)
+                raw = _encode_key(key)
+                self._pending.pop(raw, None)
+                self._pending[raw] = (vector, now)
+                if not self.readonly:
+                    self._files["vectors"].write(vector.tobytes())
+                    self._files["used"].write(np.array([now], dtype=_USED_DTYPE).tobytes())
+                    self._files["keys"].write(np.array([raw], dtype=_KEY_DTYPE).tobytes())
+            if self.readonly:
+                while len(self._pending) > _MAX_PENDING:
+                    del self._pending[next(iter(self._pending))]
+                return
+            if self._rows + len(self._pending) > self.compact_at:
+                self.compact()
+            elif len(self._pending) >= _MAX_PENDING:
+                self.sync()
+
+    def put(self, key: str, vector: Any):
+        """Append one vector."""
+        self.put_many([(key, vector)])
+
+    def sync(self):
+        """Flush appended rows, map them, and rewrite the index once enough rows are outside it."""
+        if self.readonly or not self._files:
+            return
+        with self._lock:
+            pending_used = {raw: used for raw, (_, used) in self._pending.items()}
+            # Keys last: a reader that sees a key also sees its vector
+            for kind in ("vectors", "used", "keys"):
+                self._files[kind].flush()
+            if len(self._unindexed) + len(self._pending) > _MAX_UNINDEXED:
+                rows = min(_rows_in(self._path("keys"), _KEY_DTYPE.itemsize),
+                           _rows_in(self._path("vectors"), self.dimension * 4))
+                keys = _map(self._path("keys"), _KEY_DTYPE, rows)
+                order = np.argsort(keys, kind="stable").astype(_ROW_DTYPE)
+                _atomic_write(self._path("order"), order.tobytes())
+            self._pending = {}
+            self._map_generation()
+            # Hits on rows that were still pending are recorded now that they are mapped
+            if pending_used:
+                rows = self._find_rows(list(pending_used))
+                mapped = rows >= 0
+                self._used[rows[mapped]] = np.array(list(pending_used.values()), dtype=_USED_DTYPE)[mapped]
+
+    def refresh(self):
+        """Readers: map rows appended by the writer and switch to a new generation."""
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            meta = self._read_current()
+            if meta is None:
+                return
+            if meta.get("generation") != self._generation:
+                pending = self._pending
+                self._open()
+                self._pending = pending
+            elif _rows_in(self._path("keys"), _KEY_DTYPE.itemsize) > self._rows:
+                self._map_generation()
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Copy the most recently used entry of each key, up to max_entries, into a new generation.
+
+        Returns:
+            Dict[str, int]: rows before and after and the new generation
+        """
+        if self.readonly:
+            return {"rows_before": self._rows, "rows_after": self._rows, "generation": self._generation}
+        with self._lock:
+            self.sync()
+            rows_before = self._rows
+            # Newest row of every key, in key order
+            _, last = np.unique(self._keys[::-1], return_index=True)
+            live = (rows_before - 1 - last).astype(np.int64)
+            if len(live) > self.max_entries:
+                recent = np.argsort(self._used[live], kind="stable")[-self.max_entries:]
+                live = live[np.sort(recent)]
+
+            old_generation = self._generation
+            generation = old_generation + 1
+            with open(self._path("vectors", generation), "wb") as vectors, \
+                    open(self._path("keys", generation), "wb") as keys, \
+                    open(self._path("used", generation), "wb") as used:
+                for start in range(0, len(live), _COPY_ROWS):
+                    chunk = live[start:start + _COPY_ROWS]
+                    vectors.write(np.ascontiguousarray(self._vectors[chunk]).tobytes())
+                    keys.write(np.ascontiguousarray(self._keys[chunk]).tobytes())
+                    used.write(np.ascontiguousarray(self._used[chunk]).tobytes())
+            # Rows are already in key order, so the index is the identity
+            _atomic_write(self._path("order", generation), np.arange(len(live), dtype=_ROW_DTYPE).tobytes())
+
+            self._close_files()
+            self._reset_maps()
+            self._write_current(generation)
+            self._generation = generation
+            self._map_generation()
+            # Mappings of other processes keep the unlinked files alive until they refresh
+            self._remove_generation(old_generation)
+            self.compactions += 1
+            report = {"rows_before": rows_before, "rows_after": self._rows, "generation": generation}
+            logger.info(f"Compacted vector cache: {report}")
+            return report
+
+    def close(self):
+        """Flush appended rows and release the writer lock."""
+        with self._lock:
+            self.sync()
+            self._close_files()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def __len__(self) -> int:
+        return self._rows + len(self._pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the size of the live generation."""
+        total = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "generation": self._generation,
+            "rows": len(self),
+            "indexed_rows": len(self._order),
+            "readonly": self.readonly,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "compactions": self.compactions
+        }
+
+
+# Global vector cache instance
+_vector_cache = None
+_vector_cache_lock = threading.Lock()
+
+
+def get_vector_cache(dimension: int = LOCAL_EMBEDDING_DIMENSION, namespace: str = "") -> MmapVectorCache:
+    """
+    Get the process-wide vector cache at VECTOR_CACHE_DIR.
+
+    Args:
+        dimension: Vector dimension (used when the cache is first opened)
+        namespace: Embedding backend name (used when the cache is first opened)
+
+    Returns:
+        MmapVectorCache: The shared cache
+    """
+    global _vector_cache
+    if _vector_cache is None:
+        with _vector_cache_lock:
+            if _vector_cache is None:
+                import atexit
+                _vector_cache = MmapVectorCache(dimension=dimension, namespace=namespace)
+                atexit.register(_vector_cache.close)
+    return _vector_cache
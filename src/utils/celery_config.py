@@ -3,6 +3,7 @@ Celery configuration for asynchronous task processing.
 """
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 from src.config.settings import DEBUG_MODE
 
 # Celery configuration
@@ -70,4 +71,11 @@ if DEBUG_MODE:
     celery_app.conf.update(
         task_always_eager=False,  # Allow async execution even in debug
         task_eager_propagates=True,
-    ) 
\ No newline at end of file
+    )
+
+
+@worker_process_init.connect
+def _reset_database_pools(**kwargs):
+    """Give each forked worker process its own database connections."""
+    from src.core.database.connection import dispose_engines
+    dispose_engines(close=False)
@@ -0,0 +1,132 @@
+"""
+Concurrent processing of fetched emails for the Gmail processors.
+
+Emails are grouped into one lane per sender. Lanes run in parallel on a
+bounded thread pool while each lane handles its messages one at a time in
+UID order, so a user's updates are still applied in the order they were
+sent. Stages that hit shared external services (Notion writes, SMTP) take a
+slot from a per-stage semaphore. A run lock stops a scheduled run from
+starting while the previous one is still going, which used to cause mail
+to be processed twice.
+"""
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.parser import BytesHeaderParser
+from email.utils import parseaddr
+from typing import Callable, Dict, List, Tuple
+
+from src.config.settings import (
+    GMAIL_PROCESSING_WORKERS,
+    GMAIL_NOTION_WRITE_CONCURRENCY,
+    GMAIL_SMTP_CONCURRENCY,
+    GMAIL_RUN_LOCK_FILE
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to an in-process lock
+    fcntl = None
+
+_STAGE_SLOTS = {
+    'write': threading.BoundedSemaphore(GMAIL_NOTION_WRITE_CONCURRENCY),
+    'notify': threading.BoundedSemaphore(GMAIL_SMTP_CONCURRENCY),
+}
+
+_process_run_lock = threading.Lock()
+
+
+@contextmanager
+def stage_slot(stage: str):
+    """Hold one of the limited slots of a pipeline stage ('write' or 'notify')."""
+    with _STAGE_SLOTS[stage]:
+        yield
+
+
+@contextmanager
+def single_run(lock_path: str = GMAIL_RUN_LOCK_FILE):
+    """
+    Non-blocking run lock shared by threads and processes on this host.
+
+    Yields:
+        bool: True if this caller holds the lock and should run, False if a run is in progress.
+    """
+    if not _process_run_lock.acquire(blocking=False):
+        yield False
+        return
+    lock_file = None
+    try:
+        if fcntl is not None:
+            lock_file = open(lock_path, 'a')
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+        yield True
+    finally:
+        if lock_file is not None:
+            lock_file.close()  # Closing releases the flock
+        _process_run_lock.release()
+
+
+def group_by_sender(uids: List[int], raw_emails: Dict[int, bytes]) -> "OrderedDict[str, List[int]]":
+    """
+    Split UIDs into per-sender lanes, keeping UID order inside each lane.
+
+    Args:
+        uids: Message UIDs in processing order
+        raw_emails: UID -> raw message bytes
+
+    Returns:
+        OrderedDict[str, List[int]]: Sender address -> UIDs
+    """
+    lanes = OrderedDict()
+    for uid in uids:
+        raw = raw_emails.get(uid)
+        sender = ''
+        if raw is not None:
+            headers = BytesHeaderParser().parsebytes(raw)
+            sender = parseaddr(headers.get('From', ''))[1].lower()
+        lanes.setdefault(sender, []).append(uid)
+    return lanes
+
+
+def process_in_lanes(lanes: Dict[str, List[int]], handler: Callable[[int], None],
+                     max_workers: int = GMAIL_PROCESSING_WORKERS) -> Tuple[int, int]:
+    """
+    Run handler(uid) for every UID: lanes in parallel, messages within a lane in order.
+
+    An exception from one message is reported and does not stop its lane.
+
+    Args:
+        lanes: Sender -> UIDs, as returned by group_by_sender
+        handler: Processes one message
+        max_workers: Maximum lanes running at once
+
+    Returns:
+        Tuple[int, int]: (messages handled, messages that raised)
+    """
+    counts = {'ok': 0, 'failed': 0}
+    counts_lock = threading.Lock()
+
+    def run_lane(sender: str, lane_uids: List[int]):
+        for uid in lane_uids:
+            try:
+                handler(uid)
+                outcome = 'ok'
+            except Exception as e:
+                print(f"Error processing email UID {uid} from {sender or 'unknown sender'}: {e}")
+                print(traceback.format_exc())
+                outcome = 'failed'
+            with counts_lock:
+                counts[outcome] += 1
+
+    workers = max(1, min(max_workers, len(lanes)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='email-lane') as executor:
+        futures = [executor.submit(run_lane, sender, lane_uids) for sender, lane_uids in lanes.items()]
+        for future in futures:
+            future.result()
+    return counts['ok'], counts['failed']
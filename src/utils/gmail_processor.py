@@ -12,13 +12,14 @@ import os
 import uuid
 import json
 import re
+import threading
 import datetime
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from src.core.task_extractor import extract_tasks_from_update
-from src.core.task_processor import insert_or_update_task
+from src.core.task_extractor import extract_tasks_from_chunks
+from src.core.task_processor import insert_or_update_tasks
 from src.core import fetch_notion_tasks
 from src.core.ai.insights import get_coaching_insight
 from src.config.settings import GMAIL_ADDRESS, GMAIL_APP_PASSWORD, GMAIL_SERVER, NOTION_TOKEN, NOTION_USERS_DB_ID, EMAIL_ARCHIVE_ENABLED
@@ -28,9 +29,11 @@ from src.core.services.auth_service import AuthService
 
 # Import EmailArchiveService for email archiving
 if EMAIL_ARCHIVE_ENABLED:
-    from src.core.services.email_archive_service import EmailArchiveService
+    from src.core.services.email_archive_service import get_email_archive_service
 
 from src.core.ai.extractors import chunk_email_text
+from src.utils.imap_fetcher import ImapFetcher
+from src.utils.email_pipeline import group_by_sender, process_in_lanes, stage_slot, single_run
 from src.plugins.plugin_manager_instance import plugin_manager
 
 # Import context verification utilities
@@ -60,6 +63,7 @@ TASK_REMINDER_INTERVAL_HOURS = 72     # Send task reminder after 3 days (for fut
 PERSISTENCE_FILE = "pending_conversations.json"
 PERSISTENCE_BACKUP_FILE = "pending_conversations_backup.json"
 PERSISTENCE_TEMP_FILE = "pending_conversations_temp.json"
+_STATE_LOCK = threading.RLock()
 
 # Outstanding tasks tracking
 OUTSTANDING_TASKS = {}
@@ -195,32 +199,34 @@ def save_persistent_state():
         bool: True if save was successful
     """
     try:
-        # Prepare state data
-        state = {
-            'pending_context_conversations': PENDING_CONTEXT_CONVERSATIONS,
-            'outstanding_tasks': OUTSTANDING_TASKS,
-            'metadata': {
-                'last_save': datetime.datetime.now().isoformat(),
-                'version': '1.0'
+        # Processing lanes save concurrently; one writer at a time owns the temp file
+        with _STATE_LOCK:
+            # Prepare state data
+            state = {
+                'pending_context_conversations': dict(PENDING_CONTEXT_CONVERSATIONS),
+                'outstanding_tasks': dict(OUTSTANDING_TASKS),
+                'metadata': {
+                    'last_save': datetime.datetime.now().isoformat(),
+                    'version': '1.0'
+                }
             }
-        }
-        print(f"[DEBUG] Saving persistent state to: {PERSISTENCE_FILE}")
-        print(f"[DEBUG] State to save: {json.dumps(state, indent=2, default=str)}")
+            print(f"[DEBUG] Saving persistent state to: {PERSISTENCE_FILE}")
+            print(f"[DEBUG] State to save: {json.dumps(state, indent=2, default=str)}")
         
-        # Write to temporary file first
-        with open(PERSISTENCE_TEMP_FILE, 'w') as f:
-            json.dump(state, f, indent=2, default=str)
+            # Write to temporary file first
+            with open(PERSISTENCE_TEMP_FILE, 'w') as f:
+                json.dump(state, f, indent=2, default=str)
         
-        # Create backup of current primary file if it exists
-        if os.path.exists(PERSISTENCE_FILE):
-            import shutil
-            shutil.copy2(PERSISTENCE_FILE, PERSISTENCE_BACKUP_FILE)
+            # Create backup of current primary file if it exists
+            if os.path.exists(PERSISTENCE_FILE):
+                import shutil
+                shutil.copy2(PERSISTENCE_FILE, PERSISTENCE_BACKUP_FILE)
         
-        # Atomic move from temp to primary
-        os.rename(PERSISTENCE_TEMP_FILE, PERSISTENCE_FILE)
+            # Atomic move from temp to primary
+            os.rename(PERSISTENCE_TEMP_FILE, PERSISTENCE_FILE)
         
-        print(f"✅ Saved {len(PENDING_CONTEXT_CONVERSATIONS)} pending conversations and {len(OUTSTANDING_TASKS)} outstanding tasks to {PERSISTENCE_FILE}")
-        return True
+            print(f"✅ Saved {len(PENDING_CONTEXT_CONVERSATIONS)} pending conversations and {len(OUTSTANDING_TASKS)} outstanding tasks to {PERSISTENCE_FILE}")
+            return True
         
     except Exception as e:
         print(f"❌ Error saving persistent state: {e}")
@@ -1246,10 +1252,11 @@ def send_confirmation_email(recipient, tasks, coaching_insights=None, user_datab
         
         # Add coaching insights if available
         if coaching_insights:
+            insights_html = coaching_insights.replace('\n', '<br>')
             html_content += f"""
                 <div class="insights">
                     <h3>AI Coaching Insights</h3>
-                    <p>{coaching_insights.replace('\n', '<br>')}</p>
+                    <p>{insights_html}</p>
                 </div>
             """
         
@@ -1483,13 +1490,13 @@ def process_context_response_email(msg, body, sender_email, sender_name):
             # Process tasks
             log_output = []
             successful_tasks = 0
-            for task in all_tasks:
-                success, message = insert_or_update_task(
-                    database_id=user_database_id,
-                    task=task,
-                    existing_tasks=existing_tasks,
-                    log_output=log_output
-                )
+            task_results = insert_or_update_tasks(
+                database_id=user_database_id,
+                tasks=all_tasks,
+                existing_tasks=existing_tasks,
+                log_output=log_output
+            )
+            for task, (success, message) in zip(all_tasks, task_results):
                 if success:
                     successful_tasks += 1
                     
@@ -1563,8 +1570,633 @@ def process_context_response_email(msg, body, sender_email, sender_name):
         print(traceback.format_exc())
         return False
 
+def parse_fetched_email(uid, raw_email):
+    """
+    Parse one fetched email into the fields the rest of the pipeline uses.
+    
+    Args:
+        uid: IMAP UID of the message
+        raw_email: Raw RFC822 bytes
+        
+    Returns:
+        dict: msg_id, msg, subject, sender_name, sender_email, email_date, date_str,
+              body and update_text; None if the message could not be read or has no text body
+    """
+    msg_id = str(uid).encode()
+    print(f"Processing email ID: {msg_id.decode()}")
+
+    if raw_email is None:
+        print(f"Error fetching message {msg_id}")
+        return None
+
+    # Parse the email
+    msg = email.message_from_bytes(raw_email)
+
+    # Get email details
+    subject, encoding = decode_header(msg["Subject"])[0]
+    if isinstance(subject, bytes):
+        subject = subject.decode(encoding if encoding else "utf-8")
+
+    # Get sender info
+    from_header = msg["From"]
+    sender_name = from_header.split('<')[0].strip() if '<' in from_header else from_header.split('@')[0]
+    sender_email = from_header.split('<')[1].split('>')[0] if '<' in from_header else from_header
+
+    # Get date
+    date_str = datetime.datetime.now().strftime("%Y-%m-%d")
+    email_date = None
+    if msg["Date"]:
+        try:
+            from email.utils import parsedate_to_datetime
+            email_date = parsedate_to_datetime(msg["Date"])
+            date_str = email_date.strftime("%Y-%m-%d")
+        except:
+            pass  # Use today's date as fallback
+
+    # Get email body
+    body = ""
+    if msg.is_multipart():
+        for part in msg.walk():
+            content_type = part.get_content_type()
+            content_disposition = str(part.get("Content-Disposition"))
+
+            # Skip attachments
+            if "attachment" in content_disposition:
+                continue
+
+            # Get text content
+            if content_type == "text/plain":
+                try:
+                    payload = part.get_payload(decode=True)
+                    charset = part.get_content_charset() or "utf-8"
+                    body = payload.decode(charset)
+                    break  # Use the first text/plain part
+                except:
+                    pass
+    else:
+        # Not multipart - get payload directly
+        content_type = msg.get_content_type()
+        if content_type == "text/plain":
+            try:
+                payload = msg.get_payload(decode=True)
+                charset = msg.get_content_charset() or "utf-8"
+                body = payload.decode(charset)
+            except:
+                pass
+
+    if not body:
+        print("Could not extract email body")
+        return None
+
+    # Format the update text
+    update_text = f"From: {sender_name}\nDate: {date_str}\n\nSubject: {subject}\n\n{body}"
+
+    return {
+        'msg_id': msg_id,
+        'msg': msg,
+        'subject': subject,
+        'sender_name': sender_name,
+        'sender_email': sender_email,
+        'email_date': email_date,
+        'date_str': date_str,
+        'body': body,
+        'update_text': update_text,
+    }
+
+def build_archive_record(parsed, raw_email):
+    """Build the archive row (store_emails_bulk input) for a parsed email."""
+    msg = parsed['msg']
+    msg_id = parsed['msg_id']
+    return {
+        'message_id': msg_id.decode(),
+        'thread_id': msg.get('In-Reply-To') or msg.get('References'),
+        'sender_email': parsed['sender_email'],
+        'sender_name': parsed['sender_name'],
+        'recipient_email': GMAIL_ADDRESS,
+        'subject': parsed['subject'],
+        'body_text': parsed['body'],
+        'body_html': parsed['body'],  # Could extract HTML if needed
+        'received_date': parsed['email_date'] or datetime.datetime.now(),
+        'user_id': None,  # Will be updated after user lookup
+        'task_database_id': None,  # Will be updated after user lookup
+        'email_size_bytes': len(raw_email),
+        'has_attachments': bool(msg.get_payload()),
+        'attachment_count': 0,  # Could count attachments if needed
+        'priority': 'normal',
+        'labels': [],
+        'is_read': False,
+        'is_archived': False,
+        'processing_status': 'processing',
+        'processing_metadata': {
+            'source': 'gmail_processor',
+            'parsed_at': datetime.datetime.now().isoformat(),
+            'original_message_id': msg_id.decode()
+        }
+    }
+
+def archive_fetched_emails(parsed_emails, raw_emails):
+    """
+    Archive a fetch batch in hot storage with one bulk transaction.
+    
+    Messages that are already archived keep their existing archive id.
+    
+    Args:
+        parsed_emails: UID -> parse_fetched_email() result (None entries are skipped)
+        raw_emails: UID -> raw RFC822 bytes
+        
+    Returns:
+        dict: UID -> archive email id; empty if archiving failed
+    """
+    uids = [uid for uid, parsed in parsed_emails.items() if parsed is not None]
+    if not uids:
+        return {}
+    try:
+        archive_service = get_email_archive_service()
+        records = [build_archive_record(parsed_emails[uid], raw_emails[uid]) for uid in uids]
+        email_ids = archive_service.store_emails_bulk(records, 'hot')
+        print(f"✅ Archived {len(email_ids)} email(s) in one batch")
+        return dict(zip(uids, email_ids))
+    except Exception as e:
+        print(f"⚠️ Email archiving failed: {e}")
+        print(traceback.format_exc())
+        # Continue with task processing anyway
+        return {}
+
+def process_fetched_email(uid, raw_email, fetcher, auth_service, parsed=None, email_id=None):
+    """
+    Process one fetched email: extract tasks, write them to Notion and reply.
+    
+    The fetch batch is parsed and archived beforehand (see archive_fetched_emails).
+    
+    Args:
+        uid: IMAP UID of the message
+        raw_email: Raw RFC822 bytes
+        fetcher: ImapFetcher used to mark the message as read
+        auth_service: AuthService for the sender lookup
+        parsed: parse_fetched_email() result; parsed here when not given
+        email_id: Archive id of the message, if it was archived
+    """
+    if parsed is None:
+        parsed = parse_fetched_email(uid, raw_email)
+        if parsed is None:
+            return
+    msg_id = parsed['msg_id']
+    msg = parsed['msg']
+    subject = parsed['subject']
+    sender_name = parsed['sender_name']
+    sender_email = parsed['sender_email']
+    date_str = parsed['date_str']
+    body = parsed['body']
+    update_text = parsed['update_text']
+
+    print(f"Processing email from {sender_name} ({sender_email}) with subject: {subject}")
+
+    # Look up user by email address
+    user = auth_service.get_user_by_email(sender_email)
+    if not user:
+        print(f"No user found for email: {sender_email}. Skipping email.")
+        # Update email record with failure status if archived
+        if email_id and EMAIL_ARCHIVE_ENABLED:
+            try:
+                archive_service = get_email_archive_service()
+                archive_service.update_email_status(email_id, 'failed', {'error': 'User not found'})
+            except Exception as e:
+                print(f"⚠️ Failed to update email status: {e}")
+        # Mark as read anyway to avoid reprocessing
+        fetcher.mark_seen([uid])
+        return
+
+    if not user.task_database_id:
+        print(f"User {sender_email} does not have a task database configured. Skipping email.")
+        # Update email record with failure status if archived
+        if email_id and EMAIL_ARCHIVE_ENABLED:
+            try:
+                archive_service = get_email_archive_service()
+                archive_service.update_email_status(email_id, 'failed', {'error': 'No task database configured'})
+            except Exception as e:
+                print(f"⚠️ Failed to update email status: {e}")
+        # Mark as read anyway to avoid reprocessing
+        fetcher.mark_seen([uid])
+        return
+
+    try:
+        # Extract tasks
+        print(f"\n🔍 DEBUG: Starting task extraction for email from {sender_name}")
+        print(f"📧 Email body length: {len(body)} characters")
+
+        chunks = chunk_email_text(body, 20)
+        print(f"📦 DEBUG: Email split into {len(chunks)} chunks")
+
+        # Create context-enriched chunks with email metadata
+        enriched_chunks = []
+        for i, chunk in enumerate(chunks):
+            print(f"\n📋 DEBUG: Chunk {i+1}/{len(chunks)}")
+            print(f"   Chunk length: {len(chunk)} characters")
+            print(f"   Chunk preview: {chunk[:200]}...")
+            enriched_chunks.append(f"""From: {sender_name}
+Date: {date_str}
+Subject: {subject}
+
+{chunk}""")
+
+        # Extract tasks from all chunks concurrently, merged in chunk order without repeats
+        tasks = extract_tasks_from_chunks(enriched_chunks)
+
+        # Apply fallback values for missing fields
+        for task in tasks:
+            if not task.get('employee') or task.get('employee') == 'Unknown':
+                task['employee'] = sender_name
+                print(f"     🔧 Applied fallback employee: {sender_name}")
+            if not task.get('date') or task.get('date') == 'Unknown':
+                task['date'] = date_str
+                print(f"     🔧 Applied fallback date: {date_str}")
+
+        for j, task in enumerate(tasks):
+            print(f"     Task {j+1}: {task.get('task', 'No task field')[:100]}...")
+            print(f"       Employee: {task.get('employee', 'Missing')}")
+            print(f"       Date: {task.get('date', 'Missing')}")
+
+        print(f"\n📊 DEBUG: Total tasks extracted across all chunks: {len(tasks)}")
+
+        # Apply protection to tasks if ProjectProtectionPlugin is enabled
+        protection_plugin = plugin_manager.get_plugin('ProjectProtectionPlugin')
+        print(f"🔍 DEBUG: Protection plugin check:")
+        print(f"   Plugin found: {protection_plugin is not None}")
+        if protection_plugin:
+            print(f"   Plugin enabled: {protection_plugin.enabled}")
+            print(f"   Plugin config: {protection_plugin.config}")
+        else:
+            print(f"   ❌ ProjectProtectionPlugin not found!")
+            print(f"   Available plugins: {list(plugin_manager.plugins.keys())}")
+
+        if protection_plugin and protection_plugin.enabled:
+            print(f"🛡️ DEBUG: Applying task protection...")
+            try:
+                # Force token creation for any new category before protection
+                for i, task in enumerate(tasks):
+                    if 'category' in task and task['category'] and task['category'] != 'Uncategorized':
+                        token = protection_plugin.security_manager.tokenize_project(task['category'])
+                        print(f"   🏷️ Token for category '{task['category']}': {token}")
+                # Protect each task to tokenize categories
+                for i, task in enumerate(tasks):
+                    protected_task = protection_plugin.protect_task(task)
+                    tasks[i] = protected_task
+                    print(f"   🔒 Protected task {i+1}: category '{task.get('category')}' -> '{protected_task.get('category')}'")
+                print(f"   🗺️ Token map after protection: {protection_plugin.security_manager.token_map}")
+            except Exception as e:
+                print(f"⚠️ Error protecting tasks: {e}")
+                # Continue with unprotected tasks if protection fails
+
+        print(f"Extracted {len(tasks)} tasks for user {sender_name}")
+
+        # Get existing tasks from user's database (needed for both paths)
+        existing_tasks = fetch_notion_tasks(database_id=user.task_database_id)
+        print(f"📋 DEBUG: Found {len(existing_tasks)} existing tasks in database")
+
+        # NEW: Check if this is a context response email first
+        conversation_id = find_existing_conversation_for_email(sender_email, subject, body)
+
+        if conversation_id:
+            print(f"🔍 Found existing conversation ID: {conversation_id}")
+            # Try to process as context response
+            if process_context_response_email(msg, body, sender_email, sender_name):
+                print(f"✅ Successfully processed context response email")
+                # Mark as read and continue to next email
+                fetcher.mark_seen([uid])
+                return
+            else:
+                print(f"⚠️ Failed to process as context response, treating as new email")
+                # Don't create a new conversation if we already have one
+                print(f"⚠️ Skipping new conversation creation - already have conversation {conversation_id}")
+                fetcher.mark_seen([uid])
+                return
+
+        # If no conversation ID found in email, try fallback for reply emails
+        if not conversation_id:
+            # Check if this looks like a reply email
+            subject, encoding = decode_header(msg["Subject"])[0]
+            if isinstance(subject, bytes):
+                subject = subject.decode(encoding if encoding else "utf-8")
+
+            if re.search(r'^re:', subject, re.IGNORECASE):
+                print(f"🔍 This is a reply email but no conversation ID found, trying fallback...")
+                # Try to find the most recent pending conversation for this user
+                fallback_conversation_id, fallback_conversation = find_most_recent_pending_conversation(sender_email)
+                if fallback_conversation_id:
+                    conversation_id = fallback_conversation_id
+                    print(f"✅ Using fallback conversation ID: {conversation_id}")
+
+        if conversation_id:
+            print(f"🔍 Found conversation ID in email: {conversation_id}")
+            # Try to process as context response
+            if process_context_response_email(msg, body, sender_email, sender_name):
+                print(f"✅ Successfully processed context response email")
+                # Mark as read and continue to next email
+                fetcher.mark_seen([uid])
+                return
+            else:
+                print(f"⚠️ Failed to process as context response, treating as new email")
+
+        # NEW: Classify tasks by context needs
+        print(f"\n🔍 DEBUG: Classifying tasks by context needs...")
+        ready_tasks, context_needed_tasks = classify_tasks_by_context_needs(tasks)
+
+        print(f"📊 Task classification results:")
+        print(f"   Ready tasks: {len(ready_tasks)}")
+        print(f"   Context needed tasks: {len(context_needed_tasks)}")
+
+        # NEW: Handle context verification if needed
+        if context_needed_tasks:
+            print(f"\n📧 Context verification needed for {len(context_needed_tasks)} tasks")
+
+            # Generate conversation ID for tracking
+            conversation_id = generate_conversation_id()
+
+            # Store pending conversation
+            store_pending_context_conversation(
+                conversation_id=conversation_id,
+                user_email=sender_email,
+                ready_tasks=ready_tasks,
+                context_needed_tasks=context_needed_tasks,
+                original_email_id=msg_id.decode(),
+                user_database_id=user.task_database_id
+            )
+
+            # Process ready tasks immediately if any
+            if ready_tasks:
+                print(f"🔄 Processing {len(ready_tasks)} ready tasks immediately...")
+
+                # Apply protection to ready tasks if needed
+                if protection_plugin and protection_plugin.enabled:
+                    for i, task in enumerate(ready_tasks):
+                        protected_task = protection_plugin.protect_task(task)
+                        ready_tasks[i] = protected_task
+
+                # Process ready tasks
+                ready_log_output = []
+                ready_successful = 0
+                with stage_slot('write'):
+                    ready_results = insert_or_update_tasks(
+                        database_id=user.task_database_id,
+                        tasks=ready_tasks,
+                        existing_tasks=existing_tasks,
+                        log_output=ready_log_output
+                    )
+                for task, (success, message) in zip(ready_tasks, ready_results):
+                    if success:
+                        ready_successful += 1
+
+                        # NEW: Track task for completion reminders if needed
+                        if should_track_task_for_reminders(task):
+                            task_id = generate_task_id(task, user.task_database_id)
+                            track_outstanding_task(
+                                task_id=task_id,
+                                user_email=sender_email,
+                                task_data=task,
+                                user_database_id=user.task_database_id
+                            )
+                            print(f"   📝 Ready task tracked for completion reminders: {task_id}")
+
+                print(f"✅ Processed {ready_successful}/{len(ready_tasks)} ready tasks")
+
+            # Send context request email
+            print(f"📧 Sending context request email...")
+            with stage_slot('notify'):
+                send_context_request_email(
+                    recipient=sender_email,
+                    context_needed_tasks=context_needed_tasks,
+                    conversation_id=conversation_id,
+                    ready_tasks_count=len(ready_tasks)
+                )
+
+            # Update email record with context verification status
+            if email_id and EMAIL_ARCHIVE_ENABLED:
+                try:
+                    archive_service = get_email_archive_service()
+                    update_data = {
+                        'user_id': user.user_id if hasattr(user, 'user_id') else sender_email,
+                        'task_database_id': user.task_database_id,
+                        'processing_status': 'context_verification_pending',
+                        'processing_metadata': {
+                            'source': 'gmail_processor',
+                            'tasks_extracted': len(tasks),
+                            'ready_tasks_processed': len(ready_tasks),
+                            'context_tasks_pending': len(context_needed_tasks),
+                            'conversation_id': conversation_id,
+                            'context_verification_sent_at': datetime.datetime.now().isoformat(),
+                            'user_email': sender_email
+                        }
+                    }
+                    archive_service.update_email(email_id, update_data)
+                    print(f"✅ Email record updated with context verification status")
+                except Exception as e:
+                    print(f"⚠️ Failed to update email context verification status: {e}")
+
+            # Mark as read and continue to next email
+            fetcher.mark_seen([uid])
+            return
+
+        # ORIGINAL: Process all tasks normally if no context verification needed
+        print(f"\n🔄 Processing all {len(tasks)} tasks normally (no context verification needed)")
+
+        # Process each task
+        log_output = []
+        successful_tasks = 0
+        failed_tasks = 0
+
+        print(f"\n🔄 DEBUG: Starting task insertion process...")
+        fixed_tasks = []
+        for i, task in enumerate(tasks):
+            print(f"\n📝 DEBUG: Processing task {i+1}/{len(tasks)}")
+            print(f"   Task data: {task}")
+
+            # Validate task data before insertion
+            print(f"   🔍 DEBUG: Task validation:")
+            print(f"     - task: '{task.get('task', 'MISSING')}'")
+            print(f"     - employee: '{task.get('employee', 'MISSING')}'")
+            print(f"     - date: '{task.get('date', 'MISSING')}'")
+            print(f"     - status: '{task.get('status', 'MISSING')}'")
+            print(f"     - category: '{task.get('category', 'MISSING')}'")
+
+            # Check for null/empty values that might cause Notion API errors
+            validation_errors = []
+            if not task.get('task') or not task['task'].strip():
+                validation_errors.append("Empty task description")
+            if not task.get('employee') or not task['employee'].strip():
+                validation_errors.append("Empty employee field")
+            if not task.get('date'):
+                validation_errors.append("Missing date")
+            if not task.get('status'):
+                validation_errors.append("Missing status")
+
+            if validation_errors:
+                print(f"   ⚠️ Validation errors: {validation_errors}")
+
+            # Use the protected task as the base for task_fixed
+            task_fixed = task.copy()
+            if not task_fixed.get('task') or not task_fixed['task'].strip():
+                task_fixed['task'] = "Untitled Task"
+                print(f"   🔧 Applied fallback task: 'Untitled Task'")
+            if not task_fixed.get('employee') or not task_fixed['employee'].strip():
+                task_fixed['employee'] = sender_name
+                print(f"   🔧 Applied fallback employee: {sender_name}")
+            if not task_fixed.get('date'):
+                task_fixed['date'] = date_str
+                print(f"   🔧 Applied fallback date: {date_str}")
+            if not task_fixed.get('status'):
+                task_fixed['status'] = "Not Started"
+                print(f"   🔧 Applied fallback status: 'Not Started'")
+            if not task_fixed.get('category'):
+                task_fixed['category'] = "Uncategorized"
+                print(f"   🔧 Applied fallback category: 'Uncategorized'")
+            print(f"   🛡️ DEBUG: Category before Notion insert: '{task_fixed.get('category')}'")
+            fixed_tasks.append(task_fixed)
+
+        # Resolve similarity for the whole email in one batch, then insert/update
+        with stage_slot('write'):
+            task_results = insert_or_update_tasks(
+                database_id=user.task_database_id,
+                tasks=fixed_tasks,
+                existing_tasks=existing_tasks,
+                log_output=log_output
+            )
+
+        for task, task_fixed, (success, message) in zip(tasks, fixed_tasks, task_results):
+            if success:
+                print(f"   ✅ Successfully processed task: {task.get('task')}")
+                successful_tasks += 1
+
+                # NEW: Track task for completion reminders if needed
+                if should_track_task_for_reminders(task_fixed):
+                    task_id = generate_task_id(task_fixed, user.task_database_id)
+                    track_outstanding_task(
+                        task_id=task_id,
+                        user_email=sender_email,
+                        task_data=task_fixed,
+                        user_database_id=user.task_database_id
+                    )
+                    print(f"   📝 Task tracked for completion reminders: {task_id}")
+            else:
+                print(f"   ❌ Failed to process task: {task.get('task')}")
+                print(f"   Error message: {message}")
+                print(f"   🔍 DEBUG: Full error details:")
+                print(f"     Task data that failed: {task}")
+                print(f"     Error message: {message}")
+                failed_tasks += 1
+
+        print(f"\n📈 DEBUG: Task processing summary:")
+        print(f"   Total tasks: {len(tasks)}")
+        print(f"   Successful: {successful_tasks}")
+        print(f"   Failed: {failed_tasks}")
+
+        print(f"Successfully processed {successful_tasks} tasks for user {sender_name}")
+
+        # Create unprotected versions of tasks for user-facing content
+        unprotected_tasks = []
+        if protection_plugin and protection_plugin.enabled:
+            print(f"📧 DEBUG: Creating unprotected tasks for user display...")
+            # Temporarily set preserve_tokens_in_ui to False for email display
+            original_preserve_setting = protection_plugin.security_manager.preserve_tokens_in_ui
+            protection_plugin.security_manager.preserve_tokens_in_ui = False
+
+            for task in tasks:
+                unprotected_task = protection_plugin.unprotect_task(task)
+                unprotected_tasks.append(unprotected_task)
+                print(f"   🔓 Unprotected task: category '{task.get('category')}' -> '{unprotected_task.get('category')}'")
+
+            # Restore original setting
+            protection_plugin.security_manager.preserve_tokens_in_ui = original_preserve_setting
+        else:
+            unprotected_tasks = tasks
+
+        # Generate coaching insights
+        coaching_insights = None
+        try:
+            # Get person name from the first task
+            person_name = ""
+            if unprotected_tasks and "employee" in unprotected_tasks[0]:
+                person_name = unprotected_tasks[0].get("employee", "")
+
+            if person_name and not existing_tasks.empty and "employee" in existing_tasks.columns:
+                # Get recent tasks for this person from user's database
+                recent_tasks = existing_tasks[existing_tasks['employee'] == person_name]
+                if len(recent_tasks) > 0:
+                    # Filter to recent tasks (last 14 days)
+                    if 'date' in recent_tasks.columns:
+                        # Fix: Convert date column to datetime if it's not already
+                        try:
+                            if recent_tasks['date'].dtype == 'object':
+                                recent_tasks = recent_tasks.copy()
+                                recent_tasks['date'] = pd.to_datetime(recent_tasks['date'], errors='coerce')
+                            recent_tasks = recent_tasks[recent_tasks['date'] >= datetime.datetime.now() - timedelta(days=14)]
+                        except Exception as date_error:
+                            print(f"Error processing dates for coaching insights: {date_error}")
+                            # If date processing fails, use all recent tasks
+                            recent_tasks = recent_tasks
+
+                # Get peer feedback
+                peer_feedback = []
+                try:
+                    from core import fetch_peer_feedback
+                    peer_feedback = fetch_peer_feedback(person_name)
+                except Exception as e:
+                    print(f"Error fetching peer feedback: {str(e)}")
+
+                # Generate coaching insights using unprotected tasks
+                coaching_insights = get_coaching_insight(person_name, unprotected_tasks, recent_tasks, peer_feedback)
+                print("Generated coaching insights successfully")
+            else:
+                print(f"Skipping coaching insights - person_name: {person_name}, DataFrame empty: {existing_tasks.empty}, has employee column: {'employee' in existing_tasks.columns if not existing_tasks.empty else 'N/A'}")
+        except Exception as e:
+            print(f"Error generating coaching insights: {str(e)}")
+            print(traceback.format_exc())
+
+        # Send confirmation with coaching insights using unprotected tasks
+        with stage_slot('notify'):
+            send_confirmation_email(sender_email, unprotected_tasks, coaching_insights, user.task_database_id)
+
+        # Update email record with completion status and task metadata
+        if email_id and EMAIL_ARCHIVE_ENABLED:
+            try:
+                archive_service = get_email_archive_service()
+                # Update with user info and task results
+                update_data = {
+                    'user_id': user.user_id if hasattr(user, 'user_id') else sender_email,
+                    'task_database_id': user.task_database_id,
+                    'processing_status': 'completed',
+                    'processing_metadata': {
+                        'source': 'gmail_processor',
+                        'tasks_extracted': len(tasks),
+                        'tasks_processed': successful_tasks,
+                        'tasks_failed': failed_tasks,
+                        'chunks_processed': len(chunks),
+                        'coaching_insights_generated': coaching_insights is not None,
+                        'completed_at': datetime.datetime.now().isoformat(),
+                        'user_email': sender_email
+                    }
+                }
+                archive_service.update_email(email_id, update_data)
+                print(f"✅ Email record updated with completion status")
+            except Exception as e:
+                print(f"⚠️ Failed to update email completion status: {e}")
+    except Exception as e:
+        print(f"Error processing email: {str(e)}")
+        print(traceback.format_exc())
+
+    # Mark the email as read
+    fetcher.mark_seen([uid])
+
+
 def check_gmail_for_updates():
     """Check Gmail for new emails and process them."""
+    with single_run() as acquired:
+        if not acquired:
+            print("Previous Gmail check is still running, skipping this one")
+            return
+        _check_gmail_for_updates()
+
+def _check_gmail_for_updates():
+    """Body of check_gmail_for_updates(); callers must hold the run lock."""
     try:
         # Load persistent state at startup
         print("📂 Loading persistent state...")
@@ -1602,599 +2234,60 @@ def check_gmail_for_updates():
         mail.login(GMAIL_ADDRESS, GMAIL_APP_PASSWORD)
         
         # Select inbox
-        mail.select("INBOX")
+        fetcher = ImapFetcher(mail, GMAIL_ADDRESS)
+        fetcher.select("INBOX")
         
         # Search for unread messages first
-        status, message_ids = mail.search(None, "UNSEEN")
+        uids = fetcher.search("UNSEEN")
         
-        if status != "OK" or not message_ids[0]:
+        if not uids:
             print("No unread emails found")
             
             # If no unread emails, also check for recent emails (last 24 hours) that might be replies
-            # This helps catch reply emails that were marked as read
+            # This helps catch reply emails that were marked as read. Only UIDs above the
+            # persisted watermark are returned, so messages handled by earlier runs are skipped.
             print("Checking for recent emails that might be context responses...")
             
             # Search for emails from the last 24 hours
             yesterday = (datetime.datetime.now() - datetime.timedelta(days=1)).strftime("%d-%b-%Y")
-            status, message_ids = mail.search(None, f'SINCE {yesterday}')
+            uids = fetcher.search_new("SINCE", yesterday)
             
-            if status != "OK" or not message_ids[0]:
+            if not uids:
                 print("No recent emails found")
                 mail.close()
                 mail.logout()
                 return
             else:
-                print(f"Found {len(message_ids[0].split())} recent emails to check")
+                print(f"Found {len(uids)} recent emails to check")
         else:
-            print(f"Found {len(message_ids[0].split())} unread email(s)")
-            
-        message_id_list = message_ids[0].split()
-        print(f"Found {len(message_id_list)} new email(s)")
-            
-        # Process each unread message
-        for msg_id in message_id_list:
-            print(f"Processing email ID: {msg_id.decode()}")
-            
-            # Fetch the email
-            status, msg_data = mail.fetch(msg_id, "(RFC822)")
-            if status != "OK":
-                print(f"Error fetching message {msg_id}: {status}")
-                continue
-                
-            # Parse the email
-            raw_email = msg_data[0][1]
-            msg = email.message_from_bytes(raw_email)
+            print(f"Found {len(uids)} unread email(s)")
+        
+        # Triage on headers, then download full bodies only for messages worth processing
+        wanted_uids, skipped = fetcher.triage(uids, own_address=GMAIL_ADDRESS)
+        for uid, reason in skipped.items():
+            print(f"Skipping email UID {uid}: {reason}")
+        fetcher.mark_seen(skipped)
+        raw_emails = fetcher.fetch_bodies(wanted_uids)
+        print(f"Found {len(wanted_uids)} new email(s)")
             
-            # Get email details
-            subject, encoding = decode_header(msg["Subject"])[0]
-            if isinstance(subject, bytes):
-                subject = subject.decode(encoding if encoding else "utf-8")
-                
-            # Get sender info
-            from_header = msg["From"]
-            sender_name = from_header.split('<')[0].strip() if '<' in from_header else from_header.split('@')[0]
-            sender_email = from_header.split('<')[1].split('>')[0] if '<' in from_header else from_header
-            
-            # Get date
-            date_str = datetime.datetime.now().strftime("%Y-%m-%d")
-            if msg["Date"]:
-                try:
-                    from email.utils import parsedate_to_datetime
-                    email_date = parsedate_to_datetime(msg["Date"])
-                    date_str = email_date.strftime("%Y-%m-%d")
-                except:
-                    pass  # Use today's date as fallback
-            
-            # Get email body
-            body = ""
-            if msg.is_multipart():
-                for part in msg.walk():
-                    content_type = part.get_content_type()
-                    content_disposition = str(part.get("Content-Disposition"))
-                    
-                    # Skip attachments
-                    if "attachment" in content_disposition:
-                        continue
-                    
-                    # Get text content
-                    if content_type == "text/plain":
-                        try:
-                            payload = part.get_payload(decode=True)
-                            charset = part.get_content_charset() or "utf-8"
-                            body = payload.decode(charset)
-                            break  # Use the first text/plain part
-                        except:
-                            pass
-            else:
-                # Not multipart - get payload directly
-                content_type = msg.get_content_type()
-                if content_type == "text/plain":
-                    try:
-                        payload = msg.get_payload(decode=True)
-                        charset = msg.get_content_charset() or "utf-8"
-                        body = payload.decode(charset)
-                    except:
-                        pass
-            
-            if not body:
-                print("Could not extract email body")
-                continue
-                
-            # Format the update text
-            update_text = f"From: {sender_name}\nDate: {date_str}\n\nSubject: {subject}\n\n{body}"
-            
-            print(f"Processing email from {sender_name} ({sender_email}) with subject: {subject}")
-            
-            # Archive email immediately (async) - before user lookup and task processing
-            email_id = None
-            if EMAIL_ARCHIVE_ENABLED:
-                try:
-                    # Check if email already exists in archive
-                    archive_service = EmailArchiveService()
-                    existing_email = archive_service.get_email_by_message_id(msg_id.decode())
-                    
-                    if existing_email:
-                        print(f"📧 Email with message_id {msg_id.decode()} already archived, skipping...")
-                        email_id = existing_email.get('id')
-                    else:
-                        # Prepare email data for archiving
-                        email_data = {
-                            'message_id': msg_id.decode(),
-                            'thread_id': msg.get('In-Reply-To') or msg.get('References'),
-                            'sender_email': sender_email,
-                            'sender_name': sender_name,
-                            'recipient_email': GMAIL_ADDRESS,
-                            'subject': subject,
-                            'body_text': body,
-                            'body_html': body,  # Could extract HTML if needed
-                            'received_date': email_date if 'email_date' in locals() else datetime.datetime.now(),
-                            'user_id': None,  # Will be updated after user lookup
-                            'task_database_id': None,  # Will be updated after user lookup
-                            'email_size_bytes': len(raw_email),
-                            'has_attachments': bool(msg.get_payload()),
-                            'attachment_count': 0,  # Could count attachments if needed
-                            'priority': 'normal',
-                            'labels': [],
-                            'is_read': False,
-                            'is_archived': False,
-                            'processing_status': 'processing',
-                            'processing_metadata': {
-                                'source': 'gmail_processor',
-                                'parsed_at': datetime.datetime.now().isoformat(),
-                                'original_message_id': msg_id.decode()
-                            }
-                        }
-                        
-                        # Store email in hot storage
-                        email_id = archive_service.store_email(email_data, 'hot')
-                        print(f"✅ Email archived with ID: {email_id}")
-                    
-                except Exception as e:
-                    print(f"⚠️ Email archiving failed: {e}")
-                    print(traceback.format_exc())
-                    # Continue with task processing anyway
-                    email_id = None
-            
-            # Look up user by email address
-            user = auth_service.get_user_by_email(sender_email)
-            if not user:
-                print(f"No user found for email: {sender_email}. Skipping email.")
-                # Update email record with failure status if archived
-                if email_id and EMAIL_ARCHIVE_ENABLED:
-                    try:
-                        archive_service = EmailArchiveService()
-                        archive_service.update_email_status(email_id, 'failed', {'error': 'User not found'})
-                    except Exception as e:
-                        print(f"⚠️ Failed to update email status: {e}")
-                # Mark as read anyway to avoid reprocessing
-                mail.store(msg_id, "+FLAGS", "\\Seen")
-                continue
-                
-            if not user.task_database_id:
-                print(f"User {sender_email} does not have a task database configured. Skipping email.")
-                # Update email record with failure status if archived
-                if email_id and EMAIL_ARCHIVE_ENABLED:
-                    try:
-                        archive_service = EmailArchiveService()
-                        archive_service.update_email_status(email_id, 'failed', {'error': 'No task database configured'})
-                    except Exception as e:
-                        print(f"⚠️ Failed to update email status: {e}")
-                # Mark as read anyway to avoid reprocessing
-                mail.store(msg_id, "+FLAGS", "\\Seen")
-                continue
-            
-            try:
-                # Extract tasks
-                print(f"\n🔍 DEBUG: Starting task extraction for email from {sender_name}")
-                print(f"📧 Email body length: {len(body)} characters")
-                
-                chunks = chunk_email_text(body, 20)
-                print(f"📦 DEBUG: Email split into {len(chunks)} chunks")
-                
-                tasks = []  # Initialize the tasks list
-                
-                for i, chunk in enumerate(chunks):
-                    print(f"\n📋 DEBUG: Processing chunk {i+1}/{len(chunks)}")
-                    print(f"   Chunk length: {len(chunk)} characters")
-                    print(f"   Chunk preview: {chunk[:200]}...")
-                    
-                    # Create context-enriched chunk with email metadata
-                    enriched_chunk = f"""From: {sender_name}
-Date: {date_str}
-Subject: {subject}
-
-{chunk}"""
-                    
-                    print(f"   📧 DEBUG: Enriched chunk with context:")
-                    print(f"     Sender: {sender_name}")
-                    print(f"     Date: {date_str}")
-                    print(f"     Subject: {subject}")
-                    
-                    # Extract tasks from this enriched chunk
-                    chunk_tasks = extract_tasks_from_update(enriched_chunk)
-                    print(f"   ✅ Extracted {len(chunk_tasks)} tasks from chunk {i+1}")
-                    
-                    # Apply fallback values for missing fields
-                    for task in chunk_tasks:
-                        if not task.get('employee') or task.get('employee') == 'Unknown':
-                            task['employee'] = sender_name
-                            print(f"     🔧 Applied fallback employee: {sender_name}")
-                        if not task.get('date') or task.get('date') == 'Unknown':
-                            task['date'] = date_str
-                            print(f"     🔧 Applied fallback date: {date_str}")
-                    
-                    if chunk_tasks:
-                        for j, task in enumerate(chunk_tasks):
-                            print(f"     Task {j+1}: {task.get('task', 'No task field')[:100]}...")
-                            print(f"       Employee: {task.get('employee', 'Missing')}")
-                            print(f"       Date: {task.get('date', 'Missing')}")
-                    else:
-                        print(f"     ⚠️ No tasks extracted from chunk {i+1}")
-                    
-                    tasks.extend(chunk_tasks)
-                
-                print(f"\n📊 DEBUG: Total tasks extracted across all chunks: {len(tasks)}")
-                
-                # Apply protection to tasks if ProjectProtectionPlugin is enabled
-                protection_plugin = plugin_manager.get_plugin('ProjectProtectionPlugin')
-                print(f"🔍 DEBUG: Protection plugin check:")
-                print(f"   Plugin found: {protection_plugin is not None}")
-                if protection_plugin:
-                    print(f"   Plugin enabled: {protection_plugin.enabled}")
-                    print(f"   Plugin config: {protection_plugin.config}")
-                else:
-                    print(f"   ❌ ProjectProtectionPlugin not found!")
-                    print(f"   Available plugins: {list(plugin_manager.plugins.keys())}")
-                
-                if protection_plugin and protection_plugin.enabled:
-                    print(f"🛡️ DEBUG: Applying task protection...")
-                    try:
-                        # Force token creation for any new category before protection
-                        for i, task in enumerate(tasks):
-                            if 'category' in task and task['category'] and task['category'] != 'Uncategorized':
-                                token = protection_plugin.security_manager.tokenize_project(task['category'])
-                                print(f"   🏷️ Token for category '{task['category']}': {token}")
-                        # Protect each task to tokenize categories
-                        for i, task in enumerate(tasks):
-                            protected_task = protection_plugin.protect_task(task)
-                            tasks[i] = protected_task
-                            print(f"   🔒 Protected task {i+1}: category '{task.get('category')}' -> '{protected_task.get('category')}'")
-                        print(f"   🗺️ Token map after protection: {protection_plugin.security_manager.token_map}")
-                    except Exception as e:
-                        print(f"⚠️ Error protecting tasks: {e}")
-                        # Continue with unprotected tasks if protection fails
-                
-                print(f"Extracted {len(tasks)} tasks for user {sender_name}")
-                
-                # Get existing tasks from user's database (needed for both paths)
-                existing_tasks = fetch_notion_tasks(database_id=user.task_database_id)
-                print(f"📋 DEBUG: Found {len(existing_tasks)} existing tasks in database")
-                
-                # NEW: Check if this is a context response email first
-                conversation_id = find_existing_conversation_for_email(sender_email, subject, body)
-                
-                if conversation_id:
-                    print(f"🔍 Found existing conversation ID: {conversation_id}")
-                    # Try to process as context response
-                    if process_context_response_email(msg, body, sender_email, sender_name):
-                        print(f"✅ Successfully processed context response email")
-                        # Mark as read and continue to next email
-                        mail.store(msg_id, "+FLAGS", "\\Seen")
-                        continue
-                    else:
-                        print(f"⚠️ Failed to process as context response, treating as new email")
-                        # Don't create a new conversation if we already have one
-                        print(f"⚠️ Skipping new conversation creation - already have conversation {conversation_id}")
-                        mail.store(msg_id, "+FLAGS", "\\Seen")
-                        continue
-                
-                # If no conversation ID found in email, try fallback for reply emails
-                if not conversation_id:
-                    # Check if this looks like a reply email
-                    subject, encoding = decode_header(msg["Subject"])[0]
-                    if isinstance(subject, bytes):
-                        subject = subject.decode(encoding if encoding else "utf-8")
-                    
-                    if re.search(r'^re:', subject, re.IGNORECASE):
-                        print(f"🔍 This is a reply email but no conversation ID found, trying fallback...")
-                        # Try to find the most recent pending conversation for this user
-                        fallback_conversation_id, fallback_conversation = find_most_recent_pending_conversation(sender_email)
-                        if fallback_conversation_id:
-                            conversation_id = fallback_conversation_id
-                            print(f"✅ Using fallback conversation ID: {conversation_id}")
-                
-                if conversation_id:
-                    print(f"🔍 Found conversation ID in email: {conversation_id}")
-                    # Try to process as context response
-                    if process_context_response_email(msg, body, sender_email, sender_name):
-                        print(f"✅ Successfully processed context response email")
-                        # Mark as read and continue to next email
-                        mail.store(msg_id, "+FLAGS", "\\Seen")
-                        continue
-                    else:
-                        print(f"⚠️ Failed to process as context response, treating as new email")
-                
-                # NEW: Classify tasks by context needs
-                print(f"\n🔍 DEBUG: Classifying tasks by context needs...")
-                ready_tasks, context_needed_tasks = classify_tasks_by_context_needs(tasks)
-                
-                print(f"📊 Task classification results:")
-                print(f"   Ready tasks: {len(ready_tasks)}")
-                print(f"   Context needed tasks: {len(context_needed_tasks)}")
-                
-                # NEW: Handle context verification if needed
-                if context_needed_tasks:
-                    print(f"\n📧 Context verification needed for {len(context_needed_tasks)} tasks")
-                    
-                    # Generate conversation ID for tracking
-                    conversation_id = generate_conversation_id()
-                    
-                    # Store pending conversation
-                    store_pending_context_conversation(
-                        conversation_id=conversation_id,
-                        user_email=sender_email,
-                        ready_tasks=ready_tasks,
-                        context_needed_tasks=context_needed_tasks,
-                        original_email_id=msg_id.decode(),
-                        user_database_id=user.task_database_id
-                    )
-                    
-                    # Process ready tasks immediately if any
-                    if ready_tasks:
-                        print(f"🔄 Processing {len(ready_tasks)} ready tasks immediately...")
-                        
-                        # Apply protection to ready tasks if needed
-                        if protection_plugin and protection_plugin.enabled:
-                            for i, task in enumerate(ready_tasks):
-                                protected_task = protection_plugin.protect_task(task)
-                                ready_tasks[i] = protected_task
-                        
-                        # Process ready tasks
-                        ready_log_output = []
-                        ready_successful = 0
-                        for task in ready_tasks:
-                            success, message = insert_or_update_task(
-                                database_id=user.task_database_id,
-                                task=task,
-                                existing_tasks=existing_tasks,
-                                log_output=ready_log_output
-                            )
-                            if success:
-                                ready_successful += 1
-                                
-                                # NEW: Track task for completion reminders if needed
-                                if should_track_task_for_reminders(task):
-                                    task_id = generate_task_id(task, user.task_database_id)
-                                    track_outstanding_task(
-                                        task_id=task_id,
-                                        user_email=sender_email,
-                                        task_data=task,
-                                        user_database_id=user.task_database_id
-                                    )
-                                    print(f"   📝 Ready task tracked for completion reminders: {task_id}")
-                        
-                        print(f"✅ Processed {ready_successful}/{len(ready_tasks)} ready tasks")
-                    
-                    # Send context request email
-                    print(f"📧 Sending context request email...")
-                    send_context_request_email(
-                        recipient=sender_email,
-                        context_needed_tasks=context_needed_tasks,
-                        conversation_id=conversation_id,
-                        ready_tasks_count=len(ready_tasks)
-                    )
-                    
-                    # Update email record with context verification status
-                    if email_id and EMAIL_ARCHIVE_ENABLED:
-                        try:
-                            archive_service = EmailArchiveService()
-                            update_data = {
-                                'user_id': user.user_id if hasattr(user, 'user_id') else sender_email,
-                                'task_database_id': user.task_database_id,
-                                'processing_status': 'context_verification_pending',
-                                'processing_metadata': {
-                                    'source': 'gmail_processor',
-                                    'tasks_extracted': len(tasks),
-                                    'ready_tasks_processed': len(ready_tasks),
-                                    'context_tasks_pending': len(context_needed_tasks),
-                                    'conversation_id': conversation_id,
-                                    'context_verification_sent_at': datetime.datetime.now().isoformat(),
-                                    'user_email': sender_email
-                                }
-                            }
-                            archive_service.update_email(email_id, update_data)
-                            print(f"✅ Email record updated with context verification status")
-                        except Exception as e:
-                            print(f"⚠️ Failed to update email context verification status: {e}")
-                    
-                    # Mark as read and continue to next email
-                    mail.store(msg_id, "+FLAGS", "\\Seen")
-                    continue
-                
-                # ORIGINAL: Process all tasks normally if no context verification needed
-                print(f"\n🔄 Processing all {len(tasks)} tasks normally (no context verification needed)")
-                
-                # Process each task
-                log_output = []
-                successful_tasks = 0
-                failed_tasks = 0
-                
-                print(f"\n🔄 DEBUG: Starting task insertion process...")
-                for i, task in enumerate(tasks):
-                    print(f"\n📝 DEBUG: Processing task {i+1}/{len(tasks)}")
-                    print(f"   Task data: {task}")
-                    
-                    # Validate task data before insertion
-                    print(f"   🔍 DEBUG: Task validation:")
-                    print(f"     - task: '{task.get('task', 'MISSING')}'")
-                    print(f"     - employee: '{task.get('employee', 'MISSING')}'")
-                    print(f"     - date: '{task.get('date', 'MISSING')}'")
-                    print(f"     - status: '{task.get('status', 'MISSING')}'")
-                    print(f"     - category: '{task.get('category', 'MISSING')}'")
-                    
-                    # Check for null/empty values that might cause Notion API errors
-                    validation_errors = []
-                    if not task.get('task') or not task['task'].strip():
-                        validation_errors.append("Empty task description")
-                    if not task.get('employee') or not task['employee'].strip():
-                        validation_errors.append("Empty employee field")
-                    if not task.get('date'):
-                        validation_errors.append("Missing date")
-                    if not task.get('status'):
-                        validation_errors.append("Missing status")
-                    
-                    if validation_errors:
-                        print(f"   ⚠️ Validation errors: {validation_errors}")
-                    
-                    # Use the protected task as the base for task_fixed
-                    task_fixed = task.copy()
-                    if not task_fixed.get('task') or not task_fixed['task'].strip():
-                        task_fixed['task'] = "Untitled Task"
-                        print(f"   🔧 Applied fallback task: 'Untitled Task'")
-                    if not task_fixed.get('employee') or not task_fixed['employee'].strip():
-                        task_fixed['employee'] = sender_name
-                        print(f"   🔧 Applied fallback employee: {sender_name}")
-                    if not task_fixed.get('date'):
-                        task_fixed['date'] = date_str
-                        print(f"   🔧 Applied fallback date: {date_str}")
-                    if not task_fixed.get('status'):
-                        task_fixed['status'] = "Not Started"
-                        print(f"   🔧 Applied fallback status: 'Not Started'")
-                    if not task_fixed.get('category'):
-                        task_fixed['category'] = "Uncategorized"
-                        print(f"   🔧 Applied fallback category: 'Uncategorized'")
-                    print(f"   🛡️ DEBUG: Category before Notion insert: '{task_fixed.get('category')}'")
-                    
-                    success, message = insert_or_update_task(
-                        database_id=user.task_database_id,
-                        task=task_fixed, 
-                        existing_tasks=existing_tasks, 
-                        log_output=log_output
-                    )
-                    
-                    if success:
-                        print(f"   ✅ Successfully processed task: {task.get('task')}")
-                        successful_tasks += 1
-                        
-                        # NEW: Track task for completion reminders if needed
-                        if should_track_task_for_reminders(task_fixed):
-                            task_id = generate_task_id(task_fixed, user.task_database_id)
-                            track_outstanding_task(
-                                task_id=task_id,
-                                user_email=sender_email,
-                                task_data=task_fixed,
-                                user_database_id=user.task_database_id
-                            )
-                            print(f"   📝 Task tracked for completion reminders: {task_id}")
-                    else:
-                        print(f"   ❌ Failed to process task: {task.get('task')}")
-                        print(f"   Error message: {message}")
-                        print(f"   🔍 DEBUG: Full error details:")
-                        print(f"     Task data that failed: {task}")
-                        print(f"     Error message: {message}")
-                        failed_tasks += 1
-                
-                print(f"\n📈 DEBUG: Task processing summary:")
-                print(f"   Total tasks: {len(tasks)}")
-                print(f"   Successful: {successful_tasks}")
-                print(f"   Failed: {failed_tasks}")
-                
-                print(f"Successfully processed {successful_tasks} tasks for user {sender_name}")
-                
-                # Create unprotected versions of tasks for user-facing content
-                unprotected_tasks = []
-                if protection_plugin and protection_plugin.enabled:
-                    print(f"📧 DEBUG: Creating unprotected tasks for user display...")
-                    # Temporarily set preserve_tokens_in_ui to False for email display
-                    original_preserve_setting = protection_plugin.security_manager.preserve_tokens_in_ui
-                    protection_plugin.security_manager.preserve_tokens_in_ui = False
-                    
-                    for task in tasks:
-                        unprotected_task = protection_plugin.unprotect_task(task)
-                        unprotected_tasks.append(unprotected_task)
-                        print(f"   🔓 Unprotected task: category '{task.get('category')}' -> '{unprotected_task.get('category')}'")
-                    
-                    # Restore original setting
-                    protection_plugin.security_manager.preserve_tokens_in_ui = original_preserve_setting
-                else:
-                    unprotected_tasks = tasks
-                
-                # Generate coaching insights
-                coaching_insights = None
-                try:
-                    # Get person name from the first task
-                    person_name = ""
-                    if unprotected_tasks and "employee" in unprotected_tasks[0]:
-                        person_name = unprotected_tasks[0].get("employee", "")
-                        
-                    if person_name and not existing_tasks.empty and "employee" in existing_tasks.columns:
-                        # Get recent tasks for this person from user's database
-                        recent_tasks = existing_tasks[existing_tasks['employee'] == person_name]
-                        if len(recent_tasks) > 0:
-                            # Filter to recent tasks (last 14 days)
-                            if 'date' in recent_tasks.columns:
-                                # Fix: Convert date column to datetime if it's not already
-                                try:
-                                    if recent_tasks['date'].dtype == 'object':
-                                        recent_tasks = recent_tasks.copy()
-                                        recent_tasks['date'] = pd.to_datetime(recent_tasks['date'], errors='coerce')
-                                    recent_tasks = recent_tasks[recent_tasks['date'] >= datetime.datetime.now() - timedelta(days=14)]
-                                except Exception as date_error:
-                                    print(f"Error processing dates for coaching insights: {date_error}")
-                                    # If date processing fails, use all recent tasks
-                                    recent_tasks = recent_tasks
-                            
-                        # Get peer feedback
-                        peer_feedback = []
-                        try:
-                            from core import fetch_peer_feedback
-                            peer_feedback = fetch_peer_feedback(person_name)
-                        except Exception as e:
-                            print(f"Error fetching peer feedback: {str(e)}")
-                            
-                        # Generate coaching insights using unprotected tasks
-                        coaching_insights = get_coaching_insight(person_name, unprotected_tasks, recent_tasks, peer_feedback)
-                        print("Generated coaching insights successfully")
-                    else:
-                        print(f"Skipping coaching insights - person_name: {person_name}, DataFrame empty: {existing_tasks.empty}, has employee column: {'employee' in existing_tasks.columns if not existing_tasks.empty else 'N/A'}")
-                except Exception as e:
-                    print(f"Error generating coaching insights: {str(e)}")
-                    print(traceback.format_exc())
-                    
-                # Send confirmation with coaching insights using unprotected tasks
-                send_confirmation_email(sender_email, unprotected_tasks, coaching_insights, user.task_database_id)
-                
-                # Update email record with completion status and task metadata
-                if email_id and EMAIL_ARCHIVE_ENABLED:
-                    try:
-                        archive_service = EmailArchiveService()
-                        # Update with user info and task results
-                        update_data = {
-                            'user_id': user.user_id if hasattr(user, 'user_id') else sender_email,
-                            'task_database_id': user.task_database_id,
-                            'processing_status': 'completed',
-                            'processing_metadata': {
-                                'source': 'gmail_processor',
-                                'tasks_extracted': len(tasks),
-                                'tasks_processed': successful_tasks,
-                                'tasks_failed': failed_tasks,
-                                'chunks_processed': len(chunks),
-                                'coaching_insights_generated': coaching_insights is not None,
-                                'completed_at': datetime.datetime.now().isoformat(),
-                                'user_email': sender_email
-                            }
-                        }
-                        archive_service.update_email(email_id, update_data)
-                        print(f"✅ Email record updated with completion status")
-                    except Exception as e:
-                        print(f"⚠️ Failed to update email completion status: {e}")
-            except Exception as e:
-                print(f"Error processing email: {str(e)}")
-                print(traceback.format_exc())
-                
-            # Mark the email as read
-            mail.store(msg_id, "+FLAGS", "\\Seen")
+        # Archive the whole batch in one transaction before any per-message work
+        parsed_emails = {uid: parse_fetched_email(uid, raw_emails.get(uid)) for uid in wanted_uids}
+        archived_ids = archive_fetched_emails(parsed_emails, raw_emails) if EMAIL_ARCHIVE_ENABLED else {}
+        
+        # Process senders in parallel lanes; each sender's emails stay in UID order
+        lanes = group_by_sender(wanted_uids, raw_emails)
+        handled, failed = process_in_lanes(
+            lanes,
+            lambda uid: process_fetched_email(
+                uid, raw_emails.get(uid), fetcher, auth_service,
+                parsed=parsed_emails.get(uid), email_id=archived_ids.get(uid)
+            ) if parsed_emails.get(uid) is not None else None
+        )
+        print(f"Processed {handled} email(s) from {len(lanes)} sender(s), {failed} failed")
             
+        # Everything fetched this run has been handled; don't rescan it
+        fetcher.advance(uids)
+        
         # Close the connection
         mail.close()
         mail.logout()
@@ -13,6 +13,7 @@ import pandas as pd
 import sys
 import os
 import uuid
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -24,8 +25,8 @@ import datetime
 # Add the project root to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from src.core.task_extractor import extract_tasks_from_update
-from src.core.task_processor import insert_or_update_task
+from src.core.task_extractor import extract_tasks_from_chunks
+from src.core.task_processor import insert_or_update_tasks
 from src.core import fetch_notion_tasks
 from src.core.ai.insights import get_coaching_insight
 from src.config.settings import GMAIL_ADDRESS, GMAIL_APP_PASSWORD, GMAIL_SERVER, NOTION_TOKEN, NOTION_USERS_DB_ID, EMAIL_ARCHIVE_ENABLED
@@ -71,6 +72,8 @@ def chunk_email_text(text, max_chunks=20):
     # Limit to max_chunks
     return chunks[:max_chunks]
 from src.plugins.plugin_manager_instance import plugin_manager
+from src.utils.imap_fetcher import ImapFetcher
+from src.utils.email_pipeline import group_by_sender, process_in_lanes, single_run
 
 # Import context verification utilities
 from src.core.chat.verification import generate_verification_questions, parse_verification_response
@@ -94,6 +97,7 @@ PENDING_CONTEXT_CONVERSATIONS = {}
 PERSISTENCE_FILE = "pending_conversations.json"
 PERSISTENCE_BACKUP_FILE = "pending_conversations_backup.json"
 PERSISTENCE_TEMP_FILE = "pending_conversations_temp.json"
+_STATE_LOCK = threading.RLock()
 
 # Configuration for reminders
 CONTEXT_REMINDER_INTERVAL_HOURS = 24
@@ -575,8 +579,110 @@ Your Task Manager
         print(f"❌ Error sending processing error email: {e}")
 
 
+def process_fetched_email(uid, raw_email, fetcher):
+    """
+    Route one fetched email to the correction, context response or new task handler.
+    
+    Args:
+        uid: IMAP UID of the message
+        raw_email: Raw RFC822 bytes, or None if the body could not be fetched
+        fetcher: ImapFetcher used to mark the message as read
+    """
+    print(f"Processing email ID: {uid}")
+
+    if raw_email is None:
+        print(f"Error fetching message {uid}")
+        return
+
+    # Parse the email
+    msg = email.message_from_bytes(raw_email)
+
+    # Get email details
+    subject, encoding = decode_header(msg["Subject"])[0]
+    if isinstance(subject, bytes):
+        subject = subject.decode(encoding if encoding else "utf-8")
+
+    # Get sender info
+    from_header = msg["From"]
+    sender_name = from_header.split('<')[0].strip() if '<' in from_header else from_header.split('@')[0]
+    sender_email = from_header.split('<')[1].split('>')[0] if '<' in from_header else from_header
+
+    # Get email body
+    body = ""
+    if msg.is_multipart():
+        for part in msg.walk():
+            content_type = part.get_content_type()
+            content_disposition = str(part.get("Content-Disposition"))
+
+            if "attachment" in content_disposition:
+                continue
+
+            if content_type == "text/plain":
+                try:
+                    payload = part.get_payload(decode=True)
+                    charset = part.get_content_charset() or "utf-8"
+                    body = payload.decode(charset)
+                    break
+                except:
+                    pass
+    else:
+        content_type = msg.get_content_type()
+        if content_type == "text/plain":
+            try:
+                payload = msg.get_payload(decode=True)
+                charset = msg.get_content_charset() or "utf-8"
+                body = payload.decode(charset)
+            except:
+                pass
+
+    if not body:
+        print("Could not extract email body")
+        fetcher.mark_seen([uid])
+        return
+
+    # Classify email using router
+    email_type, correlation_id = email_router.classify_email(msg, subject, body, sender_email)
+
+    if email_type == 'correction':
+        # Process as correction
+        if process_correction_email(msg, body, sender_email, correlation_id):
+            print(f"✅ Correction email processed successfully")
+        else:
+            print(f"❌ Failed to process correction email")
+        fetcher.mark_seen([uid])
+        return
+
+    elif email_type == 'context_response':
+        # Process as context response (existing logic)
+        if process_context_response_email(msg, body, sender_email, sender_name):
+            print(f"✅ Context response processed successfully")
+        else:
+            print(f"❌ Failed to process context response")
+        fetcher.mark_seen([uid])
+        return
+
+    else:
+        # Process as new task email (existing logic)
+        success = process_new_task_email(msg, body, sender_email, sender_name)
+
+        # Only mark as read if processing succeeded (or returned None for context verification)
+        # If user not found, function returns early and email stays unread for reprocessing
+        if success is not False:  # None or True means we can mark as read
+            fetcher.mark_seen([uid])
+        else:
+            print(f"⚠️ Email NOT marked as read - will retry on next check")
+
+
 def check_gmail_for_updates_enhanced():
     """Enhanced Gmail checking with correction support."""
+    with single_run() as acquired:
+        if not acquired:
+            print("Previous Gmail check is still running, skipping this one")
+            return
+        _check_gmail_for_updates_enhanced()
+
+def _check_gmail_for_updates_enhanced():
+    """Body of check_gmail_for_updates_enhanced(); callers must hold the run lock."""
     try:
         # Load persistent state at startup
         print("📂 Loading persistent state...")
@@ -613,109 +719,33 @@ def check_gmail_for_updates_enhanced():
         mail.login(GMAIL_ADDRESS, GMAIL_APP_PASSWORD)
         
         # Select inbox
-        mail.select("INBOX")
+        fetcher = ImapFetcher(mail, GMAIL_ADDRESS)
+        fetcher.select("INBOX")
         
         # Search for unread messages
-        status, message_ids = mail.search(None, "UNSEEN")
-        
-        if status != "OK":
-            print(f"Error searching for messages: {status}")
-            return
+        uids = fetcher.search("UNSEEN")
         
-        if not message_ids[0]:
+        if not uids:
             print("No unread messages found")
             return
         
-        message_id_list = message_ids[0].split()
-        print(f"Found {len(message_id_list)} unread messages")
-        
-        # Process each unread message
-        for msg_id in message_id_list:
-            print(f"Processing email ID: {msg_id.decode()}")
-            
-            # Fetch the email
-            status, msg_data = mail.fetch(msg_id, "(RFC822)")
-            if status != "OK":
-                print(f"Error fetching message {msg_id}: {status}")
-                continue
-                
-            # Parse the email
-            raw_email = msg_data[0][1]
-            msg = email.message_from_bytes(raw_email)
-            
-            # Get email details
-            subject, encoding = decode_header(msg["Subject"])[0]
-            if isinstance(subject, bytes):
-                subject = subject.decode(encoding if encoding else "utf-8")
-                
-            # Get sender info
-            from_header = msg["From"]
-            sender_name = from_header.split('<')[0].strip() if '<' in from_header else from_header.split('@')[0]
-            sender_email = from_header.split('<')[1].split('>')[0] if '<' in from_header else from_header
-            
-            # Get email body
-            body = ""
-            if msg.is_multipart():
-                for part in msg.walk():
-                    content_type = part.get_content_type()
-                    content_disposition = str(part.get("Content-Disposition"))
-                    
-                    if "attachment" in content_disposition:
-                        continue
-                    
-                    if content_type == "text/plain":
-                        try:
-                            payload = part.get_payload(decode=True)
-                            charset = part.get_content_charset() or "utf-8"
-                            body = payload.decode(charset)
-                            break
-                        except:
-                            pass
-            else:
-                content_type = msg.get_content_type()
-                if content_type == "text/plain":
-                    try:
-                        payload = msg.get_payload(decode=True)
-                        charset = msg.get_content_charset() or "utf-8"
-                        body = payload.decode(charset)
-                    except:
-                        pass
-            
-            if not body:
-                print("Could not extract email body")
-                continue
-            
-            # Classify email using router
-            email_type, correlation_id = email_router.classify_email(msg, subject, body, sender_email)
-            
-            if email_type == 'correction':
-                # Process as correction
-                if process_correction_email(msg, body, sender_email, correlation_id):
-                    print(f"✅ Correction email processed successfully")
-                else:
-                    print(f"❌ Failed to process correction email")
-                mail.store(msg_id, "+FLAGS", "\\Seen")
-                continue
-                
-            elif email_type == 'context_response':
-                # Process as context response (existing logic)
-                if process_context_response_email(msg, body, sender_email, sender_name):
-                    print(f"✅ Context response processed successfully")
-                else:
-                    print(f"❌ Failed to process context response")
-                mail.store(msg_id, "+FLAGS", "\\Seen")
-                continue
-                
-            else:
-                # Process as new task email (existing logic)
-                success = process_new_task_email(msg, body, sender_email, sender_name)
-                
-                # Only mark as read if processing succeeded (or returned None for context verification)
-                # If user not found, function returns early and email stays unread for reprocessing
-                if success is not False:  # None or True means we can mark as read
-                    mail.store(msg_id, "+FLAGS", "\\Seen")
-                else:
-                    print(f"⚠️ Email NOT marked as read - will retry on next check")
+        print(f"Found {len(uids)} unread messages")
+        
+        # Triage on headers, then download bodies in batches. PEEK keeps messages unread
+        # until they are handled, so failed ones are retried on the next check.
+        wanted_uids, skipped = fetcher.triage(uids, own_address=GMAIL_ADDRESS)
+        for uid, reason in skipped.items():
+            print(f"Skipping email UID {uid}: {reason}")
+        fetcher.mark_seen(skipped)
+        raw_emails = fetcher.fetch_bodies(wanted_uids, peek=True)
+        
+        # Process senders in parallel lanes; each sender's emails stay in UID order
+        lanes = group_by_sender(wanted_uids, raw_emails)
+        handled, failed = process_in_lanes(
+            lanes,
+            lambda uid: process_fetched_email(uid, raw_emails.get(uid), fetcher)
+        )
+        print(f"Processed {handled} email(s) from {len(lanes)} sender(s), {failed} failed")
         
         # Close the connection
         mail.close()
@@ -790,32 +820,34 @@ def save_persistent_state():
         bool: True if save was successful
     """
     try:
-        # Prepare state data
-        state = {
-            'pending_context_conversations': PENDING_CONTEXT_CONVERSATIONS,
-            'outstanding_tasks': OUTSTANDING_TASKS,
-            'metadata': {
-                'last_save': datetime.datetime.now().isoformat(),
-                'version': '1.0'
+        # Processing lanes save concurrently; one writer at a time owns the temp file
+        with _STATE_LOCK:
+            # Prepare state data
+            state = {
+                'pending_context_conversations': dict(PENDING_CONTEXT_CONVERSATIONS),
+                'outstanding_tasks': dict(OUTSTANDING_TASKS),
+                'metadata': {
+                    'last_save': datetime.datetime.now().isoformat(),
+                    'version': '1.0'
+                }
             }
-        }
-        print(f"[DEBUG] Saving persistent state to: {PERSISTENCE_FILE}")
-        print(f"[DEBUG] State to save: {json.dumps(state, indent=2, default=str)}")
+            print(f"[DEBUG] Saving persistent state to: {PERSISTENCE_FILE}")
+            print(f"[DEBUG] State to save: {json.dumps(state, indent=2, default=str)}")
         
-        # Write to temporary file first
-        with open(PERSISTENCE_TEMP_FILE, 'w') as f:
-            json.dump(state, f, indent=2, default=str)
+            # Write to temporary file first
+            with open(PERSISTENCE_TEMP_FILE, 'w') as f:
+                json.dump(state, f, indent=2, default=str)
         
-        # Create backup of current primary file if it exists
-        if os.path.exists(PERSISTENCE_FILE):
-            import shutil
-            shutil.copy2(PERSISTENCE_FILE, PERSISTENCE_BACKUP_FILE)
+            # Create backup of current primary file if it exists
+            if os.path.exists(PERSISTENCE_FILE):
+                import shutil
+                shutil.copy2(PERSISTENCE_FILE, PERSISTENCE_BACKUP_FILE)
         
-        # Atomic move from temp to primary
-        os.rename(PERSISTENCE_TEMP_FILE, PERSISTENCE_FILE)
+            # Atomic move from temp to primary
+            os.rename(PERSISTENCE_TEMP_FILE, PERSISTENCE_FILE)
         
-        print(f"✅ Saved {len(PENDING_CONTEXT_CONVERSATIONS)} pending conversations and {len(OUTSTANDING_TASKS)} outstanding tasks to {PERSISTENCE_FILE}")
-        return True
+            print(f"✅ Saved {len(PENDING_CONTEXT_CONVERSATIONS)} pending conversations and {len(OUTSTANDING_TASKS)} outstanding tasks to {PERSISTENCE_FILE}")
+            return True
         
     except Exception as e:
         print(f"❌ Error saving persistent state: {e}")
@@ -1042,20 +1074,17 @@ def process_context_response_email(msg, body, sender_email, sender_name):
             
             # Process all tasks
             successful_tasks = 0
-            for task in all_tasks:
-                try:
-                    success, message = insert_or_update_task(
-                        database_id=conversation['user_database_id'],
-                        task=task,
-                        existing_tasks=existing_tasks
-                    )
-                    if success:
-                        successful_tasks += 1
-                        print(f"✅ Processed task: {task.get('task', '')[:50]}...")
-                    else:
-                        print(f"❌ Failed to process task: {message}")
-                except Exception as e:
-                    print(f"❌ Error processing task: {e}")
+            task_results = insert_or_update_tasks(
+                database_id=conversation['user_database_id'],
+                tasks=all_tasks,
+                existing_tasks=existing_tasks
+            )
+            for task, (success, message) in zip(all_tasks, task_results):
+                if success:
+                    successful_tasks += 1
+                    print(f"✅ Processed task: {task.get('task', '')[:50]}...")
+                else:
+                    print(f"❌ Failed to process task: {message}")
             
             # Generate coaching insights
             coaching_insights = None
@@ -1096,17 +1125,15 @@ def process_context_response_email(msg, body, sender_email, sender_name):
             
             # Process verified tasks
             successful_tasks = 0
-            for task in verified_tasks + ready_tasks:
-                try:
-                    success, message = insert_or_update_task(
-                        database_id=conversation['user_database_id'],
-                        task=task,
-                        existing_tasks=existing_tasks
-                    )
-                    if success:
-                        successful_tasks += 1
-                except Exception as e:
-                    print(f"❌ Error processing task: {e}")
+            tasks_to_process = verified_tasks + ready_tasks
+            task_results = insert_or_update_tasks(
+                database_id=conversation['user_database_id'],
+                tasks=tasks_to_process,
+                existing_tasks=existing_tasks
+            )
+            for task, (success, message) in zip(tasks_to_process, task_results):
+                if success:
+                    successful_tasks += 1
             
             # Update conversation with remaining pending tasks
             update_pending_context_conversation(
@@ -1170,11 +1197,7 @@ def process_new_task_email(msg, body, sender_email, sender_name):
         
         # Extract tasks from email
         chunks = chunk_email_text(body, 20)
-        tasks = []
-        
-        for chunk in chunks:
-            chunk_tasks = extract_tasks_from_update(chunk)
-            tasks.extend(chunk_tasks)
+        tasks = extract_tasks_from_chunks(chunks)
         
         if not tasks:
             print("No tasks found in email")
@@ -1197,20 +1220,17 @@ def process_new_task_email(msg, body, sender_email, sender_name):
             if ready_tasks:
                 print(f"✅ Processing {len(ready_tasks)} ready tasks immediately (before context verification)")
                 ready_successful = 0
-                for task in ready_tasks:
-                    try:
-                        success, message = insert_or_update_task(
-                            database_id=user.task_database_id,
-                            task=task,
-                            existing_tasks=existing_tasks
-                        )
-                        if success:
-                            ready_successful += 1
-                            print(f"✅ Processed ready task: {task.get('task', '')[:50]}...")
-                        else:
-                            print(f"❌ Failed to process ready task: {message}")
-                    except Exception as e:
-                        print(f"❌ Error processing ready task: {e}")
+                task_results = insert_or_update_tasks(
+                    database_id=user.task_database_id,
+                    tasks=ready_tasks,
+                    existing_tasks=existing_tasks
+                )
+                for task, (success, message) in zip(ready_tasks, task_results):
+                    if success:
+                        ready_successful += 1
+                        print(f"✅ Processed ready task: {task.get('task', '')[:50]}...")
+                    else:
+                        print(f"❌ Failed to process ready task: {message}")
                 
                 # Send confirmation for ready tasks if any were processed
                 if ready_successful > 0:
@@ -1262,20 +1282,17 @@ def process_new_task_email(msg, body, sender_email, sender_name):
         
         # Process ready tasks
         successful_tasks = 0
-        for task in ready_tasks:
-            try:
-                success, message = insert_or_update_task(
-                    database_id=user.task_database_id,
-                    task=task,
-                    existing_tasks=existing_tasks
-                )
-                if success:
-                    successful_tasks += 1
-                    print(f"✅ Processed task: {task.get('task', '')[:50]}...")
-                else:
-                    print(f"❌ Failed to process task: {message}")
-            except Exception as e:
-                print(f"❌ Error processing task: {e}")
+        task_results = insert_or_update_tasks(
+            database_id=user.task_database_id,
+            tasks=ready_tasks,
+            existing_tasks=existing_tasks
+        )
+        for task, (success, message) in zip(ready_tasks, task_results):
+            if success:
+                successful_tasks += 1
+                print(f"✅ Processed task: {task.get('task', '')[:50]}...")
+            else:
+                print(f"❌ Failed to process task: {message}")
         
         # Generate coaching insights
         coaching_insights = None
@@ -0,0 +1,253 @@
+"""
+Batched, UID-based IMAP fetching for the Gmail processors.
+
+Instead of one FETCH round trip per message, messages are fetched with
+`UID FETCH` over a whole message set: headers first (BODY.PEEK[HEADER]) so
+messages can be triaged, then full bodies only for the ones worth processing.
+The highest UID handled per mailbox is persisted together with the mailbox's
+UIDVALIDITY, so re-scanning recent mail only returns messages not seen before.
+"""
+import email
+import json
+import os
+import re
+import threading
+from email.message import Message
+from email.utils import parseaddr
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.config.settings import IMAP_FETCH_BATCH_SIZE, IMAP_STATE_FILE
+
+_UID_RE = re.compile(rb'UID (\d+)')
+_FLAGS_RE = re.compile(rb'FLAGS \(([^)]*)\)')
+
+# Headers that mark mail nobody should get tasks extracted from
+_BULK_PRECEDENCE = {'bulk', 'junk', 'list'}
+_SYSTEM_SENDERS = ('mailer-daemon@', 'postmaster@')
+
+
+def message_set(uids: Iterable[int]) -> str:
+    """
+    Build a compact IMAP message set, e.g. [1, 2, 3, 7] -> "1:3,7".
+
+    Args:
+        uids: Message UIDs
+
+    Returns:
+        str: IMAP sequence-set string
+    """
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(a) if a == b else f"{a}:{b}" for a, b in ranges)
+
+
+def _parse_fetch_response(data) -> Dict[int, Tuple[bytes, bytes]]:
+    """
+    Map UID -> (literal bytes, response metadata) from an imaplib FETCH response.
+
+    imaplib returns a tuple (prefix, literal) for each message, followed by a
+    closing bytes element that may carry items sent after the literal (e.g. FLAGS).
+    """
+    results = {}
+    last_uid = None
+    for part in data or []:
+        if isinstance(part, tuple):
+            match = _UID_RE.search(part[0])
+            if not match:
+                last_uid = None
+                continue
+            last_uid = int(match.group(1))
+            results[last_uid] = (part[1], part[0])
+        elif isinstance(part, bytes) and last_uid is not None:
+            match = _UID_RE.search(part)
+            if match and int(match.group(1)) != last_uid:
+                # A different message's response without a literal
+                last_uid = None
+                continue
+            literal, meta = results[last_uid]
+            results[last_uid] = (literal, meta + part)
+    return results
+
+
+def triage_headers(headers: Message, own_address: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    Decide from headers alone whether a message needs its body downloaded.
+
+    Args:
+        headers: Parsed message headers
+        own_address: Our own mailbox address; mail from it is never processed
+
+    Returns:
+        Tuple[bool, str]: (needs_body, reason)
+    """
+    sender = parseaddr(headers.get('From', ''))[1].lower()
+    if not sender:
+        return False, 'no sender'
+    if own_address and sender == own_address.lower():
+        return False, 'sent by this mailbox'
+    if sender.startswith(_SYSTEM_SENDERS):
+        return False, 'delivery notification'
+    auto_submitted = (headers.get('Auto-Submitted') or 'no').strip().lower()
+    if auto_submitted != 'no':
+        return False, f'auto-submitted ({auto_submitted})'
+    if (headers.get('Precedence') or '').strip().lower() in _BULK_PRECEDENCE:
+        return False, 'bulk or list mail'
+    return True, 'ok'
+
+
+class ImapFetcher:
+    """UID-based fetcher with header-first triage and a persisted per-mailbox watermark."""
+
+    def __init__(self, mail, account: str, state_path: str = IMAP_STATE_FILE,
+                 batch_size: int = IMAP_FETCH_BATCH_SIZE):
+        """
+        Initialize the fetcher.
+
+        Args:
+            mail: Logged-in imaplib.IMAP4 connection
+            account: Account address, used to key the watermark
+            state_path: JSON file holding UIDVALIDITY and last UID per mailbox
+            batch_size: Messages per UID FETCH command
+        """
+        self.mail = mail
+        self.account = account
+        self.state_path = state_path
+        self.batch_size = batch_size
+        self.mailbox = None
+        self.uidvalidity = None
+        # imaplib connections are not thread-safe; processing lanes share this one
+        self._lock = threading.Lock()
+
+    # --- Watermark state ---
+
+    def _state_key(self) -> str:
+        return f"{self.account}:{self.mailbox}"
+
+    def _load_state(self) -> Dict[str, Dict[str, int]]:
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"⚠️ Could not read IMAP state file {self.state_path}: {e}")
+            return {}
+
+    def _save_state(self, state: Dict[str, Dict[str, int]]):
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    @property
+    def last_uid(self) -> int:
+        """Highest UID already handled in the selected mailbox (0 if unknown or UIDVALIDITY changed)."""
+        entry = self._load_state().get(self._state_key())
+        if not entry or entry.get('uidvalidity') != self.uidvalidity:
+            return 0
+        return entry.get('last_uid', 0)
+
+    def advance(self, uids: Iterable[int]):
+        """Move the watermark up to the highest of the given UIDs."""
+        uids = list(uids)
+        if not uids or self.mailbox is None:
+            return
+        highest = max(max(uids), self.last_uid)
+        state = self._load_state()
+        state[self._state_key()] = {'uidvalidity': self.uidvalidity, 'last_uid': highest}
+        self._save_state(state)
+
+    # --- IMAP commands ---
+
+    def _uid(self, command: str, *args):
+        with self._lock:
+            return self.mail.uid(command, *args)
+
+    def select(self, mailbox: str = "INBOX"):
+        """Select a mailbox and read its UIDVALIDITY."""
+        status, _ = self.mail.select(mailbox)
+        if status != "OK":
+            raise RuntimeError(f"Could not select mailbox {mailbox}: {status}")
+        self.mailbox = mailbox
+        _, data = self.mail.response('UIDVALIDITY')
+        self.uidvalidity = int(data[0]) if data and data[0] else None
+
+    def search(self, *criteria: str) -> List[int]:
+        """Run UID SEARCH and return matching UIDs in ascending order."""
+        status, data = self._uid('SEARCH', None, *criteria)
+        if status != "OK" or not data or not data[0]:
+            return []
+        return sorted(int(uid) for uid in data[0].split())
+
+    def search_new(self, *criteria: str) -> List[int]:
+        """Like search(), but only UIDs above the persisted watermark."""
+        last_uid = self.last_uid
+        return [uid for uid in self.search(*criteria) if uid > last_uid]
+
+    def _fetch(self, uids: List[int], items: str) -> Dict[int, Tuple[bytes, bytes]]:
+        results = {}
+        for start in range(0, len(uids), self.batch_size):
+            batch = uids[start:start + self.batch_size]
+            status, data = self._uid('FETCH', message_set(batch), items)
+            if status != "OK":
+                print(f"Error fetching messages {message_set(batch)}: {status}")
+                continue
+            results.update(_parse_fetch_response(data))
+        return results
+
+    def fetch_headers(self, uids: List[int]) -> Dict[int, Tuple[Message, List[str]]]:
+        """
+        Fetch headers and flags without marking messages as read.
+
+        Returns:
+            Dict[int, Tuple[Message, List[str]]]: UID -> (parsed headers, flags)
+        """
+        headers = {}
+        for uid, (literal, meta) in self._fetch(uids, '(UID FLAGS BODY.PEEK[HEADER])').items():
+            match = _FLAGS_RE.search(meta)
+            flags = match.group(1).decode().split() if match else []
+            headers[uid] = (email.message_from_bytes(literal or b''), flags)
+        return headers
+
+    def fetch_bodies(self, uids: List[int], peek: bool = False) -> Dict[int, bytes]:
+        """
+        Fetch full RFC822 messages.
+
+        Args:
+            uids: Messages to download
+            peek: Leave the \\Seen flag untouched (otherwise the server sets it, like RFC822)
+
+        Returns:
+            Dict[int, bytes]: UID -> raw message
+        """
+        item = 'BODY.PEEK[]' if peek else 'BODY[]'
+        return {uid: literal for uid, (literal, _) in self._fetch(uids, f'(UID {item})').items()}
+
+    def mark_seen(self, uids: Iterable[int]):
+        """Set \\Seen on the given UIDs with a single UID STORE."""
+        uids = [int(uid) for uid in uids]
+        if uids:
+            self._uid('STORE', message_set(uids), '+FLAGS', '(\\Seen)')
+
+    def triage(self, uids: List[int], own_address: Optional[str] = None) -> Tuple[List[int], Dict[int, str]]:
+        """
+        Fetch headers for the UIDs and split them into messages to download and skipped ones.
+
+        Returns:
+            Tuple[List[int], Dict[int, str]]: (UIDs needing bodies, skipped UID -> reason)
+        """
+        wanted, skipped = [], {}
+        headers = self.fetch_headers(uids)
+        for uid in uids:
+            if uid not in headers:
+                continue
+            needs_body, reason = triage_headers(headers[uid][0], own_address)
+            if needs_body:
+                wanted.append(uid)
+            else:
+                skipped[uid] = reason
+        return wanted, skipped
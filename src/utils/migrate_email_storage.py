@@ -61,6 +61,7 @@ def migrate_email_storage():
         """)).fetchall()
         
         migrated_count = 0
+        stored_bodies = []
         for email_id, body_text in hot_emails:
             if body_text:
                 # Create preview
@@ -71,6 +72,7 @@ def migrate_email_storage():
                     
                     # Store full body in file
                     storage_key = archive_service._store_full_email_body(str(email_id), body_text)
+                    stored_bodies.append({'body_storage_key': storage_key})
                 else:
                     body_preview = body_text
                     has_full_body = False
@@ -106,6 +108,7 @@ def migrate_email_storage():
                     
                     # Store full body in file
                     storage_key = archive_service._store_full_email_body(str(email_id), body_text)
+                    stored_bodies.append({'body_storage_key': storage_key})
                 else:
                     body_preview = body_text
                     has_full_body = False
@@ -125,13 +128,15 @@ def migrate_email_storage():
                 
                 migrated_count += 1
         
+        # Count references on the (deduplicated) body files
+        archive_service._add_body_refs(session, stored_bodies)
+        
         session.commit()
         print(f"✅ Migrated {migrated_count} emails to hybrid storage")
         
         # Create indexes for better performance
         print("📊 Creating indexes for new columns...")
-        session.execute(text("CREATE INDEX IF NOT EXISTS idx_hot_emails_body_preview ON email_archive.hot_emails USING gin(to_tsvector('english', body_preview));"))
-        session.execute(text("CREATE INDEX IF NOT EXISTS idx_cold_emails_body_preview ON email_archive.cold_emails USING gin(to_tsvector('english', body_preview));"))
+        # Text search uses the search_vector GIN indexes (migrations/20261018_email_fulltext_search.sql)
         session.execute(text("CREATE INDEX IF NOT EXISTS idx_hot_emails_has_full_body ON email_archive.hot_emails(has_full_body);"))
         session.execute(text("CREATE INDEX IF NOT EXISTS idx_cold_emails_has_full_body ON email_archive.cold_emails(has_full_body);"))
         
@@ -52,7 +52,9 @@ def test_database_connection():
     print("\n🔍 Testing database connection...")
     
     try:
-        # Initialize the archive service (this will create tables)
+        # Create tables explicitly; the service itself no longer does
+        from src.core.database.migrations import run_migrations
+        run_migrations()
         archive_service = EmailArchiveService()
         print("✅ Database connection successful")
         print("✅ Tables created/verified")
@@ -0,0 +1,8 @@
+"""
+Shared test configuration.
+"""
+import os
+
+# Tests mock provider calls per test; a persistent LLM response cache would
+# answer repeated prompts from an earlier test or run instead of the mock.
+os.environ.setdefault('LLM_RESPONSE_CACHE_BACKEND', 'none')
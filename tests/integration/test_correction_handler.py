@@ -22,7 +22,7 @@ class TestCorrectionHandlerIntegration:
     @pytest.fixture
     def mock_database(self):
         """Mock database setup."""
-        with patch('src.core.services.correction_service.create_engine') as mock_engine:
+        with patch('src.core.database.connection.create_engine') as mock_engine:
             mock_session = Mock()
             mock_engine.return_value = Mock()
             yield mock_session
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for joining Chroma results back to texts and tasks.
+
+Times embeddings_by_text() and match_results_to_tasks() from 1k to 50k tasks
+against synthetic Chroma results (no Chroma or embedding model needed) and
+checks that the time per task stays flat, i.e. the joins scale linearly.
+The nested-scan join they replaced is timed on the smaller sizes for contrast.
+
+Usage:
+    python tests/performance/benchmark_embedding_joins.py
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from src.core.chroma_embedding_manager_simple import content_id, embeddings_by_text, match_results_to_tasks
+
+SIZES = [1000, 5000, 10000, 50000]
+LEGACY_MAX_SIZE = 5000
+# Per-task time at the largest size may be at most this multiple of the smallest
+MAX_PER_TASK_GROWTH = 3.0
+
+
+def make_data(n):
+    """n tasks (about 10% sharing a title), a shuffled get() result and one result per distinct title."""
+    titles = [f"Task number {i} for project {i % 97}" for i in range(n)]
+    for i in range(0, n, 10):
+        titles[i] = titles[i // 2]
+    tasks = [{"id": f"page-{i}", "task": title} for i, title in enumerate(titles)]
+    distinct = list(dict.fromkeys(titles))
+    rows = list(range(len(distinct)))
+    random.shuffle(rows)
+    result = {
+        "ids": [content_id(distinct[r]) for r in rows],
+        "embeddings": np.zeros((len(distinct), 8), dtype=np.float32),
+        "metadatas": [{"text": distinct[r]} for r in rows],
+    }
+    similar = [{"text": text, "similarity": 0.9, "distance": 0.1, "rank": r + 1} for r, text in enumerate(distinct)]
+    return titles, tasks, result, similar
+
+
+def legacy_join(titles, tasks, result, similar):
+    """The nested scans used before: every text against every row, every result against every task."""
+    found = {}
+    for text in titles:
+        for k, metadata in enumerate(result["metadatas"]):
+            if metadata.get("text") == text:
+                found[text] = result["embeddings"][k]
+                break
+    matches = []
+    for item in similar:
+        for task in tasks:
+            if task["task"] == item["text"]:
+                matches.append(task)
+                break
+    return found, matches
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    random.seed(7)
+    print(f"{'tasks':>8} {'join ms':>10} {'us/task':>10} {'legacy ms':>12}")
+    per_task = []
+    for n in SIZES:
+        titles, tasks, result, similar = make_data(n)
+        elapsed = min(
+            timed(lambda: (embeddings_by_text(titles, result), match_results_to_tasks(similar, tasks)))
+            for _ in range(3)
+        )
+        matches = match_results_to_tasks(similar, tasks)
+        assert len(matches) == n, f"expected every task matched once, got {len(matches)}"
+        legacy = f"{timed(legacy_join, titles, tasks, result, similar) * 1000:12.1f}" if n <= LEGACY_MAX_SIZE else f"{'-':>12}"
+        per_task.append(elapsed / n)
+        print(f"{n:>8} {elapsed * 1000:10.1f} {elapsed / n * 1e6:10.2f} {legacy}")
+
+    growth = per_task[-1] / per_task[0]
+    print(f"\nPer-task time growth {SIZES[0]} -> {SIZES[-1]}: {growth:.2f}x (limit {MAX_PER_TASK_GROWTH}x)")
+    if growth > MAX_PER_TASK_GROWTH:
+        print("❌ Joins are not scaling linearly")
+        sys.exit(1)
+    print("✅ Joins scale linearly")
+
+
+if __name__ == "__main__":
+    main()
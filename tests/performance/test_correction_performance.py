@@ -72,7 +72,7 @@ class TestCorrectionHandlerPerformance:
     
     def test_correction_service_database_performance(self):
         """Test database operations performance."""
-        with patch('src.core.services.correction_service.create_engine') as mock_engine:
+        with patch('src.core.database.connection.create_engine') as mock_engine:
             mock_session = Mock()
             mock_engine.return_value = Mock()
             
@@ -233,7 +233,7 @@ class TestCorrectionHandlerPerformance:
     
     def test_database_connection_pooling(self):
         """Test database connection pooling performance."""
-        with patch('src.core.services.correction_service.create_engine') as mock_engine:
+        with patch('src.core.database.connection.create_engine') as mock_engine:
             mock_engine.return_value = Mock()
             
             service = CorrectionService()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched hot -> cold storage mover.
+"""
+import os
+import sys
+import uuid
+
+from sqlalchemy.dialects import postgresql
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.services import archive_mover
+from src.core.services.archive_mover import ColdStorageMover, cold_copy_columns, copy_to_cold_statement
+
+
+def test_copy_keeps_ids_and_skips_generated_and_cold_only_columns():
+    columns = cold_copy_columns()
+
+    assert 'id' in columns and 'message_id' in columns
+    assert 'search_vector' not in columns and 'archived_date' not in columns
+
+
+def test_copy_is_one_insert_select_returning_that_ignores_archived_messages():
+    sql = str(copy_to_cold_statement([uuid.uuid4()]).compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("INSERT INTO email_archive.cold_emails")
+    assert "SELECT email_archive.hot_emails.id" in sql
+    assert "ON CONFLICT (message_id) DO NOTHING" in sql
+    assert "RETURNING email_archive.cold_emails.id" in sql
+
+
+def test_throttle_sleeps_only_to_stay_under_rate(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(archive_mover.time, "sleep", sleeps.append)
+    mover = ColdStorageMover(engine=None, session_factory=None, max_rows_per_second=100)
+
+    mover._throttle(rows=50, batch_seconds=0.2)
+    mover._throttle(rows=50, batch_seconds=1.0)
+
+    assert sleeps == [0.3]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed email body store.
+"""
+import gzip
+import os
+import sys
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.services.body_store import ContentAddressedBodyStore, body_hash, body_key
+
+
+def test_keys_are_content_hashes_sharded_two_levels(tmp_path):
+    store = ContentAddressedBodyStore(str(tmp_path), compression='gzip')
+
+    key = store.put("hello world")
+
+    digest = body_hash("hello world")
+    assert key == body_key(digest) == f"bodies/{digest[:2]}/{digest[2:4]}/{digest}"
+    assert (tmp_path / key).exists()
+    assert store.get(key) == "hello world"
+
+
+def test_put_many_writes_each_distinct_body_once(tmp_path):
+    store = ContentAddressedBodyStore(str(tmp_path), compression='gzip')
+
+    keys = store.put_many(["quoted thread", "other", "quoted thread"])
+
+    assert keys[0] == keys[2] != keys[1]
+    assert len([p for p in (tmp_path / 'bodies').rglob('*') if p.is_file()]) == 2
+    assert store.get_many(keys + [None, "bodies/00/00/missing"]) == {
+        keys[0]: "quoted thread", keys[1]: "other"
+    }
+
+
+def test_reads_legacy_per_email_files(tmp_path):
+    store = ContentAddressedBodyStore(str(tmp_path), compression='gzip')
+    (tmp_path / 'emails').mkdir()
+    (tmp_path / 'emails' / 'abc.txt.gz').write_bytes(gzip.compress("legacy body".encode('utf-8')))
+
+    assert store.get('emails/abc.txt.gz') == "legacy body"
+
+
+def test_large_files_are_read_through_mmap(tmp_path):
+    store = ContentAddressedBodyStore(str(tmp_path), compression='gzip', mmap_threshold=1)
+    body = "long reply chain\n" * 5000
+
+    assert store.get(store.put(body)) == body
+
+
+def test_zstd_falls_back_to_gzip_without_the_package(tmp_path, monkeypatch):
+    monkeypatch.setattr('src.core.services.body_store._load_zstd', lambda: None)
+    store = ContentAddressedBodyStore(str(tmp_path), compression='zstd')
+
+    key = store.put("body")
+
+    assert store.compression == 'gzip'
+    assert (tmp_path / key).read_bytes()[:2] == b'\x1f\x8b'
+
+
+def test_delete_many_ignores_missing_files(tmp_path):
+    store = ContentAddressedBodyStore(str(tmp_path), compression='gzip')
+    key = store.put("to be removed")
+
+    assert store.delete_many([key, key]) == 1
+    assert store.get(key) is None
+
+
+def test_put_many_round_trips_with_zstd(tmp_path):
+    pytest.importorskip('zstandard')
+    store = ContentAddressedBodyStore(str(tmp_path), compression='zstd')
+    bodies = [f"message {i}\n" + "quoted reply chain line\n" * (50 + i % 40) for i in range(3000)]
+
+    keys = store.put_many(bodies)
+
+    assert store.compression == 'zstd'
+    assert (tmp_path / keys[0]).read_bytes()[:4] == b'\x28\xb5\x2f\xfd'
+    assert store.get_many(keys) == dict(zip(keys, bodies))
+
+
+def test_bodies_written_with_a_trained_dictionary_stay_readable(tmp_path):
+    zstandard = pytest.importorskip('zstandard')
+    store = ContentAddressedBodyStore(str(tmp_path), compression='zstd')
+    before = store.put("written before training")
+    samples = [f"Hi team {i},\nPlease find the weekly report attached.\nThanks, Ana {i * 7}" for i in range(500)]
+
+    dict_id = store.train_dictionary(samples, dict_size=4096)
+    keys = store.put_many(samples[:50] + ["a new body"])
+
+    data = (tmp_path / keys[0]).read_bytes()
+    assert zstandard.get_frame_parameters(data).dict_id == dict_id
+    assert store.get_many(keys + [before])[before] == "written before training"
+    assert [store.get(key) for key in keys] == samples[:50] + ["a new body"]
+
+    reopened = ContentAddressedBodyStore(str(tmp_path), compression='zstd')
+    assert reopened.get(keys[1]) == samples[1]
+    assert zstandard.get_frame_parameters((tmp_path / reopened.put("after restart")).read_bytes()).dict_id == dict_id
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared Chroma client and collection registry used by RAG queries.
+"""
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.chroma_registry import ChromaRegistry
+
+
+class FakeCollection:
+    """Collection that answers every query with fixed documents and distances."""
+
+    def __init__(self, name, hits):
+        self.name = name
+        self.hits = hits
+        self.queries = []
+        self.writes = 0
+
+    def query(self, query_embeddings, n_results, include):
+        self.queries.append((query_embeddings, n_results))
+        hits = self.hits[:n_results]
+        return {
+            "documents": [[doc for doc, _ in hits]],
+            "metadatas": [[{"source": self.name} for _ in hits]],
+            "distances": [[distance for _, distance in hits]],
+        }
+
+    def upsert(self, **kwargs):
+        self.writes += 1
+
+
+class FakeClient:
+    def __init__(self, collections):
+        self.collections = collections
+        self.opened = []
+
+    def get_or_create_collection(self, name, **kwargs):
+        self.opened.append(name)
+        return self.collections[name]
+
+
+def make_registry(collections):
+    registry = ChromaRegistry(embedding_function=lambda texts: [[float(len(t))] for t in texts])
+    registry._client = FakeClient(collections)
+    return registry
+
+
+def test_collections_are_opened_once_and_results_merged_by_distance():
+    technical = FakeCollection("guidelines_technical", [("tech-a", 0.4), ("tech-b", 0.9)])
+    process = FakeCollection("guidelines_process", [("proc-a", 0.1), ("proc-b", 0.5)])
+    registry = make_registry({c.name: c for c in (technical, process)})
+
+    for _ in range(3):
+        embedding = registry.embed_queries(["how do I deploy"])[0]
+        hits = registry.query_collections(embedding, [technical.name, process.name], n_results=2)
+
+    assert [hit["content"] for hit in hits] == ["proc-a", "tech-a", "proc-b", "tech-b"]
+    assert hits[0]["collection"] == "guidelines_process"
+    assert sorted(registry.client.opened) == sorted([technical.name, process.name])
+    assert len(technical.queries) == 3 and technical.writes == 0
+
+
+def test_failing_collection_is_skipped_and_forget_reopens():
+    good = FakeCollection("guidelines_process", [("proc-a", 0.2)])
+
+    class Broken(FakeCollection):
+        def query(self, **kwargs):
+            raise RuntimeError("boom")
+
+    broken = Broken("guidelines_technical", [])
+    registry = make_registry({c.name: c for c in (good, broken)})
+
+    hits = registry.query_collections([1.0], [broken.name, good.name], n_results=1)
+    assert [hit["content"] for hit in hits] == ["proc-a"]
+
+    registry.forget_collection(good.name)
+    registry.get_collection(good.name)
+    assert registry.client.opened.count(good.name) == 2
+
+
+def test_batch_sends_one_query_per_collection_and_lru_skips_repeats(monkeypatch):
+    import src.core.chroma_registry as chroma_registry
+    from src.core.knowledge import knowledge_base
+    from src.core.knowledge.knowledge_base import KnowledgeBase, clear_guideline_cache
+
+    technical = FakeCollection("guidelines_technical", [("shared", 0.3), ("tech-a", 0.6)])
+    process = FakeCollection("guidelines_process", [("shared", 0.2), ("proc-a", 0.4)])
+    registry = make_registry({c.name: c for c in (technical, process)})
+    monkeypatch.setattr(chroma_registry, "get_chroma_registry", lambda *args: registry)
+    clear_guideline_cache()
+
+    kb = KnowledgeBase(name="guidelines")
+    queries = ["email response time", "security incident response"]
+    first = kb.query_guidelines_batch(queries, top_k=4)
+    second = kb.query_guidelines_batch(queries + ["Email   response time"], top_k=4)
+
+    assert first[queries[0]] == ["shared", "proc-a", "tech-a"]
+    assert len(technical.queries) == 1 and len(technical.queries[0][0]) == 2
+    assert second[queries[1]] == first[queries[1]]
+    assert len(knowledge_base._guideline_cache) == 2
+    clear_guideline_cache()
+
+
+def test_guideline_results_expire_and_failures_are_not_cached(monkeypatch):
+    import src.core.chroma_registry as chroma_registry
+    from src.core.knowledge import knowledge_base
+    from src.core.knowledge.knowledge_base import KnowledgeBase, clear_guideline_cache
+
+    class Flaky(FakeCollection):
+        broken = True
+
+        def query(self, **kwargs):
+            if self.broken:
+                raise RuntimeError("collection not ready")
+            return super().query(**kwargs)
+
+    technical = Flaky("guidelines_technical", [("tech-a", 0.6)])
+    process = FakeCollection("guidelines_process", [("proc-a", 0.4)])
+    registry = make_registry({c.name: c for c in (technical, process)})
+    monkeypatch.setattr(chroma_registry, "get_chroma_registry", lambda *args: registry)
+    clear_guideline_cache()
+    kb = KnowledgeBase(name="guidelines")
+
+    assert kb.query_guidelines("deploy checklist") == ["proc-a"]
+    assert len(knowledge_base._guideline_cache) == 0
+
+    technical.broken = False
+    assert kb.query_guidelines("deploy checklist") == ["proc-a", "tech-a"]
+    assert kb.query_guidelines("deploy checklist") == ["proc-a", "tech-a"]
+    assert len(process.queries) == 2  # third call was a cache hit
+
+    monkeypatch.setattr(knowledge_base, "GUIDELINE_CACHE_TTL_SECONDS", 0)
+    kb.query_guidelines("security review")
+    kb.query_guidelines("security review")
+    assert len(process.queries) == 4  # expired at once, so queried again
+    clear_guideline_cache()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent chunk extraction, task merging and the LLM token bucket.
+"""
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core import task_extractor
+from src.core.ai.rate_limiter import TokenBucket
+
+
+def test_chunks_are_extracted_concurrently_and_merged_in_order():
+    in_flight = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+
+    def fake_extract(chunk):
+        with lock:
+            in_flight['now'] += 1
+            in_flight['max'] = max(in_flight['max'], in_flight['now'])
+        time.sleep(0.05 if chunk == "c1" else 0.01)
+        with lock:
+            in_flight['now'] -= 1
+        return [{'task': f"Task from {chunk}", 'employee': 'Ana'}]
+
+    with patch.object(task_extractor, 'extract_tasks_from_update', side_effect=fake_extract):
+        tasks = task_extractor.extract_tasks_from_chunks(["c1", "c2", "c3"], max_workers=3)
+
+    assert [t['task'] for t in tasks] == ["Task from c1", "Task from c2", "Task from c3"]
+    assert in_flight['max'] > 1
+
+
+def test_merge_drops_tasks_repeated_across_chunks():
+    merged = task_extractor.merge_chunk_tasks([
+        [{'task': 'Updated the  Resume', 'employee': 'Ana', 'status': 'Completed'}],
+        [{'task': 'updated the resume', 'employee': 'ana'}, {'task': 'Ran two cases', 'employee': 'Ana'}],
+        [{'task': 'Updated the resume', 'employee': 'Ben'}],
+    ])
+
+    assert [(t['task'], t['employee']) for t in merged] == [
+        ('Updated the  Resume', 'Ana'), ('Ran two cases', 'Ana'), ('Updated the resume', 'Ben')
+    ]
+    assert merged[0]['status'] == 'Completed'
+
+
+def test_token_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(rate=10.0, capacity=3)
+
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = bucket.try_acquire()
+    assert 0 < wait <= 0.1
+
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.05
+
+
+def test_zero_rate_disables_limiting():
+    bucket = TokenBucket(rate=0, capacity=1)
+    assert all(bucket.try_acquire() == 0 for _ in range(10))
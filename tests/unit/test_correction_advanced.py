@@ -162,7 +162,7 @@ class TestCorrectionHandlerAdvanced:
         from src.core.services.correction_service import CorrectionService
         
         # Mock database connection failure
-        with patch('src.core.services.correction_service.create_engine') as mock_engine:
+        with patch('src.core.database.connection.create_engine') as mock_engine:
             mock_engine.side_effect = Exception("Database connection failed")
             
             try:
@@ -20,7 +20,7 @@ def test_database_resilience():
     from src.core.services.correction_service import CorrectionService
     
     # Test connection pooling
-    with patch('src.core.services.correction_service.create_engine') as mock_engine:
+    with patch('src.core.database.connection.create_engine') as mock_engine:
         mock_engine.return_value = Mock()
         
         service = CorrectionService()
@@ -37,7 +37,7 @@ def test_database_resilience():
         print("   ✅ Connection pooling configured correctly")
     
     # Test retry logic
-    with patch('src.core.services.correction_service.create_engine') as mock_engine:
+    with patch('src.core.database.connection.create_engine') as mock_engine:
         mock_engine.side_effect = Exception("Database connection failed")
         
         try:
@@ -329,7 +329,7 @@ def test_performance_improvements():
     print("🧪 Testing Performance Improvements...")
     
     # Test connection pooling
-    with patch('src.core.services.correction_service.create_engine') as mock_engine:
+    with patch('src.core.database.connection.create_engine') as mock_engine:
         mock_engine.return_value = Mock()
         
         from src.core.services.correction_service import CorrectionService
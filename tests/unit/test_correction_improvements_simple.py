@@ -24,7 +24,7 @@ def test_database_resilience():
         return False
     
     # Test connection pooling configuration
-    with patch('src.core.services.correction_service.create_engine') as mock_engine:
+    with patch('src.core.database.connection.create_engine') as mock_engine:
         mock_engine.return_value = Mock()
         
         try:
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared, pooled database engine.
+"""
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.database import connection
+from src.core.database.connection import get_engine, get_session_factory
+
+
+def test_engine_and_session_factory_are_shared_per_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'a.db'}"
+
+    assert get_engine(url) is get_engine(url)
+    assert get_session_factory(url) is get_session_factory(url)
+    assert get_session_factory(url).kw["bind"] is get_engine(url)
+    assert get_engine(f"sqlite:///{tmp_path / 'b.db'}") is not get_engine(url)
+
+
+def test_postgres_engine_uses_configured_queue_pool():
+    engine = get_engine("postgresql+psycopg2://user:pw@localhost:5432/pool_test")
+
+    assert type(engine.pool).__name__ == "QueuePool"
+    assert engine.pool.size() == connection.DB_POOL_SIZE
+
+
+def test_services_reuse_engine_without_creating_schema(tmp_path, monkeypatch):
+    from sqlalchemy import inspect
+    from src.core.services.correction_service import CorrectionService
+
+    url = f"sqlite:///{tmp_path / 'corrections.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+
+    first, second = CorrectionService(), CorrectionService()
+
+    assert first.engine is second.engine is get_engine(url)
+    # Tables come from the explicit migration step, not from construction
+    assert inspect(first.engine).get_table_names() == []
+
+
+def test_dispose_engines_gives_forked_workers_fresh_pools(tmp_path):
+    engine = get_engine(f"sqlite:///{tmp_path / 'fork.db'}")
+    with engine.connect():
+        pass
+    inherited = engine.pool
+
+    connection.dispose_engines(close=False)
+
+    assert engine.pool is not inherited
+    assert engine.pool.checkedin() == 0
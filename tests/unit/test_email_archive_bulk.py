@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk email archiving and incremental storage statistics.
+"""
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.services.email_archive_service import EmailArchiveService
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def filter(self, *args):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Records statements instead of talking to PostgreSQL."""
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.executed = []
+        self.commits = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def query(self, *columns):
+        return FakeQuery(self.existing)
+
+    def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+
+    def commit(self):
+        self.commits += 1
+
+
+class ScriptedSession(FakeSession):
+    """FakeSession whose statements return the given rows, in order, and that notes what was on disk at commit."""
+
+    def __init__(self, results, root, query_rows=()):
+        super().__init__(existing=list(query_rows))
+        self.results = list(results)
+        self.root = root
+        self.files_at_commit = None
+
+    def execute(self, statement, params=None):
+        super().execute(statement, params)
+        return self.results.pop(0) if self.results else []
+
+    def commit(self):
+        super().commit()
+        self.files_at_commit = sorted(p.name for p in (self.root / 'bodies').rglob('*') if p.is_file())
+
+
+def make_email(n, body="short body"):
+    return {
+        'message_id': f"<msg-{n}@example.com>",
+        'sender_email': 'sender@example.com',
+        'recipient_email': 'inbox@example.com',
+        'subject': f"Update {n}",
+        'body_text': body,
+        'received_date': datetime(2024, 3, 1, 9, n),
+        'email_size_bytes': 100,
+        'not_a_column': 'ignored',
+    }
+
+
+@pytest.fixture
+def service(tmp_path):
+    return EmailArchiveService(database_url=f"sqlite:///{tmp_path / 'archive.db'}", storage_path=str(tmp_path))
+
+
+def use_session(service, session):
+    service.SessionLocal = lambda: session
+
+
+def test_bulk_store_uses_one_transaction_and_multirow_inserts(service):
+    session = FakeSession(existing=[])
+    use_session(service, session)
+
+    ids = service.store_emails_bulk([make_email(i) for i in range(5)])
+
+    assert len(set(ids)) == 5
+    assert session.commits == 1
+    tables = [stmt.table.name for stmt, _ in session.executed]
+    assert tables == ['hot_emails', 'processing_logs', 'storage_stats']
+    email_rows = session.executed[0][1]
+    assert len(email_rows) == 5 and 'not_a_column' not in email_rows[0]
+    assert session.executed[1][1][0]['email_id'] == email_rows[0]['id']
+
+
+def test_already_archived_and_repeated_messages_are_skipped(service):
+    existing_id = uuid.uuid4()
+    session = FakeSession(existing=[("<msg-0@example.com>", existing_id)])
+    use_session(service, session)
+
+    ids = service.store_emails_bulk([make_email(0), make_email(1), make_email(1)])
+
+    assert ids[0] == str(existing_id)
+    assert ids[1] == ids[2]
+    assert len(session.executed[0][1]) == 1
+
+
+def test_stats_are_adjusted_by_batch_delta(service):
+    session = FakeSession(existing=[])
+    use_session(service, session)
+
+    service.store_emails_bulk([make_email(i) for i in range(3)])
+
+    stats_update = session.executed[-1][0].compile()
+    assert "total_emails=(email_archive.storage_stats.total_emails + " in str(stats_update)
+    assert 3 in stats_update.params.values()
+    assert 300 in stats_update.params.values()
+
+
+def test_long_bodies_go_to_file_storage(service, tmp_path):
+    session = FakeSession(existing=[])
+    use_session(service, session)
+
+    [email_id] = service.store_emails_bulk([make_email(0, body="x" * 1000)])
+
+    row = session.executed[0][1][0]
+    assert row['has_full_body'] and row['body_storage_key'].startswith("bodies/")
+    assert (tmp_path / row['body_storage_key']).exists()
+    assert 'email_archive.body_blobs' in [str(statement).split()[2] for statement, _ in session.executed]
+
+
+def test_identical_long_bodies_share_one_file(service, tmp_path):
+    session = FakeSession(existing=[])
+    use_session(service, session)
+
+    service.store_emails_bulk([make_email(0, body="y" * 1000), make_email(1, body="y" * 1000)])
+
+    rows = session.executed[0][1]
+    assert rows[0]['body_storage_key'] == rows[1]['body_storage_key']
+    assert len(list((tmp_path / 'bodies').rglob('*'))) == 3  # two shard dirs + one file
+
+
+def test_body_refs_are_taken_before_files_are_written(service, monkeypatch):
+    session = FakeSession(existing=[])
+    use_session(service, session)
+    statements_before_write = []
+    put_many = service.body_store.put_many
+    monkeypatch.setattr(service.body_store, 'put_many', lambda bodies: (
+        statements_before_write.extend(str(statement).split()[2] for statement, _ in session.executed),
+        put_many(bodies))[1])
+
+    service.store_emails_bulk([make_email(0, body="z" * 1000)])
+
+    assert 'email_archive.body_blobs' in statements_before_write
+    assert session.commits == 1
+
+
+def test_unused_bodies_are_unlinked_while_their_rows_are_locked(service, tmp_path):
+    keep = service.body_store.put("still referenced " * 50)
+    drop = service.body_store.put("no longer referenced " * 50)
+    session = ScriptedSession(results=[[(drop,)]], root=tmp_path)
+    use_session(service, session)
+
+    assert service._collect_unused_bodies([keep, drop, drop]) == 1
+
+    assert session.files_at_commit == [os.path.basename(keep)]  # removed before the commit
+    delete_sql = str(session.executed[0][0])
+    assert delete_sql.startswith("DELETE FROM email_archive.body_blobs") and "ref_count <=" in delete_sql
+
+
+def test_sweep_removes_old_files_without_rows(service, tmp_path):
+    referenced = service.body_store.put("referenced " * 50)
+    orphan = service.body_store.put("left by a failed transaction " * 50)
+    fresh = service.body_store.put("being stored right now " * 50)
+    old = time.time() - 7200
+    for key in (referenced, orphan):
+        os.utime(tmp_path / key, (old, old))
+    # Placeholder insert claims only the key without a row; then the delete of the claim
+    session = ScriptedSession(results=[[(orphan,)], []], root=tmp_path)
+    use_session(service, session)
+
+    assert service.sweep_orphan_bodies(min_age_seconds=3600) == 1
+
+    offered = session.executed[0][0].compile().params.values()
+    assert orphan in offered and referenced in offered and fresh not in offered
+    assert not (tmp_path / orphan).exists()
+    assert (tmp_path / referenced).exists() and (tmp_path / fresh).exists()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for per-sender processing lanes and the Gmail run lock.
+"""
+import os
+import sys
+import threading
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils.email_pipeline import group_by_sender, process_in_lanes, single_run
+
+
+def raw_message(sender, n):
+    return f"From: Someone <{sender}>\r\nSubject: Update {n}\r\n\r\nBody {n}\r\n".encode()
+
+
+def test_group_by_sender_keeps_uid_order_per_sender():
+    raw = {1: raw_message("a@example.com", 1), 2: raw_message("B@example.com", 2),
+           3: raw_message("a@example.com", 3)}
+
+    lanes = group_by_sender([1, 2, 3, 4], raw)
+
+    assert lanes == {"a@example.com": [1, 3], "b@example.com": [2], "": [4]}
+
+
+def test_lanes_run_in_parallel_but_each_lane_in_order():
+    lanes = {"a": [1, 2, 3], "b": [10, 11, 12]}
+    seen = []
+    running = set()
+    overlap = threading.Event()
+    lock = threading.Lock()
+
+    def handler(uid):
+        lane = "a" if uid < 10 else "b"
+        with lock:
+            running.add(lane)
+            if len(running) == 2:
+                overlap.set()
+        time.sleep(0.02)
+        with lock:
+            seen.append(uid)
+            running.discard(lane)
+
+    assert process_in_lanes(lanes, handler, max_workers=2) == (6, 0)
+    assert overlap.is_set()
+    assert [u for u in seen if u < 10] == [1, 2, 3]
+    assert [u for u in seen if u >= 10] == [10, 11, 12]
+
+
+def test_failure_does_not_stop_the_lane():
+    handled = []
+
+    def handler(uid):
+        if uid == 2:
+            raise ValueError("boom")
+        handled.append(uid)
+
+    assert process_in_lanes({"a": [1, 2, 3]}, handler) == (2, 1)
+    assert handled == [1, 3]
+
+
+def test_single_run_rejects_overlapping_runs(tmp_path):
+    lock_path = str(tmp_path / "run.lock")
+    with single_run(lock_path) as first:
+        with single_run(lock_path) as second:
+            assert first and not second
+    with single_run(lock_path) as again:
+        assert again
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the pluggable embedding backend and its length-adaptive batching.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.embedding_backends import (
+    LocalEmbeddingBackend, adaptive_batches, estimate_text_tokens, get_embedding_backend
+)
+
+
+def test_short_texts_share_a_batch_and_long_texts_are_split():
+    texts = ["short title"] * 10 + ["x" * 4000] * 4
+
+    batches = adaptive_batches(texts, max_batch_tokens=600, max_batch_size=64)
+
+    assert sorted(i for batch in batches for i in batch) == list(range(len(texts)))
+    assert batches[0] == list(range(10))
+    for batch in batches:
+        longest = max(estimate_text_tokens(texts[i]) for i in batch)
+        assert len(batch) == 1 or len(batch) * longest <= 600
+
+
+def test_batches_respect_the_size_cap():
+    batches = adaptive_batches(["a"] * 10, max_batch_tokens=10_000, max_batch_size=4)
+
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+
+def make_backend(calls):
+    backend = LocalEmbeddingBackend("all-MiniLM-L6-v2", dimension=3, max_batch_tokens=50, max_batch_size=8)
+
+    def encode(batch):
+        calls.append(list(batch))
+        return np.array([[len(text), 1.0, 0.0] for text in batch])
+    backend._encode = encode
+    return backend
+
+
+def test_embed_keeps_input_order_and_normalizes():
+    calls = []
+    backend = make_backend(calls)
+    texts = ["y" * 400, "ab", "", "abcd"]
+
+    vectors = backend.embed(texts)
+
+    assert vectors.dtype == np.float32 and vectors.shape == (4, 3)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert vectors[1][0] == pytest.approx(2 / np.sqrt(5))
+    assert vectors[2][0] == 0.0
+    assert len(calls) == 2  # the long text is embedded on its own
+
+
+def test_dimension_mismatch_is_an_error():
+    backend = make_backend([])
+    backend.dimension = 5
+
+    with pytest.raises(ValueError):
+        backend.embed(["text"])
+
+
+def test_cache_keys_are_namespaced_by_backend():
+    small = LocalEmbeddingBackend("all-MiniLM-L6-v2", dimension=384)
+    large = LocalEmbeddingBackend("all-mpnet-base-v2", dimension=768)
+
+    assert small.cache_key("task") == small.cache_key("task")
+    assert small.cache_key("task") != large.cache_key("task")
+
+
+def test_unknown_backends_are_rejected():
+    with pytest.raises(ValueError):
+        get_embedding_backend("does-not-exist")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite embedding cache.
+"""
+import os
+import sqlite3
+import sys
+import threading
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.embedding_cache import EmbeddingCache
+
+
+class FakeBackend:
+    name = "fake"
+    dimension = 3
+
+    def __init__(self):
+        self.calls = []
+
+    def cache_key(self, text):
+        return f"fake:{text}"
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(text), 1.0, 0.0] for text in texts], dtype=np.float32)
+
+
+def make_cache(tmp_path, **kwargs):
+    return EmbeddingCache(path=str(tmp_path / "cache.db"), **kwargs)
+
+
+def test_vectors_round_trip_as_float32(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put_many([("a", "text a", [0.5, 1.5, 2.5]), ("b", "text b", np.ones(3))])
+
+    found = cache.get_many(["a", "b", "c"])
+
+    assert set(found) == {"a", "b"}
+    assert found["a"].dtype == np.float32
+    assert found["a"].tolist() == [0.5, 1.5, 2.5]
+    assert cache.get_stats()["hits"] == 2 and cache.get_stats()["misses"] == 1
+
+
+def test_wal_journaling_and_one_connection_per_thread(tmp_path):
+    cache = make_cache(tmp_path)
+    connections = []
+    thread = threading.Thread(target=lambda: connections.append(cache._connection()))
+    thread.start()
+    thread.join()
+
+    assert cache._connection() is cache._connection()
+    assert connections[0] is not cache._connection()
+    assert cache._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_get_or_embed_embeds_only_misses_in_one_batch(tmp_path):
+    cache = make_cache(tmp_path)
+    backend = FakeBackend()
+    cache.get_or_embed(["one"], backend)
+
+    result = cache.get_or_embed(["one", "three", "three", "seven"], backend)
+
+    assert backend.calls == [["one"], ["three", "seven"]]
+    assert result["seven"][0] == 5.0
+    cache.get_or_embed(["one"], backend, force_refresh=True)
+    assert backend.calls[-1] == ["one"]
+
+
+def test_lookups_wider_than_the_parameter_limit(tmp_path):
+    cache = make_cache(tmp_path, max_entries=5000)
+    cache.put_many([(f"k{i}", f"t{i}", [i, 0, 0]) for i in range(1200)])
+
+    found = cache.get_many([f"k{i}" for i in range(1200)])
+
+    assert len(found) == 1200 and found["k1199"][0] == 1199
+
+
+def test_hits_are_touched_in_batches(tmp_path):
+    cache = make_cache(tmp_path, touch_flush_seconds=3600)
+    cache.put("a", "text a", [1, 0, 0])
+    cache.get("a")
+
+    assert cache.get_stats()["pending_touches"] == 1
+    cache.flush()
+    assert cache.get_stats()["pending_touches"] == 0
+
+
+def test_eviction_is_amortized_and_keeps_recent_rows(tmp_path):
+    cache = make_cache(tmp_path, max_entries=10, evict_slack=0.5, touch_flush_seconds=3600)
+    cache.put_many([(f"k{i}", f"t{i}", [i, 0, 0]) for i in range(10)])
+    cache.get("k0")  # recently used; its buffered touch is flushed before evicting
+
+    cache.put_many([(f"n{i}", f"t{i}", [i, 0, 0]) for i in range(5)])
+    assert cache.get_stats()["evictions"] == 0  # 15 rows is within the slack
+
+    cache.put("n5", "t5", [5, 0, 0])
+
+    rows = sqlite3.connect(cache.path).execute("SELECT COUNT(*) FROM embedding_vectors").fetchone()[0]
+    assert rows == len(cache) == 10
+    assert cache.get_stats()["evictions"] == 6
+    assert "k0" in cache.get_many(["k0"])
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for content-addressed embedding ids, upserts and collection compaction.
+"""
+import os
+import sys
+
+import hashlib
+
+import numpy as np
+import pytest
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.chroma_embedding_manager_simple import SimpleChromaEmbeddingManager, content_id
+
+
+class HashEmbedding(EmbeddingFunction):
+    """Deterministic bag-of-words vectors, so the tests don't need the default ONNX model."""
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            vector = np.zeros(32, dtype=np.float32)
+            for word in text.lower().split():
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 32] += 1.0
+            vectors.append(vector / max(np.linalg.norm(vector), 1.0))
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "test_hash"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashEmbedding()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return SimpleChromaEmbeddingManager(collection_name="test_embeddings", persist_directory=str(tmp_path),
+                                        embedding_function=HashEmbedding())
+
+
+def test_content_id_ignores_whitespace_differences():
+    assert content_id("Fix  login bug ") == content_id("Fix login bug")
+    assert content_id("Fix login bug") != content_id("Fix logout bug")
+
+
+def test_repeated_texts_are_stored_once(manager):
+    manager.get_batch_embeddings(["Fix login bug", "Write report"])
+    manager.get_batch_embeddings(["Fix login bug", "Fix  login bug", "Write report"])
+    manager.get_embedding("Write report")
+
+    assert manager.collection.count() == 2
+
+
+def test_compaction_removes_duplicates_and_orphans(manager):
+    # Rows written by the old random-id scheme
+    embedding = manager.get_embedding("Fix login bug").tolist()
+    manager.collection.add(
+        ids=["task_legacy1", "task_legacy2", "task_legacy3"],
+        documents=["Fix login bug", "Fix login bug", "Deleted task"],
+        embeddings=[embedding, embedding, embedding],
+        metadatas=[{"text": "Fix login bug"}, {"text": "Fix login bug"}, {"text": "Deleted task"}]
+    )
+
+    report = manager.compact_collection(live_texts=["Fix login bug"])
+
+    assert report["rows_before"] == 4 and report["rows_after"] == 1
+    assert report["duplicates_removed"] == 2 and report["orphans_removed"] == 1
+    assert manager.collection.get(ids=[content_id("Fix login bug")])["ids"]
+    assert "test_embeddings__compacting" not in [c.name for c in manager.chroma_client.list_collections()]
+
+
+def test_similarity_search_is_limited_to_candidate_texts(manager):
+    manager.get_batch_embeddings(["Unrelated text about lunch"])
+
+    results = manager.find_similar("fix the login bug", ["Fix login bug", "Write report"], top_k=5, threshold=0.0)
+
+    assert {r["text"] for r in results} == {"Fix login bug", "Write report"}
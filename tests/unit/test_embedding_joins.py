@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Tests for joining Chroma results back to texts and tasks.
+"""
+import os
+import sys
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.chroma_embedding_manager_simple import content_id, embeddings_by_text, match_results_to_tasks
+
+
+def test_embeddings_are_joined_by_content_id_in_any_order():
+    result = {
+        "ids": [content_id("b"), content_id("a")],
+        "embeddings": np.array([[2.0], [1.0]]),
+    }
+
+    found = embeddings_by_text(["a", "b", "missing"], result)
+
+    assert found["a"].tolist() == [1.0] and found["b"].tolist() == [2.0]
+    assert "missing" not in found
+
+
+def test_every_task_sharing_a_title_is_matched_once():
+    tasks = [
+        {"id": "1", "task": "Weekly sync"},
+        {"id": "2", "task": "Weekly  sync"},
+        {"id": "1", "task": "Weekly sync"},
+        {"id": "3", "task": "Write report"},
+    ]
+    results = [{"text": "Weekly sync", "similarity": 0.9, "distance": 0.1, "rank": 1}]
+
+    matches = match_results_to_tasks(results, tasks)
+
+    assert [m["task"]["id"] for m in matches] == ["1", "2"]
+    assert all(m["rank"] == 1 for m in matches)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests that the Gmail processor archives each fetch batch with one bulk call.
+"""
+import os
+import sys
+from email.mime.text import MIMEText
+
+# The processor builds AI clients at import time
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')
+os.environ.setdefault('GEMINI_API_KEY', 'test-key')
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import src.utils.gmail_processor as gmail_processor
+
+
+def make_raw(sender, subject, body):
+    message = MIMEText(body)
+    message['From'] = f"{sender.split('@')[0].title()} <{sender}>"
+    message['Subject'] = subject
+    message['Date'] = 'Fri, 01 Mar 2024 09:30:00 +0000'
+    return message.as_bytes()
+
+
+class FakeFetcher:
+    def __init__(self, raw_emails):
+        self.raw_emails = raw_emails
+        self.advanced = None
+
+    def select(self, mailbox):
+        pass
+
+    def search(self, *criteria):
+        return list(self.raw_emails)
+
+    def triage(self, uids, own_address=None):
+        return uids, {}
+
+    def fetch_bodies(self, uids):
+        return {uid: self.raw_emails[uid] for uid in uids}
+
+    def mark_seen(self, uids):
+        pass
+
+    def advance(self, uids):
+        self.advanced = list(uids)
+
+
+class FakeMail:
+    def login(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+    def logout(self):
+        pass
+
+
+class FakeArchive:
+    def __init__(self):
+        self.bulk_calls = []
+
+    def store_emails_bulk(self, emails, storage_type='hot'):
+        self.bulk_calls.append((list(emails), storage_type))
+        return [f"archived-{email['message_id']}" for email in emails]
+
+    def store_email(self, email_data, storage_type='hot'):
+        raise AssertionError("fetched emails must be archived in bulk")
+
+
+def test_fetch_batch_is_archived_with_one_bulk_call(monkeypatch):
+    raw_emails = {
+        101: make_raw('ana@example.com', 'Update 1', 'Finished the report'),
+        102: make_raw('ben@example.com', 'Update 2', 'Reviewed the budget'),
+        103: make_raw('ana@example.com', 'Update 3', 'Sent the invoices'),
+        104: make_raw('cy@example.com', 'Attachment only', ''),  # no text body: not archived
+    }
+    fetcher = FakeFetcher(raw_emails)
+    archive = FakeArchive()
+    processed = {}
+
+    monkeypatch.setattr(gmail_processor, 'EMAIL_ARCHIVE_ENABLED', True)
+    monkeypatch.setattr(gmail_processor, 'get_email_archive_service', lambda: archive, raising=False)
+    monkeypatch.setattr(gmail_processor, 'ImapFetcher', lambda mail, address: fetcher)
+    monkeypatch.setattr(gmail_processor.imaplib, 'IMAP4_SSL', lambda server: FakeMail())
+    monkeypatch.setattr(gmail_processor, 'AuthService', lambda *args: object())
+    for name in ('load_persistent_state', 'save_persistent_state', 'check_and_send_context_reminders',
+                 'cleanup_old_conversations', 'check_and_send_task_reminders'):
+        monkeypatch.setattr(gmail_processor, name, lambda: None)
+    monkeypatch.setattr(gmail_processor, 'process_fetched_email',
+                        lambda uid, raw, fetcher, auth, parsed=None, email_id=None:
+                        processed.__setitem__(uid, (parsed['subject'], email_id)))
+
+    gmail_processor._check_gmail_for_updates()
+
+    assert len(archive.bulk_calls) == 1
+    records, storage_type = archive.bulk_calls[0]
+    assert storage_type == 'hot'
+    assert [record['message_id'] for record in records] == ['101', '102', '103']
+    assert processed == {
+        101: ('Update 1', 'archived-101'),
+        102: ('Update 2', 'archived-102'),
+        103: ('Update 3', 'archived-103'),
+    }
+    assert fetcher.advanced == [101, 102, 103, 104]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for batched UID fetching, header triage and the UID watermark.
+"""
+import os
+import sys
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.utils.imap_fetcher import ImapFetcher, message_set
+
+
+def raw_message(uid, sender="alice@example.com", extra=""):
+    return (f"From: Alice <{sender}>\r\nSubject: Update {uid}\r\n{extra}\r\n"
+            f"Did task {uid}\r\n").encode()
+
+
+class FakeIMAP:
+    """Answers UID SEARCH/FETCH/STORE the way imaplib returns them."""
+
+    def __init__(self, messages, uidvalidity=7):
+        self.messages = messages
+        self.uidvalidity = uidvalidity
+        self.commands = []
+
+    def select(self, mailbox):
+        return "OK", [str(len(self.messages)).encode()]
+
+    def response(self, code):
+        return code, [str(self.uidvalidity).encode()]
+
+    def uid(self, command, *args):
+        self.commands.append((command,) + args)
+        if command == 'SEARCH':
+            return "OK", [" ".join(str(u) for u in sorted(self.messages)).encode()]
+        if command == 'FETCH':
+            uids = []
+            for part in args[0].split(','):
+                a, _, b = part.partition(':')
+                uids.extend(range(int(a), int(b or a) + 1))
+            data = []
+            for seq, uid in enumerate(uids, 1):
+                raw = self.messages[uid]
+                if 'HEADER' in args[1]:
+                    raw = raw.split(b"\r\n\r\n")[0] + b"\r\n\r\n"
+                data.append((f"{seq} (UID {uid} FLAGS () BODY[] {{{len(raw)}}}".encode(), raw))
+                data.append(b")")
+            return "OK", data
+        return "OK", [None]
+
+
+@pytest.fixture
+def mail():
+    messages = {uid: raw_message(uid) for uid in (3, 4, 5, 9)}
+    messages[6] = raw_message(6, sender="inbox@example.com")
+    messages[7] = raw_message(7, extra="Auto-Submitted: auto-replied\r\n")
+    return FakeIMAP(messages)
+
+
+def test_message_set_compacts_ranges():
+    assert message_set([9, 3, 4, 5, 7]) == "3:5,7,9"
+
+
+def test_headers_then_bodies_in_batched_uid_fetches(mail, tmp_path):
+    fetcher = ImapFetcher(mail, "inbox@example.com", state_path=str(tmp_path / "state.json"), batch_size=10)
+    fetcher.select("INBOX")
+
+    uids = fetcher.search("UNSEEN")
+    wanted, skipped = fetcher.triage(uids, own_address="inbox@example.com")
+    bodies = fetcher.fetch_bodies(wanted)
+
+    assert wanted == [3, 4, 5, 9]
+    assert set(skipped) == {6, 7}
+    assert b"Did task 9" in bodies[9]
+    fetches = [c for c in mail.commands if c[0] == 'FETCH']
+    assert fetches == [
+        ('FETCH', "3:7,9", '(UID FLAGS BODY.PEEK[HEADER])'),
+        ('FETCH', "3:5,9", '(UID BODY[])'),
+    ]
+
+
+def test_watermark_makes_rescan_a_noop_until_uidvalidity_changes(mail, tmp_path):
+    state_path = str(tmp_path / "state.json")
+    fetcher = ImapFetcher(mail, "inbox@example.com", state_path=state_path)
+    fetcher.select("INBOX")
+    fetcher.advance(fetcher.search_new("SINCE", "01-Jan-2024"))
+
+    again = ImapFetcher(mail, "inbox@example.com", state_path=state_path)
+    again.select("INBOX")
+    assert again.search_new("SINCE", "01-Jan-2024") == []
+
+    mail.uidvalidity = 8
+    again.select("INBOX")
+    assert again.search_new("SINCE", "01-Jan-2024") == [3, 4, 5, 6, 7, 9]
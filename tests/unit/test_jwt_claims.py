@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for claims tokens and the decode-only require_auth path.
+"""
+import os
+import sys
+import time
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+pytest.importorskip("jwt")
+flask = pytest.importorskip("flask")
+
+from src.core.models.user import User
+from src.core.security.jwt_utils import (
+    CLAIMS_VERSION, JWTManager, get_token_revocations, require_auth
+)
+
+
+class CountingAuthService:
+    def __init__(self, user):
+        self.user = user
+        self.lookups = 0
+
+    def get_user_by_id(self, user_id):
+        self.lookups += 1
+        return self.user
+
+
+@pytest.fixture
+def user():
+    return User(email="ada@example.com", password_hash="", full_name="Ada", role="user",
+                user_id="user-1", task_database_id="db-1")
+
+
+@pytest.fixture
+def app(user):
+    get_token_revocations().clear()
+    app = flask.Flask(__name__)
+    app.jwt_manager = JWTManager(secret_key="test-secret-of-at-least-32-bytes")
+    app.auth_service = CountingAuthService(user)
+
+    @app.route('/me')
+    @require_auth
+    def me(current_user):
+        return flask.jsonify(current_user)
+
+    yield app
+    get_token_revocations().clear()
+
+
+def call(app, token):
+    return app.test_client().get('/me', headers={'Authorization': f'Bearer {token}'})
+
+
+def claims_token(app, user, **kwargs):
+    return app.jwt_manager.generate_token(user.user_id, user.role, user.email,
+                                          task_database_id=user.task_database_id,
+                                          full_name=user.full_name, **kwargs)
+
+
+def test_claims_tokens_are_trusted_without_a_lookup(app, user):
+    token = claims_token(app, user)
+
+    response = call(app, token)
+
+    assert response.status_code == 200
+    assert response.get_json()['task_database_id'] == "db-1"
+    assert response.get_json()['full_name'] == "Ada"
+    assert app.jwt_manager.decode_token(token)['ver'] == CLAIMS_VERSION
+    assert app.auth_service.lookups == 0
+
+
+def test_legacy_tokens_still_look_the_user_up(app, user):
+    token = app.jwt_manager.generate_token(user.user_id, user.role, user.email)
+
+    response = call(app, token)
+
+    assert response.get_json()['task_database_id'] == "db-1"
+    assert app.auth_service.lookups == 1
+
+
+def test_revoked_tokens_of_deactivated_users_are_rejected(app, user):
+    token = claims_token(app, user)
+    refreshed = app.jwt_manager.refresh_token(token)
+    get_token_revocations().revoke(user.user_id)
+    user.is_active = False
+
+    assert call(app, token).status_code == 401
+    assert call(app, refreshed).status_code == 401  # refreshing keeps the epoch
+
+
+def test_revoked_tokens_of_active_users_get_fresh_profile(app, user):
+    token = claims_token(app, user)
+    get_token_revocations().revoke(user.user_id)
+    user.task_database_id = "db-2"
+
+    assert call(app, token).get_json()['task_database_id'] == "db-2"
+    time.sleep(0.002)  # epochs have millisecond resolution
+    assert call(app, claims_token(app, user)).status_code == 200
+    assert app.auth_service.lookups == 1
+
+
+class SharedRedis:
+    """In-memory stand-in for the redis.Redis hash calls TokenRevocations uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = str(value)
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+
+def test_tokens_minted_before_deactivate_user_are_rejected(app, user):
+    pytest.importorskip("bcrypt")
+    pytest.importorskip("notion_client")
+    from src.core.services.auth_service import AuthService
+    from src.core.user_directory import UserDirectory
+
+    token = claims_token(app, user)
+    assert call(app, token).status_code == 200
+
+    service = AuthService.__new__(AuthService)
+    service.user_directory = UserDirectory()
+    service._get_notion_page_by_id = lambda user_id: {
+        'id': 'page-1', 'properties': {'Email': {'title': [{'text': {'content': user.email}}]}}
+    }
+    service._update_user_page = lambda page_id, updates: setattr(user, 'is_active', updates['is_active'])
+
+    assert service.deactivate_user(user.user_id) is True
+    assert call(app, token).status_code == 401
+
+
+def test_revocations_are_shared_across_processes():
+    from src.core.security.jwt_utils import TokenRevocations, current_epoch
+
+    redis_client = SharedRedis()
+    worker_a = TokenRevocations(redis_client=redis_client, refresh_seconds=0)
+    worker_b = TokenRevocations(redis_client=redis_client, refresh_seconds=0)
+    epoch = current_epoch()
+    worker_b.load()
+
+    worker_a.revoke("user-1")
+
+    assert worker_b.is_revoked("user-1", epoch)
+    restarted = TokenRevocations(redis_client=redis_client, refresh_seconds=60)
+    restarted.load()
+    assert restarted.is_revoked("user-1", epoch)
+    assert not restarted.is_revoked("user-2", epoch)
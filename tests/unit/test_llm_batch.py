@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent prompt batches.
+"""
+import os
+import sys
+import threading
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import src.core.ai.batch as batch
+from src.core.ai.batch import backoff_delay, cancel_batches, run_prompt_batch
+
+
+def test_results_keep_prompt_order_and_concurrency_is_bounded():
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def call(prompt):
+        with lock:
+            in_flight.append(prompt)
+            peak.append(len(in_flight))
+        time.sleep(0.02 if prompt % 2 else 0.01)
+        with lock:
+            in_flight.remove(prompt)
+        return f"answer {prompt}"
+
+    started = time.monotonic()
+    results = run_prompt_batch(call, list(range(12)), max_concurrency=4)
+
+    assert results == [f"answer {i}" for i in range(12)]
+    assert max(peak) <= 4
+    assert time.monotonic() - started < 12 * 0.015  # overlapped, not serial
+
+
+def test_each_prompt_is_retried_on_its_own(monkeypatch):
+    monkeypatch.setattr(batch, "backoff_delay", lambda attempt: 0)
+    attempts = {}
+
+    def call(prompt):
+        attempts[prompt] = attempts.get(prompt, 0) + 1
+        if prompt == "flaky" and attempts[prompt] < 3:
+            raise RuntimeError("503")
+        if prompt == "broken":
+            raise RuntimeError("bad request")
+        return prompt.upper()
+
+    results = run_prompt_batch(call, ["ok", "flaky", "broken"], max_retries=2)
+
+    assert results == ["OK", "FLAKY", "Error: bad request"]
+    assert attempts == {"ok": 1, "flaky": 3, "broken": 3}
+
+
+def test_backoff_is_jittered_and_capped():
+    delays = [backoff_delay(10, base=1.0, cap=5.0) for _ in range(50)]
+
+    assert all(0 <= d <= 5.0 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_cancellation_stops_retries_and_pending_prompts(monkeypatch):
+    monkeypatch.setattr(batch, "backoff_delay", lambda attempt: 30)
+    calls = []
+
+    def call(prompt):
+        calls.append(prompt)
+        raise RuntimeError("unavailable")
+
+    timer = threading.Timer(0.05, cancel_batches)
+    timer.start()
+    started = time.monotonic()
+    results = run_prompt_batch(call, list(range(4)), max_concurrency=1, max_retries=5)
+
+    assert time.monotonic() - started < 5
+    assert calls == [0]
+    assert all(result.startswith("Error: ") for result in results)
+    assert "cancelled" in results[1]
+
+
+def test_shutdown_signal_cancels_running_batches(monkeypatch):
+    monkeypatch.setattr(batch, "backoff_delay", lambda attempt: 30)
+
+    def call(prompt):
+        raise RuntimeError("unavailable")
+
+    # Celery sends its shutdown signals with sender and keyword arguments
+    timer = threading.Timer(0.05, batch._cancel_on_shutdown, args=("worker",), kwargs={"sig": "SIGTERM"})
+    timer.start()
+    started = time.monotonic()
+    results = run_prompt_batch(call, list(range(2)), max_concurrency=1, max_retries=5)
+
+    assert time.monotonic() - started < 5
+    assert "cancelled" in results[1]
+
+
+def test_cancel_batches_is_registered_for_process_exit(monkeypatch):
+    registered = []
+    monkeypatch.setattr(batch.atexit, "register", registered.append)
+    monkeypatch.setattr(batch.threading, "_register_atexit", registered.append, raising=False)
+
+    batch._register_shutdown_hooks()
+
+    assert registered == [cancel_batches, cancel_batches]  # atexit, and before threads are joined
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-provider LLM rate limiter.
+"""
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.ai import rate_limiter
+from src.core.ai.rate_limiter import LLMRateLimiter
+
+
+def test_in_flight_calls_are_capped():
+    limiter = LLMRateLimiter("test:model", requests_per_minute=0, tokens_per_minute=0,
+                             max_concurrent=2, burst=1)
+    running = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+
+    def call():
+        with limiter.slot():
+            with lock:
+                running['now'] += 1
+                running['max'] = max(running['max'], running['now'])
+            time.sleep(0.02)
+            with lock:
+                running['now'] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert running['max'] == 2
+
+
+def test_token_budget_paces_large_calls():
+    # 600 tokens/minute = 10 per second; a full bucket covers the first call only
+    limiter = LLMRateLimiter("test:model", requests_per_minute=0, tokens_per_minute=600,
+                             max_concurrent=0, burst=1)
+
+    start = time.monotonic()
+    with limiter.slot(tokens=600):
+        pass
+    assert time.monotonic() - start < 0.05
+    assert limiter.tokens.try_acquire(5) > 0
+
+
+def test_overrides_apply_per_provider_and_model():
+    overrides = '{"gemini": {"rpm": 15}, "gemini:gemini-pro": {"rpm": 5, "tpm": 1000}}'
+    with patch.object(rate_limiter, 'LLM_RATE_LIMITS', overrides):
+        assert rate_limiter._limits_for("gemini:gemini-pro")[:2] == (5, 1000)
+        assert rate_limiter._limits_for("gemini:gemini-1.5-flash")[0] == 15
+        assert rate_limiter._limits_for("openai:gpt-4")[0] == rate_limiter.LLM_REQUESTS_PER_MINUTE
+
+
+def test_limiters_are_shared_and_fall_back_without_redis():
+    with patch.object(rate_limiter, '_limiters', {}), \
+         patch.object(rate_limiter, '_redis_checked', False), \
+         patch.object(rate_limiter, 'LLM_RATE_LIMIT_BACKEND', 'redis'), \
+         patch.object(rate_limiter, 'LLM_RATE_LIMIT_REDIS_URL', 'redis://127.0.0.1:1/0'):
+        limiter = rate_limiter.get_rate_limiter('gemini', 'gemini-1.5-flash')
+        assert rate_limiter.get_rate_limiter('gemini', 'gemini-1.5-flash') is limiter
+        assert limiter.redis_client is None
+
+
+class ScriptedRedis:
+    """Records the Lua script calls of a Redis-backed limiter; every call succeeds."""
+
+    def __init__(self):
+        self.calls = []
+        self.released = []
+
+    def register_script(self, script):
+        def run(keys, args):
+            self.calls.append((script, keys, args))
+            return 1 if "ZSCORE" in script or "ZCARD" in script else "0"
+        return run
+
+    def zrem(self, key, lease):
+        self.released.append(lease)
+
+
+def test_redis_scripts_use_the_server_clock_and_slots_are_renewed():
+    redis = ScriptedRedis()
+    limiter = LLMRateLimiter("test:model", requests_per_minute=60, tokens_per_minute=600,
+                             max_concurrent=1, burst=1, redis_client=redis)
+
+    with patch.object(rate_limiter, '_SLOT_LEASE_SECONDS', 0.03):
+        with limiter.slot(tokens=10):
+            time.sleep(0.05)
+
+    renewals = [args for script, _, args in redis.calls if script == rate_limiter._RENEW_SCRIPT]
+    lease = renewals[0][0]
+    assert all("redis.call('TIME')" in script for script, _, _ in redis.calls)
+    assert redis.calls[1][2] == [10.0, 600, 10]  # no client timestamp
+    assert redis.released == [lease]
+    assert len(renewals) >= 1
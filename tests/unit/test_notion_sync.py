@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for paginated, incremental Notion database sync.
+"""
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.notion_sync import NotionTaskStore, query_all_pages
+
+
+def make_page(n, edited="2024-02-01T08:00:00.000Z", database_id="db-1"):
+    return {
+        "id": f"page-{n}",
+        "parent": {"type": "database_id", "database_id": database_id},
+        "last_edited_time": edited,
+        "archived": False,
+        "properties": {},
+    }
+
+
+class FakeDatabases:
+    """Mimics databases.query with cursors and the last_edited_time filter."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def query(self, database_id, page_size=100, start_cursor=None, filter=None):
+        self.calls.append({"start_cursor": start_cursor, "filter": filter})
+        pages = self.pages
+        if filter:
+            since = filter["last_edited_time"]["on_or_after"]
+            pages = [p for p in pages if p["last_edited_time"] >= since]
+        start = int(start_cursor or 0)
+        chunk = pages[start:start + page_size]
+        has_more = start + page_size < len(pages)
+        return {
+            "results": chunk,
+            "has_more": has_more,
+            "next_cursor": str(start + page_size) if has_more else None,
+        }
+
+
+class FakeClient:
+    def __init__(self, pages):
+        self.databases = FakeDatabases(pages)
+
+
+@pytest.fixture
+def client():
+    pages = [make_page(i) for i in range(249)]
+    pages.append(make_page(249, edited="2024-03-01T10:00:00.000Z"))
+    return FakeClient(pages)
+
+
+def test_query_all_pages_follows_cursors(client):
+    pages = query_all_pages(client, "db-1")
+
+    assert len(pages) == 250
+    assert [c["start_cursor"] for c in client.databases.calls] == [None, "100", "200"]
+
+
+def test_second_sync_only_pulls_edited_pages(client):
+    store = NotionTaskStore()
+    assert len(store.sync(client, "db-1")) == 250
+
+    client.databases.pages[5] = make_page(5, edited="2024-03-02T09:00:00.000Z")
+    client.databases.pages.append(make_page(999, edited="2024-03-02T09:30:00.000Z"))
+    client.databases.calls.clear()
+
+    pages = store.sync(client, "db-1")
+
+    assert len(pages) == 251
+    assert len(client.databases.calls) == 1
+    assert client.databases.calls[0]["filter"]["last_edited_time"]["on_or_after"] == "2024-03-01T10:00:00.000Z"
+    assert store.watermark("db1") == "2024-03-02T09:30:00.000Z"
+
+
+def test_record_page_writes_through_and_drops_archived(client):
+    store = NotionTaskStore()
+    store.sync(client, "db-1")
+
+    store.record_page(make_page(500, edited="2024-03-03T00:00:00.000Z"))
+    archived = dict(make_page(1), archived=True)
+    store.record_page(archived)
+
+    client.databases.calls.clear()
+    ids = {p["id"] for p in store.sync(client, "db-1")}
+    assert "page-500" in ids and "page-1" not in ids
+
+
+def test_local_write_does_not_hide_earlier_remote_edits(client):
+    store = NotionTaskStore()
+    store.sync(client, "db-1")
+
+    # Edited in Notion after our last sync, then one of our own writes lands later
+    client.databases.pages[7] = make_page(7, edited="2024-03-02T09:00:00.000Z")
+    store.record_page(make_page(500, edited="2024-03-02T11:00:00.000Z"))
+
+    assert store.watermark("db-1") == "2024-03-01T10:00:00.000Z"
+    client.databases.calls.clear()
+    pages = {p["id"]: p for p in store.sync(client, "db-1")}
+    assert client.databases.calls[0]["filter"] is not None  # still a delta sync
+    assert pages["page-7"]["last_edited_time"] == "2024-03-02T09:00:00.000Z"
+    assert "page-500" in pages
+
+
+def test_full_resync_after_interval(client):
+    store = NotionTaskStore(full_sync_interval=timedelta(0))
+    store.sync(client, "db-1")
+    client.databases.pages = client.databases.pages[:10]
+
+    assert len(store.sync(client, "db-1")) == 10
+    assert client.databases.calls[-1]["filter"] is None
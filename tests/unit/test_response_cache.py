@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for the LLM response cache.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.ai.response_cache import ResponseCache, SQLiteResponseStore, response_key
+
+
+class FakeBackend:
+    """Embeds a text as its letter counts, so anagrams are 'identical' and other texts are not."""
+    dimension = 26
+
+    def embed_one(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for ch in text.lower():
+            if ch.isalpha():
+                vector[ord(ch) - ord('a')] += 1
+        return vector / (np.linalg.norm(vector) or 1)
+
+
+class Provider:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, answer="answer"):
+        def call():
+            self.calls += 1
+            return f"{answer} {self.calls}"
+        return call
+
+
+@pytest.fixture
+def cache(tmp_path):
+    store = SQLiteResponseStore(path=str(tmp_path / "responses.db"))
+    return ResponseCache(store=store, ttl_seconds=60, similarity_threshold=0.99,
+                         embedding_backend=FakeBackend())
+
+
+def test_prompts_differing_in_whitespace_share_an_entry(cache):
+    provider = Provider()
+
+    first = cache.get_or_call("Summarize:\n  the  report", provider(), "gemini:flash", 0.3)
+    second = cache.get_or_call("Summarize: the report ", provider(), "gemini:flash", 0.3)
+
+    assert first == second == "answer 1"
+    assert provider.calls == 1
+    assert cache.get_stats()["exact_hits"] == 1 and cache.get_stats()["hit_rate"] == 0.5
+
+
+def test_model_and_temperature_are_part_of_the_key(cache):
+    provider = Provider()
+
+    cache.get_or_call("prompt", provider(), "gemini:flash", 0.3)
+    cache.get_or_call("prompt", provider(), "gemini:pro", 0.3)
+    cache.get_or_call("prompt", provider(), "gemini:flash", 0.7)
+
+    assert provider.calls == 3
+    assert response_key("prompt", "a", 0.3) != response_key("prompt", "a", None)
+
+
+def test_opt_out_and_failures_are_not_cached(cache):
+    provider = Provider()
+
+    cache.get_or_call("prompt", provider(), "m", cache=False)
+    cache.get_or_call("prompt", provider(), "m", cache=False)
+
+    def failing():
+        raise RuntimeError("quota")
+    with pytest.raises(RuntimeError):
+        cache.get_or_call("other", failing, "m")
+
+    assert provider.calls == 2
+    assert cache.store.get(response_key("prompt", "m", None)) is None
+    assert cache.store.get(response_key("other", "m", None)) is None
+    assert cache.get_stats()["bypassed"] == 2
+
+
+def test_entries_expire(cache):
+    provider = Provider()
+
+    cache.get_or_call("prompt", provider(), "m", ttl=0.05)
+    time.sleep(0.06)
+    cache.get_or_call("prompt", provider(), "m")
+
+    assert provider.calls == 2
+
+
+def test_similar_inputs_of_an_opted_in_class_reuse_the_answer(cache):
+    provider = Provider()
+    template = "Name this activity: {}"
+
+    def ask(title, semantic_class="activity_name"):
+        return cache.get_or_call(template.format(title), provider(), "m", 0.3,
+                                 semantic_class=semantic_class, semantic_text=title)
+
+    assert ask("weekly sales review") == "answer 1"
+    assert ask("Weekly  review sales") == "answer 1"  # same words
+    assert ask("update the docs") == "answer 2"
+    assert ask("weekly sales review", semantic_class=None) == "answer 1"  # exact hit
+    assert ask("review sales weekly", semantic_class=None) == "answer 3"  # class not opted in
+    assert cache.get_stats()["semantic_hits"] == 1
+
+
+def test_similarity_index_is_rebuilt_from_storage(cache):
+    provider = Provider()
+    cache.get_or_call("q: reset password", provider(), "m", semantic_class="ask", semantic_text="reset password")
+
+    restarted = ResponseCache(store=cache.store, similarity_threshold=0.99, embedding_backend=FakeBackend())
+    answer = restarted.get_or_call("q: password reset", provider(), "m",
+                                   semantic_class="ask", semantic_text="password reset")
+
+    assert answer == "answer 1"
+    assert provider.calls == 1
+
+
+def test_sampled_generations_are_not_kept_for_a_day(monkeypatch):
+    analyzers = pytest.importorskip("src.core.ai.analyzers")
+    calls = []
+    monkeypatch.setattr(analyzers, "cached_completion",
+                        lambda prompt, call, model, temperature, **options: calls.append(options) or "text")
+
+    monkeypatch.setattr("src.core.gemini_client.client", object())
+    analyzer = analyzers.AnalyzerBase.__new__(analyzers.AnalyzerBase)
+    analyzer.client = object()
+    analyzer.generate_text("Summarize my week")
+    analyzers.get_ai_response("Extract tasks")
+
+    assert calls[0] == {"cache": False}
+    assert calls[1]["ttl"] == analyzers.LLM_RESPONSE_CACHE_SAMPLED_TTL_SECONDS
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for batch task similarity resolution (one embedding call, one LLM prompt).
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import src.core.task_similarity as task_similarity
+from src.core.task_vector_index import reset_task_indexes
+
+VOCAB = ["login", "auth", "database", "query", "docs", "api", "deploy", "pipeline", "review"]
+
+
+class FakeChromaManager:
+    """Stands in for SimpleChromaEmbeddingManager with deterministic vectors."""
+
+    def __init__(self):
+        self.batch_calls = []
+
+    def get_batch_embeddings(self, texts):
+        self.batch_calls.append(list(texts))
+        return {t: np.array([float(t.lower().split().count(w)) for w in VOCAB]) + 0.01 for t in texts}
+
+    def get_embedding(self, text):
+        return self.get_batch_embeddings([text])[text]
+
+
+class FakeAnalyzer:
+    """Records batch prompts and matches every new task to its first candidate."""
+
+    calls = []
+
+    def analyze_task_similarity_batch(self, comparisons):
+        FakeAnalyzer.calls.append(comparisons)
+        return [{
+            "is_match": True,
+            "confidence": 0.8,
+            "matched_task": c["existing_tasks"][0],
+            "explanation": "same work"
+        } for c in comparisons]
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    reset_task_indexes()
+    FakeAnalyzer.calls = []
+    manager = FakeChromaManager()
+    monkeypatch.setattr(task_similarity, "_chroma_manager", manager)
+    monkeypatch.setattr(task_similarity, "TaskAnalyzer", FakeAnalyzer)
+    yield manager
+    reset_task_indexes()
+
+
+@pytest.fixture
+def existing_tasks():
+    return [
+        {"id": "e1", "task": "fix login auth", "notes": "", "status": "In Progress", "category": "Security"},
+        {"id": "e2", "task": "optimize database query", "notes": "", "status": "To Do", "category": "Perf"},
+        {"id": "e3", "task": "deploy pipeline", "notes": "", "status": "Done", "category": "DevOps"},
+    ]
+
+
+def test_embedding_mode_scores_whole_batch(fakes, existing_tasks):
+    new_tasks = [{"task": "optimize database query"}, {"task": "api docs review"}]
+
+    results = task_similarity.check_task_similarity_batch(
+        new_tasks, existing_tasks, database_id="db", mode="embedding"
+    )
+
+    assert results[0]["is_match"] and results[0]["matched_task"]["id"] == "e2"
+    assert not results[1]["is_match"]
+    # New tasks embedded together, existing tasks embedded together
+    assert sorted(map(len, fakes.batch_calls)) == [2, 3]
+
+
+def test_hybrid_sends_only_ambiguous_tasks_in_one_prompt(fakes, existing_tasks):
+    new_tasks = [
+        {"task": "fix login auth"},           # exact match: accepted without the LLM
+        {"task": "login auth review"},        # ambiguous: goes to the LLM
+        {"task": "database query review"},    # ambiguous: goes to the LLM
+    ]
+
+    results = task_similarity.check_task_similarity_batch(
+        new_tasks, existing_tasks, database_id="db", mode="hybrid", top_k=2
+    )
+
+    assert len(FakeAnalyzer.calls) == 1
+    assert [c["new_task"]["task"] for c in FakeAnalyzer.calls[0]] == ["login auth review", "database query review"]
+    assert results[0]["matched_task"]["id"] == "e1"
+    # Matched tasks are mapped back to the Notion task, keeping its id
+    assert results[1]["matched_task"]["id"] == "e1"
+    assert results[2]["matched_task"]["id"] == "e2"
+
+
+def test_intra_batch_duplicates_are_collapsed(fakes, existing_tasks):
+    new_tasks = [{"task": "deploy docs"}, {"task": "api review"}, {"task": "Deploy docs"}]
+
+    results = task_similarity.check_task_similarity_batch(
+        new_tasks, existing_tasks, database_id="db", mode="embedding"
+    )
+
+    assert results[2]["duplicate_of"] == 0
+    assert "duplicate_of" not in results[0] and "duplicate_of" not in results[1]
+
+
+def test_invalid_tasks_keep_their_position(fakes, existing_tasks):
+    results = task_similarity.check_task_similarity_batch(
+        [{"task": ""}, {"task": "deploy pipeline"}], existing_tasks, mode="embedding"
+    )
+
+    assert results[0]["explanation"] == "Invalid task"
+    assert results[1]["matched_task"]["id"] == "e3"
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared, per-database Notion task cache.
+"""
+import fnmatch
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.task_cache import TaskCache
+
+
+def make_tasks(prefix, n):
+    return [{"id": f"{prefix}-{i}", "task": f"task {i}"} for i in range(n)]
+
+
+def test_entries_are_keyed_per_database_with_own_ttl():
+    cache = TaskCache(ttl_seconds=0.05)
+    cache.set("db-1", make_tasks("a", 2))
+    time.sleep(0.06)
+    cache.set("db-2", make_tasks("b", 3))
+
+    assert cache.get("db-1") is None
+    assert len(cache.get("db2")) == 3  # dashes are ignored
+    assert cache.get_stats()["hits"] == 1 and cache.get_stats()["misses"] == 1
+
+
+def test_least_recently_used_database_is_evicted():
+    cache = TaskCache(max_databases=2)
+    cache.set("db-1", make_tasks("a", 1))
+    cache.set("db-2", make_tasks("b", 1))
+    cache.get("db-1")
+    cache.set("db-3", make_tasks("c", 1))
+
+    assert cache.get("db-2") is None
+    assert cache.get("db-1") is not None and cache.get("db-3") is not None
+
+
+def test_writes_go_through_to_cached_databases_only():
+    cache = TaskCache()
+    cache.set("db-1", make_tasks("a", 2))
+
+    cache.upsert_task("db-1", {"id": "a-0", "task": "renamed"})
+    cache.upsert_task("db-1", {"id": "a-9", "task": "new"})
+    cache.upsert_task("db-2", {"id": "b-0", "task": "not cached"})
+    cache.remove_task("a-1")
+
+    tasks = {t["id"]: t["task"] for t in cache.get("db-1")}
+    assert tasks == {"a-0": "renamed", "a-9": "new"}
+    assert cache.get("db-2") is None
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.Redis hash, pipeline and WATCH calls the cache uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiries = {}
+        self.transactions = []
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        values = self.data.setdefault(key, {})
+        if field is not None:
+            values[field] = value
+        values.update(mapping or {})
+
+    def hkeys(self, key):
+        return list(self.data.get(key, {}))
+
+    def hmget(self, key, fields):
+        return [self.data.get(key, {}).get(field) for field in fields]
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.data.get(key, {}).pop(field, None)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match=None, count=None):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match or "*")]
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def expire(self, key, seconds):
+        self.expiries[key] = seconds
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def transaction(self, func, *watches):
+        self.transactions.append(watches)
+        pipe = FakePipeline(self, immediate=True)
+        func(pipe)
+        pipe.execute()
+
+
+class FakePipeline:
+    """Buffers commands until execute(); in a transaction, reads run at once until multi()."""
+
+    def __init__(self, redis, immediate=False):
+        self.redis = redis
+        self.immediate = immediate
+        self.commands = []
+
+    def multi(self):
+        self.immediate = False
+
+    def execute(self):
+        for name, args, kwargs in self.commands:
+            getattr(self.redis, name)(*args, **kwargs)
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            if self.immediate:
+                return getattr(self.redis, name)(*args, **kwargs)
+            self.commands.append((name, args, kwargs))
+        return command
+
+
+def test_redis_upsert_checks_and_writes_in_one_watched_transaction():
+    redis = FakeRedis()
+    cache = TaskCache(redis_client=redis)
+    cache.set("db-1", make_tasks("a", 1))
+
+    cache.upsert_task("db-1", {"id": "a-1", "task": "new"})
+    cache.upsert_task("db-2", {"id": "b-0", "task": "not cached"})
+
+    assert redis.transactions == [("notion_tasks:db1",), ("notion_tasks:db2",)]
+    assert {t["id"] for t in cache.get("db-1")} == {"a-0", "a-1"}
+    assert cache.get("db-2") is None
+
+
+def test_redis_remove_without_database_id_uses_the_task_index():
+    redis = FakeRedis()
+    cache = TaskCache(redis_client=redis)
+    cache.set("db-1", make_tasks("a", 2))
+    cache.set("db-2", make_tasks("b", 1))
+    cache.upsert_task("db-2", {"id": "b-1", "task": "new"})
+
+    cache.remove_task("a-1")
+    cache.remove_task("b-1")
+    cache.remove_task("unknown")
+
+    assert [t["id"] for t in cache.get("db-1")] == ["a-0"]
+    assert [t["id"] for t in cache.get("db-2")] == ["b-0"]
+    assert set(redis.hgetall("notion_tasks:index")) == {"a-0", "b-0"}
+
+
+def test_redis_invalidate_drops_entries_and_their_index_entries():
+    redis = FakeRedis()
+    cache = TaskCache(redis_client=redis)
+    cache.set("db-1", make_tasks("a", 2))
+    cache.set("db-2", make_tasks("b", 1))
+    assert cache.get_stats()["databases"] == 2
+
+    cache.invalidate("db-1")
+
+    assert cache.get("db-1") is None
+    assert set(redis.hgetall("notion_tasks:index")) == {"b-0"}
+    assert cache.get_stats()["databases"] == 1
+
+    cache.invalidate()
+
+    assert cache.get("db-2") is None
+    assert redis.data == {}
+    assert cache.get_stats()["databases"] == 0
+
+
+def test_redis_remove_tolerates_dangling_index_entries():
+    redis = FakeRedis()
+    cache = TaskCache(redis_client=redis)
+    cache.set("db-1", make_tasks("a", 2))
+    redis.delete("notion_tasks:db1")  # expired; its index entries remain
+
+    cache.remove_task("a-0")
+
+    assert cache.get("db-1") is None
+    assert set(redis.hgetall("notion_tasks:index")) == {"a-1"}
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process task vector index used by task similarity.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.task_vector_index import (
+    TaskVectorIndex,
+    get_task_index,
+    record_task_upsert,
+    record_task_delete,
+    reset_task_indexes,
+)
+
+VOCAB = ["login", "auth", "database", "query", "docs", "api", "deploy", "pipeline"]
+
+
+class FakeEmbedder:
+    """Bag-of-words embedder that records every batch it is asked for."""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, text):
+        words = text.lower().split()
+        return np.array([float(words.count(w)) for w in VOCAB]) + 0.01
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return {text: self.embed(text) for text in texts}
+
+
+@pytest.fixture
+def embedder():
+    reset_task_indexes()
+    yield FakeEmbedder()
+    reset_task_indexes()
+
+
+@pytest.fixture
+def tasks():
+    return [
+        {"id": "t1", "task": "fix login auth", "status": "In Progress"},
+        {"id": "t2", "task": "optimize database query", "status": "To Do"},
+        {"id": "t3", "task": "update api docs", "status": "To Do"},
+        {"id": "t4", "task": "deploy pipeline", "status": "Completed"},
+    ]
+
+
+def test_search_ranks_by_similarity(embedder, tasks):
+    index = TaskVectorIndex("db", embedder)
+    index.sync(tasks)
+
+    results = index.search(embedder.embed("slow database query"), top_k=2)
+
+    assert len(results) == 2
+    assert results[0]["task"]["id"] == "t2"
+    assert results[0]["rank"] == 1
+    assert results[0]["similarity"] > results[1]["similarity"]
+    assert results[0]["similarity"] == pytest.approx(1.0 / (1.0 + results[0]["distance"]))
+
+
+def test_sync_only_embeds_new_or_changed_tasks(embedder, tasks):
+    index = TaskVectorIndex("db", embedder)
+    index.sync(tasks)
+    index.sync(tasks)
+    assert len(embedder.calls) == 1
+
+    changed = dict(tasks[0], task="fix login auth api")
+    index.sync([changed] + tasks[1:])
+    assert embedder.calls[-1] == ["fix login auth api"]
+    assert len(index) == 4
+
+
+def test_threshold_and_candidate_filter(embedder, tasks):
+    index = TaskVectorIndex("db", embedder)
+    index.sync(tasks)
+    query = embedder.embed("login auth")
+
+    assert index.search(query, threshold=0.99)[0]["task"]["id"] == "t1"
+    restricted = index.search(query, candidate_keys=["t3", "t4"], top_k=5)
+    assert {r["task"]["id"] for r in restricted} == {"t3", "t4"}
+
+
+def test_remove_keeps_rows_consistent(embedder, tasks):
+    index = TaskVectorIndex("db", embedder)
+    index.sync(tasks)
+    index.remove("t1")
+
+    results = index.search(embedder.embed("deploy pipeline"), top_k=5)
+    assert len(index) == 3
+    assert "t1" not in {r["task"]["id"] for r in results}
+    assert results[0]["task"]["id"] == "t4"
+
+
+def test_registry_applies_notion_writes(embedder, tasks):
+    index = get_task_index("db", embedder)
+    assert get_task_index("db", embedder) is index
+    index.sync(tasks)
+
+    record_task_upsert("db", {"id": "t5", "task": "auth login audit"})
+    record_task_upsert(None, {"id": "t4", "task": "deploy docs"})
+    record_task_delete("t2")
+
+    results = index.search(embedder.embed("deploy docs"), top_k=5)
+    ids = [r["task"]["id"] for r in results]
+    assert results[0]["task"]["task"] == "deploy docs"
+    assert "t5" in ids and "t2" not in ids
+
+
+def test_unknown_database_is_ignored(embedder):
+    record_task_upsert("other", {"id": "x", "task": "login"})
+    record_task_upsert(None, {"id": "x", "task": "login"})
+    assert embedder.calls == []
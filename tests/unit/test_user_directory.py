@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared user directory and AuthService lookups through it.
+"""
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.core.models.user import User
+from src.core.user_directory import MISS, UserDirectory
+
+
+def make_user(n=1, **overrides):
+    fields = dict(
+        user_id=f"user-{n}",
+        email=f"User{n}@Example.com",
+        password_hash="$2b$secret",
+        full_name=f"User {n}",
+        role="user",
+        task_database_id=f"db-{n}"
+    )
+    fields.update(overrides)
+    return User(**fields)
+
+
+def test_users_are_indexed_by_id_and_case_insensitive_email():
+    directory = UserDirectory()
+    directory.set_user(make_user())
+
+    by_id = directory.get_by_id("user-1")
+    by_email = directory.get_by_email(" user1@example.com")
+
+    assert by_id.task_database_id == by_email.task_database_id == "db-1"
+    assert by_id.password_hash == ""  # hashes are never cached
+    assert directory.get_by_id("user-2") is MISS
+    assert directory.get_stats()["hits"] == 2 and directory.get_stats()["misses"] == 1
+
+
+def test_unknown_senders_are_cached_with_their_own_ttl():
+    directory = UserDirectory(ttl_seconds=60, negative_ttl_seconds=0.05)
+    directory.set_missing(email="stranger@example.com")
+
+    assert directory.get_by_email("stranger@example.com") is None
+    time.sleep(0.06)
+    assert directory.get_by_email("stranger@example.com") is MISS
+
+
+def test_invalidate_by_id_drops_the_email_index_too():
+    directory = UserDirectory()
+    directory.set_user(make_user())
+
+    directory.invalidate(user_id="user-1")
+
+    assert directory.get_by_id("user-1") is MISS
+    assert directory.get_by_email("user1@example.com") is MISS
+
+
+def test_cached_users_are_copies_and_lru_bounded():
+    directory = UserDirectory(max_users=2)
+    directory.preload([make_user(1), make_user(2), make_user(3)])
+
+    directory.get_by_id("user-3").full_name = "changed"
+
+    assert directory.get_by_id("user-1") is MISS
+    assert directory.get_by_id("user-3").full_name == "User 3"
+
+
+class FakeNotion:
+    def __init__(self, users):
+        self.users = users
+        self.queries = 0
+
+    def request(self, path, method, body):
+        self.queries += 1
+        condition = body.get("filter", {})
+        prop = condition.get("property")
+        value = (condition.get("title") or condition.get("rich_text") or {}).get("equals")
+        matches = [u for u in self.users if prop is None
+                   or (prop == "Email" and u.email == value)
+                   or (prop == "UserID" and u.user_id == value)]
+        return {"results": [self._page(u) for u in matches]}
+
+    def _page(self, user):
+        def text(value):
+            return {"rich_text": [{"text": {"content": value}}]}
+        return {
+            "id": f"page-{user.user_id}",
+            "properties": {
+                "Email": {"title": [{"text": {"content": user.email}}]},
+                "UserID": text(user.user_id),
+                "PasswordHash": text(user.password_hash),
+                "FullName": text(user.full_name),
+                "Role": {"select": {"name": user.role}},
+                "IsActive": {"checkbox": user.is_active},
+                "TaskDatabaseID": text(user.task_database_id),
+            }
+        }
+
+    @property
+    def pages(self):
+        return self
+
+    def update(self, page_id, properties):
+        for user in self.users:
+            if page_id == f"page-{user.user_id}" and "IsActive" in properties:
+                user.is_active = properties["IsActive"]["checkbox"]
+
+
+def make_auth_service(users):
+    import pytest
+    pytest.importorskip("bcrypt")
+    pytest.importorskip("notion_client")
+    from src.core.services.auth_service import AuthService
+
+    service = AuthService.__new__(AuthService)
+    service.notion_client = FakeNotion(users)
+    service.users_database_id = "users-db"
+    service.user_directory = UserDirectory()
+    return service
+
+
+def test_auth_service_queries_notion_once_per_user():
+    service = make_auth_service([make_user()])
+
+    for _ in range(3):
+        assert service.get_user_by_id("user-1").full_name == "User 1"
+    assert service.get_user_by_email("User1@Example.com").user_id == "user-1"
+    assert service.get_user_by_email("nobody@example.com") is None
+    assert service.get_user_by_email("nobody@example.com") is None
+
+    assert service.notion_client.queries == 2
+
+
+def test_deactivation_invalidates_the_cached_user():
+    service = make_auth_service([make_user()])
+    assert service.get_user_by_id("user-1").is_active
+
+    assert service.deactivate_user("user-1")
+
+    assert service.get_user_by_id("user-1").is_active is False
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory-mapped vector cache behind EmbeddingManager.
+"""
+import os
+import sys
+from hashlib import md5
+
+import numpy as np
+import pytest
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import src.core.vector_cache as vector_cache
+from src.core.vector_cache import MmapVectorCache
+
+
+def key(n):
+    return md5(str(n).encode()).hexdigest()
+
+
+def vec(n, dimension=4):
+    return np.full(dimension, n, dtype=np.float32)
+
+
+@pytest.fixture
+def open_cache(tmp_path):
+    caches = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("dimension", 4)
+        kwargs.setdefault("namespace", "test")
+        cache = MmapVectorCache(directory=str(tmp_path / "vectors"), **kwargs)
+        caches.append(cache)
+        return cache
+    yield factory
+    for cache in caches:
+        cache.close()
+
+
+def test_vectors_survive_a_reopen(open_cache):
+    cache = open_cache()
+    cache.put_many([(key(n), vec(n)) for n in range(10)])
+    assert cache.get(key(3)).tolist() == [3.0] * 4  # served before the files are synced
+    cache.close()
+
+    reopened = open_cache()
+
+    assert len(reopened) == 10
+    assert reopened.get(key(7)).tolist() == [7.0] * 4
+    assert reopened.get(key(99)) is None
+    assert reopened.get_stats()["hits"] == 1 and reopened.get_stats()["misses"] == 1
+
+
+def test_index_is_rebuilt_and_newest_row_wins(open_cache, monkeypatch):
+    monkeypatch.setattr(vector_cache, "_MAX_UNINDEXED", 5)
+    cache = open_cache()
+    cache.put_many([(key(n), vec(n)) for n in range(8)])
+    cache.put(key(2), vec(42))
+    cache.sync()
+
+    assert cache.get_stats()["indexed_rows"] == 9
+    assert cache.get(key(2)).tolist() == [42.0] * 4
+    assert cache.get(key(5)).tolist() == [5.0] * 4
+
+
+def test_compaction_keeps_the_most_recently_used(open_cache, monkeypatch):
+    cache = open_cache(max_entries=4, compact_slack=0.5)
+    cache.put_many([(key(n), vec(n)) for n in range(4)])
+    cache.sync()
+    cache._used[:] = 100  # make the first rows old
+    cache._used[cache._find_rows([key(0).encode()])] = 200
+    cache.put_many([(key(n), vec(n)) for n in range(4, 7)])
+
+    assert cache.get_stats()["compactions"] == 1
+    assert cache.get_stats()["generation"] == 1
+    assert len(cache) == 4
+    assert cache.get(key(0)) is not None and cache.get(key(1)) is None
+    assert cache.get(key(6)).tolist() == [6.0] * 4
+    assert not os.path.exists(cache._path("vectors", 0))
+
+
+def test_second_process_reads_without_writing(open_cache, monkeypatch):
+    monkeypatch.setattr(vector_cache, "_REFRESH_SECONDS", 0)
+    writer = open_cache()
+    reader = open_cache()  # the writer lock is taken
+    assert reader.readonly and not writer.readonly
+
+    writer.put(key(1), vec(1))
+    writer.sync()
+    assert reader.get(key(1)).tolist() == [1.0] * 4
+
+    writer.compact()
+    writer.put(key(2), vec(2))
+    writer.sync()
+    assert reader.get(key(2)).tolist() == [2.0] * 4
+    assert reader.get_stats()["generation"] == writer.get_stats()["generation"]
+
+
+def test_a_cache_of_another_model_is_discarded(open_cache):
+    cache = open_cache()
+    cache.put(key(1), vec(1))
+    cache.close()
+
+    other = open_cache(dimension=8, namespace="other")
+
+    assert len(other) == 0 and other.get(key(1)) is None
+    other.put(key(1), vec(1, dimension=8))
+    assert other.get(key(1)).shape == (8,)
+
+
+def test_keys_must_be_hex_digests(open_cache):
+    with pytest.raises(ValueError):
+        open_cache().put("too-short", vec(1))